@@ -3,6 +3,9 @@
 -- Salesforce Audit Agent Database Schema - Following IDS Naming Conventions
 -- ============================================================================
 
+-- Trigram indexes back substring search on component names
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
 -- 1. Integration table - Main integration configurations
 CREATE TABLE ids_integration (
     i_id                      SERIAL PRIMARY KEY,
@@ -72,6 +75,8 @@ CREATE TABLE ids_audit_extraction_job (
     aej_total_files           INTEGER DEFAULT 0,
     aej_log                   TEXT,
     aej_job_data              JSONB,
+    aej_job_key               TEXT, -- Job id handed to the client, see ids_audit_job_state
+    aej_checkpoint            JSONB, -- Retrieve ids, saved zips, ingest and analysis progress for resuming
     aej_created_user_id       BIGINT,
     aej_created_timestamp     TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
     aej_last_updated_user_id  BIGINT,
@@ -116,6 +121,12 @@ CREATE TABLE ids_audit_metadata_component (
     amc_last_updated_user_id  BIGINT,
     amc_last_updated_timestamp TIMESTAMP,
     amc_status                INTEGER DEFAULT 1, -- 1=active, -1=archived
+    -- Weighted full-text document for search: dev name (A), label (B), first 200k characters of content (C)
+    amc_search_vector         TSVECTOR GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple'::regconfig, COALESCE(amc_dev_name, '')), 'A') ||
+        setweight(to_tsvector('simple'::regconfig, COALESCE(amc_label, '')), 'B') ||
+        setweight(to_tsvector('simple'::regconfig, LEFT(COALESCE(amc_content, ''), 200000)), 'C')
+    ) STORED,
 
     CONSTRAINT fk_amc_org_id
         FOREIGN KEY (amc_org_id)
@@ -151,6 +162,7 @@ CREATE TABLE ids_audit_metadata_dependency (
     amd_to_component_id       BIGINT NOT NULL,
     amd_dependency_type       TEXT,
     amd_description           TEXT,
+    amd_occurrence_count      INTEGER NOT NULL DEFAULT 1, -- Number of references collapsed into this edge
     amd_created_user_id       BIGINT,
     amd_created_timestamp     TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
     amd_last_updated_user_id  BIGINT,
@@ -260,6 +272,70 @@ CREATE TABLE ids_audit_list_metadata_mappings (
         UNIQUE(almm_list_id, almm_component_id)
 );
 
+-- 8. Audit Dependency Cycle table - Circular dependency groups found when a job's dependencies are stored
+CREATE TABLE ids_audit_dependency_cycle (
+    adc_id                    SERIAL PRIMARY KEY,
+    adc_org_id                BIGINT NOT NULL, -- Reference to ids_organisation.org_id
+    adc_extraction_job_id     BIGINT NOT NULL,
+    adc_cycle_index           INTEGER NOT NULL, -- 1 = largest cycle of the job
+    adc_component_ids         BIGINT[] NOT NULL,
+    adc_component_count       INTEGER NOT NULL,
+    adc_edge_count            INTEGER NOT NULL DEFAULT 0, -- Dependencies between members of the cycle
+    adc_dependency_types      TEXT[],
+    adc_created_user_id       BIGINT,
+    adc_created_timestamp     TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    adc_status                INTEGER DEFAULT 1, -- 1=active, -1=archived
+
+    CONSTRAINT fk_adc_org_id
+        FOREIGN KEY (adc_org_id)
+        REFERENCES ids_organisation(org_id)
+        ON DELETE CASCADE,
+
+    CONSTRAINT fk_adc_extraction_job_id
+        FOREIGN KEY (adc_extraction_job_id)
+        REFERENCES ids_audit_extraction_job(aej_id),
+
+    CONSTRAINT fk_adc_created_user_id
+        FOREIGN KEY (adc_created_user_id)
+        REFERENCES ids_users(user_id),
+
+    CONSTRAINT uk_adc_job_cycle_index
+        UNIQUE(adc_extraction_job_id, adc_cycle_index)
+);
+
+-- 9. Audit Job State table - Live state of extraction jobs, shared by every API worker process
+CREATE TABLE ids_audit_job_state (
+    ajs_job_key               TEXT PRIMARY KEY, -- Job id handed to the client (a UUID)
+    ajs_integration_id        BIGINT,
+    ajs_status                TEXT, -- starting, processing, ... success or error (final)
+    ajs_progress              JSONB NOT NULL DEFAULT '[]', -- Newest progress messages only
+    ajs_progress_total        INTEGER NOT NULL DEFAULT 0, -- Progress messages ever logged, including dropped ones
+    ajs_data                  JSONB,
+    ajs_error                 TEXT,
+    ajs_fields                JSONB NOT NULL DEFAULT '{}', -- Any other job attributes (e.g. mode)
+    ajs_started_at            TIMESTAMP,
+    ajs_ended_at              TIMESTAMP,
+    ajs_finished_at           TIMESTAMP, -- When the status became final; expired rows are deleted
+    ajs_updated_timestamp     TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- 10. Audit Extraction Queue table - Extractions waiting for, or holding, a worker slot
+CREATE TABLE ids_audit_extraction_queue (
+    aeq_job_key               TEXT PRIMARY KEY, -- Job id handed to the client, see ids_audit_job_state
+    aeq_org_id                BIGINT NOT NULL,
+    aeq_integration_id        BIGINT,
+    aeq_priority              INTEGER NOT NULL DEFAULT 1, -- Lower runs first
+    aeq_dedup_key             TEXT, -- One queued or running extraction per key (e.g. per integration)
+    aeq_request               JSONB NOT NULL, -- What to run, without credentials
+    aeq_queue_status          TEXT NOT NULL DEFAULT 'queued', -- queued or running; the row is deleted when done
+    aeq_enqueued_at           TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    aeq_started_at            TIMESTAMP,
+    aeq_worker_id             TEXT, -- host:pid of the process running it
+    aeq_heartbeat_at          TIMESTAMP, -- Running rows not heartbeated for a while are reclaimed
+    aeq_attempts              INTEGER NOT NULL DEFAULT 0, -- Times a worker has claimed it
+    aeq_last_progress         TEXT -- Latest progress message, written with each heartbeat
+);
+
 -- ============================================================================
 -- INDEXES FOR PERFORMANCE
 -- ============================================================================
@@ -279,6 +355,8 @@ CREATE INDEX idx_aej_integration_id ON ids_audit_extraction_job(aej_integration_
 CREATE INDEX idx_aej_job_status ON ids_audit_extraction_job(aej_job_status);
 CREATE INDEX idx_aej_started_at ON ids_audit_extraction_job(aej_started_at);
 CREATE INDEX idx_aej_status ON ids_audit_extraction_job(aej_status);
+CREATE INDEX idx_aej_integration_created ON ids_audit_extraction_job(aej_integration_id, aej_created_timestamp DESC);
+CREATE INDEX idx_aej_job_key ON ids_audit_extraction_job(aej_job_key);
 
 -- Metadata component indexes
 CREATE INDEX idx_amc_org_id ON ids_audit_metadata_component(amc_org_id);
@@ -287,6 +365,11 @@ CREATE INDEX idx_amc_metadata_type_id ON ids_audit_metadata_component(amc_metada
 CREATE INDEX idx_amc_extraction_job_id ON ids_audit_metadata_component(amc_extraction_job_id);
 CREATE INDEX idx_amc_dev_name ON ids_audit_metadata_component(amc_dev_name);
 CREATE INDEX idx_amc_status ON ids_audit_metadata_component(amc_status);
+CREATE INDEX idx_amc_job_type_dev_name ON ids_audit_metadata_component(amc_extraction_job_id, amc_metadata_type_id, amc_dev_name);
+CREATE INDEX idx_amc_job_dev_name_key ON ids_audit_metadata_component(amc_extraction_job_id, COALESCE(amc_dev_name, ''), amc_id);
+CREATE INDEX idx_amc_search_vector ON ids_audit_metadata_component USING GIN (amc_search_vector);
+CREATE INDEX idx_amc_dev_name_trgm ON ids_audit_metadata_component USING GIN (amc_dev_name gin_trgm_ops);
+CREATE INDEX idx_amc_label_trgm ON ids_audit_metadata_component USING GIN (amc_label gin_trgm_ops);
 
 -- Metadata dependency indexes
 CREATE INDEX idx_amd_org_id ON ids_audit_metadata_dependency(amd_org_id);
@@ -306,6 +389,18 @@ CREATE INDEX idx_almm_list_id ON ids_audit_list_metadata_mappings(almm_list_id);
 CREATE INDEX idx_almm_component_id ON ids_audit_list_metadata_mappings(almm_component_id);
 CREATE INDEX idx_almm_status ON ids_audit_list_metadata_mappings(almm_status);
 
+-- Dependency cycle indexes
+CREATE INDEX idx_adc_org_id ON ids_audit_dependency_cycle(adc_org_id);
+CREATE INDEX idx_adc_extraction_job_id ON ids_audit_dependency_cycle(adc_extraction_job_id);
+
+-- Job state indexes
+CREATE INDEX idx_ajs_finished_at ON ids_audit_job_state(ajs_finished_at);
+CREATE INDEX idx_ajs_updated_timestamp ON ids_audit_job_state(ajs_updated_timestamp);
+
+-- Extraction queue indexes
+CREATE UNIQUE INDEX uk_aeq_dedup_key ON ids_audit_extraction_queue(aeq_dedup_key) WHERE aeq_dedup_key IS NOT NULL;
+CREATE INDEX idx_aeq_status_priority ON ids_audit_extraction_queue(aeq_queue_status, aeq_priority, aeq_enqueued_at);
+
 -- ============================================================================
 -- POSTGRESQL COMPATIBILITY & UPDATED FOREIGN KEY SUMMARY
 -- ============================================================================
@@ -350,4 +445,113 @@ CREATE INDEX idx_almm_status ON ids_audit_list_metadata_mappings(almm_status);
 -- 28. ids_audit_list_metadata_mappings.almm_list_id → ids_audit_mylist.aml_id
 -- 29. ids_audit_list_metadata_mappings.almm_component_id → ids_audit_metadata_component.amc_id
 -- 30. ids_audit_list_metadata_mappings.almm_created_user_id → ids_users.user_id
--- 31. ids_audit_list_metadata_mappings.almm_last_updated_user_id → ids_users.user_id
\ No newline at end of file
+-- 31. ids_audit_list_metadata_mappings.almm_last_updated_user_id → ids_users.user_id
+-- 32. ids_audit_dependency_cycle.adc_org_id → ids_organisation.org_id ON DELETE CASCADE
+-- 33. ids_audit_dependency_cycle.adc_extraction_job_id → ids_audit_extraction_job.aej_id
+-- 34. ids_audit_dependency_cycle.adc_created_user_id → ids_users.user_id
+
+-- ============================================================================
+-- MIGRATIONS FOR EXISTING DATABASES
+-- ============================================================================
+-- Run these against databases created from an earlier version of this schema.
+
+-- Dependency edges are deduplicated during extraction; keep how many references each edge stands for
+ALTER TABLE ids_audit_metadata_dependency
+    ADD COLUMN IF NOT EXISTS amd_occurrence_count INTEGER NOT NULL DEFAULT 1;
+
+-- Incremental extraction matches carried-forward components by (job, type, developer name)
+CREATE INDEX IF NOT EXISTS idx_amc_job_type_dev_name
+    ON ids_audit_metadata_component(amc_extraction_job_id, amc_metadata_type_id, amc_dev_name);
+
+-- Keyset pagination of component listings orders by (dev_name, amc_id) within a job; a NULL
+-- dev name sorts as ''
+DROP INDEX IF EXISTS idx_amc_job_dev_name_id;
+CREATE INDEX IF NOT EXISTS idx_amc_job_dev_name_key
+    ON ids_audit_metadata_component(amc_extraction_job_id, COALESCE(amc_dev_name, ''), amc_id);
+
+-- Indexed metadata search: weighted tsvector over names and content plus trigram indexes on names.
+-- Adding the stored generated column rewrites the component table once.
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+ALTER TABLE ids_audit_metadata_component
+    ADD COLUMN IF NOT EXISTS amc_search_vector TSVECTOR GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple'::regconfig, COALESCE(amc_dev_name, '')), 'A') ||
+        setweight(to_tsvector('simple'::regconfig, COALESCE(amc_label, '')), 'B') ||
+        setweight(to_tsvector('simple'::regconfig, LEFT(COALESCE(amc_content, ''), 200000)), 'C')
+    ) STORED;
+CREATE INDEX IF NOT EXISTS idx_amc_search_vector
+    ON ids_audit_metadata_component USING GIN (amc_search_vector);
+CREATE INDEX IF NOT EXISTS idx_amc_dev_name_trgm
+    ON ids_audit_metadata_component USING GIN (amc_dev_name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_amc_label_trgm
+    ON ids_audit_metadata_component USING GIN (amc_label gin_trgm_ops);
+
+-- Dashboards look up the latest job per integration in one lateral join
+CREATE INDEX IF NOT EXISTS idx_aej_integration_created
+    ON ids_audit_extraction_job(aej_integration_id, aej_created_timestamp DESC);
+
+-- Circular dependency groups are computed when a job's dependencies are stored
+CREATE TABLE IF NOT EXISTS ids_audit_dependency_cycle (
+    adc_id                    SERIAL PRIMARY KEY,
+    adc_org_id                BIGINT NOT NULL REFERENCES ids_organisation(org_id) ON DELETE CASCADE,
+    adc_extraction_job_id     BIGINT NOT NULL REFERENCES ids_audit_extraction_job(aej_id),
+    adc_cycle_index           INTEGER NOT NULL,
+    adc_component_ids         BIGINT[] NOT NULL,
+    adc_component_count       INTEGER NOT NULL,
+    adc_edge_count            INTEGER NOT NULL DEFAULT 0,
+    adc_dependency_types      TEXT[],
+    adc_created_user_id       BIGINT REFERENCES ids_users(user_id),
+    adc_created_timestamp     TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    adc_status                INTEGER DEFAULT 1,
+    CONSTRAINT uk_adc_job_cycle_index UNIQUE(adc_extraction_job_id, adc_cycle_index)
+);
+CREATE INDEX IF NOT EXISTS idx_adc_org_id ON ids_audit_dependency_cycle(adc_org_id);
+CREATE INDEX IF NOT EXISTS idx_adc_extraction_job_id ON ids_audit_dependency_cycle(adc_extraction_job_id);
+
+-- Extraction job state moves out of worker memory so any API worker can answer status polls
+CREATE TABLE IF NOT EXISTS ids_audit_job_state (
+    ajs_job_key               TEXT PRIMARY KEY,
+    ajs_integration_id        BIGINT,
+    ajs_status                TEXT,
+    ajs_progress              JSONB NOT NULL DEFAULT '[]',
+    ajs_data                  JSONB,
+    ajs_error                 TEXT,
+    ajs_fields                JSONB NOT NULL DEFAULT '{}',
+    ajs_started_at            TIMESTAMP,
+    ajs_ended_at              TIMESTAMP,
+    ajs_finished_at           TIMESTAMP,
+    ajs_updated_timestamp     TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_ajs_finished_at ON ids_audit_job_state(ajs_finished_at);
+CREATE INDEX IF NOT EXISTS idx_ajs_updated_timestamp ON ids_audit_job_state(ajs_updated_timestamp);
+
+-- Progress streams resume from a count of every progress message logged, not just those kept
+ALTER TABLE ids_audit_job_state
+    ADD COLUMN IF NOT EXISTS ajs_progress_total INTEGER NOT NULL DEFAULT 0;
+
+-- Extractions are queued behind a fixed number of worker slots instead of each starting a thread
+CREATE TABLE IF NOT EXISTS ids_audit_extraction_queue (
+    aeq_job_key               TEXT PRIMARY KEY, -- Job id handed to the client, see ids_audit_job_state
+    aeq_org_id                BIGINT NOT NULL,
+    aeq_integration_id        BIGINT,
+    aeq_priority              INTEGER NOT NULL DEFAULT 1, -- Lower runs first
+    aeq_dedup_key             TEXT, -- One queued or running extraction per key (e.g. per integration)
+    aeq_request               JSONB NOT NULL, -- What to run, without credentials
+    aeq_queue_status          TEXT NOT NULL DEFAULT 'queued', -- queued or running; the row is deleted when done
+    aeq_enqueued_at           TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    aeq_started_at            TIMESTAMP
+);
+CREATE UNIQUE INDEX IF NOT EXISTS uk_aeq_dedup_key ON ids_audit_extraction_queue(aeq_dedup_key) WHERE aeq_dedup_key IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_aeq_status_priority ON ids_audit_extraction_queue(aeq_queue_status, aeq_priority, aeq_enqueued_at);
+
+-- Extraction workers claim queued rows with SKIP LOCKED, heartbeat them and reclaim ones whose worker died
+ALTER TABLE ids_audit_extraction_queue
+    ADD COLUMN IF NOT EXISTS aeq_worker_id TEXT,
+    ADD COLUMN IF NOT EXISTS aeq_heartbeat_at TIMESTAMP,
+    ADD COLUMN IF NOT EXISTS aeq_attempts INTEGER NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS aeq_last_progress TEXT;
+
+-- Extractions checkpoint each stage so an interrupted one continues instead of starting over
+ALTER TABLE ids_audit_extraction_job
+    ADD COLUMN IF NOT EXISTS aej_job_key TEXT,
+    ADD COLUMN IF NOT EXISTS aej_checkpoint JSONB;
+CREATE INDEX IF NOT EXISTS idx_aej_job_key ON ids_audit_extraction_job(aej_job_key);
@@ -1,5 +1,67 @@
-def get_comprehensive_metadata_retrieve_body(session_id):
-    """Generate comprehensive metadata retrieve request with ALL Salesforce metadata types"""
+"""
+Metadata API retrieve requests for comprehensive extraction
+A full extraction can be sent as one retrieve, or planned into several smaller retrieves by type
+"""
+
+from xml.sax.saxutils import escape
+
+# Metadata types requested by a comprehensive extraction, in request order
+COMPREHENSIVE_RETRIEVE_TYPES = [
+    'ApexClass', 'ApexTrigger', 'ApexPage', 'ApexComponent', 'CustomObject', 'CustomField', 'Flow',
+    'Layout', 'ValidationRule', 'WorkflowRule', 'PermissionSet', 'Profile', 'Role', 'Group',
+    'Queue', 'CustomTab', 'CustomApplication', 'CustomPermission', 'CustomMetadata', 'CustomLabel',
+    'CustomSite', 'CustomWebLink', 'CustomObjectTranslation', 'CustomPageWebLink',
+    'CustomTabTranslation', 'Dashboard', 'Document', 'EmailTemplate', 'FlexiPage', 'GlobalValueSet',
+    'GlobalValueSetTranslation', 'HomePageComponent', 'HomePageLayout', 'InstalledPackage',
+    'ListView', 'NamedCredential', 'Network', 'NetworkBranding', 'NetworkMemberGroup',
+    'NetworkPageOverride', 'NetworkTabSet', 'PathAssistant', 'PermissionSetGroup',
+    'PlatformEventChannel', 'PlatformEventChannelMember', 'PostTemplate', 'ProfilePasswordPolicy',
+    'ProfileSessionSetting', 'QueueRoutingConfig', 'QuickAction', 'Report', 'ReportType',
+    'SamlSsoConfig', 'Scontrol', 'ServiceChannel', 'ServicePresenceStatus', 'SharingRules',
+    'SharingSet', 'SiteDotCom', 'Skill', 'StandardValueSet', 'StandardValueSetTranslation',
+    'StaticResource', 'SynonymDictionary', 'Territory', 'Territory2', 'Territory2Model',
+    'Territory2Rule', 'Territory2Type', 'TopicsForObjects', 'UserCriteria', 'UserProfileSearch',
+    'WaveApplication', 'WaveDashboard', 'WaveDataflow', 'WaveDataset', 'WaveLens', 'WaveRecipe',
+    'WaveSpoke', 'WaveXmd', 'WorkflowAlert', 'WorkflowFieldUpdate', 'WorkflowKnowledgePublish',
+    'WorkflowOutboundMessage', 'WorkflowSend', 'WorkflowTask'
+]
+
+# Relative retrieve cost of types that are usually large; every other type costs 1
+METADATA_TYPE_WEIGHTS = {
+    'CustomObject': 8, 'Profile': 6, 'PermissionSet': 4, 'Report': 6, 'Dashboard': 4, 'Document': 6,
+    'EmailTemplate': 4, 'StaticResource': 6, 'ApexClass': 4, 'Flow': 4, 'Layout': 4,
+    'CustomObjectTranslation': 4, 'ListView': 3, 'FlexiPage': 3, 'CustomField': 4
+}
+
+# Profile and PermissionSet retrieves only include permissions on components retrieved in the same
+# request, so they are retrieved together with every type they grant access to
+PERMISSION_TYPES = ('Profile', 'PermissionSet')
+PERMISSION_SCOPE_TYPES = (
+    'ApexClass', 'ApexPage', 'CustomApplication', 'CustomObject', 'CustomField', 'CustomPermission',
+    'CustomTab', 'Flow', 'Layout'
+)
+
+# Chunked extraction settings
+RETRIEVE_CHUNK_CONFIG = {
+    'enabled': True,                 # Set to False to send one retrieve for every type
+    'max_chunk_weight': 12,          # Types are packed into retrieves up to this total weight
+    'max_concurrent_retrieves': 3    # Retrieves in flight at once per extraction, well under org API limits
+}
+
+def get_metadata_retrieve_body(session_id, metadata_types, members=None):
+    """Generate a retrieve request for the given metadata types
+
+    members optionally maps a type to the fullNames to retrieve; other types retrieve every member (*).
+    """
+    members = members or {}
+
+    def type_xml(metadata_type):
+        members_xml = ''.join(
+            f'\n                  <members>{escape(name)}</members>' for name in members.get(metadata_type, ['*'])
+        )
+        return f'\n               <types>{members_xml}\n                  <name>{metadata_type}</name>\n               </types>'
+
+    types_xml = ''.join(type_xml(metadata_type) for metadata_type in metadata_types)
     return f'''<?xml version="1.0" encoding="UTF-8"?>
 <soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/" xmlns:met="http://soap.sforce.com/2006/04/metadata">
    <soapenv:Header>
@@ -12,351 +74,7 @@ def get_comprehensive_metadata_retrieve_body(session_id):
          <met:retrieveRequest>
             <met:apiVersion>62.0</met:apiVersion>
             <met:singlePackage>true</met:singlePackage>
-            <met:unpackaged>
-               <types>
-                  <members>*</members>
-                  <name>ApexClass</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>ApexTrigger</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>ApexPage</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>ApexComponent</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>CustomObject</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>CustomField</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>Flow</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>Layout</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>ValidationRule</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>WorkflowRule</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>PermissionSet</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>Profile</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>Role</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>Group</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>Queue</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>CustomTab</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>CustomApplication</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>CustomPermission</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>CustomMetadata</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>CustomLabel</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>CustomSite</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>CustomWebLink</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>CustomObjectTranslation</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>CustomPageWebLink</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>CustomTabTranslation</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>Dashboard</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>Document</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>EmailTemplate</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>FlexiPage</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>GlobalValueSet</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>GlobalValueSetTranslation</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>HomePageComponent</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>HomePageLayout</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>InstalledPackage</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>ListView</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>NamedCredential</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>Network</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>NetworkBranding</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>NetworkMemberGroup</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>NetworkPageOverride</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>NetworkTabSet</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>PathAssistant</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>PermissionSetGroup</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>PlatformEventChannel</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>PlatformEventChannelMember</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>PostTemplate</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>ProfilePasswordPolicy</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>ProfileSessionSetting</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>QueueRoutingConfig</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>QuickAction</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>Report</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>ReportType</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>SamlSsoConfig</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>Scontrol</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>ServiceChannel</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>ServicePresenceStatus</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>SharingRules</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>SharingSet</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>SiteDotCom</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>Skill</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>StandardValueSet</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>StandardValueSetTranslation</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>StaticResource</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>SynonymDictionary</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>Territory</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>Territory2</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>Territory2Model</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>Territory2Rule</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>Territory2Type</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>TopicsForObjects</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>UserCriteria</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>UserProfileSearch</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>WaveApplication</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>WaveDashboard</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>WaveDataflow</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>WaveDataset</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>WaveLens</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>WaveRecipe</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>WaveSpoke</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>WaveXmd</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>WorkflowAlert</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>WorkflowFieldUpdate</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>WorkflowKnowledgePublish</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>WorkflowOutboundMessage</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>WorkflowSend</name>
-               </types>
-               <types>
-                  <members>*</members>
-                  <name>WorkflowTask</name>
-               </types>
+            <met:unpackaged>{types_xml}
                <version>62.0</version>
             </met:unpackaged>
          </met:retrieveRequest>
@@ -364,6 +82,44 @@ def get_comprehensive_metadata_retrieve_body(session_id):
    </soapenv:Body>
 </soapenv:Envelope>'''
 
+def get_comprehensive_metadata_retrieve_body(session_id):
+    """Generate comprehensive metadata retrieve request with ALL Salesforce metadata types"""
+    return get_metadata_retrieve_body(session_id, COMPREHENSIVE_RETRIEVE_TYPES)
+
+def plan_retrieve_chunks(metadata_types=None, max_chunk_weight=None):
+    """Split metadata types into smaller retrieves
+
+    Types are packed in request order into chunks of at most max_chunk_weight (see
+    METADATA_TYPE_WEIGHTS); a type heavier than the limit gets a chunk of its own. Returns a list of
+    type lists. When Profile or PermissionSet is requested, they share the first chunk with the
+    requested PERMISSION_SCOPE_TYPES - whatever its weight - so their permissions are complete.
+    """
+    if metadata_types is None:
+        metadata_types = COMPREHENSIVE_RETRIEVE_TYPES
+    if max_chunk_weight is None:
+        max_chunk_weight = RETRIEVE_CHUNK_CONFIG['max_chunk_weight']
+
+    permission_chunk = []
+    if any(metadata_type in PERMISSION_TYPES for metadata_type in metadata_types):
+        permission_chunk = [t for t in metadata_types if t in PERMISSION_TYPES or t in PERMISSION_SCOPE_TYPES]
+
+    chunks = [permission_chunk] if permission_chunk else []
+    current = []
+    current_weight = 0
+    for metadata_type in metadata_types:
+        if metadata_type in permission_chunk:
+            continue
+        weight = METADATA_TYPE_WEIGHTS.get(metadata_type, 1)
+        if current and current_weight + weight > max_chunk_weight:
+            chunks.append(current)
+            current = []
+            current_weight = 0
+        current.append(metadata_type)
+        current_weight += weight
+    if current:
+        chunks.append(current)
+    return chunks
+
 # List of all Salesforce metadata types for reference
 ALL_METADATA_TYPES = [
     'ApexClass', 'ApexTrigger', 'ApexPage', 'ApexComponent', 'CustomObject', 'CustomField',
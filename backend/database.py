@@ -6,8 +6,14 @@ Uses PostgreSQL with the audit agent schema
 
 import psycopg2
 import psycopg2.extras
+import psycopg2.extensions
+import psycopg2.pool
+from contextlib import contextmanager
 from datetime import datetime
 import json
+import re
+import threading
+import time
 from typing import Dict, List, Optional, Any
 import logging
 
@@ -20,19 +26,315 @@ DB_CONFIG = {
     'port': 5432
 }
 
+# Connection pool configuration - set 'enabled' to False to fall back to a single shared connection
+DB_POOL_CONFIG = {
+    'enabled': True,
+    'min_size': 2,
+    'max_size': 10,
+    'checkout_timeout': 30,        # Seconds to wait for a free connection before failing
+    'health_check_interval': 60    # Ping connections that have been idle longer than this (seconds)
+}
+
+# Component listing - list columns are returned by default, heavier columns only when requested via fields
+COMPONENT_LIST_CONFIG = {
+    'default_page_size': 500,
+    'max_page_size': 2000
+}
+
+COMPONENT_LIST_COLUMNS = (
+    'amc.amc_id', 'amc.amc_extraction_job_id', 'amc.amc_metadata_type_id', 'amc.amc_label',
+    'amc.amc_dev_name', 'amc.amc_notes', 'amc.amc_last_modified', 'amc.amc_api_version',
+    'amc.amc_created_timestamp', 'amt.amt_name as metadata_type_name'
+)
+
+# Extraction job columns returned to clients - aej_checkpoint holds server-local zip paths and can
+# list thousands of carried-forward component ids, so only resume code reads it
+EXTRACTION_JOB_COLUMNS = (
+    'aej_id', 'aej_org_id', 'aej_integration_id', 'aej_job_status', 'aej_started_at', 'aej_completed_at',
+    'aej_total_files', 'aej_log', 'aej_job_data', 'aej_job_key', 'aej_created_user_id',
+    'aej_created_timestamp', 'aej_last_updated_user_id', 'aej_last_updated_timestamp', 'aej_status'
+)
+
+COMPONENT_OPTIONAL_COLUMNS = {
+    'content': 'amc.amc_content',
+    'ai_summary': 'amc.amc_ai_summary',
+    'ai_model': 'amc.amc_ai_model',
+    'org_id': 'amc.amc_org_id',
+    'integration_id': 'amc.amc_integration_id',
+    'status': 'amc.amc_status'
+}
+
+# Metadata search ranking - exact and prefix name matches first, then weighted name/content relevance
+SEARCH_CONFIG = {
+    'default_limit': 50,
+    'max_limit': 200,
+    'exact_match_boost': 10.0,
+    'prefix_match_boost': 2.0,
+    'weights': {              # Applied to trigram similarity (names) and ts_rank (tsvector weights A/B/C)
+        'dev_name': 1.0,
+        'label': 0.6,
+        'content': 0.2
+    }
+}
+
+# Multi-hop dependency network limits
+DEPENDENCY_NETWORK_CONFIG = {
+    'default_depth': 1,
+    'max_depth': 6,
+    'default_max_nodes': 500,
+    'max_nodes': 5000
+}
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Statements execute_query may run a second time after losing the connection
+READ_QUERY_PATTERN = re.compile(r'^\s*(\(\s*)*(select|show|with)\b', re.IGNORECASE)
+WRITE_KEYWORD_PATTERN = re.compile(r'\b(insert|update|delete|merge|create|drop|alter|truncate|nextval|setval)\b',
+                                   re.IGNORECASE)
+
+def is_read_query(query: str) -> bool:
+    """True for a SELECT, SHOW or WITH query that names no data-modifying statement or function"""
+    return bool(READ_QUERY_PATTERN.match(query)) and not WRITE_KEYWORD_PATTERN.search(query)
+
+class ConnectionPool:
+    """Thread-safe PostgreSQL connection pool with health checks and usage statistics"""
+
+    def __init__(self, min_size: int, max_size: int, checkout_timeout: float = 30,
+                 health_check_interval: float = 60, db_config: Dict = None):
+        self.min_size = min_size
+        self.max_size = max_size
+        self.checkout_timeout = checkout_timeout
+        self.health_check_interval = health_check_interval
+        self.db_config = db_config or DB_CONFIG
+
+        # Idle connections are kept LIFO as (connection, returned_at) so the warmest one is reused first.
+        # Connections are opened lazily so importing this module never touches the database.
+        self._idle = []
+        self._open = 0
+        self._filled = False
+        self._cond = threading.Condition()
+
+        self._checked_out_at = {}  # id(conn) -> monotonic time of checkout
+        self._created_at = time.monotonic()
+        self._stats = {
+            'checkouts': 0,
+            'timeouts': 0,
+            'connects': 0,
+            'reconnects': 0,
+            'failed_health_checks': 0,
+            'in_use': 0,
+            'peak_in_use': 0,
+            'total_wait_seconds': 0.0,
+            'max_wait_seconds': 0.0,
+            'total_hold_seconds': 0.0
+        }
+
+    def _connect(self):
+        """Open a new autocommit connection"""
+        conn = psycopg2.connect(**self.db_config)
+        conn.autocommit = True
+        with self._cond:
+            self._stats['connects'] += 1
+        return conn
+
+    def _fill(self):
+        """Open the minimum number of connections the first time the pool is used"""
+        with self._cond:
+            if self._filled:
+                return
+            self._filled = True
+            missing = max(self.min_size - self._open, 0)
+            self._open += missing
+
+        opened = []
+        try:
+            for _ in range(missing):
+                opened.append(self._connect())
+        finally:
+            now = time.monotonic()
+            with self._cond:
+                self._open -= missing - len(opened)
+                self._idle.extend((conn, now) for conn in opened)
+                self._cond.notify_all()
+
+    def _is_healthy(self, conn, returned_at: float) -> bool:
+        """Check a connection is still usable, pinging it if it has been idle for a while"""
+        if conn.closed:
+            return False
+
+        if time.monotonic() - returned_at < self.health_check_interval:
+            return True
+
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            return True
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            return False
+
+    def getconn(self):
+        """Check a connection out of the pool, waiting up to checkout_timeout for one to become free"""
+        if not self._filled:
+            self._fill()
+
+        wait_start = time.monotonic()
+        deadline = wait_start + self.checkout_timeout
+
+        with self._cond:
+            while not self._idle and self._open >= self.max_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    raise psycopg2.pool.PoolError(
+                        f"Timed out after {self.checkout_timeout}s waiting for a database connection"
+                    )
+                self._cond.wait(remaining)
+
+            if self._idle:
+                conn, returned_at = self._idle.pop()
+            else:
+                # Reserve a slot for a brand new connection
+                conn, returned_at = None, None
+                self._open += 1
+        waited = time.monotonic() - wait_start
+
+        try:
+            if conn is None:
+                conn = self._connect()
+            elif not self._is_healthy(conn, returned_at):
+                # Replace dead connections transparently (reconnect-on-failure)
+                logger.warning("Discarding unhealthy pooled database connection and reconnecting")
+                self._close_quietly(conn)
+                with self._cond:
+                    self._stats['failed_health_checks'] += 1
+                    self._stats['reconnects'] += 1
+                conn = self._connect()
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            raise
+
+        with self._cond:
+            self._stats['checkouts'] += 1
+            self._stats['in_use'] += 1
+            self._stats['peak_in_use'] = max(self._stats['peak_in_use'], self._stats['in_use'])
+            self._stats['total_wait_seconds'] += waited
+            self._stats['max_wait_seconds'] = max(self._stats['max_wait_seconds'], waited)
+            self._checked_out_at[id(conn)] = time.monotonic()
+
+        return conn
+
+    def putconn(self, conn, discard: bool = False):
+        """Return a connection to the pool, closing it instead if it is broken"""
+        discard = discard or conn.closed
+        if not discard:
+            try:
+                if conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+                conn.autocommit = True
+            except (psycopg2.OperationalError, psycopg2.InterfaceError):
+                discard = True
+
+        if discard:
+            self._close_quietly(conn)
+
+        now = time.monotonic()
+        with self._cond:
+            checked_out_at = self._checked_out_at.pop(id(conn), None)
+            if checked_out_at is not None:
+                self._stats['total_hold_seconds'] += now - checked_out_at
+            self._stats['in_use'] -= 1
+
+            if discard:
+                self._open -= 1
+                # A dropped connection usually means the server went away - force the idle ones to be
+                # pinged before their next use instead of handing out more dead sockets
+                self._idle = [(idle_conn, float('-inf')) for idle_conn, _ in self._idle]
+            else:
+                self._idle.append((conn, now))
+            self._cond.notify()
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def closeall(self):
+        """Close every idle connection held by the pool"""
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+            self._filled = False
+        for conn, _ in idle:
+            self._close_quietly(conn)
+
+    def get_stats(self) -> Dict:
+        """Return pool sizing, wait-time and utilisation statistics"""
+        with self._cond:
+            stats = dict(self._stats)
+            idle = len(self._idle)
+            open_connections = self._open
+
+        checkouts = stats['checkouts']
+        uptime = max(time.monotonic() - self._created_at, 1e-9)
+
+        return {
+            'min_size': self.min_size,
+            'max_size': self.max_size,
+            'open': open_connections,
+            'in_use': stats['in_use'],
+            'idle': idle,
+            'peak_in_use': stats['peak_in_use'],
+            'checkouts': checkouts,
+            'timeouts': stats['timeouts'],
+            'connects': stats['connects'],
+            'reconnects': stats['reconnects'],
+            'failed_health_checks': stats['failed_health_checks'],
+            'avg_wait_ms': round(stats['total_wait_seconds'] / checkouts * 1000, 3) if checkouts else 0.0,
+            'max_wait_ms': round(stats['max_wait_seconds'] * 1000, 3),
+            'avg_hold_ms': round(stats['total_hold_seconds'] / checkouts * 1000, 3) if checkouts else 0.0,
+            'current_utilisation': round(stats['in_use'] / self.max_size, 4),
+            'average_utilisation': round(stats['total_hold_seconds'] / (uptime * self.max_size), 4)
+        }
+
 class DatabaseManager:
     """Database manager for all audit agent operations"""
-    
-    def __init__(self):
+
+    def __init__(self, pool_config: Dict = None):
         self.connection = None
-    
+
+        pool_config = DB_POOL_CONFIG if pool_config is None else pool_config
+        self.pool = None
+        if pool_config.get('enabled'):
+            self.pool = ConnectionPool(
+                min_size=pool_config.get('min_size', 1),
+                max_size=pool_config.get('max_size', 10),
+                checkout_timeout=pool_config.get('checkout_timeout', 30),
+                health_check_interval=pool_config.get('health_check_interval', 60)
+            )
+
+        # Per-thread checkout state: each thread holds at most one pooled connection at a time
+        self._local = threading.local()
+
     def get_connection(self):
-        """Get database connection with proper error handling"""
+        """Get database connection with proper error handling
+
+        In pool mode the connection is pinned to the calling thread until close_connection() is called.
+        """
         try:
+            if self.pool is not None:
+                if getattr(self._local, 'conn', None) is None:
+                    self._local.conn = self.pool.getconn()
+                    self._local.depth = 0
+                    self._local.broken = False
+                self._local.pinned = True
+                return self._local.conn
+
             if self.connection is None or self.connection.closed:
                 self.connection = psycopg2.connect(**DB_CONFIG)
                 self.connection.autocommit = True
@@ -40,34 +342,177 @@ class DatabaseManager:
         except Exception as e:
             logger.error(f"Database connection error: {e}")
             raise
-    
+
     def close_connection(self):
-        """Close database connection"""
+        """Close database connection (or return the calling thread's pinned connection to the pool)"""
+        if self.pool is not None:
+            if getattr(self._local, 'pinned', False) and self._local.depth == 0:
+                self._release_thread_connection()
+            return
+
         if self.connection and not self.connection.closed:
             self.connection.close()
-    
-    def execute_query(self, query: str, params: tuple = None, fetch_one: bool = False, fetch_all: bool = False):
-        """Execute a database query with proper error handling"""
-        conn = self.get_connection()
-        cursor = None
+
+    def _release_thread_connection(self):
+        """Hand the calling thread's connection back to the pool"""
+        conn = self._local.conn
+        self._local.conn = None
+        self._local.pinned = False
+        self.pool.putconn(conn, discard=self._local.broken)
+
+    @contextmanager
+    def checkout(self):
+        """Check a connection out for the current thread; nested checkouts reuse the same connection"""
+        if self.pool is None:
+            yield self.get_connection()
+            return
+
+        local = self._local
+        if getattr(local, 'conn', None) is None:
+            local.conn = self.pool.getconn()
+            local.depth = 0
+            local.broken = False
+            local.pinned = False
+
+        local.depth += 1
         try:
-            cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
-            cursor.execute(query, params)
-            
-            if fetch_one:
-                return cursor.fetchone()
-            elif fetch_all:
-                return cursor.fetchall()
-            else:
-                return cursor.rowcount
-        except Exception as e:
-            logger.error(f"Database query error: {e}")
-            if conn:
-                conn.rollback()
-            raise
+            yield local.conn
         finally:
-            if cursor:
-                cursor.close()
+            local.depth -= 1
+            if local.depth == 0 and not local.pinned:
+                self._release_thread_connection()
+
+    def _mark_connection_broken(self):
+        """Flag the current thread's pooled connection so it is discarded instead of reused"""
+        if self.pool is not None and getattr(self._local, 'conn', None) is not None:
+            self._local.broken = True
+
+    def is_connection_error(self, error: Exception, conn=None) -> bool:
+        """True when error means the connection is gone, not that one statement failed
+
+        QueryCanceledError (statement_timeout) and TransactionRollbackError (deadlock) are
+        OperationalErrors too, but they leave the connection usable and carry a SQLSTATE.
+        """
+        if isinstance(error, psycopg2.InterfaceError) or (conn is not None and conn.closed):
+            return True
+        if not isinstance(error, psycopg2.OperationalError):
+            return False
+        return error.pgcode is None or error.pgcode.startswith('08')
+
+    def _can_retry_on_new_connection(self) -> bool:
+        """A failed query can be retried only if this call owns the checkout and no transaction is open"""
+        if self.pool is None:
+            return False
+        local = self._local
+        return local.depth == 1 and not local.pinned and local.conn.autocommit
+
+    @contextmanager
+    def transaction(self):
+        """Run every query issued by the current thread inside one transaction
+
+        Commits when the block exits normally and rolls back on error. Nested transaction()
+        blocks join the outer transaction. Without pooling this switches the shared connection
+        out of autocommit, so it is only safe with a single active thread.
+        """
+        with self.checkout() as conn:
+            if not conn.autocommit:
+                # Already inside a transaction on this thread - let the outer block commit
+                yield conn
+                return
+
+            conn.autocommit = False
+            try:
+                yield conn
+                conn.commit()
+            except Exception:
+                try:
+                    conn.rollback()
+                except (psycopg2.OperationalError, psycopg2.InterfaceError):
+                    self._mark_connection_broken()
+                raise
+            finally:
+                if not conn.closed:
+                    conn.autocommit = True
+
+    @contextmanager
+    def savepoint(self):
+        """Run a block inside a SAVEPOINT so an error undoes only that block
+
+        Opens a transaction if none is active. After an error the enclosing transaction is
+        still usable, unless the connection itself was lost.
+        """
+        with self.transaction() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("SAVEPOINT audit_agent_savepoint")
+            try:
+                yield conn
+            except Exception as e:
+                if self.is_connection_error(e, conn):
+                    raise
+                with conn.cursor() as cursor:
+                    cursor.execute("ROLLBACK TO SAVEPOINT audit_agent_savepoint")
+                raise
+            with conn.cursor() as cursor:
+                cursor.execute("RELEASE SAVEPOINT audit_agent_savepoint")
+
+    def get_pool_stats(self) -> Optional[Dict]:
+        """Get connection pool statistics (None when pooling is disabled)"""
+        return self.pool.get_stats() if self.pool is not None else None
+
+    def ping(self) -> bool:
+        """Check that the database is reachable"""
+        result = self.execute_query("SELECT 1 AS ok", fetch_one=True)
+        return bool(result and result['ok'] == 1)
+
+    def execute_query(self, query: str, params: tuple = None, fetch_one: bool = False, fetch_all: bool = False,
+                      idempotent: bool = None):
+        """Execute a database query with proper error handling
+
+        If the connection is lost the query is retried once on a new one, but only when running it
+        twice is harmless: reads by default, or writes the caller marks idempotent=True (an INSERT
+        or UPDATE may have committed before the connection dropped).
+        """
+        if idempotent is None:
+            idempotent = is_read_query(query)
+        for attempt in range(2):
+            with self.checkout() as conn:
+                cursor = None
+                try:
+                    cursor = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+                    cursor.execute(query, params)
+
+                    if fetch_one:
+                        return cursor.fetchone()
+                    elif fetch_all:
+                        return cursor.fetchall()
+                    else:
+                        return cursor.rowcount
+                except (psycopg2.OperationalError, psycopg2.InterfaceError) as e:
+                    if not self.is_connection_error(e, conn):
+                        # A statement error (timeout, deadlock) on a healthy connection - never re-run it
+                        logger.error(f"Database query error: {e}")
+                        if conn.autocommit:
+                            conn.rollback()
+                        raise
+                    # The connection itself failed - drop it and retry once on a fresh one
+                    retry = idempotent and attempt == 0 and self._can_retry_on_new_connection()
+                    self._mark_connection_broken()
+                    if retry:
+                        logger.warning(f"Database connection lost, retrying on a new connection: {e}")
+                        continue
+                    logger.error(f"Database query error: {e}")
+                    raise
+                except Exception as e:
+                    logger.error(f"Database query error: {e}")
+                    if conn and conn.autocommit:
+                        conn.rollback()
+                    raise
+                finally:
+                    if cursor:
+                        try:
+                            cursor.close()
+                        except psycopg2.InterfaceError:
+                            pass
     
     # Integration Management
     def create_integration(self, org_id: int, name: str, instance_url: str, org_type: str, 
@@ -171,16 +616,24 @@ class DatabaseManager:
     
     # Extraction Job Management
     def create_extraction_job(self, org_id: int, integration_id: int, job_status: str, 
-                            total_files: int, created_user_id: int) -> int:
-        """Create a new extraction job record"""
+                            total_files: int, created_user_id: int, job_key: str = None,
+                            checkpoint: Dict = None) -> int:
+        """Create a new extraction job record
+        
+        job_key is the in-memory job id reported to clients; checkpoint is the job's first
+        resume checkpoint (see extraction_checkpoint.py).
+        """
         query = """
             INSERT INTO ids_audit_extraction_job (
                 aej_org_id, aej_integration_id, aej_job_status, aej_started_at,
-                aej_total_files, aej_created_user_id, aej_created_timestamp
-            ) VALUES (%s, %s, %s, CURRENT_TIMESTAMP, %s, %s, CURRENT_TIMESTAMP)
+                aej_total_files, aej_job_key, aej_checkpoint, aej_created_user_id, aej_created_timestamp
+            ) VALUES (%s, %s, %s, CURRENT_TIMESTAMP, %s, %s, %s, %s, CURRENT_TIMESTAMP)
             RETURNING aej_id;
         """
-        result = self.execute_query(query, (org_id, integration_id, job_status, total_files, created_user_id), fetch_one=True)
+        result = self.execute_query(query, (
+            org_id, integration_id, job_status, total_files, job_key,
+            json.dumps(checkpoint) if checkpoint is not None else None, created_user_id
+        ), fetch_one=True)
         return result['aej_id'] if result else None
     
     def update_extraction_job(self, job_id: int, job_status: str, completed_at: datetime = None, 
@@ -216,15 +669,56 @@ class DatabaseManager:
             query = f"UPDATE ids_audit_extraction_job SET {', '.join(updates)} WHERE aej_id = %s"
             self.execute_query(query, tuple(params))
     
-    def get_extraction_job(self, job_id: int) -> Optional[Dict]:
-        """Get extraction job by ID"""
-        query = "SELECT * FROM ids_audit_extraction_job WHERE aej_id = %s AND aej_status = 1"
+    def get_extraction_job(self, job_id: int, include_checkpoint: bool = False) -> Optional[Dict]:
+        """Get extraction job by ID, with aej_checkpoint only when include_checkpoint is set"""
+        columns = list(EXTRACTION_JOB_COLUMNS) + (['aej_checkpoint'] if include_checkpoint else [])
+        query = f"SELECT {', '.join(columns)} FROM ids_audit_extraction_job WHERE aej_id = %s AND aej_status = 1"
+        return self.execute_query(query, (job_id,), fetch_one=True)
+    
+    def get_extraction_job_version(self, job_id: int) -> Optional[Dict]:
+        """Get the status and last update times of an extraction job, for caches keyed on its version"""
+        query = """
+            SELECT aej_job_status, aej_completed_at, aej_last_updated_timestamp
+            FROM ids_audit_extraction_job WHERE aej_id = %s AND aej_status = 1
+        """
         return self.execute_query(query, (job_id,), fetch_one=True)
     
+    def get_extraction_job_by_key(self, job_key: str) -> Optional[Dict]:
+        """Get the extraction job created for an in-memory job id"""
+        query = """
+            SELECT * FROM ids_audit_extraction_job
+            WHERE aej_job_key = %s AND aej_status = 1
+            ORDER BY aej_id DESC
+            LIMIT 1
+        """
+        return self.execute_query(query, (job_key,), fetch_one=True)
+    
+    def save_extraction_checkpoint(self, job_id: int, checkpoint: Dict) -> bool:
+        """Store an extraction job's checkpoint unless a newer version is already stored
+        
+        Checkpoints are saved from several threads, so an older version that arrives late is dropped.
+        """
+        query = """
+            UPDATE ids_audit_extraction_job
+            SET aej_checkpoint = %s, aej_last_updated_timestamp = CURRENT_TIMESTAMP
+            WHERE aej_id = %s
+              AND COALESCE((aej_checkpoint->>'version')::int, -1) < %s
+        """
+        return self.execute_query(query, (json.dumps(checkpoint), job_id, checkpoint['version']), idempotent=True) > 0
+    
+    def get_resumable_extraction_jobs(self) -> List[Dict]:
+        """Get running extraction jobs that have a checkpoint to resume from, oldest first"""
+        query = """
+            SELECT * FROM ids_audit_extraction_job
+            WHERE aej_job_status = 'running' AND aej_checkpoint IS NOT NULL AND aej_status = 1
+            ORDER BY aej_id
+        """
+        return self.execute_query(query, fetch_all=True)
+    
     def get_extraction_jobs_by_integration(self, integration_id: int) -> List[Dict]:
         """Get all extraction jobs for an integration"""
-        query = """
-            SELECT * FROM ids_audit_extraction_job 
+        query = f"""
+            SELECT {', '.join(EXTRACTION_JOB_COLUMNS)} FROM ids_audit_extraction_job
             WHERE aej_integration_id = %s AND aej_status = 1 
             ORDER BY aej_created_timestamp DESC
         """
@@ -249,7 +743,166 @@ class DatabaseManager:
             notes, content, ai_summary, ai_model, last_modified, api_version, created_user_id
         ), fetch_one=True)
         return result['amc_id'] if result else None
-    
+
+    def bulk_create_metadata_components(self, components: List[Dict], page_size: int = 500) -> List[int]:
+        """Insert many metadata components using multi-row INSERTs
+
+        Each dict takes the same keys as create_metadata_component's arguments. Returns the new
+        amc_ids in the same order as the input. Call inside transaction() to make a whole
+        ingest atomic.
+        """
+        if not components:
+            return []
+
+        query = """
+            INSERT INTO ids_audit_metadata_component (
+                amc_org_id, amc_integration_id, amc_extraction_job_id, amc_metadata_type_id,
+                amc_label, amc_dev_name, amc_notes, amc_content, amc_ai_summary, amc_ai_model,
+                amc_last_modified, amc_api_version, amc_created_user_id, amc_created_timestamp
+            ) VALUES %s
+            RETURNING amc_id;
+        """
+        template = "(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP)"
+        rows = [(
+            c['org_id'], c['integration_id'], c['extraction_job_id'], c['metadata_type_id'],
+            c['label'], c['dev_name'], c.get('notes'), c.get('content'), c.get('ai_summary'),
+            c.get('ai_model'), c.get('last_modified'), c.get('api_version'), c['created_user_id']
+        ) for c in components]
+
+        with self.checkout() as conn:
+            cursor = conn.cursor()
+            try:
+                # execute_values preserves input order in the RETURNING rows across pages
+                result = psycopg2.extras.execute_values(
+                    cursor, query, rows, template=template, page_size=page_size, fetch=True
+                )
+                return [row[0] for row in result]
+            except Exception as e:
+                logger.error(f"Bulk metadata component insert error: {e}")
+                raise
+            finally:
+                cursor.close()
+
+    def delete_metadata_components_by_id_ranges(self, extraction_job_id: int, id_ranges: List[List[int]]) -> int:
+        """Delete a job's components whose amc_id falls in one of the [first, last] ranges"""
+        if not id_ranges:
+            return 0
+        conditions = ' OR '.join(['amc_id BETWEEN %s AND %s'] * len(id_ranges))
+        query = f"""
+            DELETE FROM ids_audit_metadata_component
+            WHERE amc_extraction_job_id = %s AND ({conditions})
+        """
+        params = (extraction_job_id,) + tuple(value for id_range in id_ranges for value in id_range)
+        return self.execute_query(query, params)
+
+    def get_latest_completed_extraction_job(self, integration_id: int) -> Optional[Dict]:
+        """Get the most recent completed extraction job for an integration"""
+        query = """
+            SELECT * FROM ids_audit_extraction_job
+            WHERE aej_integration_id = %s AND aej_job_status = 'completed' AND aej_status = 1
+            ORDER BY aej_created_timestamp DESC
+            LIMIT 1
+        """
+        return self.execute_query(query, (integration_id,), fetch_one=True)
+
+    def get_component_versions_by_job(self, job_id: int) -> List[Dict]:
+        """Get the identity and last modified date of every component in a job, without content"""
+        query = """
+            SELECT amc.amc_id, amc.amc_label, amc.amc_dev_name, amc.amc_metadata_type_id,
+                   amc.amc_last_modified, amt.amt_name
+            FROM ids_audit_metadata_component amc
+            JOIN ids_audit_metadata_type amt ON amc.amc_metadata_type_id = amt.amt_id
+            WHERE amc.amc_extraction_job_id = %s AND amc.amc_status = 1
+        """
+        return self.execute_query(query, (job_id,), fetch_all=True)
+
+    def get_components_for_analysis(self, job_id: int, content_after_id: int = 0) -> List[Dict]:
+        """Get the name, type and content of every component in a job, in insert order
+        
+        Content is only read for components with an amc_id above content_after_id, so components
+        carried forward from an earlier job (which keep their dependencies) come back without it.
+        """
+        query = """
+            SELECT amc.amc_id, amc.amc_dev_name, amt.amt_name,
+                   CASE WHEN amc.amc_id > %s THEN amc.amc_content END AS amc_content
+            FROM ids_audit_metadata_component amc
+            JOIN ids_audit_metadata_type amt ON amc.amc_metadata_type_id = amt.amt_id
+            WHERE amc.amc_extraction_job_id = %s AND amc.amc_status = 1
+            ORDER BY amc.amc_id
+        """
+        return self.execute_query(query, (content_after_id, job_id), fetch_all=True)
+
+    def copy_metadata_components(self, component_ids: List[int], extraction_job_id: int,
+                                 created_user_id: int) -> List[Dict]:
+        """Copy components into another extraction job with one INSERT ... SELECT
+
+        Content, AI summaries and last modified dates are carried over unchanged. Returns the new
+        rows' amc_id, amc_metadata_type_id and amc_dev_name.
+        """
+        if not component_ids:
+            return []
+        query = """
+            INSERT INTO ids_audit_metadata_component (
+                amc_org_id, amc_integration_id, amc_extraction_job_id, amc_metadata_type_id,
+                amc_label, amc_dev_name, amc_notes, amc_content, amc_ai_summary, amc_ai_model,
+                amc_last_modified, amc_api_version, amc_created_user_id, amc_created_timestamp
+            )
+            SELECT amc_org_id, amc_integration_id, %s, amc_metadata_type_id,
+                   amc_label, amc_dev_name, amc_notes, amc_content, amc_ai_summary, amc_ai_model,
+                   amc_last_modified, amc_api_version, %s, CURRENT_TIMESTAMP
+            FROM ids_audit_metadata_component
+            WHERE amc_id = ANY(%s)
+            ORDER BY amc_id
+            RETURNING amc_id, amc_metadata_type_id, amc_dev_name;
+        """
+        return self.execute_query(query, (extraction_job_id, created_user_id, list(component_ids)), fetch_all=True)
+
+    def copy_dependencies_between_jobs(self, previous_job_id: int, new_job_id: int,
+                                       from_component_ids: List[int], created_user_id: int) -> int:
+        """Carry dependencies of unchanged components forward into a new extraction job
+
+        Edges whose source is one of from_component_ids (components of the previous job) are copied,
+        with both ends remapped to the new job's components by (metadata type, dev name). Edges whose
+        target no longer exists in the new job are dropped. Returns the number of edges copied.
+        """
+        if not from_component_ids:
+            return 0
+        query = """
+            INSERT INTO ids_audit_metadata_dependency (
+                amd_org_id, amd_from_component_id, amd_to_component_id, amd_dependency_type,
+                amd_description, amd_occurrence_count, amd_created_user_id, amd_created_timestamp
+            )
+            SELECT DISTINCT ON (new_from.amc_id, new_to.amc_id, amd.amd_dependency_type)
+                   amd.amd_org_id, new_from.amc_id, new_to.amc_id, amd.amd_dependency_type,
+                   amd.amd_description, amd.amd_occurrence_count, %(user_id)s, CURRENT_TIMESTAMP
+            FROM ids_audit_metadata_dependency amd
+            JOIN ids_audit_metadata_component old_from ON old_from.amc_id = amd.amd_from_component_id
+            JOIN ids_audit_metadata_component old_to ON old_to.amc_id = amd.amd_to_component_id
+            JOIN ids_audit_metadata_component new_from
+                ON new_from.amc_extraction_job_id = %(new_job_id)s
+               AND new_from.amc_metadata_type_id = old_from.amc_metadata_type_id
+               AND new_from.amc_dev_name = old_from.amc_dev_name
+            JOIN ids_audit_metadata_component new_to
+                ON new_to.amc_extraction_job_id = %(new_job_id)s
+               AND new_to.amc_metadata_type_id = old_to.amc_metadata_type_id
+               AND new_to.amc_dev_name = old_to.amc_dev_name
+            WHERE amd.amd_from_component_id = ANY(%(from_ids)s)
+              AND old_to.amc_extraction_job_id = %(previous_job_id)s
+              AND amd.amd_status = 1
+              AND new_from.amc_id != new_to.amc_id
+            ORDER BY new_from.amc_id, new_to.amc_id, amd.amd_dependency_type, amd.amd_id
+            ON CONFLICT ON CONSTRAINT uk_amd_dependency_relationship DO NOTHING
+            RETURNING amd_id;
+        """
+        params = {
+            'user_id': created_user_id,
+            'new_job_id': new_job_id,
+            'previous_job_id': previous_job_id,
+            'from_ids': list(from_component_ids)
+        }
+        result = self.execute_query(query, params, fetch_all=True)
+        return len(result) if result else 0
+
     def get_metadata_components_by_job(self, job_id):
         """Get all metadata components for a specific extraction job"""
         try:
@@ -292,6 +945,54 @@ class DatabaseManager:
             print(f"Error getting metadata components by job and type: {e}")
             return []
 
+    def list_metadata_components(self, job_id, type_id=None, search_term=None, fields=None,
+                                 after=None, page_size=None):
+        """Get one page of metadata components for a job, ordered by (dev_name, amc_id)
+
+        Only list columns are selected unless fields names extra COMPONENT_OPTIONAL_COLUMNS keys.
+        after is the (dev_name, amc_id) of the last row of the previous page (keyset pagination);
+        a NULL dev_name sorts and pages as ''.
+        Returns (components, next_after) where next_after is None on the last page.
+        """
+        page_size = min(page_size or COMPONENT_LIST_CONFIG['default_page_size'],
+                        COMPONENT_LIST_CONFIG['max_page_size'])
+        columns = list(COMPONENT_LIST_COLUMNS) + [COMPONENT_OPTIONAL_COLUMNS[f] for f in (fields or [])]
+
+        conditions = ["amc.amc_extraction_job_id = %s", "amc.amc_status = 1"]
+        params = [job_id]
+        if type_id is not None:
+            conditions.append("amc.amc_metadata_type_id = %s")
+            params.append(type_id)
+        if search_term:
+            conditions.append("""(
+                    LOWER(amc.amc_dev_name) LIKE LOWER(%s)
+                    OR LOWER(amc.amc_label) LIKE LOWER(%s)
+                    OR LOWER(amc.amc_notes) LIKE LOWER(%s)
+                )""")
+            search_pattern = f'%{search_term}%'
+            params.extend([search_pattern] * 3)
+        if after:
+            conditions.append("(COALESCE(amc.amc_dev_name, ''), amc.amc_id) > (%s, %s)")
+            params.extend(after)
+
+        query = f"""
+            SELECT {', '.join(columns)}
+            FROM ids_audit_metadata_component amc
+            LEFT JOIN ids_audit_metadata_type amt ON amc.amc_metadata_type_id = amt.amt_id
+            WHERE {' AND '.join(conditions)}
+            ORDER BY COALESCE(amc.amc_dev_name, ''), amc.amc_id
+            LIMIT %s
+        """
+        # Fetch one extra row to know whether another page follows
+        params.append(page_size + 1)
+        components = self.execute_query(query, tuple(params), fetch_all=True) or []
+
+        next_after = None
+        if len(components) > page_size:
+            components = components[:page_size]
+            next_after = (components[-1]['amc_dev_name'] or '', components[-1]['amc_id'])
+        return components, next_after
+
     def search_metadata_components_by_job_and_type(self, job_id, type_id, search_term):
         """Search metadata components for a specific job and metadata type"""
         try:
@@ -328,7 +1029,10 @@ class DatabaseManager:
             LEFT JOIN ids_audit_metadata_type amt ON amc.amc_metadata_type_id = amt.amt_id
             WHERE amc.amc_id = %s AND amc.amc_status = 1
         """
-        return self.execute_query(query, (component_id,), fetch_one=True)
+        component = self.execute_query(query, (component_id,), fetch_one=True)
+        if component:
+            component.pop('amc_search_vector', None)
+        return component
     
     def update_metadata_component(self, component_id: int, ai_summary: str = None, ai_model: str = None, last_updated_user_id: int = None) -> bool:
         """Update a metadata component (primarily for AI summary)"""
@@ -424,77 +1128,172 @@ class DatabaseManager:
     
     def get_latest_extraction_job(self, integration_id: int) -> Optional[Dict]:
         """Get the latest extraction job for an integration"""
-        query = """
-            SELECT * FROM ids_audit_extraction_job 
+        query = f"""
+            SELECT {', '.join(EXTRACTION_JOB_COLUMNS)} FROM ids_audit_extraction_job
             WHERE aej_integration_id = %s AND aej_status = 1
             ORDER BY aej_created_timestamp DESC 
             LIMIT 1
         """
         return self.execute_query(query, (integration_id,), fetch_one=True)
     
-    def get_integration_with_latest_job(self, integration_id: int) -> Optional[Dict]:
-        """Get integration with its latest extraction job and metadata stats"""
-        # Get integration
-        integration = self.get_integration(integration_id)
-        if not integration:
-            return None
-        
-        # Get latest job
-        latest_job = self.get_latest_extraction_job(integration_id)
-        
-        # Get metadata stats if job exists
-        metadata_stats = None
-        if latest_job:
-            metadata_stats = self.get_metadata_stats_by_job(latest_job['aej_id'])
-        
-        return {
-            'integration': integration,
-            'latest_job': latest_job,
-            'metadata_stats': metadata_stats
-        }
-    
-    def get_user_integrations_with_stats(self, user_id: int, org_id: int) -> List[Dict]:
-        """Get all integrations for a user with their latest job stats"""
-        integrations = self.get_integrations_by_org(org_id)
+    def _get_integrations_with_latest_job(self, where_clause: str, params: tuple) -> List[Dict]:
+        """Get integrations with their latest extraction job and per-type stats in one query
+
+        Returns the same {'integration', 'latest_job', 'metadata_stats'} entries as
+        get_latest_extraction_job + get_metadata_stats_by_job. Integration and job columns are
+        told apart by their i_ / aej_ prefixes.
+        """
+        query = f"""
+            SELECT i.*, j.*, s.total_components, s.by_type
+            FROM ids_integration i
+            LEFT JOIN LATERAL (
+                SELECT {', '.join(EXTRACTION_JOB_COLUMNS)} FROM ids_audit_extraction_job
+                WHERE aej_integration_id = i.i_id AND aej_status = 1
+                ORDER BY aej_created_timestamp DESC
+                LIMIT 1
+            ) j ON TRUE
+            LEFT JOIN LATERAL (
+                SELECT
+                    COALESCE(SUM(t.component_count), 0)::BIGINT AS total_components,
+                    COALESCE(
+                        json_agg(json_build_object(
+                            'metadata_type', t.metadata_type,
+                            'amt_display_name', t.amt_display_name,
+                            'component_count', t.component_count
+                        ) ORDER BY t.component_count DESC),
+                        '[]'::json
+                    ) AS by_type
+                FROM (
+                    SELECT amt.amt_name AS metadata_type, amt.amt_display_name, COUNT(amc.amc_id) AS component_count
+                    FROM ids_audit_metadata_component amc
+                    LEFT JOIN ids_audit_metadata_type amt ON amc.amc_metadata_type_id = amt.amt_id
+                    WHERE amc.amc_extraction_job_id = j.aej_id AND amc.amc_status = 1
+                    GROUP BY amt.amt_id, amt.amt_name, amt.amt_display_name
+                ) t
+            ) s ON j.aej_id IS NOT NULL
+            WHERE {where_clause}
+            ORDER BY i.i_created_timestamp DESC
+        """
+        rows = self.execute_query(query, params, fetch_all=True) or []
         
         result = []
-        for integration in integrations:
-            latest_job = self.get_latest_extraction_job(integration['i_id'])
-            metadata_stats = None
+        for row in rows:
+            integration = {k: v for k, v in row.items() if k.startswith('i_')}
+            latest_job = {k: v for k, v in row.items() if k.startswith('aej_')}
+            if latest_job.get('aej_id') is None:
+                latest_job = None
             
+            metadata_stats = None
             if latest_job:
-                metadata_stats = self.get_metadata_stats_by_job(latest_job['aej_id'])
+                metadata_stats = {
+                    'total_components': row['total_components'],
+                    'by_type': row['by_type']
+                }
             
             result.append({
                 'integration': integration,
                 'latest_job': latest_job,
                 'metadata_stats': metadata_stats
             })
-        
         return result
     
-    def search_metadata_components(self, org_id: int, search_term: str = None, 
-                                 metadata_type_id: int = None) -> List[Dict]:
-        """Search metadata components"""
-        query = """
-            SELECT amc.*, amt.amt_name as metadata_type_name, amt.amt_display_name
+    def get_integration_with_latest_job(self, integration_id: int) -> Optional[Dict]:
+        """Get integration with its latest extraction job and metadata stats"""
+        result = self._get_integrations_with_latest_job("i.i_id = %s AND i.i_status = 1", (integration_id,))
+        return result[0] if result else None
+    
+    def get_user_integrations_with_stats(self, user_id: int, org_id: int) -> List[Dict]:
+        """Get all integrations for a user with their latest job stats"""
+        return self._get_integrations_with_latest_job("i.i_org_id = %s AND i.i_status = 1", (org_id,))
+    
+    def has_trigram_support(self) -> bool:
+        """Check once whether the pg_trgm extension is installed"""
+        if getattr(self, '_trigram_support', None) is None:
+            try:
+                row = self.execute_query("SELECT 1 AS installed FROM pg_extension WHERE extname = 'pg_trgm'", fetch_one=True)
+                self._trigram_support = bool(row)
+            except Exception as e:
+                print(f"Error checking pg_trgm support: {e}")
+                return False
+        return self._trigram_support
+
+    def search_metadata_components(self, org_id: int, search_term: str = None,
+                                 metadata_type_id: int = None, limit: int = None,
+                                 fields: List[str] = None) -> List[Dict]:
+        """Search metadata components, best matches first
+
+        Names match by substring (trigram indexed) and content by prefix full-text match on
+        amc_search_vector. Rows carry a search_rank; see SEARCH_CONFIG for the weighting.
+        Without a search term the most recently extracted components are returned.
+        """
+        limit = min(limit or SEARCH_CONFIG['default_limit'], SEARCH_CONFIG['max_limit'])
+        columns = list(COMPONENT_LIST_COLUMNS) + [COMPONENT_OPTIONAL_COLUMNS[f] for f in (fields or [])]
+        columns.append('amt.amt_display_name')
+
+        conditions = ["amc.amc_org_id = %(org_id)s", "amc.amc_status = 1"]
+        params = {'org_id': org_id, 'limit': limit}
+        if metadata_type_id:
+            conditions.append("amc.amc_metadata_type_id = %(metadata_type_id)s")
+            params['metadata_type_id'] = metadata_type_id
+
+        search_term = (search_term or '').strip()
+        if not search_term:
+            query = f"""
+                SELECT {', '.join(columns)}
+                FROM ids_audit_metadata_component amc
+                LEFT JOIN ids_audit_metadata_type amt ON amc.amc_metadata_type_id = amt.amt_id
+                WHERE {' AND '.join(conditions)}
+                ORDER BY amc.amc_created_timestamp DESC
+                LIMIT %(limit)s
+            """
+            return self.execute_query(query, params, fetch_all=True)
+
+        weights = SEARCH_CONFIG['weights']
+        # Match the term literally - % and _ are LIKE wildcards (Salesforce names are full of underscores)
+        escaped = search_term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        params.update({
+            'term': search_term.lower(),
+            'pattern': f'%{escaped}%',
+            'prefix': f'{escaped}%',
+            'exact_boost': SEARCH_CONFIG['exact_match_boost'],
+            'prefix_boost': SEARCH_CONFIG['prefix_match_boost'],
+            'dev_name_weight': weights['dev_name'],
+            'label_weight': weights['label'],
+            # ts_rank weight array is ordered {D, C, B, A}
+            'rank_weights': [0.0, weights['content'], weights['label'], weights['dev_name']]
+        })
+
+        # Words of the term as a prefix phrase query, e.g. Invoice__c -> invoice:* <-> c:*
+        words = re.findall(r'[A-Za-z0-9]+', search_term)
+        if words:
+            params['tsquery'] = ' <-> '.join(f'{word.lower()}:*' for word in words)
+            text_match = "amc.amc_search_vector @@ to_tsquery('simple', %(tsquery)s)"
+            text_rank = "ts_rank(%(rank_weights)s::real[], amc.amc_search_vector, to_tsquery('simple', %(tsquery)s))"
+        else:
+            text_match = "FALSE"
+            text_rank = "0"
+
+        if self.has_trigram_support():
+            name_rank = """%(dev_name_weight)s * similarity(amc.amc_dev_name, %(term)s)
+                    + %(label_weight)s * similarity(amc.amc_label, %(term)s)"""
+        else:
+            name_rank = "0"
+
+        query = f"""
+            SELECT {', '.join(columns)},
+                (CASE WHEN LOWER(amc.amc_dev_name) = %(term)s OR LOWER(amc.amc_label) = %(term)s
+                      THEN %(exact_boost)s ELSE 0 END
+                 + CASE WHEN amc.amc_dev_name ILIKE %(prefix)s THEN %(prefix_boost)s ELSE 0 END
+                 + {name_rank}
+                 + {text_rank}) AS search_rank
             FROM ids_audit_metadata_component amc
             LEFT JOIN ids_audit_metadata_type amt ON amc.amc_metadata_type_id = amt.amt_id
-            WHERE amc.amc_org_id = %s AND amc.amc_status = 1
+            WHERE {' AND '.join(conditions)}
+            AND (amc.amc_dev_name ILIKE %(pattern)s OR amc.amc_label ILIKE %(pattern)s OR {text_match})
+            ORDER BY search_rank DESC, amc.amc_created_timestamp DESC
+            LIMIT %(limit)s
         """
-        params = [org_id]
-        
-        if search_term:
-            query += " AND (amc.amc_label ILIKE %s OR amc.amc_dev_name ILIKE %s OR amc.amc_content ILIKE %s)"
-            search_pattern = f"%{search_term}%"
-            params.extend([search_pattern, search_pattern, search_pattern])
-        
-        if metadata_type_id:
-            query += " AND amc.amc_metadata_type_id = %s"
-            params.append(metadata_type_id)
-        
-        query += " ORDER BY amc.amc_created_timestamp DESC"
-        return self.execute_query(query, tuple(params), fetch_all=True)
+        return self.execute_query(query, params, fetch_all=True)
     
     def get_dashboard_data(self, integration_id: int) -> Dict:
         """Get complete dashboard data for an integration"""
@@ -530,6 +1329,62 @@ class DatabaseManager:
         result = self.execute_query(query, (org_id, from_component_id, to_component_id, dependency_type, description, created_user_id), fetch_one=True)
         return result['amd_id'] if result else None
     
+    def bulk_create_dependencies(self, org_id: int, dependencies: List[Dict], created_user_id: int,
+                                 page_size: int = 1000) -> int:
+        """Insert deduplicated dependency edges using multi-row INSERTs
+
+        Each dict has from_component_id, to_component_id, type, description and occurrence_count
+        (see dependency_analysis.dedupe_dependencies). An edge that already exists has its
+        occurrence count refreshed instead of failing the batch. Returns the number of rows written.
+        """
+        if not dependencies:
+            return 0
+
+        query = """
+            INSERT INTO ids_audit_metadata_dependency (
+                amd_org_id, amd_from_component_id, amd_to_component_id, amd_dependency_type,
+                amd_description, amd_occurrence_count, amd_created_user_id, amd_created_timestamp
+            ) VALUES %s
+            ON CONFLICT ON CONSTRAINT uk_amd_dependency_relationship DO UPDATE SET
+                amd_occurrence_count = EXCLUDED.amd_occurrence_count,
+                amd_last_updated_user_id = EXCLUDED.amd_created_user_id,
+                amd_last_updated_timestamp = CURRENT_TIMESTAMP
+            RETURNING amd_id;
+        """
+        template = "(%s, %s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP)"
+        rows = [(
+            org_id, d['from_component_id'], d['to_component_id'], d['type'],
+            d['description'], d.get('occurrence_count', 1), created_user_id
+        ) for d in dependencies]
+
+        with self.checkout() as conn:
+            cursor = conn.cursor()
+            try:
+                result = psycopg2.extras.execute_values(
+                    cursor, query, rows, template=template, page_size=page_size, fetch=True
+                )
+                return len(result)
+            except Exception as e:
+                logger.error(f"Bulk dependency insert error: {e}")
+                raise
+            finally:
+                cursor.close()
+
+    def get_diagram_components(self, component_ids) -> Dict[int, Dict]:
+        """Get the columns dependency diagrams need for many components in one query, keyed by amc_id"""
+        component_ids = list(component_ids)
+        if not component_ids:
+            return {}
+        query = """
+            SELECT amc.amc_id, amc.amc_dev_name, amc.amc_label, amc.amc_metadata_type_id,
+                   amc.amc_extraction_job_id, amt.amt_name as metadata_type_name
+            FROM ids_audit_metadata_component amc
+            LEFT JOIN ids_audit_metadata_type amt ON amc.amc_metadata_type_id = amt.amt_id
+            WHERE amc.amc_id = ANY(%s) AND amc.amc_status = 1
+        """
+        rows = self.execute_query(query, (component_ids,), fetch_all=True) or []
+        return {row['amc_id']: row for row in rows}
+    
     def get_dependencies_for_component(self, component_id: int) -> List[Dict]:
         """Get all dependencies for a component"""
         query = """
@@ -545,6 +1400,105 @@ class DatabaseManager:
         """
         return self.execute_query(query, (component_id, component_id), fetch_all=True)
     
+    def get_dependency_edges_by_job(self, job_id: int) -> List[tuple]:
+        """Get (from_component_id, to_component_id, dependency_type) for every dependency of a job"""
+        query = """
+            SELECT amd.amd_from_component_id, amd.amd_to_component_id, amd.amd_dependency_type
+            FROM ids_audit_metadata_dependency amd
+            JOIN ids_audit_metadata_component amc ON amd.amd_from_component_id = amc.amc_id
+            WHERE amc.amc_extraction_job_id = %s AND amc.amc_status = 1 AND amd.amd_status = 1
+        """
+        rows = self.execute_query(query, (job_id,), fetch_all=True) or []
+        return [(row['amd_from_component_id'], row['amd_to_component_id'], row['amd_dependency_type']) for row in rows]
+    
+    def get_dependency_subgraph(self, component_id: int, depth: int = 1, direction: str = 'both',
+                                max_nodes: int = None) -> List[Dict]:
+        """Get every dependency within depth hops of a component in one recursive query
+
+        direction is 'outgoing' (what the component depends on), 'incoming' (what depends on it) or
+        'both'. Nodes are kept nearest first up to max_nodes. Each row is an amd.* dependency plus the
+        hop depths of both ends and reached_nodes - how many components the walk reached before the
+        max_nodes cut. Hydrate the components with get_diagram_components.
+        """
+        max_nodes = min(max_nodes or DEPENDENCY_NETWORK_CONFIG['default_max_nodes'],
+                        DEPENDENCY_NETWORK_CONFIG['max_nodes'])
+        params = {
+            'root': component_id,
+            'depth': depth,
+            'max_nodes': max_nodes,
+            'outgoing': direction in ('outgoing', 'both'),
+            'incoming': direction in ('incoming', 'both')
+        }
+        # UNION (not UNION ALL) keeps one row per (component, depth), which bounds the walk on cycles
+        query = """
+            WITH RECURSIVE walk(component_id, depth) AS (
+                SELECT %(root)s::BIGINT, 0
+                UNION
+                SELECT CASE WHEN amd.amd_from_component_id = w.component_id
+                            THEN amd.amd_to_component_id ELSE amd.amd_from_component_id END,
+                       w.depth + 1
+                FROM walk w
+                JOIN ids_audit_metadata_dependency amd
+                  ON amd.amd_status = 1
+                 AND ((%(outgoing)s AND amd.amd_from_component_id = w.component_id)
+                   OR (%(incoming)s AND amd.amd_to_component_id = w.component_id))
+                WHERE w.depth < %(depth)s
+            ),
+            reached AS (
+                SELECT component_id, MIN(depth) AS depth FROM walk GROUP BY component_id
+            ),
+            kept AS (
+                SELECT component_id, depth FROM reached ORDER BY depth, component_id LIMIT %(max_nodes)s
+            )
+            SELECT amd.*, f.depth as from_depth, t.depth as to_depth,
+                   (SELECT COUNT(*) FROM reached) as reached_nodes
+            FROM ids_audit_metadata_dependency amd
+            JOIN kept f ON f.component_id = amd.amd_from_component_id
+            JOIN kept t ON t.component_id = amd.amd_to_component_id
+            WHERE amd.amd_status = 1
+            AND ((%(outgoing)s AND f.depth < %(depth)s) OR (%(incoming)s AND t.depth < %(depth)s))
+            ORDER BY amd.amd_created_timestamp DESC
+        """
+        return self.execute_query(query, params, fetch_all=True) or []
+    
+    def replace_dependency_cycles(self, org_id: int, job_id: int, cycles: List[Dict],
+                                  created_user_id: int) -> int:
+        """Replace a job's stored dependency cycles in one transaction
+
+        Each dict has component_ids, edge_count and dependency_types (see
+        dependency_graph.find_dependency_cycles), largest cycle first. Returns the number stored.
+        """
+        rows = [(
+            org_id, job_id, position, cycle['component_ids'], len(cycle['component_ids']),
+            cycle['edge_count'], cycle['dependency_types'], created_user_id
+        ) for position, cycle in enumerate(cycles, start=1)]
+
+        with self.transaction() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute("DELETE FROM ids_audit_dependency_cycle WHERE adc_extraction_job_id = %s", (job_id,))
+                if rows:
+                    psycopg2.extras.execute_values(cursor, """
+                        INSERT INTO ids_audit_dependency_cycle (
+                            adc_org_id, adc_extraction_job_id, adc_cycle_index, adc_component_ids,
+                            adc_component_count, adc_edge_count, adc_dependency_types, adc_created_user_id
+                        ) VALUES %s
+                    """, rows, page_size=500)
+                return len(rows)
+            finally:
+                cursor.close()
+
+    def get_dependency_cycles(self, job_id: int, min_size: int = 2) -> List[Dict]:
+        """Get a job's stored dependency cycles, largest first"""
+        query = """
+            SELECT adc_id, adc_cycle_index, adc_component_ids, adc_component_count,
+                   adc_edge_count, adc_dependency_types, adc_created_timestamp
+            FROM ids_audit_dependency_cycle
+            WHERE adc_extraction_job_id = %s AND adc_component_count >= %s AND adc_status = 1
+            ORDER BY adc_cycle_index
+        """
+        return self.execute_query(query, (job_id, min_size), fetch_all=True) or []
+    
     # MyList Management
     def create_mylist(self, org_id: int, user_id: int, integration_id: int, name: str,
                      description: str, notes: str, created_user_id: int) -> int:
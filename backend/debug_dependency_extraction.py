@@ -109,8 +109,8 @@ def debug_dependency_analysis():
             # Import the function
             import server_db
             dependencies = server_db.analyze_apex_class_dependencies_in_memory(
-                component['amc_dev_name'] + '.cls', 
-                component_map
+                {'component_id': component['amc_id'], 'name': component['amc_dev_name'], 'content': component.get('amc_content')}, 
+                server_db.ComponentNameIndex.from_mapping(component_map)
             )
             print(f"Dependencies found: {len(dependencies)}")
             for dep in dependencies:
@@ -189,8 +189,8 @@ def debug_dependency_analysis():
                 print(f"Component ID from map: {component_map[test_component['amc_dev_name']]}")
             
             dependencies = server_db.analyze_apex_class_dependencies_in_memory(
-                test_component['amc_dev_name'] + '.cls', 
-                component_map
+                {'component_id': test_component['amc_id'], 'name': test_component['amc_dev_name'], 'content': test_component.get('amc_content')}, 
+                server_db.ComponentNameIndex.from_mapping(component_map)
             )
             print(f"Dependencies found: {len(dependencies)}")
             for dep in dependencies:
@@ -266,8 +266,8 @@ def debug_dependency_analysis():
                 print("\n7. Testing actual Custom Object dependency analysis function...")
                 
                 dependencies = server_db.analyze_custom_object_dependencies_in_memory(
-                    component['amc_dev_name'] + '.object', 
-                    component_map
+                    {'component_id': component['amc_id'], 'name': component['amc_dev_name'], 'content': component.get('amc_content')}, 
+                    server_db.ComponentNameIndex.from_mapping(component_map)
                 )
                 print(f"Dependencies found: {len(dependencies)}")
                 for dep in dependencies:
@@ -319,8 +319,8 @@ def debug_dependency_analysis():
                 print("\n9. Testing actual Flow dependency analysis function...")
                 
                 dependencies = server_db.analyze_flow_dependencies_in_memory(
-                    component['amc_dev_name'] + '.flow', 
-                    component_map
+                    {'component_id': component['amc_id'], 'name': component['amc_dev_name'], 'content': component.get('amc_content')}, 
+                    server_db.ComponentNameIndex.from_mapping(component_map)
                 )
                 print(f"Dependencies found: {len(dependencies)}")
                 for dep in dependencies:
@@ -0,0 +1,483 @@
+#!/usr/bin/env python3
+"""
+Dependency analysis for metadata components held in memory during extraction
+Analyzers are pure functions of the decoded component content, so they can run in worker processes
+"""
+
+import re
+import xml.etree.ElementTree as ET
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from metadata_files import strip_metadata_extension
+
+# Custom metadata suffixes - a name such as ns__Invoice__c carries a namespace, Invoice__c does not
+CUSTOM_SUFFIXES = ('c', 'mdt', 'e', 'b', 'x', 'r', 'share', 'history', 'feed', 'kav')
+
+# Process pool configuration for the analysis stage - set 'workers' to 1 to always analyze serially
+ANALYSIS_POOL_CONFIG = {
+    'workers': min(multiprocessing.cpu_count(), 8),
+    'min_parallel_components': 500,   # Smaller extractions are analyzed in-process; pool start-up would dominate
+    'shards_per_worker': 4            # More shards than workers keeps the pool busy when shard costs differ
+}
+
+# Metadata types each kind of reference is expected to resolve to
+OBJECT_TYPES = ('CustomObject',)
+APEX_TYPES = ('ApexClass',)
+
+def split_namespace(name):
+    """Split a dev name into (namespace, local_name), e.g. ns__Invoice__c -> ('ns', 'Invoice__c')"""
+    parts = name.split('__')
+    if len(parts) == 3 or (len(parts) == 2 and parts[1].lower() not in CUSTOM_SUFFIXES):
+        return parts[0], '__'.join(parts[1:])
+    return None, name
+
+class ComponentNameIndex:
+    """Name resolution index over extracted components
+
+    Names are keyed case-insensitively by (local name, namespace), with file extensions stripped,
+    and record their metadata type. Lookups are constant time and understand the __c suffix:
+    a reference to Invoice resolves to Invoice__c when no Invoice component exists.
+    """
+
+    def __init__(self):
+        self._entries = {}  # lowercase local name -> [(namespace, metadata_type, component_id), ...]
+        self._size = 0
+
+    @classmethod
+    def from_component_table(cls, component_table):
+        """Build an index from ingest_zip_components' component table"""
+        index = cls()
+        for component in component_table:
+            index.add(component['name'], component['component_id'], component.get('metadata_type'))
+        return index
+
+    @classmethod
+    def from_mapping(cls, component_map, metadata_type=None):
+        """Build an index from a plain {name: component_id} dict"""
+        index = cls()
+        for name, component_id in component_map.items():
+            index.add(name, component_id, metadata_type)
+        return index
+
+    @staticmethod
+    def normalize(name):
+        """Strip the directory and metadata file extension from a name"""
+        return strip_metadata_extension(name.rsplit('/', 1)[-1])
+
+    def add(self, name, component_id, metadata_type=None):
+        """Register a component under its dev name (or file name)"""
+        namespace, local_name = split_namespace(self.normalize(name))
+        key = local_name.lower()
+        self._entries.setdefault(key, []).append(
+            (namespace.lower() if namespace else None, metadata_type, component_id)
+        )
+        self._size += 1
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, name):
+        return self.resolve(name) is not None
+
+    def resolve(self, name, expected_types=None, namespace=None):
+        """Resolve a referenced name to a component_id, or None
+
+        With expected_types, only candidates of those types (or of no recorded type) match - a
+        same-named component of another type is not the target. An exact name wins over the
+        __c-suffixed form. An unqualified reference prefers components without a
+        namespace (or in the given namespace), falling back to a single namespaced match.
+        """
+        if not name:
+            return None
+        ref_namespace, local_name = split_namespace(self.normalize(name))
+        key = local_name.lower()
+        ref_namespace = (ref_namespace or namespace or '').lower() or None
+
+        keys = [key]
+        if key.endswith('__c'):
+            keys.append(key[:-3])
+        elif '__' not in key:
+            keys.append(key + '__c')
+
+        for candidate_key in keys:
+            candidates = self._entries.get(candidate_key)
+            if not candidates:
+                continue
+            component_id = self._pick(candidates, expected_types, ref_namespace)
+            if component_id is not None:
+                return component_id
+        return None
+
+    @staticmethod
+    def _pick(candidates, expected_types, ref_namespace):
+        """Choose among same-named candidates in the namespace, of the expected types if given"""
+        in_namespace = [c for c in candidates if c[0] == ref_namespace]
+        if not in_namespace and ref_namespace is None:
+            # Unqualified reference from unpackaged code - accept a namespaced component if unambiguous
+            namespaces = {c[0] for c in candidates}
+            if len(namespaces) == 1:
+                in_namespace = candidates
+        if not in_namespace:
+            return None
+        if not expected_types:
+            return in_namespace[0][2]
+        untyped = None
+        for namespace, metadata_type, component_id in in_namespace:
+            if metadata_type in expected_types:
+                return component_id
+            if metadata_type is None and untyped is None:
+                untyped = component_id
+        return untyped
+
+def analyze_apex_class_dependencies_in_memory(component, name_index):
+    """Analyze Apex class dependencies in memory"""
+    dependencies = []
+    
+    content = component.get('content')
+    if not content:
+        return dependencies
+    
+    source_name = component['name']
+    source_component_id = component['component_id']
+    
+    try:
+        # SOQL queries
+        soql_pattern = r'(?i)SELECT\s+.+?\s+FROM\s+(\w+)'
+        for match in re.finditer(soql_pattern, content):
+            obj_name = match.group(1)
+            if '_' in obj_name and not obj_name.endswith('__c'):
+                obj_name = f"{obj_name}__c"
+            
+            # Find the component ID for this object
+            target_component_id = name_index.resolve(obj_name, OBJECT_TYPES)
+            if target_component_id and target_component_id != source_component_id:
+                dependencies.append({
+                    'to_component_id': target_component_id,
+                    'type': 'soql_query',
+                    'description': f'{source_name} queries {obj_name}'
+                })
+        
+        # DML operations
+        dml_pattern = r'(?i)(insert|update|delete|upsert|merge)\s+(\w+)'
+        for match in re.finditer(dml_pattern, content):
+            var_name = match.group(2)
+            if var_name.lower() not in ['list', 'set', 'map', 'string', 'integer', 'boolean']:
+                target_component_id = name_index.resolve(var_name, OBJECT_TYPES)
+                if target_component_id and target_component_id != source_component_id:
+                    dependencies.append({
+                        'to_component_id': target_component_id,
+                        'type': 'dml_operation',
+                        'description': f'{source_name} performs {match.group(1)} on {var_name}'
+                    })
+        
+        # Class references
+        class_pattern = r'(?i)public\s+class\s+(\w+)\s+extends\s+(\w+)'
+        for match in re.finditer(class_pattern, content):
+            parent_class = match.group(2)
+            target_component_id = name_index.resolve(parent_class, APEX_TYPES)
+            if target_component_id and target_component_id != source_component_id:
+                dependencies.append({
+                    'to_component_id': target_component_id,
+                    'type': 'class_inheritance',
+                    'description': f'{source_name} extends {parent_class}'
+                })
+        
+        # Interface implementations
+        interface_pattern = r'(?i)public\s+class\s+(\w+)\s+implements\s+(\w+)'
+        for match in re.finditer(interface_pattern, content):
+            interface_name = match.group(2)
+            target_component_id = name_index.resolve(interface_name, APEX_TYPES)
+            if target_component_id and target_component_id != source_component_id:
+                dependencies.append({
+                    'to_component_id': target_component_id,
+                    'type': 'interface_implementation',
+                    'description': f'{source_name} implements {interface_name}'
+                })
+        
+    except Exception as e:
+        print(f"Error analyzing Apex class dependencies in memory for {source_name}: {str(e)}")
+    
+    return dependencies
+
+def analyze_apex_trigger_dependencies_in_memory(component, name_index):
+    """Analyze Apex trigger dependencies in memory"""
+    dependencies = []
+    
+    content = component.get('content')
+    if not content:
+        return dependencies
+    
+    source_name = component['name']
+    source_component_id = component['component_id']
+    
+    try:
+        # Extract object the trigger is on
+        object_match = re.search(r'trigger\s+\w+\s+on\s+(\w+)', content, re.IGNORECASE)
+        if object_match:
+            obj_name = object_match.group(1)
+            target_component_id = name_index.resolve(obj_name, OBJECT_TYPES)
+            if target_component_id and target_component_id != source_component_id:
+                dependencies.append({
+                    'to_component_id': target_component_id,
+                    'type': 'trigger_on_object',
+                    'description': f'{source_name} trigger operates on {obj_name}'
+                })
+        
+    except Exception as e:
+        print(f"Error analyzing Apex trigger dependencies in memory for {source_name}: {str(e)}")
+    
+    return dependencies
+
+def analyze_custom_object_dependencies_in_memory(component, name_index):
+    """Analyze Custom Object dependencies in memory"""
+    dependencies = []
+    
+    content = component.get('content')
+    if not content:
+        return dependencies
+    
+    source_name = component['name']
+    source_component_id = component['component_id']
+    
+    try:
+        # Parse XML content for field relationships
+        try:
+            root = ET.fromstring(content)
+            
+            # Define namespace for Salesforce metadata
+            ns = {'sf': 'http://soap.sforce.com/2006/04/metadata'}
+            
+            # Find field relationships
+            for field_elem in root.findall('.//sf:fields', ns):
+                field_name_elem = field_elem.find('sf:fullName', ns)
+                ref_to_elem = field_elem.find('sf:referenceTo', ns)
+                type_elem = field_elem.find('sf:type', ns)
+                
+                if field_name_elem is not None and ref_to_elem is not None:
+                    ref_to = ref_to_elem.text
+                    field_type = type_elem.text if type_elem is not None else None
+                    
+                    # Look for reference relationships
+                    if ref_to and field_type in ['Lookup', 'MasterDetail']:
+                        target_component_id = name_index.resolve(ref_to, OBJECT_TYPES)
+                        if target_component_id and target_component_id != source_component_id:
+                            dependencies.append({
+                                'to_component_id': target_component_id,
+                                'type': 'object_reference',
+                                'description': f'{source_name} has {field_type} field referencing {ref_to}'
+                            })
+            
+        except ET.ParseError as e:
+            print(f"Error parsing XML for {source_name}: {str(e)}")
+        
+    except Exception as e:
+        print(f"Error analyzing Custom Object dependencies in memory for {source_name}: {str(e)}")
+    
+    return dependencies
+
+def analyze_flow_dependencies_in_memory(component, name_index):
+    """Analyze Flow dependencies in memory"""
+    dependencies = []
+    
+    content = component.get('content')
+    if not content:
+        return dependencies
+    
+    source_name = component['name']
+    source_component_id = component['component_id']
+    
+    try:
+        # Parse XML content for dependencies
+        try:
+            root = ET.fromstring(content)
+            
+            # Define namespace for Salesforce metadata
+            ns = {'sf': 'http://soap.sforce.com/2006/04/metadata'}
+            
+            # Find object references
+            for obj_elem in root.findall('.//sf:object', ns):
+                if obj_elem.text:
+                    obj_name = obj_elem.text
+                    target_component_id = name_index.resolve(obj_name, OBJECT_TYPES)
+                    if target_component_id and target_component_id != source_component_id:
+                        dependencies.append({
+                            'to_component_id': target_component_id,
+                            'type': 'flow_object_reference',
+                            'description': f'{source_name} flow references object {obj_name}'
+                        })
+            
+            # Find Apex class references
+            for apex_elem in root.findall('.//sf:apexClass', ns):
+                if apex_elem.text:
+                    apex_class = apex_elem.text
+                    target_component_id = name_index.resolve(apex_class, APEX_TYPES)
+                    if target_component_id and target_component_id != source_component_id:
+                        dependencies.append({
+                            'to_component_id': target_component_id,
+                            'type': 'flow_apex_reference',
+                            'description': f'{source_name} flow calls Apex class {apex_class}'
+                        })
+            
+        except ET.ParseError as e:
+            print(f"Error parsing XML for {source_name}: {str(e)}")
+        
+    except Exception as e:
+        print(f"Error analyzing Flow dependencies in memory for {source_name}: {str(e)}")
+    
+    return dependencies
+
+def analyze_layout_dependencies_in_memory(component, name_index):
+    """Analyze Layout dependencies in memory"""
+    dependencies = []
+    
+    content = component.get('content')
+    if not content:
+        return dependencies
+    
+    source_name = component['name']
+    source_component_id = component['component_id']
+    
+    try:
+        # Parse XML content for dependencies
+        try:
+            root = ET.fromstring(content)
+            
+            # Define namespace for Salesforce metadata
+            ns = {'sf': 'http://soap.sforce.com/2006/04/metadata'}
+            
+            # Find object references
+            for obj_elem in root.findall('.//sf:object', ns):
+                if obj_elem.text:
+                    obj_name = obj_elem.text
+                    target_component_id = name_index.resolve(obj_name, OBJECT_TYPES)
+                    if target_component_id and target_component_id != source_component_id:
+                        dependencies.append({
+                            'to_component_id': target_component_id,
+                            'type': 'layout_object_reference',
+                            'description': f'{source_name} layout is for object {obj_name}'
+                        })
+            
+        except ET.ParseError as e:
+            print(f"Error parsing XML for {source_name}: {str(e)}")
+        
+    except Exception as e:
+        print(f"Error analyzing Layout dependencies in memory for {source_name}: {str(e)}")
+    
+    return dependencies
+
+# Dispatch table for analyzing components held in memory during extraction, keyed by metadata type name
+IN_MEMORY_DEPENDENCY_ANALYZERS = {
+    'ApexClass': analyze_apex_class_dependencies_in_memory,
+    'ApexTrigger': analyze_apex_trigger_dependencies_in_memory,
+    'CustomObject': analyze_custom_object_dependencies_in_memory,
+    'Flow': analyze_flow_dependencies_in_memory,
+    'Layout': analyze_layout_dependencies_in_memory
+}
+
+# Name index shared with every shard, set once per worker process by _init_analysis_worker
+_worker_name_index = None
+
+def _init_analysis_worker(name_index):
+    """Process pool initializer - keep the name index resident instead of sending it with every shard"""
+    global _worker_name_index
+    _worker_name_index = name_index
+
+def _analyze_shard(shard):
+    """Analyze one shard of components inside a worker process"""
+    return analyze_component_shard(shard, _worker_name_index)
+
+def analyze_component_shard(components, name_index):
+    """Analyze components in order, returning [(component_id, dependencies), ...]"""
+    results = []
+    for component in components:
+        analyzer = IN_MEMORY_DEPENDENCY_ANALYZERS.get(component['metadata_type'])
+        if not analyzer:
+            continue
+        results.append((component['component_id'], analyzer(component, name_index)))
+    return results
+
+def split_into_shards(components, shard_count):
+    """Split components into at most shard_count contiguous, order-preserving shards"""
+    shard_count = max(1, min(shard_count, len(components)))
+    shard_size, remainder = divmod(len(components), shard_count)
+    shards = []
+    start = 0
+    for index in range(shard_count):
+        end = start + shard_size + (1 if index < remainder else 0)
+        shards.append(components[start:end])
+        start = end
+    return shards
+
+def analyze_components(component_table, name_index=None, workers=None, progress=None):
+    """Run dependency analysis over component_table, sharded across a process pool when it is large
+
+    Returns [(component_id, dependencies), ...] in component_table order. Shards are contiguous and
+    merged back in submission order, so the result is identical to analyzing serially. The name
+    index is built from component_table when not given.
+
+    Spawned workers re-import the script that started the process (server_db.py or
+    extraction_worker.py) as __mp_main__, so each worker pays for that import - about a third of
+    a second for server_db. Its module-level setup opens no connections and starts no threads, and
+    the __main__ blocks that start the server or resume extractions do not run in workers.
+    """
+    if name_index is None:
+        name_index = ComponentNameIndex.from_component_table(component_table)
+    analyzable = [
+        {'component_id': c['component_id'], 'name': c['name'], 'metadata_type': c['metadata_type'], 'content': c['content']}
+        for c in component_table
+        if c['metadata_type'] in IN_MEMORY_DEPENDENCY_ANALYZERS
+    ]
+    if workers is None:
+        workers = ANALYSIS_POOL_CONFIG['workers']
+
+    if workers <= 1 or len(analyzable) < ANALYSIS_POOL_CONFIG['min_parallel_components']:
+        return analyze_component_shard(analyzable, name_index)
+
+    shards = split_into_shards(analyzable, workers * ANALYSIS_POOL_CONFIG['shards_per_worker'])
+    if progress:
+        progress(f'Analyzing {len(analyzable):,} components across {workers} worker processes ({len(shards)} shards)...')
+
+    results = []
+    try:
+        # spawn rather than fork - the extraction runs in a thread of a multi-threaded Flask process
+        with ProcessPoolExecutor(max_workers=min(workers, len(shards)),
+                                 mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=_init_analysis_worker,
+                                 initargs=(name_index,)) as executor:
+            for shard_results in executor.map(_analyze_shard, shards):
+                results.extend(shard_results)
+    except (BrokenProcessPool, OSError) as e:
+        if progress:
+            progress(f'Warning: Parallel analysis failed ({str(e)}), falling back to serial analysis')
+        return analyze_component_shard(analyzable, name_index)
+
+    return results
+
+def dedupe_dependencies(analysis_results):
+    """Collapse repeated (from, to, type) edges into one edge with an occurrence count
+
+    analysis_results is [(from_component_id, dependencies), ...] as returned by analyze_components.
+    Edges keep first-seen order and the description of their first occurrence, so the output
+    is deterministic. Self references are dropped, matching the table's no-self-dependency check.
+    """
+    edges = {}
+    for from_component_id, dependencies in analysis_results:
+        for dep in dependencies:
+            to_component_id = dep['to_component_id']
+            if to_component_id == from_component_id:
+                continue
+            key = (from_component_id, to_component_id, dep['type'])
+            edge = edges.get(key)
+            if edge:
+                edge['occurrence_count'] += 1
+            else:
+                edges[key] = {
+                    'from_component_id': from_component_id,
+                    'to_component_id': to_component_id,
+                    'type': dep['type'],
+                    'description': dep['description'],
+                    'occurrence_count': 1
+                }
+    return list(edges.values())
@@ -0,0 +1,493 @@
+#!/usr/bin/env python3
+"""
+In-memory dependency graphs for extraction jobs
+Each job's edges are loaded once into compressed sparse row (CSR) integer arrays for forward and
+reverse adjacency, and graphs are kept in an LRU cache bounded by job count and memory
+"""
+
+import sys
+import threading
+from array import array
+from collections import OrderedDict, deque
+
+DEPENDENCY_GRAPH_CONFIG = {
+    'max_cached_jobs': 8,
+    'max_cached_bytes': 256 * 1024 * 1024,  # Evict least recently used graphs beyond this estimate
+    # Reachability bitsets take roughly components^2 / 5 bytes; larger graphs answer impact queries by BFS
+    'max_reachability_components': 20000
+}
+
+DIRECTIONS = ('outgoing', 'incoming', 'both')
+
+class DependencyGraph:
+    """Compact adjacency for one extraction job
+
+    Components are renumbered 0..n-1 (component_ids maps back to amc_id). For node i, forward
+    edges are forward_targets[forward_offsets[i]:forward_offsets[i + 1]] with their dependency type
+    codes in forward_types; the reverse arrays hold the same edges from the target's side.
+    """
+
+    def __init__(self, edges):
+        """Build from an iterable of (from_component_id, to_component_id, dependency_type)"""
+        self.type_names = []
+        type_codes = {}
+        self.index = {}
+        self.component_ids = array('q')
+
+        sources = array('i')
+        targets = array('i')
+        codes = array('B')
+        for from_id, to_id, dependency_type in edges:
+            code = type_codes.get(dependency_type)
+            if code is None:
+                code = type_codes[dependency_type] = len(self.type_names)
+                self.type_names.append(dependency_type)
+            sources.append(self._node(from_id))
+            targets.append(self._node(to_id))
+            codes.append(code)
+
+        self.edge_count = len(sources)
+        self.forward_offsets, self.forward_targets, self.forward_types = self._build_csr(sources, targets, codes)
+        self.reverse_offsets, self.reverse_targets, self.reverse_types = self._build_csr(targets, sources, codes)
+
+        # Built on first impact query (see get_reachability_index)
+        self.reachability = None
+        self._reachability_lock = threading.Lock()
+
+    def _node(self, component_id):
+        node = self.index.get(component_id)
+        if node is None:
+            node = self.index[component_id] = len(self.component_ids)
+            self.component_ids.append(component_id)
+        return node
+
+    def _build_csr(self, sources, targets, codes):
+        """Counting sort of edges by source node into offsets / targets / type codes arrays"""
+        node_count = len(self.component_ids)
+        offsets = array('i', bytes(4 * (node_count + 1)))
+        for source in sources:
+            offsets[source + 1] += 1
+        for node in range(node_count):
+            offsets[node + 1] += offsets[node]
+
+        position = array('i', offsets[:node_count])
+        sorted_targets = array('i', bytes(4 * len(sources)))
+        sorted_codes = array('B', bytes(len(sources)))
+        for source, target, code in zip(sources, targets, codes):
+            slot = position[source]
+            sorted_targets[slot] = target
+            sorted_codes[slot] = code
+            position[source] = slot + 1
+        return offsets, sorted_targets, sorted_codes
+
+    def __len__(self):
+        return len(self.component_ids)
+
+    def __contains__(self, component_id):
+        return component_id in self.index
+
+    def _adjacent(self, node, direction):
+        if direction in ('outgoing', 'both'):
+            for slot in range(self.forward_offsets[node], self.forward_offsets[node + 1]):
+                yield self.forward_targets[slot], self.forward_types[slot]
+        if direction in ('incoming', 'both'):
+            for slot in range(self.reverse_offsets[node], self.reverse_offsets[node + 1]):
+                yield self.reverse_targets[slot], self.reverse_types[slot]
+
+    def neighbors(self, component_id, direction='outgoing'):
+        """Return [(component_id, dependency_type)] one hop away"""
+        node = self.index.get(component_id)
+        if node is None:
+            return []
+        return [(self.component_ids[other], self.type_names[code]) for other, code in self._adjacent(node, direction)]
+
+    def degree(self, component_id):
+        """Return {'incoming': n, 'outgoing': n} edge counts"""
+        node = self.index.get(component_id)
+        if node is None:
+            return {'incoming': 0, 'outgoing': 0}
+        return {
+            'incoming': self.reverse_offsets[node + 1] - self.reverse_offsets[node],
+            'outgoing': self.forward_offsets[node + 1] - self.forward_offsets[node]
+        }
+
+    def bfs(self, component_id, depth=None, direction='outgoing', max_nodes=None):
+        """Breadth-first walk, returning ({component_id: hops}, truncated) nearest first
+
+        The start component is included at 0 hops. truncated is True when max_nodes stopped the walk.
+        """
+        start = self.index.get(component_id)
+        if start is None:
+            return {component_id: 0}, False
+        hops = {start: 0}
+        queue = deque([start])
+        truncated = False
+        while queue:
+            node = queue.popleft()
+            if depth is not None and hops[node] >= depth:
+                continue
+            for other, _ in self._adjacent(node, direction):
+                if other in hops:
+                    continue
+                if max_nodes is not None and len(hops) >= max_nodes:
+                    truncated = True
+                    break
+                hops[other] = hops[node] + 1
+                queue.append(other)
+            if truncated:
+                break
+        return {self.component_ids[node]: distance for node, distance in hops.items()}, truncated
+
+    def reachable(self, from_component_id, to_component_id, direction='outgoing'):
+        """True when to_component_id can be reached from from_component_id"""
+        return self.shortest_path(from_component_id, to_component_id, direction) is not None
+
+    def shortest_path(self, from_component_id, to_component_id, direction='outgoing'):
+        """Return the fewest-hop path as [(component_id, dependency_type_into_it)], or None
+
+        The first entry is the start component with a dependency type of None.
+        """
+        start = self.index.get(from_component_id)
+        goal = self.index.get(to_component_id)
+        if start is None or goal is None:
+            return [(from_component_id, None)] if from_component_id == to_component_id else None
+
+        parents = {start: (None, None)}
+        queue = deque([start])
+        while queue and goal not in parents:
+            node = queue.popleft()
+            for other, code in self._adjacent(node, direction):
+                if other not in parents:
+                    parents[other] = (node, code)
+                    queue.append(other)
+        if goal not in parents:
+            return None
+
+        path = []
+        node = goal
+        while node is not None:
+            parent, code = parents[node]
+            path.append((self.component_ids[node], self.type_names[code] if code is not None else None))
+            node = parent
+        return path[::-1]
+
+    def memory_bytes(self):
+        """Estimated memory held by the graph (arrays plus the id index)"""
+        arrays = (self.component_ids, self.forward_offsets, self.forward_targets, self.forward_types,
+                  self.reverse_offsets, self.reverse_targets, self.reverse_types)
+        total = sum(a.buffer_info()[1] * a.itemsize for a in arrays)
+        # The index dict holds an int key and value per component
+        total += sys.getsizeof(self.index) + len(self.index) * 2 * sys.getsizeof(2 ** 40)
+        if self.reachability is not None:
+            total += self.reachability.memory
+        return total
+
+    def get_reachability_index(self):
+        """Return the graph's ReachabilityIndex, building it on first use"""
+        with self._reachability_lock:
+            if self.reachability is None:
+                self.reachability = ReachabilityIndex(self)
+            return self.reachability
+
+    def get_stats(self):
+        return {
+            'components': len(self),
+            'edges': self.edge_count,
+            'dependency_types': len(self.type_names),
+            'reachability_indexed': self.reachability is not None,
+            'memory_bytes': self.memory_bytes()
+        }
+
+def strongly_connected_components(graph):
+    """Iterative Tarjan over a DependencyGraph's forward edges
+
+    Returns lists of node indexes (not component ids), one per strongly connected component, in
+    reverse topological order: every component comes after all components it has edges into.
+    """
+    node_count = len(graph)
+    offsets, targets = graph.forward_offsets, graph.forward_targets
+    order = array('i', [-1]) * node_count
+    lowlink = array('i', [0]) * node_count
+    on_stack = bytearray(node_count)
+    stack = []
+    components = []
+    counter = 0
+
+    for root in range(node_count):
+        if order[root] != -1:
+            continue
+        order[root] = lowlink[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = 1
+        work = [[root, offsets[root]]]
+
+        while work:
+            frame = work[-1]
+            node, slot = frame
+            if slot < offsets[node + 1]:
+                frame[1] = slot + 1
+                target = targets[slot]
+                if order[target] == -1:
+                    order[target] = lowlink[target] = counter
+                    counter += 1
+                    stack.append(target)
+                    on_stack[target] = 1
+                    work.append([target, offsets[target]])
+                elif on_stack[target] and order[target] < lowlink[node]:
+                    lowlink[node] = order[target]
+                continue
+
+            work.pop()
+            if work and lowlink[node] < lowlink[work[-1][0]]:
+                lowlink[work[-1][0]] = lowlink[node]
+            if lowlink[node] == order[node]:
+                members = []
+                while True:
+                    member = stack.pop()
+                    on_stack[member] = 0
+                    members.append(member)
+                    if member == node:
+                        break
+                components.append(members)
+
+    return components
+
+def find_dependency_cycles(graph, components=None):
+    """Group a DependencyGraph's circular dependencies, largest first
+
+    components may pass in an existing strongly_connected_components result. Each cycle is a dict
+    with component_ids (sorted), edge_count (dependencies between members) and dependency_types.
+    Self dependencies are not stored, so only groups of two or more components are cycles.
+    """
+    if components is None:
+        components = strongly_connected_components(graph)
+    cycles = []
+    for members in components:
+        if len(members) < 2:
+            continue
+        member_set = set(members)
+        edge_count = 0
+        dependency_types = set()
+        for node in members:
+            for slot in range(graph.forward_offsets[node], graph.forward_offsets[node + 1]):
+                if graph.forward_targets[slot] in member_set:
+                    edge_count += 1
+                    dependency_types.add(graph.type_names[graph.forward_types[slot]])
+        cycles.append({
+            'component_ids': sorted(graph.component_ids[node] for node in members),
+            'edge_count': edge_count,
+            'dependency_types': sorted(dependency_types, key=str)
+        })
+    cycles.sort(key=lambda cycle: (-len(cycle['component_ids']), cycle['component_ids'][0]))
+    return cycles
+
+def _bit_positions(bits):
+    """Indexes of the set bits of a non-negative int"""
+    digits = bin(bits)[:1:-1]
+    positions = []
+    position = digits.find('1')
+    while position != -1:
+        positions.append(position)
+        position = digits.find('1', position + 1)
+    return positions
+
+class ReachabilityIndex:
+    """Transitive closure of a DependencyGraph over its strongly connected components
+
+    Cycles are condensed first, so every member of an SCC shares one closure. Each SCC has a
+    bitset (a Python int, bit i = SCC i) of the SCCs it reaches (dependencies - what it needs) and of
+    the SCCs that reach it (dependents - who is affected). Membership tests are a single bit test;
+    listing costs time proportional to the result.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.components = strongly_connected_components(graph)
+        self.component_of = array('i', [0]) * len(graph)
+        for index, members in enumerate(self.components):
+            for node in members:
+                self.component_of[node] = index
+
+        # SCCs come sinks first, so everything an SCC points at is already complete
+        self.dependencies = self._closure(range(len(self.components)), graph.forward_offsets, graph.forward_targets)
+        self.dependents = self._closure(reversed(range(len(self.components))), graph.reverse_offsets, graph.reverse_targets)
+        self.memory = sum(sys.getsizeof(bits) for bits in self.dependencies + self.dependents)
+        self.memory += self.component_of.buffer_info()[1] * self.component_of.itemsize
+
+    def _closure(self, component_order, offsets, targets):
+        closure = [0] * len(self.components)
+        component_of = self.component_of
+        for index in component_order:
+            bits = 1 << index
+            for node in self.components[index]:
+                for slot in range(offsets[node], offsets[node + 1]):
+                    other = component_of[targets[slot]]
+                    if other != index:
+                        bits |= closure[other]
+            closure[index] = bits
+        return closure
+
+    def _bits(self, component_id, direction):
+        node = self.graph.index.get(component_id)
+        if node is None:
+            return None, 0
+        component = self.component_of[node]
+        closure = self.dependents if direction == 'incoming' else self.dependencies
+        return component, closure[component]
+
+    def reaches(self, from_component_id, to_component_id):
+        """True when from_component_id transitively depends on to_component_id"""
+        source = self.graph.index.get(from_component_id)
+        target = self.graph.index.get(to_component_id)
+        if source is None or target is None:
+            return from_component_id == to_component_id
+        return bool(self.dependencies[self.component_of[source]] >> self.component_of[target] & 1)
+
+    def count(self, component_id, direction='incoming'):
+        """Number of components reached, excluding the component itself"""
+        component, bits = self._bits(component_id, direction)
+        if component is None:
+            return 0
+        # Every SCC in the closure contributes all of its members
+        if len(self.components) == len(self.graph):
+            return bits.bit_count() - 1
+        return sum(len(self.components[index]) for index in _bit_positions(bits)) - 1
+
+    def reached(self, component_id, direction='incoming'):
+        """Component ids that depend on (incoming) or are needed by (outgoing) component_id"""
+        component, bits = self._bits(component_id, direction)
+        if component is None:
+            return []
+        component_ids = self.graph.component_ids
+        return [
+            component_ids[node]
+            for index in _bit_positions(bits)
+            for node in self.components[index]
+            if component_ids[node] != component_id
+        ]
+
+    def cycle_members(self, component_id):
+        """Other components in the same dependency cycle"""
+        node = self.graph.index.get(component_id)
+        if node is None:
+            return []
+        return [self.graph.component_ids[member] for member in self.components[self.component_of[node]]
+                if member != node]
+
+class DependencyGraphCache:
+    """LRU cache of DependencyGraph per extraction job
+
+    loader(job_id) returns the job's (from_component_id, to_component_id, dependency_type) edges.
+    version(job_id), if given, returns a value that changes whenever the job's dependencies may have
+    changed - checked on every lookup, so a graph cached by any process is not served after another
+    process rewrote them - or None while the job is still running, in which case the graph is loaded
+    but not kept. A load that was invalidated before it finished is not kept either. Graphs are
+    evicted least recently used first once either configured bound is exceeded; the most recently
+    used graph is always kept.
+    """
+
+    def __init__(self, loader, config=None, version=None):
+        self.config = dict(DEPENDENCY_GRAPH_CONFIG, **(config or {}))
+        self._loader = loader
+        self._version = version
+        self._graphs = OrderedDict()  # job_id -> (version, graph)
+        self._generations = {}        # job_id -> number of invalidations
+        self._lock = threading.Lock()
+        self._loading = {}
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0, 'stale': 0, 'uncached_loads': 0}
+
+    def get(self, job_id):
+        """Return the job's graph, loading it on first use or once its version changed"""
+        version = self._version(job_id) if self._version else 0
+        with self._lock:
+            graph = self._cached(job_id, version)
+            if graph is not None:
+                self._stats['hits'] += 1
+                return graph
+            self._stats['misses'] += 1
+            # One loader per job; concurrent requests for the same job wait for it
+            load_lock = self._loading.setdefault(job_id, threading.Lock())
+
+        with load_lock:
+            try:
+                with self._lock:
+                    graph = self._cached(job_id, version)
+                    generation = self._generations.get(job_id, 0)
+                if graph is None:
+                    graph = DependencyGraph(self._loader(job_id))
+                    self._store(job_id, version, graph, generation)
+            finally:
+                with self._lock:
+                    self._loading.pop(job_id, None)
+        return graph
+
+    def _cached(self, job_id, version):
+        """The cached graph of a job if it is still at version; called with the lock held"""
+        entry = self._graphs.get(job_id)
+        if entry is None:
+            return None
+        if version is None or entry[0] != version:
+            del self._graphs[job_id]
+            self._stats['stale'] += 1
+            return None
+        self._graphs.move_to_end(job_id)
+        return entry[1]
+
+    def _store(self, job_id, version, graph, generation):
+        with self._lock:
+            if version is None or self._generations.get(job_id, 0) != generation:
+                self._stats['uncached_loads'] += 1
+                return
+            self._graphs[job_id] = (version, graph)
+            self._evict()
+
+    def put(self, job_id, graph):
+        """Cache a graph built from the job's current edges, e.g. by the extraction that wrote them"""
+        version = self._version(job_id) if self._version else 0
+        with self._lock:
+            generation = self._generations.get(job_id, 0)
+        self._store(job_id, version, graph, generation)
+
+    def indexable(self, graph):
+        """Whether a graph is small enough for a ReachabilityIndex"""
+        return len(graph) <= self.config['max_reachability_components']
+
+    def get_reachability_index(self, job_id):
+        """Return the job's ReachabilityIndex, or None when the graph is too large to index"""
+        graph = self.get(job_id)
+        if not self.indexable(graph):
+            return None
+        if graph.reachability is None:
+            graph.get_reachability_index()
+            # The index counts towards the graph's memory, so re-check the bounds
+            with self._lock:
+                self._evict()
+        return graph.reachability
+
+    def invalidate(self, job_id):
+        """Drop a job's graph, e.g. after its dependencies were written"""
+        with self._lock:
+            # Loads already running for the job are not kept
+            self._generations[job_id] = self._generations.get(job_id, 0) + 1
+            if self._graphs.pop(job_id, None) is not None:
+                self._stats['invalidations'] += 1
+
+    def _evict(self):
+        while len(self._graphs) > 1 and (
+            len(self._graphs) > self.config['max_cached_jobs']
+            or sum(graph.memory_bytes() for _, graph in self._graphs.values()) > self.config['max_cached_bytes']
+        ):
+            self._graphs.popitem(last=False)
+            self._stats['evictions'] += 1
+
+    def get_stats(self):
+        """Return cache counters and per-job graph sizes"""
+        with self._lock:
+            jobs = {job_id: graph.get_stats() for job_id, (_, graph) in self._graphs.items()}
+            stats = dict(self._stats)
+        stats['cached_jobs'] = len(jobs)
+        stats['memory_bytes'] = sum(job['memory_bytes'] for job in jobs.values())
+        stats['max_cached_bytes'] = self.config['max_cached_bytes']
+        stats['jobs'] = jobs
+        return stats
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Resume checkpoints for metadata extractions
+Each extraction job records how far it got in ids_audit_extraction_job.aej_checkpoint: the async id
+of every retrieve, where its zip was saved, how many zip entries are committed and which analysis
+stage finished. An extraction interrupted by a restart continues from there instead of
+resubmitting retrieves that can take an hour.
+"""
+
+import copy
+import json
+import os
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+
+from retrieve_stream import RetrieveResponse
+
+EXTRACTION_CHECKPOINT_CONFIG = {
+    # Completed retrieves are saved here until their extraction finishes, outside the source tree.
+    # Extraction workers on other machines can only resume from a saved zip if this is shared
+    # storage; otherwise (or if the directory was cleared) they fetch the zip from Salesforce
+    # again by its async id.
+    'zip_dir': os.path.join(tempfile.gettempdir(), 'audit_agent_extraction_checkpoints'),
+    'save_zips': True,
+    'resume_on_startup': True   # Queue interrupted extractions again when the API starts
+}
+
+CHECKPOINT_VERSION = 1
+
+# Retrieve (chunk) statuses: pending -> submitted -> downloaded -> ingested, or failed
+FINISHED_CHUNK_STATUSES = ('ingested', 'failed')
+
+class ExtractionCheckpoint:
+    """Thread-safe resume state of one extraction job
+
+    Every change bumps data['version'] and is passed to save(data), one save at a time. A save
+    made inside committing() holds the others back until that database transaction ends, so no
+    other thread stores its changes before they commit. save must still drop versions older than
+    the one already stored - see DatabaseManager.save_extraction_checkpoint.
+    """
+
+    def __init__(self, data, save=None):
+        self.data = data
+        self.save = save
+        self._lock = threading.Lock()
+        self._save_lock = threading.RLock()
+        self._local = threading.local()
+
+    @classmethod
+    def start(cls, job_key, chunks, pipeline='chunked', members=None, previous_job_id=None,
+              carry_forward_ids=None, save=None):
+        """Checkpoint for a new extraction; chunks is the list of type lists to retrieve"""
+        return cls({
+            'version': 0,
+            'format': CHECKPOINT_VERSION,
+            'job_key': job_key,
+            'pipeline': pipeline,
+            'stage': 'retrieving',    # -> analyzing -> dependencies_stored -> completed
+            'members': members,
+            'previous_job_id': previous_job_id,
+            'carry_forward_ids': list(carry_forward_ids or []),
+            'carried_max_id': None,   # Highest amc_id copied forward, None until carry forward ran
+            'analysis': None,
+            'chunks': [{
+                'types': list(types),
+                'status': 'pending',
+                'async_id': None,
+                'zip_path': None,
+                'files_done': 0,      # Zip entries whose rows are committed
+                'id_ranges': [],      # [first, last] amc_id ranges of those rows
+                'error': None
+            } for types in chunks]
+        }, save)
+
+    def get(self, key, default=None):
+        with self._lock:
+            return copy.deepcopy(self.data.get(key, default))
+
+    def chunk(self, index):
+        with self._lock:
+            return dict(self.data['chunks'][index])
+
+    def snapshot(self):
+        with self._lock:
+            return json.loads(json.dumps(self.data))
+
+    def update(self, **values):
+        """Set top-level values (stage, carried_max_id, analysis) and save"""
+        with self._saving():
+            with self._lock:
+                self.data.update(values)
+                data = self._next_version()
+            return self._save(data)
+
+    def update_chunk(self, index, **values):
+        """Set values of one retrieve (status, async_id, zip_path, files_done, id_ranges, error) and save"""
+        with self._saving():
+            with self._lock:
+                self.data['chunks'][index].update(values)
+                data = self._next_version()
+            return self._save(data)
+
+    def record_batch(self, index, files_done, component_ids):
+        """Record an ingest batch of one retrieve: zip entries done and the amc_ids stored
+
+        Called inside the batch's transaction, wrapped in committing(index).
+        """
+        with self._saving():
+            with self._lock:
+                chunk = self.data['chunks'][index]
+                chunk['files_done'] = files_done
+                chunk['id_ranges'] = add_id_ranges(chunk.get('id_ranges') or [], component_ids)
+                data = self._next_version()
+            return self._save(data)
+
+    @contextmanager
+    def committing(self, index):
+        """Wrap a database transaction that saves retrieve index's progress
+        (an ingest batch, or dropping the batches of a failed retrieve)
+
+        Saves made inside it keep other threads from saving until the block ends - after the
+        transaction commits - so another retrieve never stores a checkpoint holding this retrieve's
+        uncommitted files_done and id_ranges. If the block fails, the retrieve's values
+        are put back.
+        """
+        before = self.chunk(index)
+        depth = getattr(self._local, 'depth', 0)
+        self._local.depth = depth + 1
+        try:
+            yield
+        except BaseException:
+            with self._lock:
+                self.data['chunks'][index] = before
+            raise
+        finally:
+            self._local.depth = depth
+            if depth == 0:
+                for _ in range(getattr(self._local, 'held', 0)):
+                    self._save_lock.release()
+                self._local.held = 0
+
+    @contextmanager
+    def _saving(self):
+        self._save_lock.acquire()
+        if getattr(self._local, 'depth', 0):
+            # Released when committing() ends
+            self._local.held = getattr(self._local, 'held', 0) + 1
+            yield
+            return
+        try:
+            yield
+        finally:
+            self._save_lock.release()
+
+    def _next_version(self):
+        self.data['version'] += 1
+        return json.loads(json.dumps(self.data))
+
+    def _save(self, data):
+        if self.save is not None:
+            self.save(data)
+        return data
+
+    def resume_plan(self, zip_exists=os.path.exists):
+        """Work left for an interrupted extraction, as lists of chunk indexes
+
+        ingest: downloaded retrieves whose saved zip is still there
+        poll: retrieves Salesforce is (or was) running - check their async id again
+        submit: retrieves never submitted, or downloaded without a saved zip or async id
+        ingested / failed: retrieves already finished
+        """
+        plan = {'ingest': [], 'poll': [], 'submit': [], 'ingested': [], 'failed': []}
+        with self._lock:
+            for index, chunk in enumerate(self.data['chunks']):
+                status = chunk['status']
+                if status in FINISHED_CHUNK_STATUSES:
+                    plan[status].append(index)
+                elif status == 'downloaded' and chunk['zip_path'] and zip_exists(chunk['zip_path']):
+                    plan['ingest'].append(index)
+                elif status in ('submitted', 'downloaded') and chunk['async_id']:
+                    plan['poll'].append(index)
+                else:
+                    plan['submit'].append(index)
+        return plan
+
+def add_id_ranges(id_ranges, ids):
+    """Merge ids into a sorted list of [first, last] ranges, joining adjacent ones
+
+    Retrieves are ingested concurrently, so one retrieve's amc_ids are not always contiguous.
+    """
+    merged = []
+    for first, last in sorted([list(id_range) for id_range in id_ranges] + [[i, i] for i in ids]):
+        if merged and first <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], last)
+        else:
+            merged.append([first, last])
+    return merged
+
+def saved_zip_dir(job_key, zip_dir=None):
+    return os.path.join(zip_dir or EXTRACTION_CHECKPOINT_CONFIG['zip_dir'], job_key)
+
+def save_retrieve_zip(job_key, index, retrieve_response, zip_dir=None):
+    """Copy a completed retrieve's zip and envelope to disk, returning the zip's path
+
+    The zip is written under a temporary name and renamed, so a saved zip is always complete.
+    retrieve_response.zip_file is left positioned at the start.
+    """
+    directory = saved_zip_dir(job_key, zip_dir)
+    os.makedirs(directory, exist_ok=True)
+    zip_path = os.path.join(directory, f'retrieve_{index}.zip')
+
+    with open(zip_path[:-len('.zip')] + '.xml', 'w', encoding='utf-8') as f:
+        f.write(retrieve_response.text)
+    retrieve_response.zip_file.seek(0)
+    with open(zip_path + '.part', 'wb') as f:
+        shutil.copyfileobj(retrieve_response.zip_file, f)
+    retrieve_response.zip_file.seek(0)
+    os.replace(zip_path + '.part', zip_path)
+    return zip_path
+
+def open_saved_retrieve(zip_path):
+    """A RetrieveResponse read back from save_retrieve_zip, or None if the zip is gone"""
+    try:
+        with open(zip_path[:-len('.zip')] + '.xml', encoding='utf-8') as f:
+            text = f.read()
+        zip_file = open(zip_path, 'rb')
+    except OSError:
+        return None
+    return RetrieveResponse(text, zip_file, os.path.getsize(zip_path))
+
+def remove_saved_zips(job_key, zip_dir=None):
+    """Delete the zips saved for an extraction once it no longer needs them"""
+    shutil.rmtree(saved_zip_dir(job_key, zip_dir), ignore_errors=True)
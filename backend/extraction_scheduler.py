@@ -0,0 +1,569 @@
+#!/usr/bin/env python3
+"""
+Bounded pool of extraction workers fed by a priority queue
+A fixed number of extractions run at once; the rest wait in a queue ordered by priority and shared
+fairly between organisations. A second extraction of the same integration joins the one already
+queued or running instead of starting another retrieve.
+Persisted extractions are claimed row by row, so the API process and any number of standalone
+extraction_worker.py processes can share one queue. A running extraction is only taken over once
+its worker has stopped heartbeating, and the worker that lost it stops running it.
+"""
+
+import heapq
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from collections import deque
+from datetime import datetime
+import psycopg2.extras
+
+logger = logging.getLogger(__name__)
+
+EXTRACTION_SCHEDULER_CONFIG = {
+    'backend': 'database',      # 'database' keeps queued extractions across restarts, 'local' keeps them in memory
+    'max_workers': 2,           # Extractions running at once in this process
+    'max_queued_jobs': 50,      # Submissions beyond this many waiting jobs are refused
+    'priorities': {             # Default priority per kind of extraction - lower runs first
+        'incremental': 0,
+        'full': 1,
+        'login': 1
+    },
+    'wait_samples': 100,        # Recent queue waits kept for the average in get_stats
+    'run_locally': True,        # False leaves persisted extractions to extraction_worker.py processes
+    'heartbeat_seconds': 15,    # How often running extractions are marked alive in the queue table
+    'stale_after_seconds': 120, # A running extraction not heartbeated for this long is reclaimed
+    'poll_seconds': 5.0,        # How long an idle worker waits before claiming persisted extractions again
+    'max_attempts': 3           # Claims before an extraction whose worker keeps dying is failed
+}
+
+def default_worker_id():
+    """Identifies this process in aeq_worker_id"""
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+class QueueFullError(Exception):
+    """Raised by submit when max_queued_jobs extractions are already waiting"""
+
+class LocalQueueBackend:
+    """Keeps the queue in memory only - queued extractions are lost on restart"""
+
+    def enqueue(self, entry):
+        return None
+
+    def reprioritize(self, job_id, priority):
+        pass
+
+    def start(self, job_id, worker_id, config):
+        return True
+
+    def claim(self, worker_id, config):
+        return None
+
+    def heartbeat(self, worker_id, progress):
+        return list(progress)
+
+    def release(self, job_id, worker_id):
+        pass
+
+    def finish(self, job_id, worker_id=None):
+        pass
+
+    def expire(self, config):
+        return []
+
+    def get_stats(self):
+        return {}
+
+class DatabaseQueueBackend:
+    """Mirrors queued and running extractions in ids_audit_extraction_queue
+
+    Only entries submitted with a request (a JSON description needed to rebuild the work, never
+    credentials) are written; the rest live in memory like LocalQueueBackend.
+    """
+
+    def __init__(self, db):
+        self.db = db
+
+    def enqueue(self, entry):
+        """Insert an entry; returns the job key already holding its dedup key, if any"""
+        if entry['request'] is None:
+            return None
+        inserted = self.db.execute_query("""
+            INSERT INTO ids_audit_extraction_queue (
+                aeq_job_key, aeq_org_id, aeq_integration_id, aeq_priority, aeq_dedup_key, aeq_request, aeq_enqueued_at
+            ) VALUES (%s, %s, %s, %s, %s, %s, %s)
+            ON CONFLICT (aeq_dedup_key) WHERE aeq_dedup_key IS NOT NULL DO NOTHING
+        """, (
+            entry['job_id'], entry['org_id'], entry['integration_id'], entry['priority'], entry['dedup_key'],
+            psycopg2.extras.Json(entry['request'], dumps=lambda v: json.dumps(v, default=str)), entry['enqueued_at']
+        ))
+        if inserted:
+            return None
+        row = self.db.execute_query(
+            "SELECT aeq_job_key FROM ids_audit_extraction_queue WHERE aeq_dedup_key = %s",
+            (entry['dedup_key'],), fetch_one=True
+        )
+        return row['aeq_job_key'] if row else None
+
+    def reprioritize(self, job_id, priority):
+        self.db.execute_query(
+            "UPDATE ids_audit_extraction_queue SET aeq_priority = %s WHERE aeq_job_key = %s", (priority, job_id)
+        )
+
+    def start(self, job_id, worker_id, config):
+        """Claim a specific queued entry; False if another process got to it first"""
+        return self.db.execute_query("""
+            UPDATE ids_audit_extraction_queue
+            SET aeq_queue_status = 'running', aeq_worker_id = %s, aeq_started_at = CURRENT_TIMESTAMP,
+                aeq_heartbeat_at = CURRENT_TIMESTAMP, aeq_attempts = aeq_attempts + 1
+            WHERE aeq_job_key = %s AND aeq_queue_status = 'queued'
+        """, (worker_id, job_id)) > 0
+
+    def claim(self, worker_id, config):
+        """Claim the next entry to run - queued, or running under a worker that stopped heartbeating
+
+        Best priority first, then the organisation with the fewest extractions running, then the
+        oldest. SKIP LOCKED lets any number of workers claim concurrently without blocking.
+        """
+        row = self.db.execute_query(f"""
+            UPDATE ids_audit_extraction_queue AS claimed
+            SET aeq_queue_status = 'running', aeq_worker_id = %s, aeq_started_at = CURRENT_TIMESTAMP,
+                aeq_heartbeat_at = CURRENT_TIMESTAMP, aeq_attempts = claimed.aeq_attempts + 1
+            WHERE claimed.aeq_job_key = (
+                SELECT candidate.aeq_job_key
+                FROM ids_audit_extraction_queue candidate
+                WHERE (candidate.aeq_queue_status = 'queued' OR ({self._stale('candidate')}))
+                  AND candidate.aeq_attempts < %s
+                ORDER BY candidate.aeq_priority,
+                         (SELECT COUNT(*) FROM ids_audit_extraction_queue busy
+                          WHERE busy.aeq_org_id = candidate.aeq_org_id AND busy.aeq_queue_status = 'running'),
+                         candidate.aeq_enqueued_at
+                LIMIT 1
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING claimed.*
+        """, (worker_id, config['stale_after_seconds'], config['max_attempts']), fetch_one=True)
+        return self._entry(row) if row else None
+
+    @staticmethod
+    def _stale(alias):
+        return f"""{alias}.aeq_queue_status = 'running'
+                   AND COALESCE({alias}.aeq_heartbeat_at, {alias}.aeq_started_at, {alias}.aeq_enqueued_at)
+                       < CURRENT_TIMESTAMP - make_interval(secs => %s)"""
+
+    def heartbeat(self, worker_id, progress):
+        """Mark this worker's running entries alive with their latest progress; returns the ones it still owns"""
+        if not progress:
+            return []
+        rows = self.db.execute_query("""
+            UPDATE ids_audit_extraction_queue AS running
+            SET aeq_heartbeat_at = CURRENT_TIMESTAMP, aeq_last_progress = beat.line
+            FROM unnest(%s::text[], %s::text[]) AS beat(job_key, line)
+            WHERE running.aeq_job_key = beat.job_key AND running.aeq_worker_id = %s
+            RETURNING running.aeq_job_key
+        """, (list(progress), list(progress.values()), worker_id), fetch_all=True, idempotent=True)
+        return [row['aeq_job_key'] for row in rows or []]
+
+    def release(self, job_id, worker_id):
+        """Hand a running entry back to the queue, e.g. when its worker shuts down"""
+        self.db.execute_query("""
+            UPDATE ids_audit_extraction_queue
+            SET aeq_queue_status = 'queued', aeq_worker_id = NULL, aeq_heartbeat_at = NULL
+            WHERE aeq_job_key = %s AND aeq_worker_id = %s
+        """, (job_id, worker_id))
+
+    def finish(self, job_id, worker_id=None):
+        """Delete a done entry - only while worker_id still owns it, if given"""
+        self.db.execute_query(
+            "DELETE FROM ids_audit_extraction_queue WHERE aeq_job_key = %s AND (%s IS NULL OR aeq_worker_id = %s)",
+            (job_id, worker_id, worker_id)
+        )
+
+    def expire(self, config):
+        """Delete stale entries that have used up max_attempts; returns their job keys"""
+        rows = self.db.execute_query(f"""
+            DELETE FROM ids_audit_extraction_queue AS dead
+            WHERE {self._stale('dead')} AND dead.aeq_attempts >= %s
+            RETURNING dead.aeq_job_key
+        """, (config['stale_after_seconds'], config['max_attempts']), fetch_all=True)
+        return [row['aeq_job_key'] for row in rows or []]
+
+    @staticmethod
+    def _entry(row):
+        return {
+            'job_id': row['aeq_job_key'],
+            'org_id': row['aeq_org_id'],
+            'integration_id': row['aeq_integration_id'],
+            'priority': row['aeq_priority'],
+            'dedup_key': row['aeq_dedup_key'],
+            'request': row['aeq_request'],
+            'enqueued_at': row['aeq_enqueued_at'],
+            'attempts': row['aeq_attempts'],
+            # Claimed before (not counting the claim just made): a worker stopped, restarted or let it go
+            'interrupted': row['aeq_attempts'] > 1
+        }
+
+    def get_stats(self):
+        """Queue depth across every process sharing the table"""
+        row = self.db.execute_query("""
+            SELECT COUNT(*) FILTER (WHERE aeq_queue_status = 'queued') AS queued,
+                   COUNT(*) FILTER (WHERE aeq_queue_status = 'running') AS running,
+                   COUNT(DISTINCT aeq_worker_id) AS active_workers,
+                   EXTRACT(EPOCH FROM CURRENT_TIMESTAMP - MIN(aeq_enqueued_at) FILTER (WHERE aeq_queue_status = 'queued'))
+                       AS oldest_wait_seconds
+            FROM ids_audit_extraction_queue
+        """, fetch_one=True)
+        return {
+            'queued': row['queued'],
+            'running': row['running'],
+            'active_workers': row['active_workers'],
+            'oldest_wait_seconds': round(float(row['oldest_wait_seconds'] or 0), 1)
+        }
+
+class ExtractionScheduler:
+    """Runs submitted extractions on at most max_workers threads
+
+    Each organisation has its own queue ordered by (priority, submission order). A free worker takes
+    the best priority waiting anywhere; between organisations waiting at that priority it takes the
+    one served least recently, so one organisation queueing many jobs cannot starve the others.
+
+    Persisted entries are claimed in the backend before they run and heartbeated while running, so
+    an extraction_worker.py process never runs the same one; with run_locally False they are only
+    written to the backend and left to those workers. After claim_persisted(build), idle workers
+    also claim entries other processes left in the backend.
+
+    on_start(entry), if given, is called on the worker thread just before an entry runs, with
+    entry['wait_seconds'] set. progress(job_id) returns a running job's latest progress line for its
+    heartbeat, on_expired(job_id) is told about extractions failed after max_attempts, and
+    on_lost(job_id) must stop a running extraction another worker has taken over.
+    """
+
+    def __init__(self, backend=None, config=None, on_start=None, progress=None, on_expired=None, on_lost=None):
+        self.config = dict(EXTRACTION_SCHEDULER_CONFIG, **(config or {}))
+        self.backend = backend or LocalQueueBackend()
+        self.worker_id = default_worker_id()
+        self.on_start = on_start
+        self.progress = progress
+        self.on_expired = on_expired
+        self.on_lost = on_lost
+        self.build = None
+        self._queues = {}       # org_id -> heap of (priority, seq, job_id)
+        self._entries = {}      # job_id -> entry, queued or running
+        self._running = set()
+        self._dedup = {}        # dedup_key -> job_id
+        self._last_served = {}  # org_id -> dispatch counter when it last got a worker
+        self._seq = 0
+        self._dispatched = 0
+        self._waits = deque(maxlen=self.config['wait_samples'])
+        self._workers = []
+        self._heartbeat = None
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._stats = {'submitted': 0, 'coalesced': 0, 'rejected': 0, 'started': 0, 'completed': 0,
+                       'failed': 0, 'lost': 0, 'claimed': 0, 'claimed_elsewhere': 0,
+                       'handed_to_workers': 0, 'expired': 0, 'max_wait_seconds': 0.0}
+
+    def priority_for(self, kind):
+        return self.config['priorities'].get(kind, max(self.config['priorities'].values()))
+
+    def submit(self, job_id, target, args=(), org_id=None, integration_id=None, priority=1,
+               dedup_key=None, request=None, enqueued_at=None, prepare=None):
+        """Queue target(*args) to run as job_id
+
+        prepare(job_id), if given, is called only when the job is really queued, before any worker
+        can start it - the place to create the job's state.
+
+        Returns (job_id, coalesced). When another job with the same dedup_key is queued or running -
+        here or, with the database backend, in another process - that job's id is returned with
+        coalesced True and target is dropped; a queued job takes the better of the two priorities.
+        Raises QueueFullError when max_queued_jobs extractions are already waiting.
+        """
+        with self._lock:
+            existing = self._dedup.get(dedup_key) if dedup_key is not None else None
+            if existing is not None:
+                self._stats['coalesced'] += 1
+                entry = self._entries.get(existing)  # None while the other submit is still persisting
+                if entry is not None and existing not in self._running and priority < entry['priority']:
+                    entry['priority'] = priority
+                    heapq.heappush(self._queues[entry['org_id']], (priority, entry['seq'], existing))
+                    reprioritized = True
+                else:
+                    reprioritized = False
+            elif len(self._entries) - len(self._running) >= self.config['max_queued_jobs']:
+                self._stats['rejected'] += 1
+                raise QueueFullError(f"{self.config['max_queued_jobs']} extractions are already queued")
+            elif dedup_key is not None:
+                self._dedup[dedup_key] = job_id
+        if existing is not None:
+            if reprioritized:
+                self._backend_call('reprioritize', existing, priority)
+            return existing, True
+
+        entry = {
+            'job_id': job_id,
+            'org_id': org_id,
+            'integration_id': integration_id,
+            'priority': priority,
+            'dedup_key': dedup_key,
+            'request': request,
+            'enqueued_at': enqueued_at or datetime.now(),
+            'target': target,
+            'args': tuple(args)
+        }
+        # Another process may already hold this dedup key
+        try:
+            other = self.backend.enqueue(entry)
+        except Exception as e:
+            logger.error(f"Failed to persist queued extraction {job_id}: {e}")
+            other = None
+        if other is not None:
+            with self._lock:
+                self._dedup.pop(dedup_key, None)
+                self._stats['coalesced'] += 1
+            return other, True
+
+        if prepare:
+            try:
+                prepare(job_id)
+            except Exception:
+                with self._lock:
+                    self._dedup.pop(dedup_key, None)
+                self._backend_call('finish', job_id)
+                raise
+
+        if request is not None and not self.config['run_locally']:
+            # Left in the queue table for extraction_worker.py processes
+            with self._lock:
+                self._dedup.pop(dedup_key, None)
+                self._stats['handed_to_workers'] += 1
+            return job_id, False
+
+        with self._lock:
+            self._seq += 1
+            entry['seq'] = self._seq
+            self._entries[job_id] = entry
+            heapq.heappush(self._queues.setdefault(org_id, []), (priority, entry['seq'], job_id))
+            self._stats['submitted'] += 1
+            self._wakeup.notify()
+        self._start_workers()
+        return job_id, False
+
+    def claim_persisted(self, build):
+        """Let idle workers claim entries persisted by other processes or an earlier run of this one
+
+        build(entry) returns (target, args) for a claimed entry, or None to drop it. Queued entries
+        are claimed straight away; running ones only once their worker has missed heartbeats for
+        stale_after_seconds, so extractions other processes are still running are left alone.
+        """
+        self.build = build
+        self._start_workers()
+
+    def stop(self):
+        """Stop taking work and hand running persisted extractions back to the queue; returns their job ids"""
+        self._stopping.set()
+        with self._lock:
+            running = [job_id for job_id in self._running if self._entries[job_id]['request'] is not None]
+            self._wakeup.notify_all()
+        for job_id in running:
+            self._backend_call('release', job_id, self.worker_id)
+        return running
+
+    def wait(self, timeout=None):
+        """Block until stop() is called; False if timeout passed first"""
+        return self._stopping.wait(timeout)
+
+    def _backend_call(self, method, *args):
+        try:
+            return getattr(self.backend, method)(*args)
+        except Exception as e:
+            logger.error(f"Extraction queue {method} failed: {e}")
+            return None
+
+    def _start_workers(self):
+        with self._lock:
+            self._workers = [worker for worker in self._workers if worker.is_alive()]
+            missing = self.config['max_workers'] - len(self._workers)
+            for _ in range(max(missing, 0)):
+                worker = threading.Thread(target=self._work, name='extraction-worker', daemon=True)
+                self._workers.append(worker)
+                worker.start()
+            if self._heartbeat is None:
+                self._heartbeat = threading.Thread(target=self._beat, name='extraction-heartbeat', daemon=True)
+                self._heartbeat.start()
+
+    def _beat(self):
+        """Keep this process's persisted running entries claimed and fail ones no worker could finish"""
+        while True:
+            time.sleep(self.config['heartbeat_seconds'])
+            with self._lock:
+                running = [job_id for job_id in self._running
+                           if self._entries[job_id]['request'] is not None and not self._entries[job_id].get('lost')]
+            progress = {job_id: self.progress(job_id) if self.progress else None for job_id in running}
+            owned = self._backend_call('heartbeat', self.worker_id, progress)
+            with self._lock:
+                # Entries that finished during the heartbeat are not owned any more either
+                lost = (set(running) - set(running if owned is None else owned)) & self._running
+                for job_id in lost:
+                    self._entries[job_id]['lost'] = True
+            for job_id in lost:
+                logger.warning(f"Extraction {job_id} was reclaimed by another worker after missed heartbeats, stopping it here")
+                if self.on_lost:
+                    try:
+                        self.on_lost(job_id)
+                    except Exception as e:
+                        logger.error(f"Failed to stop lost extraction {job_id}: {e}")
+
+            for job_id in self._backend_call('expire', self.config) or []:
+                with self._lock:
+                    self._stats['expired'] += 1
+                if self.on_expired:
+                    try:
+                        self.on_expired(job_id)
+                    except Exception as e:
+                        logger.error(f"Failed to report expired extraction {job_id}: {e}")
+
+    def _pop_next(self):
+        """Remove and return the next entry to run, or None; called with the lock held"""
+        best = None
+        for org_id, heap in self._queues.items():
+            # Drop heap items left behind by a priority change
+            while heap and (heap[0][2] not in self._entries or heap[0][2] in self._running
+                            or self._entries[heap[0][2]]['priority'] != heap[0][0]):
+                heapq.heappop(heap)
+            if heap:
+                rank = (heap[0][0], self._last_served.get(org_id, -1))
+                if best is None or rank < best[0]:
+                    best = (rank, org_id)
+        if best is None:
+            return None
+        org_id = best[1]
+        _, _, job_id = heapq.heappop(self._queues[org_id])
+        if not self._queues[org_id]:
+            del self._queues[org_id]
+        self._dispatched += 1
+        self._last_served[org_id] = self._dispatched
+        self._running.add(job_id)
+        return self._entries[job_id]
+
+    def _work(self):
+        while not self._stopping.is_set():
+            with self._lock:
+                entry = self._pop_next()
+                if entry is None and self.build is None:
+                    self._wakeup.wait()
+                    continue
+            if entry is None:
+                entry = self._claim()
+                if entry is None:
+                    with self._lock:
+                        self._wakeup.wait(self.config['poll_seconds'])
+                    continue
+            elif entry['request'] is not None and self._backend_call(
+                    'start', entry['job_id'], self.worker_id, self.config) is False:
+                # An extraction worker claimed it from the queue table first
+                self._forget(entry, 'claimed_elsewhere')
+                continue
+            self._run(entry)
+
+    def _claim(self):
+        """Claim a persisted entry and mark it running here; None when there is nothing to run"""
+        stored = self._backend_call('claim', self.worker_id, self.config)
+        if stored is None:
+            return None
+        with self._lock:
+            entry = self._entries.get(stored['job_id'])
+            if entry is not None:
+                if stored['job_id'] in self._running:
+                    # Already running here - the claim only renewed a heartbeat that came too late
+                    return None
+                # Submitted here and still waiting in the local queue
+                self._running.add(stored['job_id'])
+                return entry
+        try:
+            work = self.build(stored)
+        except Exception as e:
+            logger.error(f"Failed to prepare claimed extraction {stored['job_id']}: {e}")
+            work = None
+        if work is None:
+            self._backend_call('finish', stored['job_id'], self.worker_id)
+            return None
+
+        target, args = work
+        entry = dict(stored, target=target, args=tuple(args))
+        entry.pop('interrupted', None)
+        with self._lock:
+            self._entries[entry['job_id']] = entry
+            self._running.add(entry['job_id'])
+            if entry['dedup_key'] is not None:
+                self._dedup.setdefault(entry['dedup_key'], entry['job_id'])
+            self._stats['claimed'] += 1
+        return entry
+
+    def _run(self, entry):
+        """Run a claimed entry on the current thread, then drop it from the queue"""
+        with self._lock:
+            entry['wait_seconds'] = max((datetime.now() - entry['enqueued_at']).total_seconds(), 0.0)
+            self._waits.append(entry['wait_seconds'])
+            self._stats['max_wait_seconds'] = max(self._stats['max_wait_seconds'], entry['wait_seconds'])
+            self._stats['started'] += 1
+        failed = False
+        try:
+            if self.on_start:
+                self.on_start(entry)
+            entry['target'](*entry['args'])
+        except Exception as e:
+            failed = True
+            logger.error(f"Extraction {entry['job_id']} raised: {e}")
+        finally:
+            self._forget(entry, 'lost' if entry.get('lost') else 'failed' if failed else 'completed')
+            self._backend_call('finish', entry['job_id'], self.worker_id)
+
+    def _forget(self, entry, outcome):
+        with self._lock:
+            self._running.discard(entry['job_id'])
+            self._entries.pop(entry['job_id'], None)
+            if entry['dedup_key'] is not None and self._dedup.get(entry['dedup_key']) == entry['job_id']:
+                del self._dedup[entry['dedup_key']]
+            self._stats[outcome] += 1
+
+    def queued_jobs(self):
+        """Waiting entries, best priority first, without their targets"""
+        now = datetime.now()
+        with self._lock:
+            waiting = [entry for job_id, entry in self._entries.items() if job_id not in self._running]
+            waiting.sort(key=lambda entry: (entry['priority'], entry['seq']))
+            return [{
+                'job_id': entry['job_id'],
+                'org_id': entry['org_id'],
+                'integration_id': entry['integration_id'],
+                'priority': entry['priority'],
+                'enqueued_at': entry['enqueued_at'],
+                'waiting_seconds': round(max((now - entry['enqueued_at']).total_seconds(), 0.0), 1)
+            } for entry in waiting]
+
+    def get_stats(self):
+        queued = self.queued_jobs()
+        with self._lock:
+            queued_by_org = {}
+            for entry in queued:
+                queued_by_org[entry['org_id']] = queued_by_org.get(entry['org_id'], 0) + 1
+            waits = list(self._waits)
+            stats = dict(
+                self._stats,
+                max_wait_seconds=round(self._stats['max_wait_seconds'], 1),
+                workers=self.config['max_workers'],
+                running=len(self._running),
+                queued=len(queued),
+                queued_by_org=queued_by_org,
+                oldest_wait_seconds=max((entry['waiting_seconds'] for entry in queued), default=0.0),
+                avg_wait_seconds=round(sum(waits) / len(waits), 1) if waits else 0.0,
+                worker_id=self.worker_id
+            )
+        # Every process sharing the queue table
+        shared = self._backend_call('get_stats')
+        if shared:
+            stats['shared'] = shared
+        return stats
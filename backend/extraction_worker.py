@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Standalone extraction worker
+Claims dashboard extractions from ids_audit_extraction_queue and runs the same
+login -> retrieve -> poll -> ingest -> analyze pipeline as the API, so extraction capacity can be
+added on other machines independently of the web tier. Run any number of these next to the API:
+
+    python extraction_worker.py --workers 4
+
+With EXTRACTION_SCHEDULER_CONFIG['run_locally'] set to False the API only queues dashboard
+extractions and these workers run all of them; otherwise both take jobs from the same queue.
+Extractions whose worker stops heartbeating are reclaimed by another worker.
+"""
+
+import argparse
+import logging
+import signal
+from datetime import datetime
+
+from extraction_scheduler import ExtractionScheduler, DatabaseQueueBackend
+
+EXTRACTION_WORKER_CONFIG = {
+    'max_workers': 2,       # Extractions this process runs at once
+    'poll_seconds': 5.0     # How long an idle worker thread waits before looking for work again
+}
+
+class ExtractionWorker:
+    """Runs extractions claimed from the shared queue table on an ExtractionScheduler of its own
+
+    build(entry) turns a claimed entry into (target, args), or None to drop it. Nothing is submitted
+    here - the scheduler's threads only claim. Stopping hands running extractions back to the queue
+    so another worker can pick them up straight away.
+    """
+
+    def __init__(self, backend, build, config=None, **hooks):
+        self.scheduler = ExtractionScheduler(backend, dict(EXTRACTION_WORKER_CONFIG, **(config or {})), **hooks)
+        self.build = build
+
+    @property
+    def worker_id(self):
+        return self.scheduler.worker_id
+
+    def start(self):
+        self.scheduler.claim_persisted(self.build)
+
+    def stop(self):
+        """Stop claiming work and release extractions that are still running"""
+        return self.scheduler.stop()
+
+    def wait(self):
+        self.scheduler.wait()
+
+    def get_stats(self):
+        return self.scheduler.get_stats()
+
+def main():
+    parser = argparse.ArgumentParser(description='Run queued metadata extractions')
+    parser.add_argument('--workers', type=int, default=EXTRACTION_WORKER_CONFIG['max_workers'],
+                        help='extractions to run at once')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+
+    # The pipeline, database manager and job store are shared with the API server
+    import server_db
+
+    def build(entry):
+        message = (f'Resuming metadata extraction on worker {worker.worker_id}...' if entry['interrupted'] else
+                   f'Starting metadata extraction on worker {worker.worker_id}...')
+        return server_db.build_queued_extraction(entry, message)
+
+    worker = ExtractionWorker(
+        DatabaseQueueBackend(server_db.db),
+        build,
+        {'max_workers': args.workers},
+        on_start=server_db.on_extraction_start,
+        progress=server_db.extraction_job_progress,
+        on_expired=server_db.on_extraction_expired,
+        on_lost=server_db.on_extraction_lost
+    )
+
+    def shutdown(signum, frame):
+        released = worker.stop()
+        print(f"🛑 Stopping; released {len(released)} running extractions back to the queue")
+
+    signal.signal(signal.SIGINT, shutdown)
+    signal.signal(signal.SIGTERM, shutdown)
+
+    print(f"⚙️  Extraction worker {worker.worker_id} started with {args.workers} slots at {datetime.now().isoformat()}")
+    worker.start()
+    worker.wait()
+    # Let job state writes for the released extractions reach the database
+    server_db.extraction_jobs.flush()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Incremental (delta) extraction planning using the Metadata API listMetadata call
+Compares each component's lastModifiedDate with the previous extraction job so only changed
+members are retrieved; unchanged components are carried forward from the previous job
+"""
+
+import os
+import re
+from datetime import datetime
+import requests
+
+# Types stored in folders cannot be listed or retrieved with a wildcard per member - always retrieved in full
+FOLDER_METADATA_TYPES = ('Report', 'Dashboard', 'Document', 'EmailTemplate')
+
+# listMetadata accepts at most 3 queries per call
+LIST_METADATA_QUERIES_PER_CALL = 3
+
+def _element(block, name):
+    match = re.search(rf'<(?:\w+:)?{name}>(.*?)</(?:\w+:)?{name}>', block, re.DOTALL)
+    return match.group(1) if match else None
+
+def parse_salesforce_datetime(value):
+    """Parse a Salesforce dateTime such as 2024-05-01T10:15:30.000Z into a naive UTC datetime"""
+    if not value:
+        return None
+    value = value.strip().replace('Z', '')
+    for fmt in ('%Y-%m-%dT%H:%M:%S.%f', '%Y-%m-%dT%H:%M:%S'):
+        try:
+            return datetime.strptime(value.split('+')[0], fmt)
+        except ValueError:
+            continue
+    return None
+
+def normalize_file_name(file_name):
+    """Strip the package folder Salesforce prefixes to file names (unpackaged/classes/X.cls -> classes/X.cls)"""
+    if file_name and file_name.startswith('unpackaged/'):
+        return file_name[len('unpackaged/'):]
+    return file_name
+
+def parse_file_properties(response_text, tag='fileProperties'):
+    """Parse the FileProperties of a reply - <fileProperties> in checkRetrieveStatus, <result> in listMetadata"""
+    properties = []
+    for block in re.findall(rf'<(?:\w+:)?{tag}>(.*?)</(?:\w+:)?{tag}>', response_text, re.DOTALL):
+        properties.append({
+            'type': _element(block, 'type'),
+            'full_name': _element(block, 'fullName'),
+            'file_name': normalize_file_name(_element(block, 'fileName')),
+            'last_modified': parse_salesforce_datetime(_element(block, 'lastModifiedDate'))
+        })
+    return properties
+
+def get_list_metadata_body(session_id, metadata_types, api_version='62.0'):
+    """Generate a listMetadata request for up to three metadata types"""
+    queries = ''.join(f'''
+         <met:queries>
+            <met:type>{metadata_type}</met:type>
+         </met:queries>''' for metadata_type in metadata_types)
+    return f'''<?xml version="1.0" encoding="UTF-8"?>
+<soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/" xmlns:met="http://soap.sforce.com/2006/04/metadata">
+   <soapenv:Header>
+      <met:SessionHeader>
+         <met:sessionId>{session_id}</met:sessionId>
+      </met:SessionHeader>
+   </soapenv:Header>
+   <soapenv:Body>
+      <met:listMetadata>{queries}
+         <met:asOfVersion>{api_version}</met:asOfVersion>
+      </met:listMetadata>
+   </soapenv:Body>
+</soapenv:Envelope>'''
+
+def list_metadata(metadata_url, session_id, metadata_types, timeout=120):
+    """List the members of metadata types, returning (file_properties, listed_types, failed_types)
+
+    A type is only reported as listed when its listMetadata call succeeded, so a type that could
+    not be listed can be retrieved in full instead of being treated as empty.
+    """
+    headers = {
+        'Content-Type': 'text/xml; charset=UTF-8',
+        'SOAPAction': 'listMetadata'
+    }
+    file_properties = []
+    listed_types = []
+    failed_types = []
+
+    for start in range(0, len(metadata_types), LIST_METADATA_QUERIES_PER_CALL):
+        batch = metadata_types[start:start + LIST_METADATA_QUERIES_PER_CALL]
+        try:
+            response = requests.post(metadata_url, data=get_list_metadata_body(session_id, batch),
+                                     headers=headers, timeout=timeout)
+            if response.status_code != 200 or '<soapenv:Fault>' in response.text:
+                failed_types.extend(batch)
+                continue
+            file_properties.extend(parse_file_properties(response.text, tag='result'))
+            listed_types.extend(batch)
+        except requests.exceptions.RequestException:
+            failed_types.extend(batch)
+
+    return file_properties, listed_types, failed_types
+
+def plan_incremental_extraction(file_properties, listed_types, previous_components, file_type_for, full_types=()):
+    """Decide what to retrieve and what to carry forward from the previous job
+
+    Components are matched on (stored metadata type, file name) - the same key the ingest uses, so
+    a CustomField listing maps onto its object's .object file and a changed field marks the object
+    as changed. previous_components rows need amc_id, amt_name, amc_label and amc_last_modified.
+    file_type_for maps a file name to the stored metadata type (metadata_files.get_file_type_from_path).
+    Components with a member of one of full_types are left to a retrieve of every member of that type,
+    so they are neither listed in members nor carried forward.
+
+    Returns a dict with:
+      members       - {api_type: [fullName, ...]} to retrieve because they are new or changed
+      carry_forward - amc_ids of previous components that are unchanged
+      deleted       - count of previous components of listed types that no longer exist
+    """
+    listed = set(listed_types)
+    full = set(full_types)
+
+    # Latest modification per stored component, and the listed members that produce it
+    current = {}
+    for prop in file_properties:
+        if prop['type'] not in listed or not prop['file_name'] or not prop['full_name']:
+            continue
+        key = (file_type_for(prop['file_name']), os.path.basename(prop['file_name']))
+        entry = current.setdefault(key, {'last_modified': None, 'members': []})
+        entry['members'].append((prop['type'], prop['full_name']))
+        if prop['last_modified'] and (entry['last_modified'] is None or prop['last_modified'] > entry['last_modified']):
+            entry['last_modified'] = prop['last_modified']
+
+    previous = {}
+    for component in previous_components:
+        previous[(component['amt_name'], component['amc_label'])] = component
+
+    members = {}
+    carry_forward = []
+    for key, entry in current.items():
+        component = previous.get(key)
+        unchanged = (
+            component is not None
+            and component['amc_last_modified'] is not None
+            and entry['last_modified'] is not None
+            and entry['last_modified'] <= component['amc_last_modified']
+        )
+        if any(metadata_type in full for metadata_type, _ in entry['members']):
+            continue
+        if unchanged:
+            carry_forward.append(component['amc_id'])
+            continue
+        for metadata_type, full_name in entry['members']:
+            members.setdefault(metadata_type, [])
+            if full_name not in members[metadata_type]:
+                members[metadata_type].append(full_name)
+
+    stored_listed_types = {file_type_for(prop['file_name']) for prop in file_properties
+                           if prop['type'] in listed and prop['file_name']}
+    deleted = sum(1 for key in previous if key not in current and key[0] in stored_listed_types)
+
+    return {
+        'members': members,
+        'carry_forward': sorted(carry_forward),
+        'deleted': deleted
+    }
@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+"""
+Extraction job state shared between API worker processes
+Jobs behave like the plain dicts server_db has always used, but progress logs are bounded, finished
+jobs expire, status changes are atomic and every change is written behind to ids_audit_job_state so
+any worker can answer a status poll
+"""
+
+import json
+import logging
+import threading
+import time
+import psycopg2.extras
+
+logger = logging.getLogger(__name__)
+
+JOB_STORE_CONFIG = {
+    'backend': 'database',              # 'database' shares jobs across workers, 'local' keeps them in-process
+    'max_progress_entries': 500,        # Oldest progress lines are dropped beyond this
+    'finished_job_ttl_seconds': 3600,   # Successful or failed jobs are forgotten this long after finishing
+    'stale_job_ttl_seconds': 86400,     # Unfinished jobs not updated for this long (their worker died) are removed
+    'flush_interval_seconds': 0.5,      # Progress lines are written in batches at most this far apart
+    'cleanup_interval_seconds': 300,
+    'stream_keepalive_seconds': 15,     # Idle progress streams send a comment this often
+    'stream_poll_seconds': 1.0,         # How often a stream re-reads a job running in another worker
+    'max_stream_seconds': 3600          # Streams end after this long; clients reconnect where they left off
+}
+
+TERMINAL_STATUSES = ('success', 'error')
+
+# Job keys stored in their own columns; anything else goes to ajs_fields
+JOB_COLUMNS = {
+    'status': 'ajs_status',
+    'data': 'ajs_data',
+    'error': 'ajs_error',
+    'integration_id': 'ajs_integration_id',
+    'start_time': 'ajs_started_at',
+    'end_time': 'ajs_ended_at'
+}
+
+def _json(value):
+    return psycopg2.extras.Json(value, dumps=lambda v: json.dumps(v, default=str))
+
+class ProgressLog(list):
+    """A job's progress messages, keeping only the newest max_entries
+
+    total counts every line ever appended, so a reader that has seen total lines can ask for just
+    the newer ones even after older lines were dropped.
+    """
+
+    def __init__(self, lines=(), max_entries=None, on_append=None, total=None):
+        super().__init__(lines)
+        self.max_entries = max_entries
+        self.total = len(self) if total is None else total
+        self._on_append = on_append
+        self._lock = threading.Lock()
+
+    def append(self, line):
+        with self._lock:
+            super().append(line)
+            self.total += 1
+            if self.max_entries and len(self) > self.max_entries:
+                del self[:len(self) - self.max_entries]
+        if self._on_append:
+            self._on_append(line)
+
+    def lines_since(self, seen):
+        """Return (lines appended after the first seen lines, total)"""
+        with self._lock:
+            new = self.total - seen
+            if new <= 0:
+                return [], self.total
+            return list(self[-new:]) if new < len(self) else list(self), self.total
+
+class JobState(dict):
+    """One extraction job - a dict whose changes are reported to its JobStore
+
+    Once a job reaches success or error its status is final: later status changes, and the fields
+    set together with them through update(), are ignored.
+    """
+
+    def __init__(self, store, job_id, fields):
+        super().__init__(fields)
+        self.store = store
+        self.job_id = job_id
+        self.finished_at = None  # time.monotonic() when the job reached a terminal status
+        self.version = 0         # Bumped on every change, see wait_for_change
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+
+    def __setitem__(self, key, value):
+        self.update({key: value})
+
+    def update(self, fields=(), **kwargs):
+        fields = dict(fields, **kwargs)
+        with self._lock:
+            status = fields.get('status')
+            if status is not None and self.get('status') in TERMINAL_STATUSES and status != self.get('status'):
+                logger.warning(f"Ignoring status change of finished job {self.job_id}: {self['status']} -> {status}")
+                return False
+            if status in TERMINAL_STATUSES and status != self.get('status'):
+                self.finished_at = time.monotonic()
+            super().update(fields)
+            self.version += 1
+            self._changed.notify_all()
+        if self.store is not None:
+            self.store.mark_dirty(self, urgent='status' in fields)
+        return True
+
+    def touch(self):
+        """Wake anything waiting for this job to change (called for new progress lines)"""
+        with self._lock:
+            self.version += 1
+            self._changed.notify_all()
+
+    def wait_for_change(self, version, timeout):
+        """Block until the job's version differs from version or timeout passes; returns the version"""
+        with self._lock:
+            if self.version == version:
+                self._changed.wait(timeout)
+            return self.version
+
+class LocalJobBackend:
+    """Keeps nothing outside the process - a job is only visible to the worker running it"""
+
+    def save(self, job, new_lines):
+        pass
+
+    def load(self, job_id, max_entries):
+        return None
+
+    def cleanup(self, config):
+        return 0
+
+class DatabaseJobBackend:
+    """Writes job state to ids_audit_job_state"""
+
+    def __init__(self, db):
+        self.db = db
+
+    def save(self, job, new_lines):
+        """Upsert a job's fields and append its new progress lines, trimming the stored log"""
+        with job._lock:
+            snapshot = dict(job)
+        fields = {k: v for k, v in snapshot.items() if k not in JOB_COLUMNS and k not in ('id', 'progress')}
+        query = """
+            INSERT INTO ids_audit_job_state AS ajs_state (
+                ajs_job_key, ajs_status, ajs_data, ajs_error, ajs_integration_id, ajs_started_at,
+                ajs_ended_at, ajs_fields, ajs_progress, ajs_progress_total, ajs_finished_at, ajs_updated_timestamp
+            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s,
+                      CASE WHEN %s IN ('success', 'error') THEN CURRENT_TIMESTAMP END, CURRENT_TIMESTAMP)
+            ON CONFLICT (ajs_job_key) DO UPDATE SET
+                ajs_status = CASE WHEN ajs_state.ajs_status IN ('success', 'error')
+                                  THEN ajs_state.ajs_status ELSE EXCLUDED.ajs_status END,
+                ajs_data = EXCLUDED.ajs_data,
+                ajs_error = EXCLUDED.ajs_error,
+                ajs_integration_id = EXCLUDED.ajs_integration_id,
+                ajs_started_at = EXCLUDED.ajs_started_at,
+                ajs_ended_at = EXCLUDED.ajs_ended_at,
+                ajs_fields = EXCLUDED.ajs_fields,
+                ajs_progress = jsonb_path_query_array(ajs_state.ajs_progress || EXCLUDED.ajs_progress,
+                                                      '$[last - $keep + 1 to last]', %s),
+                ajs_progress_total = ajs_state.ajs_progress_total + EXCLUDED.ajs_progress_total,
+                ajs_finished_at = COALESCE(ajs_state.ajs_finished_at, EXCLUDED.ajs_finished_at),
+                ajs_updated_timestamp = CURRENT_TIMESTAMP
+        """
+        keep = job.store.config['max_progress_entries']
+        self.db.execute_query(query, (
+            job.job_id, snapshot.get('status'), _json(snapshot.get('data')), snapshot.get('error'),
+            snapshot.get('integration_id'), snapshot.get('start_time'), snapshot.get('end_time'),
+            _json(fields), _json(new_lines[-keep:]), len(new_lines), snapshot.get('status'), _json({'keep': keep})
+        ))
+
+    def load(self, job_id, max_entries):
+        row = self.db.execute_query(
+            "SELECT * FROM ids_audit_job_state WHERE ajs_job_key = %s", (job_id,), fetch_one=True
+        )
+        if not row:
+            return None
+        fields = dict(row['ajs_fields'] or {})
+        fields.update({key: row[column] for key, column in JOB_COLUMNS.items()})
+        fields['id'] = job_id
+        fields['progress'] = ProgressLog(row['ajs_progress'] or [], max_entries, total=row['ajs_progress_total'])
+        return fields
+
+    def cleanup(self, config):
+        """Delete expired finished jobs and abandoned unfinished ones"""
+        return self.db.execute_query("""
+            DELETE FROM ids_audit_job_state
+            WHERE ajs_finished_at < CURRENT_TIMESTAMP - make_interval(secs => %s)
+               OR (ajs_finished_at IS NULL AND ajs_updated_timestamp < CURRENT_TIMESTAMP - make_interval(secs => %s))
+        """, (config['finished_job_ttl_seconds'], config['stale_job_ttl_seconds']))
+
+class JobStore:
+    """Dict-like store of extraction jobs keyed by job id
+
+    Jobs created here stay in memory while they run, so background threads keep mutating the same
+    JobState. Changes are queued and written by one flusher thread - outside any transaction the
+    extraction thread may have open - with status changes written straight away and progress lines
+    batched. Jobs created by another worker are read from the backend on every lookup.
+    """
+
+    def __init__(self, backend=None, config=None):
+        self.config = dict(JOB_STORE_CONFIG, **(config or {}))
+        self.backend = backend or LocalJobBackend()
+        self._persistent = not isinstance(self.backend, LocalJobBackend)
+        self._jobs = {}
+        self._pending = {}   # job_id -> (job, [new progress lines])
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._urgent = False
+        self._flusher = None
+        self._last_cleanup = time.monotonic()
+        self._stats = {'created': 0, 'evicted': 0, 'remote_reads': 0, 'writes': 0, 'write_errors': 0}
+
+    def __setitem__(self, job_id, fields):
+        self.create(job_id, fields)
+
+    def create(self, job_id, fields):
+        """Start tracking a job; its initial state is written before this returns"""
+        fields = dict(fields)
+        job = JobState(self, job_id, {})
+        lines = fields.pop('progress', [])
+        dict.update(job, fields)
+        dict.__setitem__(job, 'progress', ProgressLog(
+            lines, self.config['max_progress_entries'], on_append=lambda line: self._progress_appended(job, line)
+        ))
+        with self._lock:
+            self._jobs[job_id] = job
+            self._stats['created'] += 1
+        self._write(job, list(lines))
+        self._start_flusher()
+        return job
+
+    def get(self, job_id, default=None):
+        self._evict_finished()
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None:
+            return job
+        try:
+            fields = self.backend.load(job_id, self.config['max_progress_entries'])
+        except Exception as e:
+            logger.error(f"Failed to load job {job_id}: {e}")
+            return default
+        if fields is None:
+            return default
+        with self._lock:
+            self._stats['remote_reads'] += 1
+        # A snapshot of another worker's job - changes to it are not persisted
+        return JobState(None, job_id, fields)
+
+    def detach(self, job_id):
+        """Stop persisting a job running here, e.g. once another worker has taken it over
+
+        Its later changes stay local, so they cannot overwrite the state written by the new worker.
+        """
+        with self._lock:
+            job = self._jobs.pop(job_id, None)
+            self._pending.pop(job_id, None)
+        if job is not None:
+            job.store = None
+            job.touch()
+        return job
+
+    def __getitem__(self, job_id):
+        job = self.get(job_id)
+        if job is None:
+            raise KeyError(job_id)
+        return job
+
+    def __contains__(self, job_id):
+        return self.get(job_id) is not None
+
+    def _progress_appended(self, job, line):
+        job.touch()
+        self.mark_dirty(job, line=line)
+
+    def follow(self, job_id, seen=0):
+        """Yield a job's changes until it finishes, for streaming to a client
+
+        Each item is a dict with the progress lines appended after the first seen, progress_total and
+        the job's status, data, error, start_time and end_time - or None when nothing changed for
+        stream_keepalive_seconds. Yields {'status': None} once if the job does not exist. Jobs running
+        in this worker are waited on; other workers' jobs are re-read every stream_poll_seconds.
+        Ends when the job reaches success or error, or after max_stream_seconds.
+        """
+        started = time.monotonic()
+        last_sent = started
+        last_state = None
+        while time.monotonic() - started < self.config['max_stream_seconds']:
+            job = self.get(job_id)
+            if job is None:
+                yield {'status': None}
+                return
+            version = job.version
+            lines, seen = job['progress'].lines_since(seen)
+            state = {key: job.get(key) for key in ('status', 'data', 'error', 'start_time', 'end_time')}
+            if lines or state != last_state:
+                last_state = state
+                last_sent = time.monotonic()
+                yield dict(state, lines=lines, progress_total=seen)
+            elif time.monotonic() - last_sent >= self.config['stream_keepalive_seconds']:
+                last_sent = time.monotonic()
+                yield None
+            if state['status'] in TERMINAL_STATUSES:
+                return
+
+            if job.store is self:
+                job.wait_for_change(version, self.config['stream_keepalive_seconds'])
+            else:
+                time.sleep(self.config['stream_poll_seconds'])
+
+    def mark_dirty(self, job, urgent=False, line=None):
+        if not self._persistent:
+            return
+        with self._lock:
+            if job.job_id not in self._jobs:
+                return
+            _, lines = self._pending.setdefault(job.job_id, (job, []))
+            if line is not None:
+                lines.append(line)
+            if urgent:
+                self._urgent = True
+                self._wakeup.notify()
+
+    def flush(self):
+        """Write every queued change now"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._urgent = False
+        for job, lines in pending.values():
+            self._write(job, lines)
+
+    def _write(self, job, lines):
+        try:
+            self.backend.save(job, lines)
+            with self._lock:
+                self._stats['writes'] += 1
+        except Exception as e:
+            with self._lock:
+                self._stats['write_errors'] += 1
+            logger.error(f"Failed to persist job {job.job_id}: {e}")
+
+    def _start_flusher(self):
+        if not self._persistent:
+            return
+        with self._lock:
+            if self._flusher is not None:
+                return
+            self._flusher = threading.Thread(target=self._flush_loop, name='job-store-flusher', daemon=True)
+        self._flusher.start()
+
+    def _flush_loop(self):
+        while True:
+            with self._lock:
+                if not self._urgent:
+                    self._wakeup.wait(self.config['flush_interval_seconds'])
+            self.flush()
+            if time.monotonic() - self._last_cleanup >= self.config['cleanup_interval_seconds']:
+                self._last_cleanup = time.monotonic()
+                try:
+                    self.backend.cleanup(self.config)
+                except Exception as e:
+                    logger.error(f"Job state cleanup failed: {e}")
+
+    def _evict_finished(self):
+        """Forget finished jobs once their TTL has passed (their last state is already written)"""
+        cutoff = time.monotonic() - self.config['finished_job_ttl_seconds']
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items()
+                       if job.finished_at is not None and job.finished_at < cutoff and job_id not in self._pending]
+            for job_id in expired:
+                del self._jobs[job_id]
+            self._stats['evicted'] += len(expired)
+
+    def get_stats(self):
+        with self._lock:
+            running = sum(1 for job in self._jobs.values() if job.get('status') not in TERMINAL_STATUSES)
+            return dict(
+                self._stats,
+                backend='database' if self._persistent else 'local',
+                local_jobs=len(self._jobs),
+                running_jobs=running,
+                pending_writes=len(self._pending)
+            )
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Classification of retrieved metadata files
+One extension -> type table shared by extraction, dependency analysis and AI prompts so file types
+and dev names agree everywhere
+"""
+
+import os
+
+# Metadata API file extension -> metadata type name (extensions are case-sensitive)
+METADATA_FILE_EXTENSIONS = {
+    # Apex and Visualforce
+    '.cls': 'ApexClass',
+    '.trigger': 'ApexTrigger',
+    '.page': 'ApexPage',
+    '.component': 'ApexComponent',
+
+    # Custom Objects and Fields
+    '.object': 'CustomObject',
+    '.field': 'CustomField',
+
+    # Automation and Workflow
+    '.flow': 'Flow',
+    '.workflow': 'WorkflowRule',
+    '.workflowAlert': 'WorkflowAlert',
+    '.workflowFieldUpdate': 'WorkflowFieldUpdate',
+    '.workflowTask': 'WorkflowTask',
+    '.workflowSend': 'WorkflowSend',
+    '.workflowOutboundMessage': 'WorkflowOutboundMessage',
+    '.workflowKnowledgePublish': 'WorkflowKnowledgePublish',
+
+    # UI and Layout
+    '.layout': 'Layout',
+    '.flexipage': 'FlexiPage',
+    '.tab': 'CustomTab',
+    '.app': 'CustomApplication',
+    '.weblink': 'CustomWebLink',
+    '.quickAction': 'QuickAction',
+
+    # Validation and Rules
+    '.validationRule': 'ValidationRule',
+    '.sharingRules': 'SharingRules',
+    '.sharingSet': 'SharingSet',
+
+    # Security and Permissions
+    '.permissionset': 'PermissionSet',
+    '.profile': 'Profile',
+    '.role': 'Role',
+    '.group': 'Group',
+    '.queue': 'Queue',
+    '.customPermission': 'CustomPermission',
+
+    # Custom Metadata and Labels
+    '.customMetadata': 'CustomMetadata',
+    '.labels': 'CustomLabel',
+
+    # Sites and Communities
+    '.site': 'CustomSite',
+    '.network': 'Network',
+    '.networkBranding': 'NetworkBranding',
+    '.networkMemberGroup': 'NetworkMemberGroup',
+    '.networkPageOverride': 'NetworkPageOverride',
+    '.networkTabSet': 'NetworkTabSet',
+
+    # Reports and Analytics
+    '.report': 'Report',
+    '.reportType': 'ReportType',
+    '.dashboard': 'Dashboard',
+    '.listView': 'ListView',
+
+    # Einstein Analytics (Wave)
+    '.waveApplication': 'WaveApplication',
+    '.waveDashboard': 'WaveDashboard',
+    '.waveDataflow': 'WaveDataflow',
+    '.waveDataset': 'WaveDataset',
+    '.waveLens': 'WaveLens',
+    '.waveRecipe': 'WaveRecipe',
+    '.waveSpoke': 'WaveSpoke',
+    '.waveXmd': 'WaveXmd',
+
+    # Global Value Sets
+    '.globalValueSet': 'GlobalValueSet',
+    '.globalValueSetTranslation': 'GlobalValueSetTranslation',
+    '.standardValueSet': 'StandardValueSet',
+    '.standardValueSetTranslation': 'StandardValueSetTranslation',
+
+    # Home Page Components
+    '.homePageComponent': 'HomePageComponent',
+    '.homePageLayout': 'HomePageLayout',
+
+    # Named Credentials and Integrations
+    '.namedCredential': 'NamedCredential',
+    '.samlSsoConfig': 'SamlSsoConfig',
+
+    # Documents and Resources
+    '.document': 'Document',
+    '.resource': 'StaticResource',
+    '.email': 'EmailTemplate',
+
+    # Territory Management
+    '.territory': 'Territory',
+    '.territory2': 'Territory2',
+    '.territory2Model': 'Territory2Model',
+    '.territory2Rule': 'Territory2Rule',
+    '.territory2Type': 'Territory2Type',
+
+    # Platform Events
+    '.platformEventChannel': 'PlatformEventChannel',
+    '.platformEventChannelMember': 'PlatformEventChannelMember',
+
+    # Service and Support
+    '.serviceChannel': 'ServiceChannel',
+    '.servicePresenceStatus': 'ServicePresenceStatus',
+    '.skill': 'Skill',
+
+    # Queue Routing
+    '.queueRoutingConfig': 'QueueRoutingConfig',
+
+    # Path Assistant
+    '.pathAssistant': 'PathAssistant',
+
+    # Permission Set Groups
+    '.permissionSetGroup': 'PermissionSetGroup',
+
+    # Post Templates
+    '.postTemplate': 'PostTemplate',
+
+    # Profile Settings
+    '.profilePasswordPolicy': 'ProfilePasswordPolicy',
+    '.profileSessionSetting': 'ProfileSessionSetting',
+
+    # Topics
+    '.topicsForObjects': 'TopicsForObjects',
+
+    # User Criteria and Searches
+    '.userCriteria': 'UserCriteria',
+    '.userProfileSearch': 'UserProfileSearch',
+
+    # Custom Object Translations
+    '.customObjectTranslation': 'CustomObjectTranslation',
+    '.customPageWebLink': 'CustomPageWebLink',
+    '.customTabTranslation': 'CustomTabTranslation',
+
+    # Installed Packages
+    '.installedPackage': 'InstalledPackage',
+
+    # Synonym Dictionary
+    '.synonymDictionary': 'SynonymDictionary',
+
+    # Site Dot Com
+    '.siteDotCom': 'SiteDotCom',
+}
+
+def get_file_type_from_path(file_path):
+    """Determine the metadata type of a retrieved file ("Unknown" when it is not metadata)
+
+    Only the extension counts - from the last dot of the base name, so X.workflowAlert gives
+    WorkflowAlert and X.cls-meta.xml is Unknown. Folders are not looked at: aura/ and lwc/ bundle
+    files and siteDotComSites/*.site keep the types their extensions map to, the types stored in
+    ids_audit_metadata_type.
+    """
+    base_name = file_path.replace('\\', '/').rsplit('/', 1)[-1]
+    dot = base_name.rfind('.')
+    return METADATA_FILE_EXTENSIONS.get(base_name[dot:] if dot != -1 else '', "Unknown")
+
+def strip_metadata_extension(name):
+    """Remove a known metadata file extension from a name (Admin.permissionset -> Admin)"""
+    dot = name.rfind('.')
+    if dot > 0 and name[dot:] in METADATA_FILE_EXTENSIONS:
+        return name[:dot]
+    return name
+
+def get_dev_name(file_path):
+    """Developer name of a retrieved file - its base name without the metadata file extension"""
+    return strip_metadata_extension(os.path.basename(file_path))
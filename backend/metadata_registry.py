@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Process-wide cache of ids_audit_metadata_type
+Each organisation's types are loaded once into name and id lookup tables and kept until invalidated, e.g. when a type is created through /api/metadata-types
+"""
+
+import threading
+import time
+from types import MappingProxyType
+
+METADATA_REGISTRY_CONFIG = {
+    # Types added outside the API (init_database.py, manual SQL) show up after this long at most
+    'max_age_seconds': 600
+}
+
+class MetadataTypes:
+    """Read-only lookup tables for one organisation's metadata types
+
+    rows are the ids_audit_metadata_type rows ordered by amt_name. ids (name -> amt_id) and names
+    (amt_id -> name) are read-only views, so a job holding a snapshot cannot change it for others.
+    File types are classified by metadata_files.get_file_type_from_path, not by amt_file_extension.
+    """
+
+    def __init__(self, rows):
+        self.rows = tuple(rows)
+        self.ids = MappingProxyType({row['amt_name']: row['amt_id'] for row in self.rows})
+        self.names = MappingProxyType({row['amt_id']: row['amt_name'] for row in self.rows})
+
+    def __len__(self):
+        return len(self.rows)
+
+    def id_for(self, name):
+        """amt_id of a type name, or None"""
+        return self.ids.get(name)
+
+    def name_for(self, type_id):
+        """Type name of an amt_id, or None"""
+        return self.names.get(type_id)
+
+class MetadataTypeRegistry:
+    """Thread-safe registry of MetadataTypes per organisation
+
+    loader(org_id) returns the organisation's active ids_audit_metadata_type rows. A snapshot is
+    replaced, never mutated, so callers can keep using one for the length of a job.
+    """
+
+    def __init__(self, loader, config=None):
+        self.config = dict(METADATA_REGISTRY_CONFIG, **(config or {}))
+        self._loader = loader
+        self._types = {}
+        self._loaded_at = {}
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'loads': 0, 'invalidations': 0}
+
+    def get(self, org_id):
+        """Return the organisation's MetadataTypes, loading them on first use"""
+        with self._lock:
+            types = self._types.get(org_id)
+            if types is not None and time.monotonic() - self._loaded_at[org_id] < self.config['max_age_seconds']:
+                self._stats['hits'] += 1
+                return types
+
+        types = MetadataTypes(self._loader(org_id) or [])
+        with self._lock:
+            self._types[org_id] = types
+            self._loaded_at[org_id] = time.monotonic()
+            self._stats['loads'] += 1
+        return types
+
+    def invalidate(self, org_id=None):
+        """Drop one organisation's types, or every organisation's when org_id is None"""
+        with self._lock:
+            org_ids = list(self._types) if org_id is None else [org_id]
+            for key in org_ids:
+                if self._types.pop(key, None) is not None:
+                    self._loaded_at.pop(key, None)
+                    self._stats['invalidations'] += 1
+
+    def get_stats(self):
+        with self._lock:
+            return dict(self._stats, cached_orgs={org_id: len(types) for org_id, types in self._types.items()})
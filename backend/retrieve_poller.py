@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Adaptive checkRetrieveStatus polling shared by every in-flight Metadata API retrieve
+One scheduler thread keeps a heap of due checks; status checks run on a small worker pool
+and finished retrieves are handed off to their own thread for download and processing
+"""
+
+import heapq
+import itertools
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from retrieve_stream import check_retrieve_status
+
+# Poll schedule: start fast, back off exponentially to a cap, with jitter so retrieves started
+# together do not check in lockstep
+POLL_CONFIG = {
+    'initial_interval': 2,        # Seconds before the first status check
+    'backoff_factor': 1.5,
+    'max_interval': 60,           # Never wait longer than this between checks
+    'jitter': 0.2,                # +/- fraction applied to every interval
+    'timeout': 3600,              # Give up on a retrieve after this many seconds
+    'max_consecutive_errors': 5,  # Failed status checks in a row before the retrieve is failed
+    'check_workers': 4,           # Status checks that may be in flight at once
+    'download_timeout': 600       # Read timeout for the final zip download (seconds)
+}
+
+class RetrievePoller:
+    """Schedules checkRetrieveStatus calls for many retrieves from a single thread
+
+    Each retrieve is submitted with callbacks:
+      on_complete(retrieve_response) - called on a dedicated thread once the zip has been fetched
+      on_error(message)              - called when the retrieve fails or times out
+      on_progress(message)           - optional, called with status updates
+    Status checks ask for includeZip=false so polling stays cheap; the zip is fetched once, when done.
+    """
+
+    def __init__(self, config=None, check_status=check_retrieve_status):
+        self.config = dict(POLL_CONFIG, **(config or {}))
+        self._check_status = check_status
+        self._heap = []
+        self._sequence = itertools.count()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._executor = None
+        self._stopping = False
+        self._stats = {
+            'submitted': 0,
+            'in_flight': 0,
+            'checks': 0,
+            'check_errors': 0,
+            'completed': 0,
+            'failed': 0,
+            'timed_out': 0
+        }
+
+    def submit(self, metadata_url, session_id, async_id, on_complete, on_error, on_progress=None):
+        """Start polling a retrieve; returns immediately"""
+        now = time.monotonic()
+        entry = {
+            'metadata_url': metadata_url,
+            'session_id': session_id,
+            'async_id': async_id,
+            'on_complete': on_complete,
+            'on_error': on_error,
+            'on_progress': on_progress,
+            'started': now,
+            'interval': self.config['initial_interval'],
+            'attempts': 0,
+            'consecutive_errors': 0
+        }
+        with self._cond:
+            self._ensure_started()
+            self._stats['submitted'] += 1
+            self._stats['in_flight'] += 1
+            self._schedule(entry, now + self._jittered(entry['interval']))
+        return async_id
+
+    def get_stats(self):
+        """Return a snapshot of poller counters"""
+        with self._cond:
+            stats = dict(self._stats)
+            stats['scheduled'] = len(self._heap)
+        return stats
+
+    def shutdown(self):
+        """Stop the scheduler thread; retrieves still in flight are abandoned"""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join(timeout=5)
+        if self._executor:
+            self._executor.shutdown(wait=False)
+
+    def _ensure_started(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stopping = False
+            self._executor = ThreadPoolExecutor(max_workers=self.config['check_workers'],
+                                                thread_name_prefix='retrieve-check')
+            self._thread = threading.Thread(target=self._run, name='retrieve-poller', daemon=True)
+            self._thread.start()
+
+    def _jittered(self, interval):
+        jitter = self.config['jitter']
+        return interval * random.uniform(1 - jitter, 1 + jitter)
+
+    def _schedule(self, entry, due):
+        heapq.heappush(self._heap, (due, next(self._sequence), entry))
+        self._cond.notify()
+
+    def _run(self):
+        """Scheduler loop - sleep until the earliest check is due, then dispatch every due check"""
+        while True:
+            with self._cond:
+                while not self._stopping and (not self._heap or self._heap[0][0] > time.monotonic()):
+                    timeout = self._heap[0][0] - time.monotonic() if self._heap else None
+                    self._cond.wait(timeout)
+                if self._stopping:
+                    return
+                due = []
+                now = time.monotonic()
+                while self._heap and self._heap[0][0] <= now:
+                    due.append(heapq.heappop(self._heap)[2])
+            for entry in due:
+                self._executor.submit(self._check, entry)
+
+    def _check(self, entry):
+        """Run one status check and reschedule, complete or fail the retrieve"""
+        entry['attempts'] += 1
+        with self._cond:
+            self._stats['checks'] += 1
+
+        elapsed = time.monotonic() - entry['started']
+        if elapsed > self.config['timeout']:
+            with self._cond:
+                self._stats['timed_out'] += 1
+            self._finish_with_error(
+                entry, f"Timed out waiting for completion ({self.config['timeout'] // 60} minutes)"
+            )
+            return
+
+        try:
+            status_code, response = self._check_status(
+                entry['metadata_url'], entry['session_id'], entry['async_id'], include_zip=False
+            )
+        except Exception as e:
+            status_code, response = None, None
+            error = str(e)
+        else:
+            error = f'Status check failed: {status_code}' if response is None else None
+
+        if response is None:
+            entry['consecutive_errors'] += 1
+            with self._cond:
+                self._stats['check_errors'] += 1
+            if entry['consecutive_errors'] >= self.config['max_consecutive_errors']:
+                self._finish_with_error(entry, error)
+                return
+            self._progress(entry, f'{error}, retrying...')
+            self._reschedule(entry)
+            return
+
+        entry['consecutive_errors'] = 0
+        text = response.text
+        response.close()
+
+        if 'INVALID_LOCATOR' in text:
+            self._finish_with_error(entry, 'Result expired! The retrieve result was deleted by Salesforce.')
+            return
+        if '<soapenv:Fault>' in text:
+            fault = re.search(r'<faultstring>(.*?)</faultstring>', text)
+            self._finish_with_error(entry, fault.group(1) if fault else 'Unknown SOAP fault')
+            return
+
+        done = re.search(r'<done>(.*?)</done>', text)
+        if done and done.group(1).lower() == 'true':
+            # Downloading and processing the zip can take minutes - keep it off the check workers
+            threading.Thread(target=self._complete, args=(entry,), daemon=True).start()
+            return
+
+        state = re.search(r'<state>(.*?)</state>', text)
+        next_interval = self._next_interval(entry)
+        self._progress(
+            entry,
+            f"Checking status... (check {entry['attempts']}, {elapsed:.0f}s elapsed) - "
+            f"Current state: {state.group(1) if state else 'InProgress'}, next check in {next_interval:.0f}s"
+        )
+        self._reschedule(entry, next_interval)
+
+    def _next_interval(self, entry):
+        return min(entry['interval'] * self.config['backoff_factor'], self.config['max_interval'])
+
+    def _reschedule(self, entry, interval=None):
+        entry['interval'] = interval if interval is not None else self._next_interval(entry)
+        with self._cond:
+            self._schedule(entry, time.monotonic() + self._jittered(entry['interval']))
+
+    def _complete(self, entry):
+        """Fetch the finished zip and hand it to the retrieve's completion callback"""
+        try:
+            status_code, response = self._check_status(
+                entry['metadata_url'], entry['session_id'], entry['async_id'],
+                include_zip=True, timeout=self.config['download_timeout']
+            )
+        except Exception as e:
+            self._finish_with_error(entry, f'Error downloading retrieve result: {str(e)}')
+            return
+        if response is None:
+            self._finish_with_error(entry, f'Status check failed: {status_code}')
+            return
+
+        with self._cond:
+            self._stats['in_flight'] -= 1
+            self._stats['completed'] += 1
+        try:
+            entry['on_complete'](response)
+        except Exception as e:
+            print(f"Error in retrieve completion callback for {entry['async_id']}: {str(e)}")
+
+    def _finish_with_error(self, entry, message):
+        with self._cond:
+            self._stats['in_flight'] -= 1
+            self._stats['failed'] += 1
+        try:
+            entry['on_error'](message)
+        except Exception as e:
+            print(f"Error in retrieve error callback for {entry['async_id']}: {str(e)}")
+
+    def _progress(self, entry, message):
+        if entry['on_progress']:
+            try:
+                entry['on_progress'](message)
+            except Exception as e:
+                print(f"Error in retrieve progress callback for {entry['async_id']}: {str(e)}")
+
+# Shared poller instance
+retrieve_poller = RetrievePoller()
+
+def get_retrieve_poller() -> RetrievePoller:
+    """Get the shared retrieve poller instance"""
+    return retrieve_poller
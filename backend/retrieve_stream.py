@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Streaming parser for Salesforce Metadata API checkRetrieveStatus responses
+The base64 <zipFile> payload is decoded chunk by chunk into a spooled temporary file,
+so a retrieve of any size never has to be held in memory as text
+"""
+
+import base64
+import binascii
+import re
+import tempfile
+import requests
+
+# Zip payloads up to this size stay in memory; larger ones roll over to a temporary file on disk
+ZIP_SPOOL_MAX_SIZE = 32 * 1024 * 1024
+
+# Size of each chunk read from the HTTP response
+RESPONSE_CHUNK_SIZE = 256 * 1024
+
+ZIP_OPEN_TAG = b'<zipFile>'
+ZIP_CLOSE_TAG = b'</zipFile>'
+
+# base64 decodes in groups of 4 characters
+_B64_GROUP = 4
+_WHITESPACE = re.compile(rb'\s+')
+
+class RetrieveResponse:
+    """A parsed checkRetrieveStatus reply
+
+    text is the SOAP envelope with the zip payload cut out, small enough for the usual regex checks
+    (<done>, <success>, <state>, <message>, faults). zip_file is a seekable file positioned at the
+    start of the decoded zip, or None when the reply carried no <zipFile>.
+    """
+
+    def __init__(self, text, zip_file=None, zip_size=0):
+        self.text = text
+        self.zip_file = zip_file
+        self.zip_size = zip_size
+
+    def search(self, pattern, flags=0):
+        """Search the envelope text, returning the first group or None"""
+        match = re.search(pattern, self.text, flags)
+        return match.group(1) if match else None
+
+    def close(self):
+        """Release the spooled zip file"""
+        if self.zip_file is not None:
+            self.zip_file.close()
+            self.zip_file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+def parse_retrieve_stream(chunks, spool_max_size=ZIP_SPOOL_MAX_SIZE):
+    """Parse an iterable of response byte chunks into a RetrieveResponse
+
+    Everything outside <zipFile> is kept as envelope text. The payload between the tags is stripped of
+    whitespace and base64-decoded incrementally, carrying any partial 4-character group and any
+    partially received closing tag over to the next chunk.
+    """
+    envelope = bytearray()
+    zip_file = None
+    zip_size = 0
+    pending = b''     # Bytes not yet classified - may hold part of a tag split across chunks
+    b64_carry = b''   # base64 characters left over from the last incomplete 4-character group
+    in_zip = False
+
+    def decode(data, final=False):
+        nonlocal b64_carry, zip_size
+        data = b64_carry + _WHITESPACE.sub(b'', data)
+        usable = len(data) if final else len(data) - len(data) % _B64_GROUP
+        b64_carry = data[usable:]
+        if usable:
+            decoded = base64.b64decode(data[:usable], validate=True)
+            zip_file.write(decoded)
+            zip_size += len(decoded)
+
+    try:
+        for chunk in chunks:
+            if not chunk:
+                continue
+            pending += chunk
+
+            while pending:
+                if not in_zip:
+                    index = pending.find(ZIP_OPEN_TAG)
+                    if index == -1:
+                        # Keep a possible partial opening tag for the next chunk
+                        keep = len(ZIP_OPEN_TAG) - 1
+                        envelope += pending[:-keep] if len(pending) > keep else b''
+                        pending = pending[-keep:] if len(pending) > keep else pending
+                        break
+                    envelope += pending[:index + len(ZIP_OPEN_TAG)]
+                    pending = pending[index + len(ZIP_OPEN_TAG):]
+                    zip_file = tempfile.SpooledTemporaryFile(max_size=spool_max_size)
+                    in_zip = True
+                else:
+                    index = pending.find(ZIP_CLOSE_TAG)
+                    if index == -1:
+                        keep = len(ZIP_CLOSE_TAG) - 1
+                        if len(pending) > keep:
+                            decode(pending[:-keep])
+                            pending = pending[-keep:]
+                        break
+                    decode(pending[:index], final=True)
+                    envelope += pending[index:index + len(ZIP_CLOSE_TAG)]
+                    pending = pending[index + len(ZIP_CLOSE_TAG):]
+                    in_zip = False
+
+        if in_zip:
+            raise ValueError('Response ended inside <zipFile>')
+        envelope += pending
+    except (binascii.Error, ValueError):
+        if zip_file is not None:
+            zip_file.close()
+        raise
+
+    if zip_file is not None:
+        zip_file.seek(0)
+    return RetrieveResponse(envelope.decode('utf-8', errors='replace'), zip_file, zip_size)
+
+def parse_retrieve_text(response_text):
+    """Parse a reply that is already held as text (e.g. a retrieve() response)"""
+    return parse_retrieve_stream([response_text.encode('utf-8')])
+
+def check_retrieve_status(metadata_url, session_id, async_id, include_zip=True, timeout=180):
+    """Call checkRetrieveStatus and stream the reply through parse_retrieve_stream
+
+    Returns (status_code, RetrieveResponse). The response is None when the HTTP status is not 200.
+    """
+    check_body = f'''<?xml version="1.0" encoding="UTF-8"?>
+<soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/" xmlns:met="http://soap.sforce.com/2006/04/metadata">
+   <soapenv:Header>
+      <met:SessionHeader>
+         <met:sessionId>{session_id}</met:sessionId>
+      </met:SessionHeader>
+   </soapenv:Header>
+   <soapenv:Body>
+      <met:checkRetrieveStatus>
+         <met:asyncProcessId>{async_id}</met:asyncProcessId>
+         <met:includeZip>{'true' if include_zip else 'false'}</met:includeZip>
+      </met:checkRetrieveStatus>
+   </soapenv:Body>
+</soapenv:Envelope>'''
+
+    headers = {
+        'Content-Type': 'text/xml; charset=UTF-8',
+        'SOAPAction': 'checkRetrieveStatus'
+    }
+
+    with requests.post(metadata_url, data=check_body, headers=headers, timeout=timeout, stream=True) as response:
+        if response.status_code != 200:
+            return response.status_code, None
+        return response.status_code, parse_retrieve_stream(response.iter_content(chunk_size=RESPONSE_CHUNK_SIZE))
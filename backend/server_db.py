@@ -4,11 +4,10 @@ Flask Backend for Salesforce Metadata Extractor with Database Integration
 Starting with Integration table functionality
 """
 
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, request, jsonify, send_from_directory, Response, stream_with_context
 from flask_cors import CORS
 import os
 import requests
-import base64
 import zipfile
 import time
 import re
@@ -17,10 +16,57 @@ import uuid
 from datetime import datetime, date
 import xml.etree.ElementTree as ET
 import json
+import base64
 from collections import defaultdict
-from database import get_db_manager
-import io
-from comprehensive_metadata_extraction import get_comprehensive_metadata_retrieve_body
+from database import get_db_manager, COMPONENT_OPTIONAL_COLUMNS, DEPENDENCY_NETWORK_CONFIG
+import shutil
+from contextlib import nullcontext
+from comprehensive_metadata_extraction import (
+    get_comprehensive_metadata_retrieve_body,
+    get_metadata_retrieve_body,
+    plan_retrieve_chunks,
+    RETRIEVE_CHUNK_CONFIG,
+    COMPREHENSIVE_RETRIEVE_TYPES,
+    PERMISSION_TYPES,
+    PERMISSION_SCOPE_TYPES
+)
+from incremental_extraction import (
+    list_metadata,
+    parse_file_properties,
+    plan_incremental_extraction,
+    FOLDER_METADATA_TYPES
+)
+from dependency_analysis import (
+    analyze_components,
+    dedupe_dependencies,
+    ComponentNameIndex,
+    OBJECT_TYPES
+)
+# The analyzers moved to dependency_analysis; debug and test scripts still call them through server_db
+from dependency_analysis import (  # noqa: F401
+    analyze_apex_class_dependencies_in_memory,
+    analyze_apex_trigger_dependencies_in_memory,
+    analyze_custom_object_dependencies_in_memory,
+    analyze_flow_dependencies_in_memory,
+    analyze_layout_dependencies_in_memory,
+    IN_MEMORY_DEPENDENCY_ANALYZERS
+)
+from retrieve_stream import check_retrieve_status, parse_retrieve_text
+from retrieve_poller import get_retrieve_poller
+from metadata_registry import MetadataTypeRegistry
+from job_store import JobStore, DatabaseJobBackend, JOB_STORE_CONFIG, TERMINAL_STATUSES
+from extraction_scheduler import ExtractionScheduler, DatabaseQueueBackend, QueueFullError, EXTRACTION_SCHEDULER_CONFIG
+from extraction_checkpoint import (
+    ExtractionCheckpoint,
+    save_retrieve_zip,
+    open_saved_retrieve,
+    remove_saved_zips,
+    EXTRACTION_CHECKPOINT_CONFIG
+)
+from metadata_files import get_file_type_from_path, get_dev_name
+from dependency_graph import (
+    DependencyGraph, DependencyGraphCache, DIRECTIONS, find_dependency_cycles, strongly_connected_components
+)
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for React frontend
@@ -28,8 +74,97 @@ CORS(app)  # Enable CORS for React frontend
 # Get database manager
 db = get_db_manager()
 
-# Store active extraction jobs (temporary until we fully migrate to database)
-extraction_jobs = {}
+# Shared checkRetrieveStatus poller - one scheduler thread for every in-flight retrieve
+retrieve_poller = get_retrieve_poller()
+
+def dependency_graph_version(db_job_id):
+    """Version of a job's dependencies for the graph cache - None until the job has finished writing them"""
+    db_job = db.get_extraction_job_version(db_job_id)
+    if not db_job or db_job['aej_job_status'] not in ('completed', 'error'):
+        return None
+    return db_job['aej_job_status'], db_job['aej_completed_at'], db_job['aej_last_updated_timestamp']
+
+# In-memory dependency graphs of finished extraction jobs, loaded once per job version and evicted
+# least recently used first
+dependency_graph_cache = DependencyGraphCache(db.get_dependency_edges_by_job, version=dependency_graph_version)
+
+# Metadata types per organisation, loaded once and invalidated when a type is created
+metadata_type_registry = MetadataTypeRegistry(db.get_metadata_types)
+
+# Extraction job state - bounded progress logs, written to ids_audit_job_state so any worker can report it
+extraction_jobs = JobStore(DatabaseJobBackend(db) if JOB_STORE_CONFIG['backend'] == 'database' else None)
+
+def on_extraction_start(entry):
+    """Mark a queued extraction job as started once the scheduler gives it a worker"""
+    job = extraction_jobs.get(entry['job_id'])
+    if job is None:
+        return
+    job.update(status='starting', queue_wait_seconds=round(entry['wait_seconds'], 1))
+    if entry['wait_seconds'] >= 1:
+        job['progress'].append(f"Started after waiting {entry['wait_seconds']:.0f}s in the extraction queue")
+
+def extraction_job_progress(job_id):
+    """Latest progress line of a job running in this process, sent with queue heartbeats"""
+    job = extraction_jobs.get(job_id)
+    return job['progress'][-1] if job is not None and job['progress'] else None
+
+def on_extraction_expired(job_id):
+    """Fail a job whose extraction workers kept dying before it could finish"""
+    job = extraction_jobs.get(job_id) or {}
+    extraction_jobs.create(job_id, {
+        'id': job_id,
+        'integration_id': job.get('integration_id'),
+        'mode': job.get('mode'),
+        'start_time': job.get('start_time'),
+        'status': 'error',
+        'progress': ['Extraction abandoned: the workers running it stopped responding'],
+        'error': f"Extraction stopped responding {EXTRACTION_SCHEDULER_CONFIG['max_attempts']} times",
+        'data': None,
+        'end_time': datetime.now()
+    })
+    fail_extraction_job_record(job_id, 'Abandoned after its extraction workers stopped responding')
+
+def on_extraction_lost(job_id):
+    """Stop an extraction running here once another worker has taken it over after missed heartbeats
+
+    Its job state is no longer written, late chunk callbacks find no run, and wait_for_extraction
+    returns, freeing the worker slot. The new worker continues from the extraction's checkpoint.
+    """
+    active_extraction_runs.pop(job_id, None)
+    job = extraction_jobs.detach(job_id)
+    if job is not None:
+        job['progress'].append('Extraction taken over by another worker after missed heartbeats')
+
+def fail_extraction_job_record(job_id, error):
+    """Mark the running extraction job row of a failed job as failed, so it is not resumed"""
+    db_job = db.get_extraction_job_by_key(job_id)
+    if db_job and db_job['aej_job_status'] == 'running':
+        db.update_extraction_job(
+            job_id=db_job['aej_id'],
+            job_status="error",
+            completed_at=datetime.now(),
+            log=error
+        )
+    remove_saved_zips(job_id)
+
+# Extractions run on a fixed number of worker threads; the rest wait in a priority queue
+# shared with any extraction_worker.py processes
+extraction_scheduler = ExtractionScheduler(
+    DatabaseQueueBackend(db) if EXTRACTION_SCHEDULER_CONFIG['backend'] == 'database' else None,
+    on_start=on_extraction_start,
+    progress=extraction_job_progress,
+    on_expired=on_extraction_expired,
+    on_lost=on_extraction_lost
+)
+
+# Chunked extractions in progress (see extract_metadata_chunked_to_database), keyed by extraction job id
+active_extraction_runs = {}
+
+# Number of component rows sent per multi-row INSERT while ingesting a retrieved zip
+INGEST_BATCH_SIZE = 500
+
+# Number of dependency edges sent per multi-row INSERT
+DEPENDENCY_BATCH_SIZE = 1000
 
 def login_to_salesforce(username, password, security_token, is_sandbox):
     """Login and return session details"""
@@ -279,6 +414,7 @@ def create_metadata_type():
         )
         
         if type_id:
+            metadata_type_registry.invalidate(data['org_id'])
             return jsonify({
                 'success': True,
                 'type_id': type_id,
@@ -294,7 +430,7 @@ def create_metadata_type():
 def get_metadata_types(org_id):
     """Get all metadata types for an organization"""
     try:
-        metadata_types = db.get_metadata_types(org_id)
+        metadata_types = metadata_type_registry.get(org_id).rows
         
         return jsonify({
             'success': True,
@@ -374,6 +510,89 @@ def get_extraction_jobs_by_integration(integration_id):
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/extraction-jobs/<int:job_id>/cycles', methods=['GET'])
+def get_extraction_job_cycles(job_id):
+    """Get the circular dependency groups stored for an extraction job, largest first
+
+    Query args: min_size (smallest cycle to return, default 2) and limit (cycles returned).
+    """
+    min_size = max(2, request.args.get('min_size', 2, type=int))
+    limit = request.args.get('limit', type=int)
+    
+    try:
+        if not db.get_extraction_job(job_id):
+            return jsonify({'success': False, 'error': 'Extraction job not found'}), 404
+        
+        stored = db.get_dependency_cycles(job_id, min_size=min_size)
+        total = len(stored)
+        components_in_cycles = sum(cycle['adc_component_count'] for cycle in stored)
+        if limit is not None:
+            stored = stored[:max(0, limit)]
+        
+        components_data = db.get_diagram_components(
+            {comp_id for cycle in stored for comp_id in cycle['adc_component_ids']}
+        )
+        cycles = []
+        for cycle in stored:
+            cycles.append({
+                'id': cycle['adc_id'],
+                'index': cycle['adc_cycle_index'],
+                'size': cycle['adc_component_count'],
+                'edge_count': cycle['adc_edge_count'],
+                'dependency_types': cycle['adc_dependency_types'] or [],
+                'components': [
+                    components_data.get(comp_id, {'amc_id': comp_id})
+                    for comp_id in cycle['adc_component_ids']
+                ]
+            })
+        
+        return jsonify({
+            'success': True,
+            'job_id': job_id,
+            'cycles': cycles,
+            'count': len(cycles),
+            'total': total,
+            'components_in_cycles': components_in_cycles
+        })
+        
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/extraction-jobs/<int:job_id>/resume', methods=['POST'])
+def resume_extraction_job(job_id):
+    """Continue an interrupted extraction job from its last checkpoint instead of starting over"""
+    try:
+        db_job = db.get_extraction_job(job_id, include_checkpoint=True)
+        if not db_job:
+            return jsonify({'success': False, 'error': 'Extraction job not found'}), 404
+        
+        if db_job['aej_job_status'] != 'running' or not db_job['aej_checkpoint'] or not db_job['aej_job_key']:
+            return jsonify({'success': False, 'error': 'Extraction job has no checkpoint to resume from'}), 400
+        
+        job_key, coalesced = queue_extraction_resume(db_job, f'Resuming extraction job {job_id} from its checkpoint...')
+        if job_key is None:
+            return jsonify({'success': False, 'error': 'Invalid stored credentials format'}), 400
+        
+        if job_key != db_job['aej_job_key']:
+            message = 'Another extraction of this integration is already in progress'
+        elif coalesced:
+            message = 'Extraction is already running'
+        else:
+            message = 'Extraction queued to resume from its checkpoint'
+        
+        return jsonify({
+            'success': True,
+            'job_id': job_key,
+            'extraction_job_id': job_id,
+            'coalesced': coalesced,
+            'message': message
+        })
+        
+    except QueueFullError as e:
+        return jsonify({'success': False, 'error': f'Extraction queue is full: {str(e)}'}), 503
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @app.route('/api/extraction-jobs/<int:job_id>', methods=['PUT'])
 def update_extraction_job(job_id):
     """Update extraction job status and data"""
@@ -617,6 +836,104 @@ def get_integration_dashboard(integration_id):
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+def create_dashboard_extraction_job(job_id, integration_id, mode, message='Starting metadata extraction for dashboard...'):
+    """Initialize the state of a queued dashboard extraction job"""
+    extraction_jobs[job_id] = {
+        'id': job_id,
+        'status': 'queued',
+        'progress': [message],
+        'start_time': datetime.now(),
+        'data': None,
+        'error': None,
+        'integration_id': integration_id,  # Store integration ID for database storage
+        'mode': mode
+    }
+
+def build_queued_extraction(entry, message):
+    """Rebuild a persisted queue entry into (target, args), creating its job state; None to drop it"""
+    if entry['request'].get('kind') != 'dashboard':
+        return None
+    job = extraction_jobs.get(entry['job_id'])
+    if job is not None and job['status'] in TERMINAL_STATUSES:
+        return None
+    integration = db.get_integration(entry['integration_id'])
+    credentials = integration and parse_stored_credentials(integration['i_token'], integration['i_org_type'])
+    if not credentials:
+        return None
+    
+    mode = entry['request'].get('mode', 'full')
+    create_dashboard_extraction_job(entry['job_id'], entry['integration_id'], mode, message)
+    return extract_metadata_async_for_dashboard, (entry['job_id'], credentials, entry['integration_id'], mode)
+
+def claim_queued_extraction(entry):
+    """Rebuild a dashboard extraction claimed from the queue (see ExtractionScheduler.claim_persisted)"""
+    return build_queued_extraction(
+        entry,
+        'Resuming metadata extraction after its worker stopped...' if entry['interrupted'] else
+        'Starting metadata extraction for dashboard...'
+    )
+
+def queue_extraction_resume(db_job, message):
+    """Queue an interrupted extraction job to continue from its checkpoint
+
+    It runs under its original job id, so clients following that job keep receiving its progress.
+    Returns (job_id, coalesced) like ExtractionScheduler.submit, or (None, False) when the
+    integration's credentials are gone. When another extraction of the integration is already
+    queued or running, that one is returned and this job is marked as superseded.
+    """
+    integration_id = db_job['aej_integration_id']
+    integration = db.get_integration(integration_id)
+    credentials = integration and parse_stored_credentials(integration['i_token'], integration['i_org_type'])
+    if not credentials:
+        return None, False
+    
+    job_key = db_job['aej_job_key']
+    mode = 'incremental' if db_job['aej_checkpoint'].get('previous_job_id') else 'full'
+    job_id, coalesced = extraction_scheduler.submit(
+        job_key,
+        extract_metadata_async_for_dashboard,
+        args=(job_key, credentials, integration_id, mode),
+        org_id=integration['i_org_id'],
+        integration_id=integration_id,
+        priority=extraction_scheduler.priority_for(mode),
+        dedup_key=f'integration:{integration_id}',
+        request={'kind': 'dashboard', 'mode': mode},
+        prepare=lambda job_id: create_dashboard_extraction_job(job_id, integration_id, mode, message)
+    )
+    
+    if job_id != job_key:
+        db.update_extraction_job(
+            job_id=db_job['aej_id'],
+            job_status="error",
+            completed_at=datetime.now(),
+            log=f'Superseded by extraction {job_id} of the same integration'
+        )
+        remove_saved_zips(job_key)
+    return job_id, coalesced
+
+def resume_interrupted_extractions():
+    """Queue every extraction job left running with a checkpoint, returning how many were queued
+
+    Jobs whose extraction is still queued or running (here or on an extraction worker) are joined
+    rather than started twice.
+    """
+    resumed = 0
+    for db_job in db.get_resumable_extraction_jobs():
+        if not db_job['aej_job_key']:
+            continue
+        try:
+            job_id, coalesced = queue_extraction_resume(
+                db_job, f"Resuming extraction job {db_job['aej_id']} after a server restart..."
+            )
+        except QueueFullError:
+            break
+        except Exception as e:
+            print(f"Failed to resume extraction job {db_job['aej_id']}: {e}")
+            continue
+        if job_id == db_job['aej_job_key'] and not coalesced:
+            resumed += 1
+    return resumed
+
 @app.route('/api/dashboard/extract/<int:integration_id>', methods=['POST'])
 def extract_metadata_for_dashboard(integration_id):
     """Extract metadata for dashboard - triggers extraction and returns dashboard data"""
@@ -632,45 +949,127 @@ def extract_metadata_for_dashboard(integration_id):
         if not credentials:
             return jsonify({'success': False, 'error': 'Invalid stored credentials format'}), 400
         
+        # 'incremental' only retrieves components changed since the last completed extraction
+        request_data = request.get_json(silent=True) or {}
+        mode = request_data.get('mode') or request.args.get('mode', 'full')
+        if mode not in ('full', 'incremental'):
+            return jsonify({'success': False, 'error': f'Invalid extraction mode: {mode}'}), 400
+        
+        # Lower runs first; incremental extractions default ahead of full ones
+        priority = request_data.get('priority', extraction_scheduler.priority_for(mode))
+        if not isinstance(priority, int) or isinstance(priority, bool):
+            return jsonify({'success': False, 'error': 'priority must be an integer'}), 400
+        
         # Create job ID for this extraction
         job_id = str(uuid.uuid4())
         
-        # Initialize job
-        extraction_jobs[job_id] = {
-            'id': job_id,
-            'status': 'starting',
-            'progress': ['Starting metadata extraction for dashboard...'],
-            'start_time': datetime.now(),
-            'data': None,
-            'error': None,
-            'integration_id': integration_id  # Store integration ID for database storage
-        }
-        
-        # Start extraction in background thread
-        thread = threading.Thread(
-            target=extract_metadata_async_for_dashboard,
-            args=(job_id, credentials, integration_id)
+        # Queue the extraction; a second extract of the same integration joins the one already queued or running
+        job_id, coalesced = extraction_scheduler.submit(
+            job_id,
+            extract_metadata_async_for_dashboard,
+            args=(job_id, credentials, integration_id, mode),
+            org_id=integration['i_org_id'],
+            integration_id=integration_id,
+            priority=priority,
+            dedup_key=f'integration:{integration_id}',
+            request={'kind': 'dashboard', 'mode': mode},
+            prepare=lambda job_id: create_dashboard_extraction_job(job_id, integration_id, mode)
         )
-        thread.daemon = True
-        thread.start()
+        
+        if coalesced:
+            mode = (extraction_jobs.get(job_id) or {}).get('mode', mode)
         
         return jsonify({
             'success': True, 
             'job_id': job_id,
-            'message': 'Metadata extraction started for dashboard'
+            'mode': mode,
+            'coalesced': coalesced,
+            'message': 'An extraction of this integration is already in progress' if coalesced else
+                       'Metadata extraction queued for dashboard'
         })
         
+    except QueueFullError as e:
+        return jsonify({'success': False, 'error': f'Extraction queue is full: {str(e)}'}), 503
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+def sse_event(event, payload, event_id=None):
+    """Format one server-sent event"""
+    lines = [f'id: {event_id}'] if event_id is not None else []
+    lines.append(f'event: {event}')
+    lines.append(f'data: {json.dumps(payload, default=str)}')
+    return '\n'.join(lines) + '\n\n'
+
+def job_status_stream(job_id, include_dashboard=False):
+    """Server-sent events for a job: new progress lines, status changes and one final result
+
+    Events (each id is the number of progress lines sent so far, so EventSource reconnects with
+    Last-Event-ID resume where they stopped):
+      progress - {'lines': [...]} with only the lines the client has not seen
+      status   - {'status', 'data', 'error'} whenever the status or partial results change
+      complete - {'status', 'data', 'error', 'duration'} plus dashboard_data on success, then the stream ends
+      missing  - the job does not exist
+    """
+    try:
+        seen = int(request.headers.get('Last-Event-ID') or request.args.get('since', 0))
+    except ValueError:
+        seen = 0
+    
+    def generate():
+        last_status = None
+        for change in extraction_jobs.follow(job_id, seen):
+            if change is None:
+                yield ': keepalive\n\n'
+                continue
+            if change['status'] is None:
+                yield sse_event('missing', {'error': 'Job not found'})
+                return
+            
+            event_id = change['progress_total']
+            if change['lines']:
+                yield sse_event('progress', {'lines': change['lines']}, event_id)
+            
+            status = {key: change[key] for key in ('status', 'data', 'error')}
+            if change['status'] not in ('success', 'error'):
+                if status != last_status:
+                    last_status = status
+                    yield sse_event('status', status, event_id)
+                continue
+            
+            if change['end_time'] and change['start_time']:
+                status['duration'] = str(change['end_time'] - change['start_time']).split('.')[0]
+            # The dashboard payload is read once per stream, not on every poll
+            if include_dashboard and change['status'] == 'success':
+                job = extraction_jobs.get(job_id)
+                if job and job.get('integration_id'):
+                    try:
+                        status['dashboard_data'] = db.get_dashboard_data(job['integration_id'])
+                    except Exception as e:
+                        status['dashboard_error'] = str(e)
+            yield sse_event('complete', status, event_id)
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'  # Stop reverse proxies buffering the stream
+    })
+
+@app.route('/api/dashboard/job-status/<job_id>/stream', methods=['GET'])
+def stream_dashboard_job_status(job_id):
+    """Stream a dashboard extraction job's progress as server-sent events (see job_status_stream)"""
+    return job_status_stream(job_id, include_dashboard=True)
+
+@app.route('/api/job-status/<job_id>/stream', methods=['GET'])
+def stream_job_status(job_id):
+    """Stream an extraction job's progress as server-sent events (see job_status_stream)"""
+    return job_status_stream(job_id)
+
 @app.route('/api/dashboard/job-status/<job_id>', methods=['GET'])
 def get_dashboard_job_status(job_id):
     """Get the status of a dashboard extraction job"""
-    if job_id not in extraction_jobs:
+    job = extraction_jobs.get(job_id)
+    if job is None:
         return jsonify({'success': False, 'error': 'Job not found'}), 404
     
-    job = extraction_jobs[job_id]
-    
     response_data = {
         'success': True,
         'status': job['status'],
@@ -679,16 +1078,20 @@ def get_dashboard_job_status(job_id):
         'error': job.get('error')
     }
     
-    # If job is complete, get dashboard data
-    if job['status'] == 'success' and 'integration_id' in job:
+    # If job is complete get dashboard data; while a chunked extraction runs, only the per-type
+    # counts of the chunks stored so far (the full payload loads every component's content)
+    partial_results = job['status'] not in TERMINAL_STATUSES and (job.get('data') or {}).get('chunks_completed')
+    if (job['status'] == 'success' or partial_results) and job.get('integration_id'):
         try:
-            dashboard_data = db.get_dashboard_data(job['integration_id'])
-            response_data['dashboard_data'] = dashboard_data
+            if job['status'] == 'success':
+                response_data['dashboard_data'] = db.get_dashboard_data(job['integration_id'])
+            else:
+                response_data['dashboard_data'] = db.get_integration_with_latest_job(job['integration_id'])
         except Exception as e:
             response_data['dashboard_error'] = str(e)
     
     # Calculate duration if job is complete
-    if job['status'] in ['success', 'error'] and 'end_time' in job:
+    if job['status'] in ['success', 'error'] and job.get('end_time'):
         duration = job['end_time'] - job['start_time']
         response_data['duration'] = str(duration).split('.')[0]  # Remove microseconds
     
@@ -728,70 +1131,118 @@ def get_metadata_from_integration(integration_id):
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+def encode_page_cursor(after):
+    """Encode the (dev_name, amc_id) keyset of the last listed row as an opaque cursor"""
+    if after is None:
+        return None
+    return base64.urlsafe_b64encode(json.dumps(list(after)).encode('utf-8')).decode('ascii')
+
+def get_component_page_args():
+    """Read fields, cursor and page_size query args for a component listing
+
+    Raises ValueError with a message suitable for a 400 response.
+    """
+    fields = [f.strip() for f in request.args.get('fields', '').split(',') if f.strip()]
+    unknown = [f for f in fields if f not in COMPONENT_OPTIONAL_COLUMNS]
+    if unknown:
+        raise ValueError(
+            f"Unknown fields: {', '.join(unknown)} (available: {', '.join(COMPONENT_OPTIONAL_COLUMNS)})"
+        )
+    
+    after = None
+    cursor = request.args.get('cursor')
+    if cursor:
+        try:
+            dev_name, component_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+            after = (str(dev_name), int(component_id))
+        except (ValueError, TypeError):
+            raise ValueError('Invalid cursor')
+    
+    page_size = request.args.get('page_size', type=int)
+    if page_size is not None and page_size < 1:
+        raise ValueError('page_size must be positive')
+    
+    return fields, after, page_size
+
+def component_page_response(components, next_after, **extra):
+    """Build the JSON body shared by the component listing endpoints"""
+    return jsonify({
+        'success': True,
+        'components': components,
+        'count': len(components),
+        'next_cursor': encode_page_cursor(next_after),
+        'has_more': next_after is not None,
+        **extra
+    })
+
 @app.route('/api/metadata-components/<int:job_id>', methods=['GET'])
 def get_metadata_components(job_id):
-    """Get all metadata components for a specific extraction job"""
+    """Get a page of metadata components for a specific extraction job
+
+    Query args: fields (comma separated extra columns, e.g. content,ai_summary), cursor (next_cursor of
+    the previous page) and page_size (capped at COMPONENT_LIST_CONFIG['max_page_size']).
+    """
+    try:
+        fields, after, page_size = get_component_page_args()
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
     try:
-        components = db.get_metadata_components_by_job(job_id)
+        components, next_after = db.list_metadata_components(
+            job_id, fields=fields, after=after, page_size=page_size
+        )
         
-        return jsonify({
-            'success': True,
-            'components': components,
-            'count': len(components)
-        })
+        return component_page_response(components, next_after)
         
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/metadata-components/<int:job_id>/type/<metadata_type>', methods=['GET'])
 def get_metadata_components_by_type(job_id, metadata_type):
-    """Get metadata components for a specific job and metadata type"""
+    """Get a page of metadata components for a specific job and metadata type"""
+    try:
+        fields, after, page_size = get_component_page_args()
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
     try:
         # Get metadata type ID first
-        metadata_types = db.get_metadata_types(org_id=409)
-        type_mapping = {mt['amt_name']: mt['amt_id'] for mt in metadata_types}
-        
-        type_id = type_mapping.get(metadata_type)
+        type_id = metadata_type_registry.get(409).id_for(metadata_type)
         if not type_id:
             return jsonify({'success': False, 'error': f'Unknown metadata type: {metadata_type}'}), 400
         
         # Get components for this job and type
-        components = db.get_metadata_components_by_job_and_type(job_id, type_id)
+        components, next_after = db.list_metadata_components(
+            job_id, type_id=type_id, fields=fields, after=after, page_size=page_size
+        )
         
-        return jsonify({
-            'success': True,
-            'components': components,
-            'count': len(components),
-            'metadata_type': metadata_type
-        })
+        return component_page_response(components, next_after, metadata_type=metadata_type)
         
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/metadata-components/<int:job_id>/type/<metadata_type>/search', methods=['GET'])
 def search_metadata_components_by_type(job_id, metadata_type):
-    """Search metadata components for a specific job and metadata type"""
+    """Search metadata components for a specific job and metadata type, one page at a time"""
+    try:
+        fields, after, page_size = get_component_page_args()
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
     try:
         search_term = request.args.get('search_term', '')
         
         # Get metadata type ID first
-        metadata_types = db.get_metadata_types(org_id=409)
-        type_mapping = {mt['amt_name']: mt['amt_id'] for mt in metadata_types}
-        
-        type_id = type_mapping.get(metadata_type)
+        type_id = metadata_type_registry.get(409).id_for(metadata_type)
         if not type_id:
             return jsonify({'success': False, 'error': f'Unknown metadata type: {metadata_type}'}), 400
         
         # Search components for this job and type
-        components = db.search_metadata_components_by_job_and_type(job_id, type_id, search_term)
+        components, next_after = db.list_metadata_components(
+            job_id, type_id=type_id, search_term=search_term, fields=fields, after=after, page_size=page_size
+        )
         
-        return jsonify({
-            'success': True,
-            'components': components,
-            'count': len(components),
-            'metadata_type': metadata_type,
-            'search_term': search_term
-        })
+        return component_page_response(components, next_after, metadata_type=metadata_type, search_term=search_term)
         
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -877,55 +1328,59 @@ def get_metadata_component_content(component_id):
 
 @app.route('/api/metadata-component/<int:component_id>/dependency-network', methods=['GET'])
 def get_metadata_component_dependency_network(component_id):
-    """Get dependency network data for diagram visualization"""
+    """Get dependency network data for diagram visualization
+
+    Query args: depth (hops, default 1), direction (both, outgoing or incoming) and max_nodes.
+    The whole subgraph is fetched with one recursive query, so deeper networks cost no extra round trips.
+    """
+    depth = request.args.get('depth', DEPENDENCY_NETWORK_CONFIG['default_depth'], type=int)
+    direction = request.args.get('direction', 'both')
+    max_nodes = request.args.get('max_nodes', type=int)
+    if depth < 1 or depth > DEPENDENCY_NETWORK_CONFIG['max_depth']:
+        return jsonify({
+            'success': False, 'error': f"depth must be between 1 and {DEPENDENCY_NETWORK_CONFIG['max_depth']}"
+        }), 400
+    if direction not in ('both', 'outgoing', 'incoming'):
+        return jsonify({'success': False, 'error': f'Invalid direction: {direction}'}), 400
+    if max_nodes is not None and max_nodes < 1:
+        return jsonify({'success': False, 'error': 'max_nodes must be positive'}), 400
+    
     try:
         # Get the component
         component = db.get_metadata_component(component_id)
         if not component:
             return jsonify({'success': False, 'error': 'Component not found'}), 404
         
-        # Get dependencies for this component
-        dependencies = db.get_dependencies_for_component(component_id)
+        # Get every dependency within depth hops
+        dependencies = db.get_dependency_subgraph(component_id, depth, direction, max_nodes)
         
-        # Get all related components
-        related_component_ids = set()
+        # Hop distance of each related component
+        node_depths = {}
         for dep in dependencies:
-            related_component_ids.add(dep['amd_from_component_id'])
-            related_component_ids.add(dep['amd_to_component_id'])
+            node_depths[dep['amd_from_component_id']] = dep['from_depth']
+            node_depths[dep['amd_to_component_id']] = dep['to_depth']
         
-        # Get component details for all related components
-        components_data = {}
-        for comp_id in related_component_ids:
-            comp = db.get_metadata_component(comp_id)
-            if comp:
-                components_data[comp_id] = comp
+        # Get diagram columns for all related components in one query
+        components_data = db.get_diagram_components(node_depths)
         
         # Create network data for visualization
         nodes = []
         edges = []
         
-        # Add all components as nodes
-        for comp_id, comp_data in components_data.items():
-            # Get metadata type name
-            metadata_type_name = comp_data.get('metadata_type_name', 'Unknown')
-            if not metadata_type_name:
-                # Try to get from metadata type ID
-                type_id = comp_data.get('amc_metadata_type_id')
-                if type_id:
-                    type_query = "SELECT amt_name FROM ids_audit_metadata_type WHERE amt_id = %s"
-                    type_result = db.execute_query(type_query, (type_id,), fetch_one=True)
-                    if type_result:
-                        metadata_type_name = type_result['amt_name']
-            
+        # Add all components as nodes, nearest first
+        for comp_id in sorted(components_data, key=lambda c: (node_depths[c], c)):
+            comp_data = components_data[comp_id]
             nodes.append({
                 'id': comp_data.get('amc_dev_name', 'Unknown'),
                 'label': comp_data.get('amc_dev_name', 'Unknown'),
-                'type': metadata_type_name,
+                'type': comp_data.get('metadata_type_name') or 'Unknown',
                 'isTarget': comp_id == component_id,
-                'component_id': comp_id
+                'component_id': comp_id,
+                'depth': node_depths[comp_id]
             })
         
         # Add dependencies as edges
+        relationships = []
         for dep in dependencies:
             from_comp = components_data.get(dep['amd_from_component_id'])
             to_comp = components_data.get(dep['amd_to_component_id'])
@@ -939,11 +1394,17 @@ def get_metadata_component_dependency_network(component_id):
                     'from_component_id': dep['amd_from_component_id'],
                     'to_component_id': dep['amd_to_component_id']
                 })
+                relationships.append(dict(
+                    dep,
+                    from_label=from_comp['amc_label'], from_dev_name=from_comp['amc_dev_name'],
+                    to_label=to_comp['amc_label'], to_dev_name=to_comp['amc_dev_name']
+                ))
         
         # Calculate statistics
-        total_relationships = len(dependencies)
-        incoming = len([d for d in dependencies if d['amd_to_component_id'] == component_id])
-        outgoing = len([d for d in dependencies if d['amd_from_component_id'] == component_id])
+        total_relationships = len(relationships)
+        incoming = len([d for d in relationships if d['amd_to_component_id'] == component_id])
+        outgoing = len([d for d in relationships if d['amd_from_component_id'] == component_id])
+        reached_nodes = dependencies[0]['reached_nodes'] if dependencies else 0
         
         return jsonify({
             'success': True,
@@ -952,17 +1413,186 @@ def get_metadata_component_dependency_network(component_id):
                 'nodes': nodes,
                 'edges': edges
             },
-            'relationships': dependencies,  # Add raw relationships for the frontend
+            'relationships': relationships,  # Add raw relationships for the frontend
             'stats': {
                 'total_relationships': total_relationships,
                 'incoming': incoming,
-                'outgoing': outgoing
+                'outgoing': outgoing,
+                'depth': depth,
+                'direction': direction,
+                'total_nodes': len(nodes),
+                'truncated': reached_nodes > len(nodes)
             }
         })
         
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+def get_component_graph(component_id):
+    """Return (component, graph) for a component's extraction job, or (None, None) if it does not exist"""
+    component = db.get_diagram_components([component_id]).get(component_id)
+    if not component or not component['amc_extraction_job_id']:
+        return None, None
+    return component, dependency_graph_cache.get(component['amc_extraction_job_id'])
+
+def graph_direction_arg(default='outgoing'):
+    direction = request.args.get('direction', default)
+    if direction not in DIRECTIONS:
+        raise ValueError(f'Invalid direction: {direction}')
+    return direction
+
+@app.route('/api/metadata-component/<int:component_id>/graph/reachable', methods=['GET'])
+def get_component_reachable(component_id):
+    """Get every component reachable from a component, answered from the in-memory job graph
+
+    Query args: direction (outgoing - what it depends on, incoming - what depends on it, or both),
+    depth (hops, unlimited by default) and max_nodes.
+    """
+    try:
+        direction = graph_direction_arg()
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    depth = request.args.get('depth', type=int)
+    max_nodes = request.args.get('max_nodes', DEPENDENCY_NETWORK_CONFIG['default_max_nodes'], type=int)
+    max_nodes = min(max_nodes, DEPENDENCY_NETWORK_CONFIG['max_nodes'])
+    
+    try:
+        component, graph = get_component_graph(component_id)
+        if not component:
+            return jsonify({'success': False, 'error': 'Component not found'}), 404
+        
+        hops, truncated = graph.bfs(component_id, depth=depth, direction=direction, max_nodes=max_nodes)
+        hops.pop(component_id, None)
+        components_data = db.get_diagram_components(hops)
+        
+        components = []
+        for comp_id in sorted(hops, key=lambda c: (hops[c], c)):
+            comp_data = components_data.get(comp_id)
+            if comp_data:
+                components.append(dict(comp_data, depth=hops[comp_id], degree=graph.degree(comp_id)))
+        
+        return jsonify({
+            'success': True,
+            'component': component,
+            'direction': direction,
+            'components': components,
+            'count': len(components),
+            'truncated': truncated
+        })
+        
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/metadata-component/<int:component_id>/graph/path/<int:target_id>', methods=['GET'])
+def get_component_path(component_id, target_id):
+    """Get the shortest dependency path between two components of the same extraction job"""
+    try:
+        direction = graph_direction_arg()
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    try:
+        component, graph = get_component_graph(component_id)
+        if not component:
+            return jsonify({'success': False, 'error': 'Component not found'}), 404
+        
+        path = graph.shortest_path(component_id, target_id, direction)
+        if path is None:
+            return jsonify({'success': True, 'reachable': False, 'path': [], 'hops': None})
+        
+        components_data = db.get_diagram_components([comp_id for comp_id, _ in path])
+        steps = [
+            dict(components_data.get(comp_id, {'amc_id': comp_id}), dependency_type=dependency_type)
+            for comp_id, dependency_type in path
+        ]
+        
+        return jsonify({
+            'success': True,
+            'reachable': True,
+            'path': steps,
+            'hops': len(steps) - 1
+        })
+        
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/metadata-component/<int:component_id>/graph/degree', methods=['GET'])
+def get_component_degree(component_id):
+    """Get a component's incoming and outgoing dependency counts"""
+    try:
+        component, graph = get_component_graph(component_id)
+        if not component:
+            return jsonify({'success': False, 'error': 'Component not found'}), 404
+        
+        return jsonify({
+            'success': True,
+            'component_id': component_id,
+            'degree': graph.degree(component_id)
+        })
+        
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/metadata-component/<int:component_id>/impact', methods=['GET'])
+def get_component_impact(component_id):
+    """Get the transitive impact of a component from the job's precomputed reachability index
+
+    Query args: direction (incoming - every component affected by a change to it, the default,
+    or outgoing - everything it needs) and limit (components returned; total is always exact).
+    Graphs above max_reachability_components are answered with a breadth-first walk instead.
+    """
+    try:
+        direction = graph_direction_arg(default='incoming')
+        if direction == 'both':
+            raise ValueError('Impact direction must be incoming or outgoing')
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    limit = request.args.get('limit', DEPENDENCY_NETWORK_CONFIG['default_max_nodes'], type=int)
+    limit = max(0, min(limit, DEPENDENCY_NETWORK_CONFIG['max_nodes']))
+    
+    try:
+        component, graph = get_component_graph(component_id)
+        if not component:
+            return jsonify({'success': False, 'error': 'Component not found'}), 404
+        
+        index = dependency_graph_cache.get_reachability_index(component['amc_extraction_job_id'])
+        if index is not None:
+            reached = index.reached(component_id, direction)
+            cycle_members = index.cycle_members(component_id)
+        else:
+            hops, _ = graph.bfs(component_id, direction=direction)
+            hops.pop(component_id, None)
+            reached = list(hops)
+            cycle_members = []
+        
+        components_data = db.get_diagram_components(reached)
+        by_type = {}
+        for comp_data in components_data.values():
+            type_name = comp_data['metadata_type_name'] or 'Unknown'
+            by_type[type_name] = by_type.get(type_name, 0) + 1
+        
+        components = [components_data[comp_id] for comp_id in sorted(components_data)[:limit]]
+        
+        return jsonify({
+            'success': True,
+            'component': component,
+            'direction': direction,
+            'total': len(reached),
+            'by_type': by_type,
+            'components': components,
+            'truncated': len(components_data) > limit,
+            'cycle_members': cycle_members,
+            'indexed': index is not None
+        })
+        
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/dependency-graph/stats', methods=['GET'])
+def get_dependency_graph_stats():
+    """Get dependency graph cache statistics, including memory held per cached job"""
+    return jsonify({'success': True, 'stats': dependency_graph_cache.get_stats()})
+
 @app.route('/api/metadata-component/<int:component_id>/generate-summary', methods=['POST'])
 def generate_component_summary(component_id):
     """Generate AI summary for a metadata component on-demand"""
@@ -1039,26 +1669,31 @@ def extract_metadata_with_login():
         # Create job ID
         job_id = str(uuid.uuid4())
         
-        # Initialize job WITHOUT login success message
-        extraction_jobs[job_id] = {
-            'id': job_id,
-            'status': 'starting',
-            'progress': ['Initializing metadata extraction...'],
-            'start_time': datetime.now(),
-            'data': None,
-            'error': None
-        }
+        def prepare(job_id):
+            # Initialize job WITHOUT login success message
+            extraction_jobs[job_id] = {
+                'id': job_id,
+                'status': 'queued',
+                'progress': ['Initializing metadata extraction...'],
+                'start_time': datetime.now(),
+                'data': None,
+                'error': None
+            }
         
-        # Start extraction in background thread
-        thread = threading.Thread(
-            target=extract_metadata_async,
-            args=(job_id, username, password, security_token, is_sandbox, output_dir)
+        # Queue the extraction in memory only - credentials are never written to the queue table
+        extraction_scheduler.submit(
+            job_id,
+            extract_metadata_async,
+            args=(job_id, username, password, security_token, is_sandbox, output_dir),
+            org_id=409,
+            priority=extraction_scheduler.priority_for('login'),
+            prepare=prepare
         )
-        thread.daemon = True
-        thread.start()
         
         return jsonify({'success': True, 'job_id': job_id, 'message': 'Starting extraction'})
         
+    except QueueFullError as e:
+        return jsonify({'success': False, 'error': f'Extraction queue is full: {str(e)}'}), 503
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -1083,37 +1718,53 @@ def extract_metadata_api():
         # Create job ID
         job_id = str(uuid.uuid4())
         
-        # Initialize job
-        extraction_jobs[job_id] = {
-            'id': job_id,
-            'status': 'starting',
-            'progress': ['Initializing extraction process...'],
-            'start_time': datetime.now(),
-            'data': None,
-            'error': None
-        }
+        def prepare(job_id):
+            # Initialize job
+            extraction_jobs[job_id] = {
+                'id': job_id,
+                'status': 'queued',
+                'progress': ['Initializing extraction process...'],
+                'start_time': datetime.now(),
+                'data': None,
+                'error': None
+            }
         
-        # Start extraction in background thread
-        thread = threading.Thread(
-            target=extract_metadata_async,
-            args=(job_id, username, password, security_token, is_sandbox, output_dir)
+        # Queue the extraction in memory only - credentials are never written to the queue table
+        extraction_scheduler.submit(
+            job_id,
+            extract_metadata_async,
+            args=(job_id, username, password, security_token, is_sandbox, output_dir),
+            org_id=409,
+            priority=extraction_scheduler.priority_for('login'),
+            prepare=prepare
         )
-        thread.daemon = True
-        thread.start()
         
         return jsonify({'success': True, 'job_id': job_id})
         
+    except QueueFullError as e:
+        return jsonify({'success': False, 'error': f'Extraction queue is full: {str(e)}'}), 503
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/extraction-queue', methods=['GET'])
+def get_extraction_queue():
+    """Extraction queue depth, wait times and the jobs waiting for a worker"""
+    try:
+        return jsonify({
+            'success': True,
+            'stats': extraction_scheduler.get_stats(),
+            'queued_jobs': extraction_scheduler.queued_jobs()
+        })
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/job-status/<job_id>', methods=['GET'])
 def get_job_status(job_id):
     """Get the status of an extraction job"""
-    if job_id not in extraction_jobs:
+    job = extraction_jobs.get(job_id)
+    if job is None:
         return jsonify({'success': False, 'error': 'Job not found'}), 404
     
-    job = extraction_jobs[job_id]
-    
     response_data = {
         'success': True,
         'status': job['status'],
@@ -1123,7 +1774,7 @@ def get_job_status(job_id):
     }
     
     # Calculate duration if job is complete
-    if job['status'] in ['success', 'error'] and 'end_time' in job:
+    if job['status'] in ['success', 'error'] and job.get('end_time'):
         duration = job['end_time'] - job['start_time']
         response_data['duration'] = str(duration).split('.')[0]  # Remove microseconds
     
@@ -1132,10 +1783,9 @@ def get_job_status(job_id):
 @app.route('/api/metadata-files/<job_id>/<metadata_type>', methods=['GET'])
 def get_metadata_files(job_id, metadata_type):
     """Get list of files for a specific metadata type"""
-    if job_id not in extraction_jobs:
+    job = extraction_jobs.get(job_id)
+    if job is None:
         return jsonify({'success': False, 'error': 'Job not found'}), 404
-    
-    job = extraction_jobs[job_id]
     if job['status'] != 'success':
         return jsonify({'success': False, 'error': 'Job not completed successfully'}), 400
     
@@ -1220,8 +1870,7 @@ def extract_metadata_corrected(job_id, session_id, metadata_url, output_dir):
         response = requests.post(metadata_url, data=retrieve_body, headers=headers, timeout=300)  # 5 minutes timeout for comprehensive extraction
         
         if response.status_code != 200:
-            job['status'] = 'error'
-            job['error'] = f"Retrieve failed: {response.status_code}"
+            job.update(status='error', error=f"Retrieve failed: {response.status_code}")
             return False
         
         response_text = response.text
@@ -1229,15 +1878,13 @@ def extract_metadata_corrected(job_id, session_id, metadata_url, output_dir):
         # Check for faults
         if '<soapenv:Fault>' in response_text:
             fault_match = re.search(r'<faultstring>(.*?)</faultstring>', response_text)
-            job['status'] = 'error'
-            job['error'] = fault_match.group(1) if fault_match else "Unknown SOAP fault"
+            job.update(status='error', error=fault_match.group(1) if fault_match else "Unknown SOAP fault")
             return False
         
         # Extract async ID
         id_match = re.search(r'<id>(.*?)</id>', response_text)
         if not id_match:
-            job['status'] = 'error'
-            job['error'] = "No async ID found in response"
+            job.update(status='error', error="No async ID found in response")
             return False
         
         async_id = id_match.group(1)
@@ -1247,117 +1894,72 @@ def extract_metadata_corrected(job_id, session_id, metadata_url, output_dir):
         done_match = re.search(r'<done>(.*?)</done>', response_text)
         if done_match and done_match.group(1).lower() == 'true':
             job['progress'].append('Job completed immediately!')
-            return download_and_extract(job_id, response_text, output_dir)
+            # The retrieve() reply never carries the zip - fetch it with checkRetrieveStatus
+            status_code, retrieve_response = check_retrieve_status(metadata_url, session_id, async_id)
+            if retrieve_response is not None:
+                return download_and_extract(job_id, retrieve_response, output_dir)
         
         # Poll for completion
         return poll_and_download_corrected(job_id, session_id, metadata_url, async_id, output_dir)
         
     except Exception as e:
-        job['status'] = 'error'
-        job['error'] = f"Retrieve exception: {str(e)}"
+        job.update(status='error', error=f"Retrieve exception: {str(e)}")
         return False
 
 def poll_and_download_corrected(job_id, session_id, metadata_url, async_id, output_dir):
-    """Poll for completion and download when ready - INCREASED TIMEOUT FOR COMPREHENSIVE EXTRACTION"""
+    """Hand the retrieve to the shared poller; the zip is downloaded and extracted when it completes
+
+    Returns True once polling has started - the job's status is set by the completion or error callback.
+    """
     job = extraction_jobs[job_id]
     
-    check_body = f'''<?xml version="1.0" encoding="UTF-8"?>
-<soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/" xmlns:met="http://soap.sforce.com/2006/04/metadata">
-   <soapenv:Header>
-      <met:SessionHeader>
-         <met:sessionId>{session_id}</met:sessionId>
-      </met:SessionHeader>
-   </soapenv:Header>
-   <soapenv:Body>
-      <met:checkRetrieveStatus>
-         <met:asyncProcessId>{async_id}</met:asyncProcessId>
-      </met:checkRetrieveStatus>
-   </soapenv:Body>
-</soapenv:Envelope>'''
-    
-    headers = {
-        'Content-Type': 'text/xml; charset=UTF-8',
-        'SOAPAction': 'checkRetrieveStatus'
-    }
-    
     job['progress'].append('Polling for completion (comprehensive extraction - this may take 15-30 minutes)...')
     
-    # INCREASED TIMEOUT: 60 attempts × 60 seconds = 60 minutes max
-    max_attempts = 60  # Increased from 15 to 60
-    for i in range(max_attempts):
-        time.sleep(60)  # Increased from 30 to 60 seconds
-        job['progress'].append(f'Checking status... ({i+1}/{max_attempts}) - Comprehensive extraction in progress')
-        
-        try:
-            response = requests.post(metadata_url, data=check_body, headers=headers, timeout=180)  # Increased timeout to 3 minutes
-            
-            if response.status_code != 200:
-                job['progress'].append(f'Status check failed: {response.status_code}')
-                continue
-            
-            response_text = response.text
-            
-            # Check for critical errors first
-            if 'INVALID_LOCATOR' in response_text:
-                job['status'] = 'error'
-                job['error'] = 'Result expired! The retrieve result was deleted by Salesforce.'
-                return False
-            
-            if '<soapenv:Fault>' in response_text:
-                fault_match = re.search(r'<faultstring>(.*?)</faultstring>', response_text)
-                job['status'] = 'error'
-                job['error'] = fault_match.group(1) if fault_match else "Unknown fault"
-                return False
-            
-            # Check if done
-            done_match = re.search(r'<done>(.*?)</done>', response_text)
-            if done_match and done_match.group(1).lower() == 'true':
-                job['progress'].append('✅ Job completed! Downloading immediately...')
-                return download_and_extract(job_id, response_text, output_dir)
-            
-            # Show current state
-            state_match = re.search(r'<state>(.*?)</state>', response_text)
-            if state_match:
-                job['progress'].append(f'Current state: {state_match.group(1)}')
-            
-        except requests.exceptions.Timeout:
-            job['progress'].append('Request timed out, retrying...')
-        except Exception as e:
-            job['progress'].append(f'Error: {str(e)}')
-            continue
+    def on_complete(retrieve_response):
+        job['progress'].append('✅ Job completed! Downloading immediately...')
+        download_and_extract(job_id, retrieve_response, output_dir)
     
-    job['status'] = 'error'
-    job['error'] = 'Timed out waiting for completion (60 minutes) - Comprehensive extraction may take longer'
-    return False
+    retrieve_poller.submit(
+        metadata_url, session_id, async_id,
+        on_complete=on_complete,
+        on_error=lambda message: mark_job_error(job_id, message),
+        on_progress=job['progress'].append
+    )
+    return True
+
+def mark_job_error(job_id, message):
+    """Mark an in-memory extraction job as failed"""
+    job = extraction_jobs[job_id]
+    job.update(status='error', error=message)
+
+def download_and_extract(job_id, retrieve_response, output_dir):
+    """Download and extract the metadata zip and store in database
 
-def download_and_extract(job_id, response_text, output_dir):
-    """Download and extract the metadata zip and store in database"""
+    retrieve_response is a retrieve_stream.RetrieveResponse (or raw response text).
+    """
     job = extraction_jobs[job_id]
+    if isinstance(retrieve_response, str):
+        retrieve_response = parse_retrieve_text(retrieve_response)
+    response_text = retrieve_response.text
     
     try:
         # Verify success
         success_match = re.search(r'<success>(.*?)</success>', response_text)
         if success_match and success_match.group(1).lower() == 'false':
-            job['status'] = 'error'
-            job['error'] = 'Retrieve operation was not successful'
+            job.update(status='error', error='Retrieve operation was not successful')
             # Look for error messages
             messages = re.findall(r'<message>(.*?)</message>', response_text)
             for msg in messages:
                 job['progress'].append(f'Error message: {msg}')
             return False
         
-        # Extract zip file content
-        zip_match = re.search(r'<zipFile>(.*?)</zipFile>', response_text, re.DOTALL)
-        if not zip_match:
-            job['status'] = 'error'
-            job['error'] = 'No zip file found in response'
+        # The zip payload was decoded while the response streamed in
+        if retrieve_response.zip_file is None:
+            job.update(status='error', error='No zip file found in response')
             return False
         
-        zip_b64 = zip_match.group(1).strip()
-        
         job['progress'].append('Decoding and extracting zip file...')
-        zip_data = base64.b64decode(zip_b64)
-        job['progress'].append(f'Zip file size: {len(zip_data):,} bytes')
+        job['progress'].append(f'Zip file size: {retrieve_response.zip_size:,} bytes')
         
         # Create output directory
         os.makedirs(output_dir, exist_ok=True)
@@ -1365,7 +1967,7 @@ def download_and_extract(job_id, response_text, output_dir):
         # Save zip file
         zip_path = os.path.join(output_dir, 'metadata.zip')
         with open(zip_path, 'wb') as f:
-            f.write(zip_data)
+            shutil.copyfileobj(retrieve_response.zip_file, f)
         job['progress'].append(f'Zip saved: {zip_path}')
         
         # Extract files
@@ -1386,23 +1988,25 @@ def download_and_extract(job_id, response_text, output_dir):
         job['progress'].append('Successfully extracted {total_files} files!'.format(total_files=metadata_stats["totalFiles"]))
         job['progress'].append(f'Output directory: {os.path.abspath(extract_dir)}')
         
-        job['status'] = 'success'
-        job['data'] = metadata_stats
-        job['end_time'] = datetime.now()
+        job.update(status='success', data=metadata_stats, end_time=datetime.now())
         
         return True
         
     except zipfile.BadZipFile:
-        job['status'] = 'error'
-        job['error'] = 'Received invalid zip file'
+        job.update(status='error', error='Received invalid zip file')
         return False
     except Exception as e:
-        job['status'] = 'error'
-        job['error'] = f'Error processing zip: {str(e)}'
+        job.update(status='error', error=f'Error processing zip: {str(e)}')
         return False
+    finally:
+        retrieve_response.close()
+
+def extract_metadata_async_for_dashboard(job_id, credentials, integration_id, mode='full'):
+    """Extract metadata for dashboard using stored integration - NO LOCAL FILES
 
-def extract_metadata_async_for_dashboard(job_id, credentials, integration_id):
-    """Extract metadata for dashboard using stored integration - NO LOCAL FILES"""
+    Returns once the extraction has finished, so its queue row stays claimed and heartbeated while
+    retrieves are polled. A job that was interrupted continues from its checkpoint.
+    """
     job = extraction_jobs[job_id]
     
     try:
@@ -1415,25 +2019,66 @@ def extract_metadata_async_for_dashboard(job_id, credentials, integration_id):
         )
         
         if error:
-            job['status'] = 'error'
-            job['error'] = error
+            job.update(status='error', error=error)
             return
         
         # Step 2: Extract metadata
         job['progress'].append('Preparing metadata extraction...')
         metadata_url = server_url.replace('/services/Soap/c/', '/services/Soap/m/')
         
-        # Extract metadata directly to memory (no local files)
-        success = extract_metadata_to_database(job_id, session_id, metadata_url, integration_id)
+        # An interrupted extraction continues from its checkpoint instead of starting over
+        db_job = db.get_extraction_job_by_key(job_id)
+        
+        # Extract metadata directly to memory (no local files), as several smaller retrieves unless disabled
+        if db_job and db_job['aej_job_status'] == 'running' and db_job['aej_checkpoint']:
+            success = resume_extraction_to_database(job_id, session_id, metadata_url, db_job)
+        elif mode == 'incremental':
+            success = extract_metadata_incremental_to_database(job_id, session_id, metadata_url, integration_id)
+        elif RETRIEVE_CHUNK_CONFIG['enabled']:
+            success = extract_metadata_chunked_to_database(job_id, session_id, metadata_url, integration_id)
+        else:
+            success = extract_metadata_to_database(job_id, session_id, metadata_url, integration_id)
         
         if not success and job['status'] != 'success':
             if job['status'] != 'error':
-                job['status'] = 'error'
-                job['error'] = 'Failed to extract metadata'
+                job.update(status='error', error='Failed to extract metadata')
+        
+        wait_for_extraction(job_id)
         
     except Exception as e:
-        job['status'] = 'error'
-        job['error'] = f'Extraction process failed: {str(e)}'
+        job.update(status='error', error=f'Extraction process failed: {str(e)}')
+    
+    # Once another worker has taken the job over, its extraction job row is that worker's to finish
+    if job['status'] == 'error' and job.store is extraction_jobs:
+        fail_extraction_job_record(job_id, job['error'])
+
+def extraction_timeout_seconds():
+    """Longest an extraction may take: every round of concurrent retrieves can use the poller's
+    full timeout and download time, plus an hour for ingest and dependency analysis"""
+    rounds = -(-len(plan_retrieve_chunks()) // RETRIEVE_CHUNK_CONFIG['max_concurrent_retrieves'])
+    per_retrieve = retrieve_poller.config['timeout'] + retrieve_poller.config['download_timeout']
+    return rounds * per_retrieve + 3600
+
+def wait_for_extraction(job_id, poll_seconds=30, timeout=None):
+    """Block until an extraction job reaches a final status, failing it after timeout seconds
+
+    A job whose retrieves stopped reporting back would otherwise hold its worker slot forever.
+    """
+    deadline = time.monotonic() + (timeout or extraction_timeout_seconds())
+    job = extraction_jobs.get(job_id)
+    # A job not held by this process any more has been taken over by another worker
+    while job is not None and job.store is extraction_jobs:
+        version = job.version
+        if job['status'] in TERMINAL_STATUSES:
+            return
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            # Late chunk callbacks find no run and stop
+            active_extraction_runs.pop(job_id, None)
+            job.update(status='error', error='Extraction did not finish in time', end_time=datetime.now())
+            return
+        job.wait_for_change(version, min(poll_seconds, remaining))
+        job = extraction_jobs.get(job_id)
 
 def store_metadata_components_in_db(job_id, extract_dir, metadata_stats):
     """Store extracted metadata components in the database WITHOUT AI summaries (generated on-demand)"""
@@ -1441,8 +2086,7 @@ def store_metadata_components_in_db(job_id, extract_dir, metadata_stats):
     
     try:
         # Get metadata types for mapping
-        metadata_types = db.get_metadata_types(org_id=409)
-        type_mapping = {mt['amt_name']: mt['amt_id'] for mt in metadata_types}
+        type_mapping = metadata_type_registry.get(409).ids
         
         # Get the integration ID from the job
         integration_id = job.get('integration_id', 4)  # Default fallback
@@ -1470,18 +2114,18 @@ def store_metadata_components_in_db(job_id, extract_dir, metadata_stats):
         )
         
         components_stored = 0
-        dependencies_stored = 0
         
         # Store all components first
         component_map = {}  # Map filename to component_id for dependency creation
+        name_index = ComponentNameIndex()  # Resolves referenced names to component_ids during analysis
         
         # Process each file and store in database
         for root, dirs, files in os.walk(extract_dir):
             for file in files:
                 file_path = os.path.join(root, file)
                 
-                # Determine metadata type
-                metadata_type = get_file_type_from_path(file_path)
+                # Determine metadata type from the path inside the retrieved package
+                metadata_type = get_file_type_from_path(os.path.relpath(file_path, extract_dir))
                 type_id = type_mapping.get(metadata_type)
                 
                 if not type_id:
@@ -1499,7 +2143,7 @@ def store_metadata_components_in_db(job_id, extract_dir, metadata_stats):
                         extraction_job_id=db_job_id,
                         metadata_type_id=type_id,
                         label=file,
-                        dev_name=file.replace('.cls', '').replace('.trigger', '').replace('.object', '').replace('.flow', '').replace('.layout', ''),
+                        dev_name=get_dev_name(file),
                         notes=f"Extracted from {file_path}",
                         content=content,
                         ai_summary=None,  # No AI summary during extraction
@@ -1512,6 +2156,7 @@ def store_metadata_components_in_db(job_id, extract_dir, metadata_stats):
                     if component_id:
                         components_stored += 1
                         component_map[file] = component_id
+                        name_index.add(file, component_id, metadata_type)
                     
                 except Exception as e:
                     job['progress'].append(f'Warning: Failed to store component {file}: {str(e)}')
@@ -1520,6 +2165,7 @@ def store_metadata_components_in_db(job_id, extract_dir, metadata_stats):
         # Now analyze and store dependencies
         job['progress'].append('Analyzing dependencies between components...')
         
+        analysis_results = []
         for root, dirs, files in os.walk(extract_dir):
             for file in files:
                 file_path = os.path.join(root, file)
@@ -1530,273 +2176,93 @@ def store_metadata_components_in_db(job_id, extract_dir, metadata_stats):
                 source_component_id = component_map[file]
                 
                 # Analyze dependencies based on file type
-                dependencies = []
-                
-                if file.endswith('.cls'):
-                    dependencies = analyze_apex_class_dependencies(file_path, file, component_map)
-                elif file.endswith('.trigger'):
-                    dependencies = analyze_apex_trigger_dependencies(file_path, file, component_map)
-                elif file.endswith('.object'):
-                    dependencies = analyze_custom_object_dependencies(file_path, file, component_map)
-                elif file.endswith('.flow'):
-                    dependencies = analyze_flow_dependencies(file_path, file, component_map)
-                elif file.endswith('.layout'):
-                    dependencies = analyze_layout_dependencies(file_path, file, component_map)
+                metadata_type = get_file_type_from_path(os.path.relpath(file_path, extract_dir))
+                analyzer = FILE_DEPENDENCY_ANALYZERS.get(metadata_type)
+                dependencies = analyzer(file_path, file, name_index) if analyzer else []
                 
-                # Store dependencies in database
-                for dep in dependencies:
-                    try:
-                        dependency_id = db.create_dependency(
-                            org_id=409,
-                            from_component_id=source_component_id,
-                            to_component_id=dep['to_component_id'],
-                            dependency_type=dep['type'],
-                            description=dep['description'],
-                            created_user_id=243
-                        )
-                        if dependency_id:
-                            dependencies_stored += 1
-                    except Exception as e:
-                        job['progress'].append(f'Warning: Failed to store dependency: {str(e)}')
-                        continue
+                analysis_results.append((source_component_id, dependencies))
+        
+        dependencies_stored, _ = store_dependencies(job, analysis_results)
+        graph = refresh_dependency_graph(job, db_job_id)
+        # The job row was marked completed before its dependencies existed; touching it again
+        # changes its version, so graphs other processes cached without them are reloaded
+        db.update_extraction_job(job_id=db_job_id, job_status="completed")
+        if graph is not None:
+            dependency_graph_cache.put(db_job_id, graph)
         
         job['progress'].append(f'Stored {components_stored} metadata components and {dependencies_stored} dependencies in database')
         
     except Exception as e:
         job['progress'].append(f'Error storing metadata in database: {str(e)}')
 
-def get_file_type_from_path(file_path):
-    """Determine metadata type from file path - COMPREHENSIVE VERSION"""
-    filename = os.path.basename(file_path)
-    
-    # Apex and Visualforce
-    if filename.endswith('.cls'):
-        return "ApexClass"
-    elif filename.endswith('.trigger'):
-        return "ApexTrigger"
-    elif filename.endswith('.page'):
-        return "ApexPage"
-    elif filename.endswith('.component'):
-        return "ApexComponent"
-    
-    # Custom Objects and Fields
-    elif filename.endswith('.object'):
-        return "CustomObject"
-    elif filename.endswith('.field'):
-        return "CustomField"
-    
-    # Automation and Workflow
-    elif filename.endswith('.flow'):
-        return "Flow"
-    elif filename.endswith('.workflow'):
-        return "WorkflowRule"
-    elif filename.endswith('.workflowAlert'):
-        return "WorkflowAlert"
-    elif filename.endswith('.workflowFieldUpdate'):
-        return "WorkflowFieldUpdate"
-    elif filename.endswith('.workflowTask'):
-        return "WorkflowTask"
-    elif filename.endswith('.workflowSend'):
-        return "WorkflowSend"
-    elif filename.endswith('.workflowOutboundMessage'):
-        return "WorkflowOutboundMessage"
-    elif filename.endswith('.workflowKnowledgePublish'):
-        return "WorkflowKnowledgePublish"
-    
-    # UI and Layout
-    elif filename.endswith('.layout'):
-        return "Layout"
-    elif filename.endswith('.flexipage'):
-        return "FlexiPage"
-    elif filename.endswith('.tab'):
-        return "CustomTab"
-    elif filename.endswith('.app'):
-        return "CustomApplication"
-    elif filename.endswith('.weblink'):
-        return "CustomWebLink"
-    elif filename.endswith('.quickAction'):
-        return "QuickAction"
-    
-    # Validation and Rules
-    elif filename.endswith('.validationRule'):
-        return "ValidationRule"
-    elif filename.endswith('.sharingRules'):
-        return "SharingRules"
-    elif filename.endswith('.sharingSet'):
-        return "SharingSet"
-    
-    # Security and Permissions
-    elif filename.endswith('.permissionset'):
-        return "PermissionSet"
-    elif filename.endswith('.profile'):
-        return "Profile"
-    elif filename.endswith('.role'):
-        return "Role"
-    elif filename.endswith('.group'):
-        return "Group"
-    elif filename.endswith('.queue'):
-        return "Queue"
-    elif filename.endswith('.customPermission'):
-        return "CustomPermission"
-    
-    # Custom Metadata and Labels
-    elif filename.endswith('.customMetadata'):
-        return "CustomMetadata"
-    elif filename.endswith('.labels'):
-        return "CustomLabel"
-    
-    # Sites and Communities
-    elif filename.endswith('.site'):
-        return "CustomSite"
-    elif filename.endswith('.network'):
-        return "Network"
-    elif filename.endswith('.networkBranding'):
-        return "NetworkBranding"
-    elif filename.endswith('.networkMemberGroup'):
-        return "NetworkMemberGroup"
-    elif filename.endswith('.networkPageOverride'):
-        return "NetworkPageOverride"
-    elif filename.endswith('.networkTabSet'):
-        return "NetworkTabSet"
-    
-    # Reports and Analytics
-    elif filename.endswith('.report'):
-        return "Report"
-    elif filename.endswith('.reportType'):
-        return "ReportType"
-    elif filename.endswith('.dashboard'):
-        return "Dashboard"
-    elif filename.endswith('.listView'):
-        return "ListView"
-    
-    # Einstein Analytics (Wave)
-    elif filename.endswith('.waveApplication'):
-        return "WaveApplication"
-    elif filename.endswith('.waveDashboard'):
-        return "WaveDashboard"
-    elif filename.endswith('.waveDataflow'):
-        return "WaveDataflow"
-    elif filename.endswith('.waveDataset'):
-        return "WaveDataset"
-    elif filename.endswith('.waveLens'):
-        return "WaveLens"
-    elif filename.endswith('.waveRecipe'):
-        return "WaveRecipe"
-    elif filename.endswith('.waveSpoke'):
-        return "WaveSpoke"
-    elif filename.endswith('.waveXmd'):
-        return "WaveXmd"
-    
-    # Global Value Sets
-    elif filename.endswith('.globalValueSet'):
-        return "GlobalValueSet"
-    elif filename.endswith('.globalValueSetTranslation'):
-        return "GlobalValueSetTranslation"
-    elif filename.endswith('.standardValueSet'):
-        return "StandardValueSet"
-    elif filename.endswith('.standardValueSetTranslation'):
-        return "StandardValueSetTranslation"
-    
-    # Home Page Components
-    elif filename.endswith('.homePageComponent'):
-        return "HomePageComponent"
-    elif filename.endswith('.homePageLayout'):
-        return "HomePageLayout"
-    
-    # Named Credentials and Integrations
-    elif filename.endswith('.namedCredential'):
-        return "NamedCredential"
-    elif filename.endswith('.samlSsoConfig'):
-        return "SamlSsoConfig"
-    
-    # Documents and Resources
-    elif filename.endswith('.document'):
-        return "Document"
-    elif filename.endswith('.resource'):
-        return "StaticResource"
-    elif filename.endswith('.email'):
-        return "EmailTemplate"
-    
-    # Territory Management
-    elif filename.endswith('.territory'):
-        return "Territory"
-    elif filename.endswith('.territory2'):
-        return "Territory2"
-    elif filename.endswith('.territory2Model'):
-        return "Territory2Model"
-    elif filename.endswith('.territory2Rule'):
-        return "Territory2Rule"
-    elif filename.endswith('.territory2Type'):
-        return "Territory2Type"
-    
-    # Platform Events
-    elif filename.endswith('.platformEventChannel'):
-        return "PlatformEventChannel"
-    elif filename.endswith('.platformEventChannelMember'):
-        return "PlatformEventChannelMember"
-    
-    # Service and Support
-    elif filename.endswith('.serviceChannel'):
-        return "ServiceChannel"
-    elif filename.endswith('.servicePresenceStatus'):
-        return "ServicePresenceStatus"
-    elif filename.endswith('.skill'):
-        return "Skill"
-    
-    # Queue Routing
-    elif filename.endswith('.queueRoutingConfig'):
-        return "QueueRoutingConfig"
-    
-    # Path Assistant
-    elif filename.endswith('.pathAssistant'):
-        return "PathAssistant"
-    
-    # Permission Set Groups
-    elif filename.endswith('.permissionSetGroup'):
-        return "PermissionSetGroup"
-    
-    # Post Templates
-    elif filename.endswith('.postTemplate'):
-        return "PostTemplate"
-    
-    # Profile Settings
-    elif filename.endswith('.profilePasswordPolicy'):
-        return "ProfilePasswordPolicy"
-    elif filename.endswith('.profileSessionSetting'):
-        return "ProfileSessionSetting"
-    
-    # Topics
-    elif filename.endswith('.topicsForObjects'):
-        return "TopicsForObjects"
-    
-    # User Criteria and Searches
-    elif filename.endswith('.userCriteria'):
-        return "UserCriteria"
-    elif filename.endswith('.userProfileSearch'):
-        return "UserProfileSearch"
-    
-    # Custom Object Translations
-    elif filename.endswith('.customObjectTranslation'):
-        return "CustomObjectTranslation"
-    elif filename.endswith('.customPageWebLink'):
-        return "CustomPageWebLink"
-    elif filename.endswith('.customTabTranslation'):
-        return "CustomTabTranslation"
-    
-    # Installed Packages
-    elif filename.endswith('.installedPackage'):
-        return "InstalledPackage"
-    
-    # Synonym Dictionary
-    elif filename.endswith('.synonymDictionary'):
-        return "SynonymDictionary"
-    
-    # Site Dot Com
-    elif filename.endswith('.siteDotCom'):
-        return "SiteDotCom"
+def refresh_dependency_graph(job, db_job_id):
+    """Build the job's graph and reachability index from the dependencies just written, and store
+    the circular dependency groups found in it
+
+    Returns the graph, or None if it could not be loaded. The graph cache only keeps finished jobs,
+    so callers hand it to dependency_graph_cache.put once the job is marked completed.
+    """
+    dependency_graph_cache.invalidate(db_job_id)
+    try:
+        graph = DependencyGraph(db.get_dependency_edges_by_job(db_job_id))
+    except Exception as e:
+        job['progress'].append(f'Warning: could not load the dependency graph: {str(e)}')
+        return None
     
-    else:
-        return "Unknown"
+    index = None
+    if dependency_graph_cache.indexable(graph):
+        try:
+            started = time.monotonic()
+            index = graph.get_reachability_index()
+            job['progress'].append(
+                f'Indexed impact analysis for {len(index.graph):,} components '
+                f'({len(index.components):,} groups) in {time.monotonic() - started:.1f}s'
+            )
+        except Exception as e:
+            # Impact queries build the index on demand, so a failure here is not fatal
+            job['progress'].append(f'Warning: could not build impact analysis index: {str(e)}')
+    
+    try:
+        if index is not None:
+            cycles = find_dependency_cycles(graph, index.components)
+        else:
+            cycles = find_dependency_cycles(graph, strongly_connected_components(graph))
+        db.replace_dependency_cycles(org_id=409, job_id=db_job_id, cycles=cycles, created_user_id=243)
+        if cycles:
+            job['progress'].append(
+                f'Found {len(cycles):,} circular dependency groups covering '
+                f'{sum(len(cycle["component_ids"]) for cycle in cycles):,} components'
+            )
+    except Exception as e:
+        job['progress'].append(f'Warning: could not store dependency cycles: {str(e)}')
+    return graph
+
+def store_dependencies(job, analysis_results):
+    """Deduplicate analyzed edges and bulk insert them into ids_audit_metadata_dependency
+
+    Returns (edges_stored, references_found). A failed batch is reported as a warning on the job,
+    matching how individual dependency failures were reported before.
+    """
+    dependencies = dedupe_dependencies(analysis_results)
+    references_found = sum(dep['occurrence_count'] for dep in dependencies)
+
+    try:
+        with db.transaction():
+            dependencies_stored = db.bulk_create_dependencies(
+                org_id=409,
+                dependencies=dependencies,
+                created_user_id=243,
+                page_size=DEPENDENCY_BATCH_SIZE
+            )
+    except Exception as e:
+        job['progress'].append(f'Warning: Failed to store dependencies: {str(e)}')
+        return 0, references_found
+
+    if references_found > dependencies_stored:
+        job['progress'].append(
+            f'Merged {references_found - dependencies_stored:,} duplicate references into {dependencies_stored:,} dependencies'
+        )
+    return dependencies_stored, references_found
 
 def analyze_extracted_metadata(extract_dir):
     """Analyze the extracted metadata and return statistics"""
@@ -1987,7 +2453,7 @@ Keep the summary concise but informative (150-250 words).
 
 """
 
-def analyze_apex_class_dependencies(file_path, filename, component_map):
+def analyze_apex_class_dependencies(file_path, filename, name_index):
     """Analyze Apex class for dependencies"""
     dependencies = []
     
@@ -1995,7 +2461,7 @@ def analyze_apex_class_dependencies(file_path, filename, component_map):
         with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
             content = f.read()
         
-        source_name = filename.replace('.cls', '')
+        source_name = get_dev_name(filename)
         
         # SOQL queries
         soql_pattern = r'(?i)SELECT\s+.+?\s+FROM\s+(\w+)'
@@ -2005,7 +2471,7 @@ def analyze_apex_class_dependencies(file_path, filename, component_map):
                 obj_name = f"{obj_name}__c"
             
             # Find the component ID for this object
-            target_component_id = find_component_id_by_name(obj_name, component_map)
+            target_component_id = name_index.resolve(obj_name, OBJECT_TYPES)
             if target_component_id:
                 dependencies.append({
                     'to_component_id': target_component_id,
@@ -2018,7 +2484,7 @@ def analyze_apex_class_dependencies(file_path, filename, component_map):
         for match in re.finditer(dml_pattern, content):
             var_name = match.group(2)
             if var_name.lower() not in ['list', 'set', 'map', 'string', 'integer', 'boolean']:
-                target_component_id = find_component_id_by_name(var_name, component_map)
+                target_component_id = name_index.resolve(var_name, OBJECT_TYPES)
                 if target_component_id:
                     dependencies.append({
                         'to_component_id': target_component_id,
@@ -2031,7 +2497,7 @@ def analyze_apex_class_dependencies(file_path, filename, component_map):
     
     return dependencies
 
-def analyze_apex_trigger_dependencies(file_path, filename, component_map):
+def analyze_apex_trigger_dependencies(file_path, filename, name_index):
     """Analyze Apex trigger for dependencies"""
     dependencies = []
     
@@ -2039,13 +2505,13 @@ def analyze_apex_trigger_dependencies(file_path, filename, component_map):
         with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
             content = f.read()
         
-        source_name = filename.replace('.trigger', '')
+        source_name = get_dev_name(filename)
         
         # Extract object the trigger is on
         object_match = re.search(r'trigger\s+\w+\s+on\s+(\w+)', content, re.IGNORECASE)
         if object_match:
             obj_name = object_match.group(1)
-            target_component_id = find_component_id_by_name(obj_name, component_map)
+            target_component_id = name_index.resolve(obj_name, OBJECT_TYPES)
             if target_component_id:
                 dependencies.append({
                     'to_component_id': target_component_id,
@@ -2058,7 +2524,7 @@ def analyze_apex_trigger_dependencies(file_path, filename, component_map):
     
     return dependencies
 
-def analyze_custom_object_dependencies(file_path, filename, component_map):
+def analyze_custom_object_dependencies(file_path, filename, name_index):
     """Analyze custom object for dependencies"""
     dependencies = []
     
@@ -2066,7 +2532,7 @@ def analyze_custom_object_dependencies(file_path, filename, component_map):
         tree = ET.parse(file_path)
         root = tree.getroot()
         
-        source_name = filename.replace('.object', '')
+        source_name = get_dev_name(filename)
         
         # Define namespace for Salesforce metadata
         ns = {'sf': 'http://soap.sforce.com/2006/04/metadata'}
@@ -2084,8 +2550,8 @@ def analyze_custom_object_dependencies(file_path, filename, component_map):
                 
                 # Look for reference relationships
                 if ref_to and field_type in ['Lookup', 'MasterDetail']:
-                    target_component_id = component_map.get(ref_to)
-                    if target_component_id and target_component_id != source_component_id:
+                    target_component_id = name_index.resolve(ref_to, OBJECT_TYPES)
+                    if target_component_id:
                         dependencies.append({
                             'to_component_id': target_component_id,
                             'type': 'object_reference',
@@ -2097,7 +2563,7 @@ def analyze_custom_object_dependencies(file_path, filename, component_map):
     
     return dependencies
 
-def analyze_flow_dependencies(file_path, filename, component_map):
+def analyze_flow_dependencies(file_path, filename, name_index):
     """Analyze flow for dependencies"""
     dependencies = []
     
@@ -2105,7 +2571,7 @@ def analyze_flow_dependencies(file_path, filename, component_map):
         tree = ET.parse(file_path)
         root = tree.getroot()
         
-        source_name = filename.replace('.flow', '')
+        source_name = get_dev_name(filename)
         
         # Define namespace for Salesforce metadata
         ns = {'sf': 'http://soap.sforce.com/2006/04/metadata'}
@@ -2114,7 +2580,7 @@ def analyze_flow_dependencies(file_path, filename, component_map):
         for obj_elem in root.findall('.//sf:object', ns):
             if obj_elem.text:
                 obj_name = obj_elem.text
-                target_component_id = component_map.get(obj_name)
+                target_component_id = name_index.resolve(obj_name, OBJECT_TYPES)
                 if target_component_id:
                     dependencies.append({
                         'to_component_id': target_component_id,
@@ -2127,7 +2593,7 @@ def analyze_flow_dependencies(file_path, filename, component_map):
     
     return dependencies
 
-def analyze_layout_dependencies(file_path, filename, component_map):
+def analyze_layout_dependencies(file_path, filename, name_index):
     """Analyze layout for dependencies"""
     dependencies = []
     
@@ -2135,13 +2601,13 @@ def analyze_layout_dependencies(file_path, filename, component_map):
         tree = ET.parse(file_path)
         root = tree.getroot()
         
-        source_name = filename.replace('.layout', '')
+        source_name = get_dev_name(filename)
         
         # Extract object name from layout name
         object_name = source_name.split('-')[0] if '-' in source_name else None
         
         if object_name:
-            target_component_id = find_component_id_by_name(object_name, component_map)
+            target_component_id = name_index.resolve(object_name, OBJECT_TYPES)
             if target_component_id:
                 dependencies.append({
                     'to_component_id': target_component_id,
@@ -2154,13 +2620,14 @@ def analyze_layout_dependencies(file_path, filename, component_map):
     
     return dependencies
 
-def find_component_id_by_name(name, component_map):
-    """Find component ID by name in the component map"""
-    for filename, component_id in component_map.items():
-        dev_name = filename.replace('.cls', '').replace('.trigger', '').replace('.object', '').replace('.flow', '').replace('.layout', '')
-        if dev_name == name:
-            return component_id
-    return None
+# Dispatch table for analyzing extracted files on disk, keyed by metadata type name
+FILE_DEPENDENCY_ANALYZERS = {
+    'ApexClass': analyze_apex_class_dependencies,
+    'ApexTrigger': analyze_apex_trigger_dependencies,
+    'CustomObject': analyze_custom_object_dependencies,
+    'Flow': analyze_flow_dependencies,
+    'Layout': analyze_layout_dependencies
+}
 
 def extract_metadata_async(job_id, username, password, security_token, is_sandbox, output_dir):
     """Main async extraction workflow"""
@@ -2171,8 +2638,7 @@ def extract_metadata_async(job_id, username, password, security_token, is_sandbo
         session_id, server_url, error = login_to_salesforce(username, password, security_token, is_sandbox)
         
         if error:
-            job['status'] = 'error'
-            job['error'] = error
+            job.update(status='error', error=error)
             return
         
         # Step 2: Extract metadata
@@ -2183,35 +2649,55 @@ def extract_metadata_async(job_id, username, password, security_token, is_sandbo
         
         if not success and job['status'] != 'success':
             if job['status'] != 'error':
-                job['status'] = 'error'
-                job['error'] = 'Failed to extract metadata'
+                job.update(status='error', error='Failed to extract metadata')
+        
+        # The retrieve finishes on poller threads - hold this worker slot until it does
+        wait_for_extraction(job_id)
         
     except Exception as e:
-        job['status'] = 'error'
-        job['error'] = f'Extraction process failed: {str(e)}'
+        job.update(status='error', error=f'Extraction process failed: {str(e)}')
 
 # Health check endpoint
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
     try:
-        # Test database connection
-        conn = db.get_connection()
-        db_status = "connected" if conn and not conn.closed else "disconnected"
-        
+        # Test database connection (checked out from the pool and returned immediately)
+        db_status = "connected" if db.ping() else "disconnected"
+
         return jsonify({
-            'status': 'healthy', 
+            'status': 'healthy',
             'timestamp': datetime.now().isoformat(),
-            'database': db_status
+            'database': db_status,
+            'connection_pool': db.get_pool_stats(),
+            'retrieve_poller': retrieve_poller.get_stats(),
+            'dependency_graph_cache': {
+                k: v for k, v in dependency_graph_cache.get_stats().items() if k != 'jobs'
+            },
+            'metadata_type_registry': metadata_type_registry.get_stats(),
+            'job_store': extraction_jobs.get_stats(),
+            'extraction_scheduler': extraction_scheduler.get_stats()
         })
     except Exception as e:
         return jsonify({
             'status': 'unhealthy',
             'timestamp': datetime.now().isoformat(),
             'database': 'error',
+            'connection_pool': db.get_pool_stats(),
             'error': str(e)
         }), 500
 
+@app.route('/api/health/db-pool', methods=['GET'])
+def get_db_pool_stats():
+    """Get database connection pool wait-time and utilisation statistics"""
+    pool_stats = db.get_pool_stats()
+
+    return jsonify({
+        'success': True,
+        'pooling_enabled': pool_stats is not None,
+        'stats': pool_stats
+    })
+
 # ============================================================================
 # MYLIST MANAGEMENT API ENDPOINTS
 # ============================================================================
@@ -2435,6 +2921,545 @@ def get_mylist_dependency_network(list_id):
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+def submit_retrieve(metadata_url, retrieve_body):
+    """Submit a Metadata API retrieve request, returning (async_id, error)"""
+    headers = {
+        'Content-Type': 'text/xml; charset=UTF-8',
+        'SOAPAction': 'retrieve'
+    }
+    
+    response = requests.post(metadata_url, data=retrieve_body, headers=headers, timeout=300)
+    
+    if response.status_code != 200:
+        return None, f"Retrieve failed: {response.status_code}"
+    
+    response_text = response.text
+    
+    if '<soapenv:Fault>' in response_text:
+        fault_match = re.search(r'<faultstring>(.*?)</faultstring>', response_text)
+        return None, fault_match.group(1) if fault_match else "Unknown SOAP fault"
+    
+    id_match = re.search(r'<id>(.*?)</id>', response_text)
+    if not id_match:
+        return None, "No async ID found in response"
+    
+    return id_match.group(1), None
+
+def extract_metadata_chunked_to_database(job_id, session_id, metadata_url, integration_id,
+                                         metadata_types=None, members=None, previous_job_id=None,
+                                         carry_forward_ids=None):
+    """Extract metadata as several smaller retrieves, ingesting each zip as soon as it completes
+
+    Metadata types are planned into chunks (plan_retrieve_chunks) and up to
+    RETRIEVE_CHUNK_CONFIG['max_concurrent_retrieves'] retrieves are in flight at once. Every chunk is
+    stored into the same extraction job, so the dashboard fills in while later chunks are still
+    running. Dependencies are analyzed once all chunks are in, so references across chunks resolve.
+    Returns True once the first retrieves have been submitted.
+
+    For incremental extraction, members limits the retrieve to specific members per type and
+    carry_forward_ids lists unchanged components of previous_job_id to copy into the new job.
+    Every step is checkpointed on the extraction job, see resume_extraction_to_database.
+    """
+    job = extraction_jobs[job_id]
+    
+    chunks = plan_retrieve_chunks(metadata_types)
+    checkpoint = ExtractionCheckpoint.start(
+        job_id, chunks, members=members, previous_job_id=previous_job_id, carry_forward_ids=carry_forward_ids
+    )
+    
+    # Create the extraction job up front so each chunk can be stored as soon as it arrives
+    db_job_id = db.create_extraction_job(
+        org_id=409,
+        integration_id=integration_id,
+        job_status="running",
+        total_files=0,  # Updated as chunks are ingested
+        created_user_id=243,
+        job_key=job_id,
+        checkpoint=checkpoint.snapshot()
+    )
+    
+    if not db_job_id:
+        job.update(status='error', error='Failed to create extraction job in database')
+        return False
+    checkpoint.save = lambda data: db.save_extraction_checkpoint(db_job_id, data)
+    
+    metadata_types = metadata_type_registry.get(409)
+    
+    # Copy unchanged components forward first - they only need names and types for analysis
+    carried_components = carry_forward_components(job, db_job_id, checkpoint, metadata_types)
+    
+    active_extraction_runs[job_id] = new_extraction_run(
+        job_id, db_job_id, session_id, metadata_url, integration_id, metadata_types.ids, checkpoint,
+        carried_components
+    )
+    
+    if not chunks:
+        job['progress'].append('Nothing to retrieve')
+        finalize_chunked_extraction(job_id)
+        return True
+    
+    job['progress'].append(
+        f'Split extraction into {len(chunks)} retrieves '
+        f'(up to {RETRIEVE_CHUNK_CONFIG["max_concurrent_retrieves"]} at a time)...'
+    )
+    submit_next_retrieve_chunks(job_id)
+    return True
+
+def new_extraction_run(job_id, db_job_id, session_id, metadata_url, integration_id, type_mapping, checkpoint,
+                       carried_components, plan=None, components_stored=None):
+    """State of a chunked extraction kept in active_extraction_runs
+
+    plan is the checkpoint's resume_plan when an interrupted extraction is continued; its finished
+    retrieves are counted and only the retrieves still to submit are pending.
+    """
+    chunks = [chunk['types'] for chunk in checkpoint.get('chunks')]
+    resumed = plan is not None
+    if plan is None:
+        plan = {'submit': list(range(len(chunks))), 'ingest': [], 'poll': [], 'ingested': [], 'failed': []}
+
+    return {
+        'job_id': job_id,
+        'db_job_id': db_job_id,
+        'session_id': session_id,
+        'metadata_url': metadata_url,
+        'integration_id': integration_id,
+        'type_mapping': type_mapping,
+        'chunks': chunks,
+        'members': checkpoint.get('members'),
+        'previous_job_id': checkpoint.get('previous_job_id'),
+        'carry_forward_ids': checkpoint.get('carry_forward_ids') or [],
+        'carried_components': carried_components,
+        'checkpoint': checkpoint,
+        'resumed': resumed,
+        'pending': list(plan['submit']),
+        'in_flight': len(plan['ingest']) + len(plan['poll']),
+        'chunks_completed': len(plan['ingested']),
+        'chunks_failed': [{
+            'chunk': index + 1,
+            'types': chunks[index],
+            'error': checkpoint.chunk(index)['error']
+        } for index in plan['failed']],
+        'component_table': [],
+        'components_stored': len(carried_components) if components_stored is None else components_stored,
+        'started': time.monotonic(),
+        'lock': threading.Lock()
+    }
+
+def carry_forward_components(job, db_job_id, checkpoint, metadata_types):
+    """Copy the unchanged components of an incremental extraction into its job
+
+    The copy commits together with the checkpoint recording it, so a resumed extraction never
+    copies twice. Returns the copied components' names and types.
+    """
+    carry_forward_ids = checkpoint.get('carry_forward_ids')
+    if not carry_forward_ids or checkpoint.get('carried_max_id') is not None:
+        return []
+
+    with db.transaction():
+        copied = db.copy_metadata_components(carry_forward_ids, db_job_id, created_user_id=243)
+        # Components are copied before any chunk is ingested, so ids up to this one were carried forward
+        checkpoint.update(carried_max_id=max((row['amc_id'] for row in copied), default=0))
+
+    carried_components = [{
+        'component_id': row['amc_id'],
+        'name': row['amc_dev_name'],
+        'metadata_type': metadata_types.name_for(row['amc_metadata_type_id'])
+    } for row in copied]
+    job['progress'].append(f'Carried forward {len(carried_components):,} unchanged components')
+    return carried_components
+
+def extract_metadata_incremental_to_database(job_id, session_id, metadata_url, integration_id):
+    """Retrieve only components changed since the integration's last completed extraction
+
+    listMetadata reports every member's lastModifiedDate; members newer than the previous job's copy
+    (or new) are retrieved, unchanged components and their dependencies are carried forward, and
+    folder types or types that could not be listed are retrieved in full. Falls back to a full
+    chunked extraction when there is no previous job.
+    """
+    job = extraction_jobs[job_id]
+    
+    previous_job = db.get_latest_completed_extraction_job(integration_id)
+    if not previous_job:
+        job['progress'].append('No previous completed extraction - running a full extraction')
+        return extract_metadata_chunked_to_database(job_id, session_id, metadata_url, integration_id)
+    
+    listable_types = [t for t in COMPREHENSIVE_RETRIEVE_TYPES if t not in FOLDER_METADATA_TYPES]
+    job['progress'].append(
+        f"Listing {len(listable_types)} metadata types for changes since extraction job {previous_job['aej_id']}..."
+    )
+    file_properties, listed_types, failed_types = list_metadata(metadata_url, session_id, listable_types)
+    if failed_types:
+        job['progress'].append(f"Warning: Could not list {', '.join(failed_types)} - retrieving in full")
+    
+    previous_components = db.get_component_versions_by_job(previous_job['aej_id'])
+    plan = plan_incremental_extraction(file_properties, listed_types, previous_components, get_file_type_from_path)
+    
+    full_types = [t for t in COMPREHENSIVE_RETRIEVE_TYPES if t not in listed_types]
+    # Profile and PermissionSet only hold permissions on components retrieved with them, so when
+    # either is retrieved every member of the types they grant access to is retrieved too
+    if any(t in plan['members'] or t in full_types for t in PERMISSION_TYPES):
+        full_types += [t for t in COMPREHENSIVE_RETRIEVE_TYPES if t in PERMISSION_SCOPE_TYPES and t not in full_types]
+        plan = plan_incremental_extraction(
+            file_properties, listed_types, previous_components, get_file_type_from_path, full_types
+        )
+    retrieve_types = [t for t in COMPREHENSIVE_RETRIEVE_TYPES if t in plan['members'] or t in full_types]
+    changed_members = sum(len(names) for names in plan['members'].values())
+    
+    job['progress'].append(
+        f"{changed_members:,} new or changed members, {len(plan['carry_forward']):,} unchanged components, "
+        f"{plan['deleted']:,} deleted; {len(full_types)} types retrieved in full"
+    )
+    
+    return extract_metadata_chunked_to_database(
+        job_id, session_id, metadata_url, integration_id,
+        metadata_types=retrieve_types,
+        members=plan['members'],
+        previous_job_id=previous_job['aej_id'],
+        carry_forward_ids=plan['carry_forward']
+    )
+
+def resume_extraction_to_database(job_id, session_id, metadata_url, db_job):
+    """Continue an interrupted extraction from the checkpoint stored on its extraction job
+
+    Retrieves already ingested are kept. Downloaded ones are ingested from their saved zip, after the
+    last committed batch; submitted ones are polled again by async id; only retrieves that never
+    started (or whose zip is gone and async id unknown) are submitted again. An extraction that
+    reached analysis goes straight to finalizing. Single-retrieve extractions continue as a chunked
+    run of one retrieve. Returns True once the remaining work has been started.
+    """
+    job = extraction_jobs[job_id]
+    db_job_id = db_job['aej_id']
+    checkpoint = ExtractionCheckpoint(
+        db_job['aej_checkpoint'], save=lambda data: db.save_extraction_checkpoint(db_job_id, data)
+    )
+    plan = checkpoint.resume_plan()
+
+    job['progress'].append(
+        f"Resuming extraction job {db_job_id} from its checkpoint: "
+        f"{len(plan['ingested'])} of {len(checkpoint.get('chunks'))} retrieves already stored, "
+        f"{len(plan['ingest'])} to ingest from saved zips, {len(plan['poll'])} to check again, "
+        f"{len(plan['submit'])} to submit"
+    )
+
+    metadata_types = metadata_type_registry.get(409)
+    carry_forward_components(job, db_job_id, checkpoint, metadata_types)
+
+    # Components stored before the restart are read back from the database when analysis starts
+    run = new_extraction_run(
+        job_id, db_job_id, session_id, metadata_url, db_job['aej_integration_id'], metadata_types.ids,
+        checkpoint, [], plan=plan, components_stored=db_job['aej_total_files'] or 0
+    )
+    active_extraction_runs[job_id] = run
+
+    if checkpoint.get('stage') != 'retrieving' or (not run['pending'] and run['in_flight'] == 0):
+        finalize_chunked_extraction(job_id)
+        return True
+
+    for index in plan['poll']:
+        job['progress'].append(f"[{index + 1}/{len(run['chunks'])}] Checking retrieve {checkpoint.chunk(index)['async_id']} again")
+        poll_retrieve_chunk(job_id, index, checkpoint.chunk(index)['async_id'])
+    submit_next_retrieve_chunks(job_id)
+    for index in plan['ingest']:
+        retrieve_response = open_saved_retrieve(checkpoint.chunk(index)['zip_path'])
+        if retrieve_response is None:
+            finish_retrieve_chunk(job_id, index, error='Saved retrieve zip could not be read')
+        else:
+            ingest_retrieve_chunk(job_id, index, retrieve_response)
+    return True
+
+def submit_next_retrieve_chunks(job_id):
+    """Submit pending chunks of a chunked extraction until the concurrency limit is reached"""
+    run = active_extraction_runs.get(job_id)
+    if run is None:
+        return  # Already finalized
+    job = extraction_jobs[job_id]
+    
+    with run['lock']:
+        to_submit = []
+        while run['pending'] and run['in_flight'] < RETRIEVE_CHUNK_CONFIG['max_concurrent_retrieves']:
+            to_submit.append(run['pending'].pop(0))
+            run['in_flight'] += 1
+    
+    for index in to_submit:
+        chunk_types = run['chunks'][index]
+        label = f"[{index + 1}/{len(run['chunks'])}]"
+        try:
+            async_id, error = submit_retrieve(
+                run['metadata_url'], get_metadata_retrieve_body(run['session_id'], chunk_types, run['members'])
+            )
+            if not error:
+                # Remember the async id so a restart polls this retrieve instead of submitting it again
+                run['checkpoint'].update_chunk(index, status='submitted', async_id=async_id)
+                job['progress'].append(f"{label} Submitted retrieve {async_id} for {', '.join(chunk_types)}")
+                poll_retrieve_chunk(job_id, index, async_id)
+        except Exception as e:
+            error = f"Retrieve exception: {str(e)}"
+        
+        # Once the poller has the retrieve, its callbacks finish the chunk instead
+        if error:
+            finish_retrieve_chunk(job_id, index, error=error)
+
+def poll_retrieve_chunk(job_id, index, async_id):
+    """Hand a submitted chunk's retrieve to the shared poller"""
+    run = active_extraction_runs[job_id]
+    job = extraction_jobs[job_id]
+    label = f"[{index + 1}/{len(run['chunks'])}]"
+
+    retrieve_poller.submit(
+        run['metadata_url'], run['session_id'], async_id,
+        on_complete=lambda retrieve_response: ingest_retrieve_chunk(job_id, index, retrieve_response),
+        on_error=lambda message: finish_retrieve_chunk(job_id, index, error=message),
+        on_progress=lambda message: job['progress'].append(f'{label} {message}')
+    )
+
+def save_checkpoint_zip(job, job_id, index, retrieve_response):
+    """Keep a completed retrieve's zip until its extraction finishes, returning the path or None
+
+    A restart then ingests the saved zip instead of retrieving it again. Failing to save only costs
+    that, so it is reported as a warning.
+    """
+    if not EXTRACTION_CHECKPOINT_CONFIG['save_zips']:
+        return None
+    try:
+        return save_retrieve_zip(job_id, index, retrieve_response)
+    except OSError as e:
+        job['progress'].append(f'Warning: Could not save retrieve zip for resuming: {str(e)}')
+        return None
+
+def ingest_retrieve_chunk(job_id, index, retrieve_response):
+    """Store the components of one completed chunk into the extraction job
+
+    Every outcome ends in exactly one finish_retrieve_chunk call, so the run always finalizes.
+    """
+    run = active_extraction_runs.get(job_id)
+    if run is None:
+        retrieve_response.close()
+        return  # The extraction timed out (see wait_for_extraction)
+    job = extraction_jobs[job_id]
+    checkpoint = run['checkpoint']
+    label = f"[{index + 1}/{len(run['chunks'])}]"
+    error = None
+    
+    try:
+        success_match = re.search(r'<success>(.*?)</success>', retrieve_response.text)
+        if success_match and success_match.group(1).lower() == 'false':
+            messages = re.findall(r'<message>(.*?)</message>', retrieve_response.text)
+            error = '; '.join(messages) or 'Retrieve operation was not successful'
+        elif retrieve_response.zip_file is None:
+            error = 'No zip file found in response'
+        else:
+            chunk = checkpoint.chunk(index)
+            if not (chunk['zip_path'] and os.path.exists(chunk['zip_path'])):
+                checkpoint.update_chunk(
+                    index, status='downloaded', zip_path=save_checkpoint_zip(job, job_id, index, retrieve_response)
+                )
+            
+            # Store Salesforce's lastModifiedDate so a later incremental extraction can compare against it
+            last_modified_by_file = {p['file_name']: p['last_modified'] for p in parse_file_properties(retrieve_response.text)}
+            with zipfile.ZipFile(retrieve_response.zip_file, 'r') as zip_file:
+                # Each batch commits with the count of zip entries done, so a restart skips them
+                component_table, components_stored, ingest_seconds = ingest_zip_components(
+                    job, zip_file, run['db_job_id'], run['integration_id'], run['type_mapping'], last_modified_by_file,
+                    skip_files=chunk['files_done'],
+                    on_batch=lambda files_done, component_ids: checkpoint.record_batch(index, files_done, component_ids),
+                    batch_context=lambda: checkpoint.committing(index)
+                )
+            checkpoint.update_chunk(index, status='ingested')
+    except Exception as e:
+        error = f'Error processing zip: {str(e)}'
+    finally:
+        retrieve_response.close()
+    
+    if error:
+        finish_retrieve_chunk(job_id, index, error=error)
+        return
+    
+    with run['lock']:
+        if not run['resumed']:
+            run['component_table'].extend(component_table)
+        run['components_stored'] += components_stored
+        run['chunks_completed'] += 1
+        total_stored = run['components_stored']
+        progress_stats = {
+            "totalFiles": total_stored,
+            "components_stored": total_stored,
+            "chunks_total": len(run['chunks']),
+            "chunks_completed": run['chunks_completed'],
+            "chunks_failed": len(run['chunks_failed'])
+        }
+    
+    # Publish partial results - the dashboard shows components from finished chunks straight away
+    job['data'] = progress_stats
+    job['progress'].append(
+        f'{label} Ingested {components_stored:,} components in {ingest_seconds:.1f}s ({total_stored:,} so far)'
+    )
+    try:
+        db.update_extraction_job(
+            job_id=run['db_job_id'],
+            job_status="running",
+            total_files=total_stored,
+            job_data=progress_stats
+        )
+    except Exception as e:
+        # The rows and checkpoint are committed; finalizing writes the totals again
+        job['progress'].append(f'{label} Warning: Could not update the extraction job: {str(e)}')
+    finish_retrieve_chunk(job_id, index)
+
+def finish_retrieve_chunk(job_id, index, error=None):
+    """Record that a chunk is done, then submit more work or finalize the extraction"""
+    run = active_extraction_runs.get(job_id)
+    if run is None:
+        return  # The extraction timed out (see wait_for_extraction)
+    job = extraction_jobs[job_id]
+    
+    if error:
+        try:
+            with run['checkpoint'].committing(index), db.transaction():
+                # A chunk that failed partway through ingest drops the batches it already committed
+                db.delete_metadata_components_by_id_ranges(
+                    run['db_job_id'], run['checkpoint'].chunk(index).get('id_ranges') or []
+                )
+                run['checkpoint'].update_chunk(index, status='failed', error=error, files_done=0, id_ranges=[])
+        except Exception as e:
+            job['progress'].append(f"Warning: Could not clear retrieve {index + 1}/{len(run['chunks'])}: {str(e)}")
+    
+    with run['lock']:
+        run['in_flight'] -= 1
+        if error:
+            run['chunks_failed'].append({
+                'chunk': index + 1,
+                'types': run['chunks'][index],
+                'error': error
+            })
+        all_done = not run['pending'] and run['in_flight'] == 0
+    
+    if error:
+        job['progress'].append(f"Warning: Retrieve {index + 1}/{len(run['chunks'])} failed: {error}")
+    
+    if all_done:
+        finalize_chunked_extraction(job_id)
+    else:
+        submit_next_retrieve_chunks(job_id)
+
+def load_extraction_components(run):
+    """Read a resumed extraction's components back from the database for dependency analysis
+
+    Components stored before the restart are only in the database; carried-forward ones are the
+    ids up to the checkpoint's carried_max_id and come back without content.
+    """
+    carried_max_id = run['checkpoint'].get('carried_max_id') or 0
+    rows = db.get_components_for_analysis(run['db_job_id'], content_after_id=carried_max_id)
+    run['carried_components'] = []
+    run['component_table'] = []
+    for row in rows:
+        component = {'component_id': row['amc_id'], 'name': row['amc_dev_name'], 'metadata_type': row['amt_name']}
+        if row['amc_id'] <= carried_max_id:
+            run['carried_components'].append(component)
+        else:
+            run['component_table'].append(dict(component, content=row['amc_content']))
+    run['components_stored'] = len(rows)
+
+def finalize_chunked_extraction(job_id):
+    """Analyze dependencies across all ingested chunks and complete the extraction job"""
+    run = active_extraction_runs.pop(job_id, None)
+    if run is None:
+        return  # Already finalized, or timed out
+    job = extraction_jobs[job_id]
+    checkpoint = run['checkpoint']
+    
+    try:
+        if run['chunks'] and run['chunks_completed'] == 0:
+            db.update_extraction_job(
+                job_id=run['db_job_id'],
+                job_status="error",
+                completed_at=datetime.now(),
+                log='; '.join(f"chunk {c['chunk']}: {c['error']}" for c in run['chunks_failed'])
+            )
+            job.update(
+                status='error',
+                error=run['chunks_failed'][0]['error'] if run['chunks_failed'] else 'Failed to extract metadata'
+            )
+            remove_saved_zips(job_id)
+            return
+        
+        # Dependencies stored before a restart are not analyzed again
+        analysis = checkpoint.get('analysis')
+        if analysis is None:
+            checkpoint.update(stage='analyzing')
+            if run['resumed']:
+                load_extraction_components(run)
+        
+            component_table = run['component_table']
+            job['progress'].append('Analyzing dependencies between components...')
+        
+            analysis_started = time.monotonic()
+            # Carried-forward components are resolvable targets but keep their previous dependencies
+            name_index = ComponentNameIndex.from_component_table(run['carried_components'] + component_table)
+            analysis_results = analyze_components(component_table, name_index, progress=job['progress'].append)
+            job['progress'].append(
+                f'Analyzed {len(analysis_results):,} components in {time.monotonic() - analysis_started:.1f}s'
+            )
+        
+            dependencies_stored, references_found = store_dependencies(job, analysis_results)
+            
+            dependencies_carried = 0
+            if run['carry_forward_ids']:
+                dependencies_carried = db.copy_dependencies_between_jobs(
+                    run['previous_job_id'], run['db_job_id'], run['carry_forward_ids'], created_user_id=243
+                )
+                job['progress'].append(f'Carried forward {dependencies_carried:,} dependencies of unchanged components')
+            
+            analysis = {
+                'components_stored': run['components_stored'],
+                'components_carried_forward': len(run['carried_components']),
+                'dependencies_stored': dependencies_stored,
+                'references_found': references_found,
+                'dependencies_carried': dependencies_carried
+            }
+            checkpoint.update(stage='dependencies_stored', analysis=analysis)
+        else:
+            job['progress'].append('Dependencies were already stored before the restart')
+        graph = refresh_dependency_graph(job, run['db_job_id'])
+        
+        components_stored = analysis['components_stored']
+        dependencies_stored = analysis['dependencies_stored'] + analysis['dependencies_carried']
+        metadata_stats = {
+            "totalFiles": components_stored,
+            "components_stored": components_stored,
+            "dependencies_stored": dependencies_stored,
+            "dependency_references": analysis['references_found'],
+            "mode": 'incremental' if run['previous_job_id'] else 'full',
+            "components_carried_forward": analysis['components_carried_forward'],
+            "dependencies_carried_forward": analysis['dependencies_carried'],
+            "chunks_total": len(run['chunks']),
+            "chunks_completed": run['chunks_completed'],
+            "chunks_failed": run['chunks_failed'],
+            "elapsed_seconds": round(time.monotonic() - run['started'], 1),
+            "resumed": run['resumed']
+        }
+        
+        db.update_extraction_job(
+            job_id=run['db_job_id'],
+            job_status="completed",
+            completed_at=datetime.now(),
+            total_files=components_stored,
+            job_data=metadata_stats
+        )
+        checkpoint.update(stage='completed')
+        remove_saved_zips(job_id)
+        if graph is not None:
+            dependency_graph_cache.put(run['db_job_id'], graph)
+        
+        if run['chunks_failed']:
+            job['progress'].append(f"Warning: {len(run['chunks_failed'])} of {len(run['chunks'])} retrieves failed")
+        job['progress'].append(f'Successfully processed {components_stored} files!')
+        job['progress'].append(f'Stored {dependencies_stored} dependencies')
+        
+        job.update(status='success', data=metadata_stats, end_time=datetime.now())
+        
+    except Exception as e:
+        job.update(status='error', error=f'Error finalizing extraction: {str(e)}')
+
 def extract_metadata_to_database(job_id, session_id, metadata_url, integration_id):
     """Extract metadata directly to database without local files - COMPREHENSIVE EXTRACTION"""
     job = extraction_jobs[job_id]
@@ -2453,8 +3478,7 @@ def extract_metadata_to_database(job_id, session_id, metadata_url, integration_i
         response = requests.post(metadata_url, data=retrieve_body, headers=headers, timeout=300)  # 5 minutes timeout for comprehensive extraction
         
         if response.status_code != 200:
-            job['status'] = 'error'
-            job['error'] = f"Retrieve failed: {response.status_code}"
+            job.update(status='error', error=f"Retrieve failed: {response.status_code}")
             return False
         
         response_text = response.text
@@ -2462,249 +3486,160 @@ def extract_metadata_to_database(job_id, session_id, metadata_url, integration_i
         # Check for faults
         if '<soapenv:Fault>' in response_text:
             fault_match = re.search(r'<faultstring>(.*?)</faultstring>', response_text)
-            job['status'] = 'error'
-            job['error'] = fault_match.group(1) if fault_match else "Unknown SOAP fault"
+            job.update(status='error', error=fault_match.group(1) if fault_match else "Unknown SOAP fault")
             return False
         
         # Extract async ID
         id_match = re.search(r'<id>(.*?)</id>', response_text)
         if not id_match:
-            job['status'] = 'error'
-            job['error'] = "No async ID found in response"
+            job.update(status='error', error="No async ID found in response")
             return False
         
         async_id = id_match.group(1)
         job['progress'].append(f'Job ID: {async_id}')
         
+        # Record the retrieve on a running extraction job, so a restart polls it again by its async id
+        checkpoint = ExtractionCheckpoint.start(job_id, [COMPREHENSIVE_RETRIEVE_TYPES], pipeline='single')
+        checkpoint.update_chunk(0, status='submitted', async_id=async_id)
+        db_job_id = db.create_extraction_job(
+            org_id=409,
+            integration_id=integration_id,
+            job_status="running",
+            total_files=0,  # Will be updated after processing
+            created_user_id=243,
+            job_key=job_id,
+            checkpoint=checkpoint.snapshot()
+        )
+        
+        if not db_job_id:
+            job.update(status='error', error='Failed to create extraction job in database')
+            return False
+        checkpoint.save = lambda data: db.save_extraction_checkpoint(db_job_id, data)
+        
         # Check if immediately done
         done_match = re.search(r'<done>(.*?)</done>', response_text)
         if done_match and done_match.group(1).lower() == 'true':
             job['progress'].append('Job completed immediately!')
-            return process_zip_to_database(job_id, response_text, integration_id)
+            # The retrieve() reply never carries the zip - fetch it with checkRetrieveStatus
+            status_code, retrieve_response = check_retrieve_status(metadata_url, session_id, async_id)
+            if retrieve_response is not None:
+                return process_zip_to_database(job_id, retrieve_response, integration_id, db_job_id, checkpoint)
         
         # Poll for completion
-        return poll_and_process_to_database(job_id, session_id, metadata_url, async_id, integration_id)
+        return poll_and_process_to_database(job_id, session_id, metadata_url, async_id, integration_id,
+                                            db_job_id, checkpoint)
         
     except Exception as e:
-        job['status'] = 'error'
-        job['error'] = f"Retrieve exception: {str(e)}"
+        job.update(status='error', error=f"Retrieve exception: {str(e)}")
         return False
 
-def poll_and_process_to_database(job_id, session_id, metadata_url, async_id, integration_id):
-    """Poll for completion and process zip directly to database - INCREASED TIMEOUT FOR COMPREHENSIVE EXTRACTION"""
+def poll_and_process_to_database(job_id, session_id, metadata_url, async_id, integration_id, db_job_id, checkpoint):
+    """Hand the retrieve to the shared poller; the zip is processed into the database when it completes
+
+    Returns True once polling has started - the job's status is set by the completion or error callback.
+    """
     job = extraction_jobs[job_id]
     
-    check_body = f'''<?xml version="1.0" encoding="UTF-8"?>
-<soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/" xmlns:met="http://soap.sforce.com/2006/04/metadata">
-   <soapenv:Header>
-      <met:SessionHeader>
-         <met:sessionId>{session_id}</met:sessionId>
-      </met:SessionHeader>
-   </soapenv:Header>
-   <soapenv:Body>
-      <met:checkRetrieveStatus>
-         <met:asyncProcessId>{async_id}</met:asyncProcessId>
-      </met:checkRetrieveStatus>
-   </soapenv:Body>
-</soapenv:Envelope>'''
-    
-    headers = {
-        'Content-Type': 'text/xml; charset=UTF-8',
-        'SOAPAction': 'checkRetrieveStatus'
-    }
-    
-    # INCREASED TIMEOUT: 60 attempts × 60 seconds = 60 minutes max
-    max_attempts = 60  # Increased from 15 to 60
-    attempt = 0
-    
     job['progress'].append('Polling for completion (comprehensive extraction - this may take 15-30 minutes)...')
     
-    while attempt < max_attempts:
-        attempt += 1
-        job['progress'].append(f'Checking status... ({attempt}/{max_attempts}) - Comprehensive extraction in progress')
-        
-        try:
-            response = requests.post(metadata_url, data=check_body, headers=headers, timeout=180)  # Increased timeout to 3 minutes
-            
-            if response.status_code != 200:
-                job['status'] = 'error'
-                job['error'] = f"Status check failed: {response.status_code}"
-                return False
-            
-            response_text = response.text
-            
-            # Check for faults
-            if '<soapenv:Fault>' in response_text:
-                fault_match = re.search(r'<faultstring>(.*?)</faultstring>', response_text)
-                job['status'] = 'error'
-                job['error'] = fault_match.group(1) if fault_match else "Unknown SOAP fault"
-                return False
-            
-            # Check if done
-            done_match = re.search(r'<done>(.*?)</done>', response_text)
-            if done_match and done_match.group(1).lower() == 'true':
-                job['progress'].append('✅ Job completed! Processing immediately...')
-                return process_zip_to_database(job_id, response_text, integration_id)
-            
-            # Wait before next check - increased from 2 to 60 seconds
-            time.sleep(60)
-            
-        except Exception as e:
-            job['progress'].append(f'Error checking status: {str(e)}')
-            time.sleep(60)  # Increased from 2 to 60 seconds
-    
-    job['status'] = 'error'
-    job['error'] = 'Job timed out (60 minutes) - Comprehensive extraction may take longer'
-    return False
-
-def process_zip_to_database(job_id, response_text, integration_id):
-    """Process zip file in memory and store components directly to database"""
+    def on_complete(retrieve_response):
+        job['progress'].append('✅ Job completed! Processing immediately...')
+        process_zip_to_database(job_id, retrieve_response, integration_id, db_job_id, checkpoint)
+    
+    retrieve_poller.submit(
+        metadata_url, session_id, async_id,
+        on_complete=on_complete,
+        on_error=lambda message: mark_job_error(job_id, message),
+        on_progress=job['progress'].append
+    )
+    return True
+
+def process_zip_to_database(job_id, retrieve_response, integration_id, db_job_id, checkpoint):
+    """Process the retrieved zip and store components directly to database
+
+    retrieve_response is a retrieve_stream.RetrieveResponse (or raw response text). db_job_id is the
+    running extraction job created when the retrieve was submitted and checkpoint its
+    ExtractionCheckpoint; each stage is recorded on it so a restart can resume.
+    """
     job = extraction_jobs[job_id]
+    if isinstance(retrieve_response, str):
+        retrieve_response = parse_retrieve_text(retrieve_response)
+    response_text = retrieve_response.text
     
     try:
         # Verify success
         success_match = re.search(r'<success>(.*?)</success>', response_text)
         if success_match and success_match.group(1).lower() == 'false':
-            job['status'] = 'error'
-            job['error'] = 'Retrieve operation was not successful'
+            job.update(status='error', error='Retrieve operation was not successful')
             # Look for error messages
             messages = re.findall(r'<message>(.*?)</message>', response_text)
             for msg in messages:
                 job['progress'].append(f'Error message: {msg}')
             return False
         
-        # Extract zip file content
-        zip_match = re.search(r'<zipFile>(.*?)</zipFile>', response_text, re.DOTALL)
-        if not zip_match:
-            job['status'] = 'error'
-            job['error'] = 'No zip file found in response'
+        # The zip payload was decoded into a spooled file while the response streamed in
+        if retrieve_response.zip_file is None:
+            job.update(status='error', error='No zip file found in response')
             return False
         
-        zip_b64 = zip_match.group(1).strip()
-        
         job['progress'].append('Decoding and processing zip file...')
-        zip_data = base64.b64decode(zip_b64)
-        job['progress'].append(f'Zip file size: {len(zip_data):,} bytes')
-        
-        # Process zip file in memory
-        job['progress'].append('Processing files in memory...')
-        
-        # Create extraction job in database
-        db_job_id = db.create_extraction_job(
-            org_id=409,
-            integration_id=integration_id,
-            job_status="completed",
-            total_files=0,  # Will be updated after processing
-            created_user_id=243
+        job['progress'].append(f'Zip file size: {retrieve_response.zip_size:,} bytes')
+        checkpoint.update_chunk(
+            0, status='downloaded', zip_path=save_checkpoint_zip(job, job_id, 0, retrieve_response)
         )
         
-        if not db_job_id:
-            job['progress'].append('Warning: Failed to create extraction job in database')
-            return False
+        # Process zip file without extracting it to disk
+        job['progress'].append('Processing files in memory...')
         
         # Get metadata types for mapping
-        metadata_types = db.get_metadata_types(org_id=409)
-        type_mapping = {mt['amt_name']: mt['amt_id'] for mt in metadata_types}
-        
-        components_stored = 0
-        dependencies_stored = 0
-        component_map = {}  # Map component name (without extension) to component_id for dependency creation
+        type_mapping = metadata_type_registry.get(409).ids
+        
+        # Process zip file in memory, streaming rows into the database in multi-row batches;
+        # each batch commits with the number of zip entries done so a restart continues after it
+        last_modified_by_file = {p['file_name']: p['last_modified'] for p in parse_file_properties(response_text)}
+        with zipfile.ZipFile(retrieve_response.zip_file, 'r') as zip_file:
+            component_table, components_stored, ingest_seconds = ingest_zip_components(
+                job, zip_file, db_job_id, integration_id, type_mapping, last_modified_by_file,
+                on_batch=lambda files_done, component_ids: checkpoint.record_batch(0, files_done, component_ids),
+                batch_context=lambda: checkpoint.committing(0)
+            )
+        checkpoint.update_chunk(0, status='ingested')
         
-        # Process zip file in memory
-        with zipfile.ZipFile(io.BytesIO(zip_data), 'r') as zip_file:
-            for file_info in zip_file.filelist:
-                if file_info.is_dir():
-                    continue
-                
-                filename = file_info.filename
-                
-                # Determine metadata type
-                metadata_type = get_file_type_from_path(filename)
-                type_id = type_mapping.get(metadata_type)
-                
-                if not type_id:
-                    continue  # Skip unknown types
-                
-                try:
-                    # Read file content from zip
-                    content = zip_file.read(filename).decode('utf-8', errors='ignore')
-                    
-                    # Create metadata component in database WITHOUT AI summary
-                    component_id = db.create_metadata_component(
-                        org_id=409,
-                        integration_id=integration_id,
-                        extraction_job_id=db_job_id,
-                        metadata_type_id=type_id,
-                        label=os.path.basename(filename),
-                        dev_name=os.path.basename(filename).replace('.cls', '').replace('.trigger', '').replace('.object', '').replace('.flow', '').replace('.layout', ''),
-                        notes=f"Extracted from {filename}",
-                        content=content,
-                        ai_summary=None,  # No AI summary during extraction
-                        ai_model=None,     # No AI model during extraction
-                        last_modified=datetime.now(),
-                        api_version="62.0",
-                        created_user_id=243
-                    )
-                    
-                    if component_id:
-                        components_stored += 1
-                        # Store with component name (without extension) as key
-                        component_name = os.path.basename(filename).replace('.cls', '').replace('.trigger', '').replace('.object', '').replace('.flow', '').replace('.layout', '')
-                        component_map[component_name] = component_id
-                    
-                except Exception as e:
-                    job['progress'].append(f'Warning: Failed to store component {filename}: {str(e)}')
-                    continue
+        ingest_rate = components_stored / ingest_seconds if ingest_seconds > 0 else 0
+        job['progress'].append(
+            f'Ingested {components_stored:,} components in {ingest_seconds:.1f}s ({ingest_rate:,.0f} rows/sec)'
+        )
         
         # Now analyze and store dependencies
+        checkpoint.update(stage='analyzing')
         job['progress'].append('Analyzing dependencies between components...')
         
-        # Process dependencies in memory
-        for component_name, component_id in component_map.items():
-            # Analyze dependencies based on file type
-            dependencies = []
-            
-            # Determine file type from component name (we need to check what type this component is)
-            component = db.get_metadata_component(component_id)
-            if not component:
-                continue
-                
-            metadata_type_id = component.get('amc_metadata_type_id')
-            
-            # Analyze based on metadata type
-            if metadata_type_id == 1:  # Apex Class
-                dependencies = analyze_apex_class_dependencies_in_memory(component_name + '.cls', component_map)
-            elif metadata_type_id == 2:  # Apex Trigger
-                dependencies = analyze_apex_trigger_dependencies_in_memory(component_name + '.trigger', component_map)
-            elif metadata_type_id == 3:  # Custom Object
-                dependencies = analyze_custom_object_dependencies_in_memory(component_name + '.object', component_map)
-            elif metadata_type_id == 4:  # Flow
-                dependencies = analyze_flow_dependencies_in_memory(component_name + '.flow', component_map)
-            elif metadata_type_id == 5:  # Layout
-                dependencies = analyze_layout_dependencies_in_memory(component_name + '.layout', component_map)
-            
-            # Store dependencies in database
-            for dep in dependencies:
-                try:
-                    dependency_id = db.create_dependency(
-                        org_id=409,
-                        from_component_id=component_id,
-                        to_component_id=dep['to_component_id'],
-                        dependency_type=dep['type'],
-                        description=dep['description'],
-                        created_user_id=243
-                    )
-                    if dependency_id:
-                        dependencies_stored += 1
-                except Exception as e:
-                    job['progress'].append(f'Warning: Failed to store dependency: {str(e)}')
-                    continue
+        # Analyze the content decoded from the zip - large extractions are sharded across a process pool
+        analysis_started = time.monotonic()
+        name_index = ComponentNameIndex.from_component_table(component_table)
+        analysis_results = analyze_components(component_table, name_index, progress=job['progress'].append)
+        job['progress'].append(
+            f'Analyzed {len(analysis_results):,} components in {time.monotonic() - analysis_started:.1f}s'
+        )
+        
+        # Store each distinct edge once, with how many times it was referenced
+        dependencies_stored, references_found = store_dependencies(job, analysis_results)
+        checkpoint.update(stage='dependencies_stored', analysis={
+            'components_stored': components_stored,
+            'components_carried_forward': 0,
+            'dependencies_stored': dependencies_stored,
+            'references_found': references_found,
+            'dependencies_carried': 0
+        })
+        graph = refresh_dependency_graph(job, db_job_id)
         
         # Update job with final stats
         metadata_stats = {
             "totalFiles": components_stored,
             "components_stored": components_stored,
-            "dependencies_stored": dependencies_stored
+            "dependencies_stored": dependencies_stored,
+            "dependency_references": references_found,
+            "ingest_rows_per_sec": round(ingest_rate, 1)
         }
         
         db.update_extraction_job(
@@ -2714,295 +3649,135 @@ def process_zip_to_database(job_id, response_text, integration_id):
             total_files=components_stored,
             job_data=metadata_stats
         )
+        checkpoint.update(stage='completed')
+        remove_saved_zips(job_id)
+        if graph is not None:
+            dependency_graph_cache.put(db_job_id, graph)
         
         job['progress'].append(f'Successfully processed {components_stored} files!')
         job['progress'].append(f'Stored {dependencies_stored} dependencies')
         
-        job['status'] = 'success'
-        job['data'] = metadata_stats
-        job['end_time'] = datetime.now()
+        job.update(status='success', data=metadata_stats, end_time=datetime.now())
         
         return True
         
     except zipfile.BadZipFile:
-        job['status'] = 'error'
-        job['error'] = 'Received invalid zip file'
+        job.update(status='error', error='Received invalid zip file')
         return False
     except Exception as e:
-        job['status'] = 'error'
-        job['error'] = f'Error processing zip: {str(e)}'
+        job.update(status='error', error=f'Error processing zip: {str(e)}')
         return False
+    finally:
+        retrieve_response.close()
+
+def ingest_zip_components(job, zip_file, db_job_id, integration_id, type_mapping, last_modified_by_file=None,
+                          skip_files=0, on_batch=None, batch_context=None):
+    """Bulk insert every known metadata file in the zip into ids_audit_metadata_component
+
+    Rows are flushed in batches of INGEST_BATCH_SIZE inside one transaction, so either the
+    whole zip is stored or nothing is. A batch the database rejects is retried row by row and
+    files whose row still fails are skipped with a warning. With on_batch, each batch commits on
+    its own instead and calls on_batch(files_done, component_ids) inside its transaction with the
+    number of zip entries now stored and the batch's new amc_ids, so a checkpoint commits together
+    with its rows; skip_files resumes after that many entries. batch_context, if given, returns a
+    context manager entered around each batch's transaction (ExtractionCheckpoint.committing).
+    last_modified_by_file maps zip paths to Salesforce's lastModifiedDate (from the retrieve's
+    fileProperties); files without one get the current time.
+
+    Returns (component_table, components_stored, elapsed_seconds). component_table holds
+    {'component_id', 'name', 'metadata_type', 'content'} for every file stored by this call so
+    dependency analysis can run on the decoded content without reading it back from the database.
+    """
+    component_table = []
+    components_stored = 0
+    pending = []
+    started = time.monotonic()
+
+    def flush(files_done):
+        nonlocal components_stored
+        with batch_context() if batch_context else nullcontext(), db.transaction():
+            try:
+                with db.savepoint():
+                    component_ids = db.bulk_create_metadata_components([row for row, _, _ in pending],
+                                                                       page_size=INGEST_BATCH_SIZE)
+                stored = list(pending)
+            except Exception as e:
+                if db.is_connection_error(e):
+                    raise
+                # One bad row fails the whole INSERT - store the batch row by row and skip the bad ones
+                stored, component_ids = [], []
+                for row, metadata_type, filename in pending:
+                    try:
+                        with db.savepoint():
+                            component_ids.extend(db.bulk_create_metadata_components([row]))
+                        stored.append((row, metadata_type, filename))
+                    except Exception as e:
+                        if db.is_connection_error(e):
+                            raise
+                        job['progress'].append(f'Warning: Failed to store component {filename}: {str(e)}')
+            if on_batch:
+                on_batch(files_done, component_ids)
+        for (row, metadata_type, _), component_id in zip(stored, component_ids):
+            component_table.append({
+                'component_id': component_id,
+                'name': row['dev_name'],
+                'metadata_type': metadata_type,
+                'content': row['content']
+            })
+        components_stored += len(component_ids)
+        pending.clear()
 
-def analyze_apex_class_dependencies_in_memory(filename, component_map):
-    """Analyze Apex class dependencies in memory"""
-    dependencies = []
-    
-    # Get the component ID for this component name
-    source_component_name = filename.replace('.cls', '')
-    source_component_id = component_map.get(source_component_name)
-    if not source_component_id:
-        return dependencies
-    
-    # Get the content from the database for this component
-    try:
-        component = db.get_metadata_component(source_component_id)
-        if not component or not component.get('amc_content'):
-            return dependencies
-        
-        content = component['amc_content']
-        source_name = source_component_name
-        
-        # Use the actual component ID from database, not from map
-        actual_source_component_id = component['amc_id']
-        
-        # SOQL queries
-        soql_pattern = r'(?i)SELECT\s+.+?\s+FROM\s+(\w+)'
-        for match in re.finditer(soql_pattern, content):
-            obj_name = match.group(1)
-            if '_' in obj_name and not obj_name.endswith('__c'):
-                obj_name = f"{obj_name}__c"
-            
-            # Find the component ID for this object
-            target_component_id = component_map.get(obj_name)
-            if target_component_id and target_component_id != actual_source_component_id:
-                dependencies.append({
-                    'to_component_id': target_component_id,
-                    'type': 'soql_query',
-                    'description': f'{source_name} queries {obj_name}'
-                })
-        
-        # DML operations
-        dml_pattern = r'(?i)(insert|update|delete|upsert|merge)\s+(\w+)'
-        for match in re.finditer(dml_pattern, content):
-            var_name = match.group(2)
-            if var_name.lower() not in ['list', 'set', 'map', 'string', 'integer', 'boolean']:
-                target_component_id = component_map.get(var_name)
-                if target_component_id and target_component_id != actual_source_component_id:
-                    dependencies.append({
-                        'to_component_id': target_component_id,
-                        'type': 'dml_operation',
-                        'description': f'{source_name} performs {match.group(1)} on {var_name}'
-                    })
-        
-        # Class references
-        class_pattern = r'(?i)public\s+class\s+(\w+)\s+extends\s+(\w+)'
-        for match in re.finditer(class_pattern, content):
-            parent_class = match.group(2)
-            target_component_id = component_map.get(parent_class)
-            if target_component_id and target_component_id != actual_source_component_id:
-                dependencies.append({
-                    'to_component_id': target_component_id,
-                    'type': 'class_inheritance',
-                    'description': f'{source_name} extends {parent_class}'
-                })
-        
-        # Interface implementations
-        interface_pattern = r'(?i)public\s+class\s+(\w+)\s+implements\s+(\w+)'
-        for match in re.finditer(interface_pattern, content):
-            interface_name = match.group(2)
-            target_component_id = component_map.get(interface_name)
-            if target_component_id and target_component_id != actual_source_component_id:
-                dependencies.append({
-                    'to_component_id': target_component_id,
-                    'type': 'interface_implementation',
-                    'description': f'{source_name} implements {interface_name}'
-                })
-        
-    except Exception as e:
-        print(f"Error analyzing Apex class dependencies in memory for {filename}: {str(e)}")
-    
-    return dependencies
+        elapsed = time.monotonic() - started
+        rate = components_stored / elapsed if elapsed > 0 else 0
+        job['progress'].append(f'Stored {components_stored:,} components so far ({rate:,.0f} rows/sec)')
 
-def analyze_apex_trigger_dependencies_in_memory(filename, component_map):
-    """Analyze Apex trigger dependencies in memory"""
-    dependencies = []
-    
-    # Get the component ID for this component name
-    source_component_name = filename.replace('.trigger', '')
-    source_component_id = component_map.get(source_component_name)
-    if not source_component_id:
-        return dependencies
-    
-    try:
-        component = db.get_metadata_component(source_component_id)
-        if not component or not component.get('amc_content'):
-            return dependencies
-        
-        content = component['amc_content']
-        source_name = source_component_name
-        
-        # Extract object the trigger is on
-        object_match = re.search(r'trigger\s+\w+\s+on\s+(\w+)', content, re.IGNORECASE)
-        if object_match:
-            obj_name = object_match.group(1)
-            target_component_id = component_map.get(obj_name)
-            if target_component_id and target_component_id != source_component_id:
-                dependencies.append({
-                    'to_component_id': target_component_id,
-                    'type': 'trigger_on_object',
-                    'description': f'{source_name} trigger operates on {obj_name}'
-                })
-        
-    except Exception as e:
-        print(f"Error analyzing Apex trigger dependencies in memory for {filename}: {str(e)}")
-    
-    return dependencies
+    with db.transaction() if on_batch is None else nullcontext():
+        for position, file_info in enumerate(zip_file.filelist):
+            if position < skip_files or file_info.is_dir():
+                continue
 
-def analyze_custom_object_dependencies_in_memory(filename, component_map):
-    """Analyze Custom Object dependencies in memory"""
-    dependencies = []
-    
-    # Get the component ID for this component name
-    source_component_name = filename.replace('.object', '')
-    source_component_id = component_map.get(source_component_name)
-    if not source_component_id:
-        return dependencies
-    
-    try:
-        component = db.get_metadata_component(source_component_id)
-        if not component or not component.get('amc_content'):
-            return dependencies
-        
-        content = component['amc_content']
-        source_name = source_component_name
-        
-        # Parse XML content for field relationships
-        try:
-            root = ET.fromstring(content)
-            
-            # Define namespace for Salesforce metadata
-            ns = {'sf': 'http://soap.sforce.com/2006/04/metadata'}
-            
-            # Find field relationships
-            for field_elem in root.findall('.//sf:fields', ns):
-                field_name_elem = field_elem.find('sf:fullName', ns)
-                ref_to_elem = field_elem.find('sf:referenceTo', ns)
-                type_elem = field_elem.find('sf:type', ns)
-                
-                if field_name_elem is not None and ref_to_elem is not None:
-                    field_name = field_name_elem.text
-                    ref_to = ref_to_elem.text
-                    field_type = type_elem.text if type_elem is not None else None
-                    
-                    # Look for reference relationships
-                    if ref_to and field_type in ['Lookup', 'MasterDetail']:
-                        target_component_id = component_map.get(ref_to)
-                        if target_component_id and target_component_id != source_component_id:
-                            dependencies.append({
-                                'to_component_id': target_component_id,
-                                'type': 'object_reference',
-                                'description': f'{source_name} has {field_type} field referencing {ref_to}'
-                            })
-            
-        except ET.ParseError as e:
-            print(f"Error parsing XML for {filename}: {str(e)}")
-        
-    except Exception as e:
-        print(f"Error analyzing Custom Object dependencies in memory for {filename}: {str(e)}")
-    
-    return dependencies
+            filename = file_info.filename
 
-def analyze_flow_dependencies_in_memory(filename, component_map):
-    """Analyze Flow dependencies in memory"""
-    dependencies = []
-    
-    # Get the component ID for this component name
-    source_component_name = filename.replace('.flow', '')
-    source_component_id = component_map.get(source_component_name)
-    if not source_component_id:
-        return dependencies
-    
-    try:
-        component = db.get_metadata_component(source_component_id)
-        if not component or not component.get('amc_content'):
-            return dependencies
-        
-        content = component['amc_content']
-        source_name = source_component_name
-        
-        # Parse XML content for dependencies
-        try:
-            root = ET.fromstring(content)
-            
-            # Define namespace for Salesforce metadata
-            ns = {'sf': 'http://soap.sforce.com/2006/04/metadata'}
-            
-            # Find object references
-            for obj_elem in root.findall('.//sf:object', ns):
-                if obj_elem.text:
-                    obj_name = obj_elem.text
-                    target_component_id = component_map.get(obj_name)
-                    if target_component_id and target_component_id != source_component_id:
-                        dependencies.append({
-                            'to_component_id': target_component_id,
-                            'type': 'flow_object_reference',
-                            'description': f'{source_name} flow references object {obj_name}'
-                        })
-            
-            # Find Apex class references
-            for apex_elem in root.findall('.//sf:apexClass', ns):
-                if apex_elem.text:
-                    apex_class = apex_elem.text
-                    target_component_id = component_map.get(apex_class)
-                    if target_component_id and target_component_id != source_component_id:
-                        dependencies.append({
-                            'to_component_id': target_component_id,
-                            'type': 'flow_apex_reference',
-                            'description': f'{source_name} flow calls Apex class {apex_class}'
-                        })
-            
-        except ET.ParseError as e:
-            print(f"Error parsing XML for {filename}: {str(e)}")
-        
-    except Exception as e:
-        print(f"Error analyzing Flow dependencies in memory for {filename}: {str(e)}")
-    
-    return dependencies
+            # Determine metadata type
+            metadata_type = get_file_type_from_path(filename)
+            type_id = type_mapping.get(metadata_type)
 
-def analyze_layout_dependencies_in_memory(filename, component_map):
-    """Analyze Layout dependencies in memory"""
-    dependencies = []
-    
-    # Get the component ID for this component name
-    source_component_name = filename.replace('.layout', '')
-    source_component_id = component_map.get(source_component_name)
-    if not source_component_id:
-        return dependencies
-    
-    try:
-        component = db.get_metadata_component(source_component_id)
-        if not component or not component.get('amc_content'):
-            return dependencies
-        
-        content = component['amc_content']
-        source_name = source_component_name
-        
-        # Parse XML content for dependencies
-        try:
-            root = ET.fromstring(content)
-            
-            # Define namespace for Salesforce metadata
-            ns = {'sf': 'http://soap.sforce.com/2006/04/metadata'}
-            
-            # Find object references
-            for obj_elem in root.findall('.//sf:object', ns):
-                if obj_elem.text:
-                    obj_name = obj_elem.text
-                    target_component_id = component_map.get(obj_name)
-                    if target_component_id and target_component_id != source_component_id:
-                        dependencies.append({
-                            'to_component_id': target_component_id,
-                            'type': 'layout_object_reference',
-                            'description': f'{source_name} layout is for object {obj_name}'
-                        })
-            
-        except ET.ParseError as e:
-            print(f"Error parsing XML for {filename}: {str(e)}")
-        
-    except Exception as e:
-        print(f"Error analyzing Layout dependencies in memory for {filename}: {str(e)}")
-    
-    return dependencies
+            if not type_id:
+                continue  # Skip unknown types
+
+            try:
+                # Read file content from zip
+                content = zip_file.read(filename).decode('utf-8', errors='ignore')
+                # Binary bodies (StaticResource, Document) can hold NUL, which PostgreSQL text rejects
+                content = content.replace('\x00', '')
+            except Exception as e:
+                job['progress'].append(f'Warning: Failed to read component {filename}: {str(e)}')
+                continue
+
+            base_name = os.path.basename(filename)
+            pending.append(({
+                'org_id': 409,
+                'integration_id': integration_id,
+                'extraction_job_id': db_job_id,
+                'metadata_type_id': type_id,
+                'label': base_name,
+                'dev_name': get_dev_name(base_name),
+                'notes': f"Extracted from {filename}",
+                'content': content,
+                'ai_summary': None,  # No AI summary during extraction
+                'ai_model': None,     # No AI model during extraction
+                'last_modified': (last_modified_by_file or {}).get(filename) or datetime.now(),
+                'api_version': "62.0",
+                'created_user_id': 243
+            }, metadata_type, filename))
+
+            if len(pending) >= INGEST_BATCH_SIZE:
+                flush(position + 1)
+
+        if pending:
+            flush(len(zip_file.filelist))
+
+    return component_table, components_stored, time.monotonic() - started
 
 @app.route('/api/mylists/<int:list_id>/generate-summaries', methods=['POST'])
 def generate_list_summaries(list_id):
@@ -3133,19 +3908,31 @@ def update_metadata_component_notes(component_id):
 
 @app.route('/api/search-metadata', methods=['GET'])
 def search_metadata():
-    """Search metadata components"""
+    """Search metadata components, ranked best match first
+
+    Query args: search_term, org_id, metadata_type_id, limit (capped at SEARCH_CONFIG['max_limit'])
+    and fields (extra columns such as content, as for the component listings).
+    """
     try:
         org_id = request.args.get('org_id', 409)  # Default org_id
         search_term = request.args.get('search_term')
         metadata_type_id = request.args.get('metadata_type_id')
+        limit = request.args.get('limit', type=int)
         
         if metadata_type_id:
             metadata_type_id = int(metadata_type_id)
         
+        fields = [f.strip() for f in request.args.get('fields', '').split(',') if f.strip()]
+        unknown = [f for f in fields if f not in COMPONENT_OPTIONAL_COLUMNS]
+        if unknown:
+            return jsonify({'success': False, 'error': f"Unknown fields: {', '.join(unknown)}"}), 400
+        
         components = db.search_metadata_components(
             org_id=int(org_id),
             search_term=search_term,
-            metadata_type_id=metadata_type_id
+            metadata_type_id=metadata_type_id,
+            limit=limit,
+            fields=fields
         )
         
         return jsonify({
@@ -3179,6 +3966,9 @@ if __name__ == '__main__':
     print("   GET  /api/extraction-jobs/<id> - Get extraction job")
     print("   GET  /api/extraction-jobs/integration/<id> - Get jobs by integration")
     print("   PUT  /api/extraction-jobs/<id> - Update extraction job")
+    print("   POST /api/extraction-jobs/<id>/resume - Resume an interrupted extraction from its checkpoint")
+    print("   GET  /api/dashboard/job-status/<job_id>/stream - Stream extraction progress (server-sent events)")
+    print("   GET  /api/extraction-jobs/<id>/cycles - Get circular dependency groups")
     print("   GET  /api/metadata-components/<job_id> - Get components by job")
     print("   GET  /api/metadata-component/<component_id> - Get specific component")
     print("   GET  /api/metadata-from-integration/<integration_id> - Get metadata from integration")
@@ -3189,11 +3979,18 @@ if __name__ == '__main__':
     print("   GET  /api/metadata-files/<id>/<type> - List files")
     print("   POST /api/login-test - Test login credentials")
     print("   GET  /api/health - Health check")
+    print("   GET  /api/health/db-pool - Database connection pool statistics")
+    print("   GET  /api/extraction-queue - Extraction queue depth, wait times and queued jobs")
     print("   POST /api/metadata-component/<id>/generate-summary - Generate AI summary")
     print("   GET  /api/metadata-component/<id>/details - Get component details")
     print("   GET  /api/metadata-component/<id>/dependencies - Get component dependencies")
     print("   GET  /api/metadata-component/<id>/content - Get component content")
     print("   GET  /api/metadata-component/<id>/dependency-network - Get dependency network")
+    print("   GET  /api/metadata-component/<id>/graph/reachable - Get reachable components")
+    print("   GET  /api/metadata-component/<id>/graph/path/<target_id> - Get shortest dependency path")
+    print("   GET  /api/metadata-component/<id>/graph/degree - Get dependency counts")
+    print("   GET  /api/metadata-component/<id>/impact - Get transitive impact (affected or needed components)")
+    print("   GET  /api/dependency-graph/stats - Dependency graph cache statistics")
     print("   POST /api/mylists - Create MyList")
     print("   GET  /api/mylists/user/<user_id>/org/<org_id> - Get user MyLists")
     print("   GET  /api/mylists/<id> - Get MyList by ID")
@@ -3202,6 +3999,16 @@ if __name__ == '__main__':
     print("   DELETE /api/mylists/<id>/components/<component_id> - Remove component from MyList")
     print("   GET  /api/mylists/<id>/dependency-network - Get MyList dependency network")
     print("   POST /api/mylists/<id>/generate-summaries - Generate AI summaries for all components in a list")
+    
+    # Dashboard extractions left in the queue - still queued, or running under a worker that stopped
+    # heartbeating - are claimed as workers free up, unless extraction_worker.py processes run them
+    if EXTRACTION_SCHEDULER_CONFIG['run_locally']:
+        extraction_scheduler.claim_persisted(claim_queued_extraction)
+    # Extractions interrupted mid-retrieve continue from their checkpoint
+    if EXTRACTION_CHECKPOINT_CONFIG['resume_on_startup']:
+        resumed = resume_interrupted_extractions()
+        if resumed:
+            print(f"♻️  Resuming {resumed} interrupted extraction jobs from their checkpoints")
     print("\n✨ Ready to work with database and extract metadata!")
     
     app.run(debug=False, host='0.0.0.0', port=5000) 
\ No newline at end of file
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Test script to verify component name resolution used by dependency analysis
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from dependency_analysis import ComponentNameIndex, split_namespace
+
+def test_component_name_index():
+    """Test case, suffix, namespace and type aware lookups"""
+    try:
+        print("🔍 Testing Component Name Index")
+        print("=" * 50)
+
+        assert split_namespace('Invoice__c') == (None, 'Invoice__c')
+        assert split_namespace('acme__Invoice__c') == ('acme', 'Invoice__c')
+        assert split_namespace('acme__InvoiceService') == ('acme', 'InvoiceService')
+        assert split_namespace('Setting__mdt') == (None, 'Setting__mdt')
+        print("✅ Namespaces split correctly")
+
+        index = ComponentNameIndex()
+        index.add('Invoice__c', 1, 'CustomObject')
+        index.add('InvoiceService.cls', 2, 'ApexClass')
+        index.add('Account', 3, 'ApexClass')
+        index.add('Account.object', 4, 'CustomObject')
+        index.add('acme__Payment__c', 5, 'CustomObject')
+        index.add('Shipment', 6, 'CustomObject')
+
+        assert len(index) == 6
+        assert index.resolve('Invoice__c') == 1
+        assert index.resolve('INVOICE__C') == 1, "Lookups should be case-insensitive"
+        assert index.resolve('Invoice') == 1, "Invoice should resolve to Invoice__c"
+        assert index.resolve('Shipment__c') == 6, "Shipment__c should fall back to Shipment"
+        assert index.resolve('InvoiceService') == 2, "File extensions should be stripped"
+        assert index.resolve('Account', ('CustomObject',)) == 4, "Expected type should win"
+        assert index.resolve('Account', ('ApexClass',)) == 3
+        assert index.resolve('Account') == 3, "Without a type preference the first match wins"
+        assert index.resolve('InvoiceService', ('CustomObject',)) is None, "Other types must not match an expected type"
+        assert index.resolve('Shipment', ('ApexClass',)) is None
+        assert index.resolve('acme__Payment__c') == 5
+        assert index.resolve('Payment__c') == 5, "Unambiguous namespaced match should resolve"
+        assert index.resolve('other__Payment__c') is None, "A different namespace must not match"
+        assert index.resolve('Missing__c') is None
+        assert index.resolve('') is None
+        assert 'invoiceservice' in index
+        print("✅ Lookups resolve by name, suffix, namespace and type")
+
+        mapped = ComponentNameIndex.from_mapping({'Invoice__c': 10, 'Util.cls': 11})
+        assert mapped.resolve('invoice') == 10 and mapped.resolve('Util') == 11
+        assert mapped.resolve('Util', ('ApexClass',)) == 11, "Untyped entries still match an expected type"
+        print("✅ Index builds from a plain name map")
+
+    except AssertionError as e:
+        print(f"❌ Assertion failed: {str(e)}")
+        raise
+
+if __name__ == "__main__":
+    test_component_name_index()
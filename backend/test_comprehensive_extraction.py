@@ -7,7 +7,10 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from comprehensive_metadata_extraction import get_comprehensive_metadata_retrieve_body, ALL_METADATA_TYPES
+from comprehensive_metadata_extraction import (
+    get_comprehensive_metadata_retrieve_body, get_metadata_retrieve_body, plan_retrieve_chunks,
+    ALL_METADATA_TYPES, COMPREHENSIVE_RETRIEVE_TYPES, METADATA_TYPE_WEIGHTS, PERMISSION_TYPES, PERMISSION_SCOPE_TYPES
+)
 
 def test_comprehensive_metadata_types():
     """Test that all metadata types are included in the comprehensive extraction"""
@@ -71,6 +74,45 @@ def test_comprehensive_metadata_types():
     print("\n🎯 Comprehensive extraction is ready!")
     return True
 
+def test_retrieve_chunk_planning():
+    """Test that chunked retrieves cover every type exactly once and stay within the weight limit"""
+    print("\n🧪 Testing Retrieve Chunk Planning")
+    print("=" * 40)
+    
+    max_weight = 12
+    chunks = plan_retrieve_chunks(max_chunk_weight=max_weight)
+    planned_types = [metadata_type for chunk in chunks for metadata_type in chunk]
+    
+    if sorted(planned_types) != sorted(COMPREHENSIVE_RETRIEVE_TYPES):
+        print("❌ Chunks do not cover every metadata type exactly once")
+        return False
+    print(f"✅ {len(COMPREHENSIVE_RETRIEVE_TYPES)} metadata types planned into {len(chunks)} retrieves")
+    
+    permission_chunk = chunks[0]
+    if not set(PERMISSION_TYPES + PERMISSION_SCOPE_TYPES) <= set(permission_chunk):
+        print(f"❌ Profiles are not retrieved with the types they grant permissions on: {permission_chunk}")
+        return False
+    print(f"✅ Profiles and permission sets are retrieved with {', '.join(PERMISSION_SCOPE_TYPES)}")
+    
+    if plan_retrieve_chunks(['Role', 'Report', 'Document'], max_chunk_weight=max_weight) != [['Role', 'Report'], ['Document']]:
+        print("❌ Types without profiles are not packed in request order")
+        return False
+    
+    for chunk in chunks[1:]:
+        weight = sum(METADATA_TYPE_WEIGHTS.get(t, 1) for t in chunk)
+        if weight > max_weight and len(chunk) > 1:
+            print(f"❌ Chunk over the weight limit ({weight}): {chunk}")
+            return False
+    print("✅ Every chunk is within the weight limit")
+    
+    chunk_body = get_metadata_retrieve_body("test_session_123", chunks[0])
+    if chunk_body.count('<name>') != len(chunks[0]):
+        print("❌ Chunk retrieve body does not list exactly the chunk's types")
+        return False
+    print(f"✅ Chunk retrieve body lists {len(chunks[0])} types: {', '.join(chunks[0])}")
+    
+    return True
+
 def test_metadata_extraction_functions():
     """Test that the extraction functions are properly updated"""
     print("\n🧪 Testing Extraction Functions")
@@ -107,7 +149,11 @@ def main():
     if not test_comprehensive_metadata_types():
         success = False
     
-    # Test 2: Extraction functions
+    # Test 2: Chunk planning
+    if not test_retrieve_chunk_planning():
+        success = False
+    
+    # Test 3: Extraction functions
     if not test_metadata_extraction_functions():
         success = False
     
@@ -73,8 +73,8 @@ def test_dependency_functions():
             
             # Test the dependency analysis function
             dependencies = server_db.analyze_apex_class_dependencies_in_memory(
-                test_component['amc_dev_name'] + '.cls',
-                component_map
+                {'component_id': test_component['amc_id'], 'name': test_component['amc_dev_name'], 'content': test_component.get('amc_content')},
+                server_db.ComponentNameIndex.from_mapping(component_map)
             )
             
             print(f"Dependencies found: {len(dependencies)}")
@@ -103,8 +103,8 @@ def test_dependency_functions():
                 
                 # Test the dependency analysis function
                 dependencies2 = server_db.analyze_apex_class_dependencies_in_memory(
-                    test_component2['amc_dev_name'] + '.cls',
-                    component_map
+                    {'component_id': test_component2['amc_id'], 'name': test_component2['amc_dev_name'], 'content': test_component2.get('amc_content')},
+                    server_db.ComponentNameIndex.from_mapping(component_map)
                 )
                 
                 print(f"Dependencies found: {len(dependencies2)}")
@@ -121,8 +121,8 @@ def test_dependency_functions():
             
             # Test the dependency analysis function
             dependencies = server_db.analyze_flow_dependencies_in_memory(
-                test_flow['amc_dev_name'] + '.flow',
-                component_map
+                {'component_id': test_flow['amc_id'], 'name': test_flow['amc_dev_name'], 'content': test_flow.get('amc_content')},
+                server_db.ComponentNameIndex.from_mapping(component_map)
             )
             
             print(f"Dependencies found: {len(dependencies)}")
@@ -139,8 +139,8 @@ def test_dependency_functions():
             
             # Test the dependency analysis function
             dependencies = server_db.analyze_custom_object_dependencies_in_memory(
-                test_object['amc_dev_name'] + '.object',
-                component_map
+                {'component_id': test_object['amc_id'], 'name': test_object['amc_dev_name'], 'content': test_object.get('amc_content')},
+                server_db.ComponentNameIndex.from_mapping(component_map)
             )
             
             print(f"Dependencies found: {len(dependencies)}")
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the in-memory dependency graph and its LRU cache
+"""
+
+import sys
+import os
+import random
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from dependency_graph import DependencyGraph, DependencyGraphCache, ReachabilityIndex, find_dependency_cycles, strongly_connected_components
+
+EDGES = [
+    (10, 20, 'class_inheritance'),
+    (20, 30, 'soql_query'),
+    (30, 10, 'dml_operation'),
+    (20, 40, 'soql_query'),
+    (50, 40, 'trigger_object')
+]
+
+def reference_hops(edges, start, direction):
+    """Plain breadth-first search over an edge list, for comparison"""
+    hops = {start: 0}
+    frontier = [start]
+    while frontier:
+        next_frontier = []
+        for node in frontier:
+            for source, target, _ in edges:
+                if direction in ('outgoing', 'both') and source == node and target not in hops:
+                    hops[target] = hops[node] + 1
+                    next_frontier.append(target)
+                if direction in ('incoming', 'both') and target == node and source not in hops:
+                    hops[source] = hops[node] + 1
+                    next_frontier.append(source)
+        frontier = next_frontier
+    return hops
+
+def test_dependency_graph():
+    """Test CSR adjacency, traversal and cache eviction"""
+    try:
+        print("🔍 Testing Dependency Graph")
+        print("=" * 50)
+
+        graph = DependencyGraph(EDGES)
+        assert len(graph) == 5 and graph.edge_count == 5
+        assert sorted(graph.neighbors(20)) == [(30, 'soql_query'), (40, 'soql_query')]
+        assert graph.neighbors(40, 'incoming') == [(20, 'soql_query'), (50, 'trigger_object')]
+        assert graph.degree(20) == {'incoming': 1, 'outgoing': 2}
+        assert graph.degree(999) == {'incoming': 0, 'outgoing': 0}
+        print("✅ Forward and reverse adjacency with dependency types")
+
+        assert graph.bfs(10)[0] == {10: 0, 20: 1, 30: 2, 40: 2}
+        assert graph.bfs(10, depth=1)[0] == {10: 0, 20: 1}
+        assert graph.bfs(40, direction='incoming')[0] == {40: 0, 20: 1, 50: 1, 10: 2, 30: 3}
+        hops, truncated = graph.bfs(10, max_nodes=2)
+        assert len(hops) == 2 and truncated
+        print("✅ Breadth-first walks honour depth, direction and max_nodes (cycle 10 -> 20 -> 30 -> 10)")
+
+        assert graph.shortest_path(10, 40) == [(10, None), (20, 'class_inheritance'), (40, 'soql_query')]
+        assert graph.shortest_path(40, 10) is None
+        assert graph.shortest_path(50, 10, 'both') == [(50, None), (40, 'trigger_object'), (20, 'soql_query'), (10, 'class_inheritance')]
+        assert graph.reachable(30, 40) and not graph.reachable(50, 10)
+        print("✅ Shortest paths and reachability")
+
+        random.seed(7)
+        edges = list({(random.randrange(300), random.randrange(300), random.choice(['a', 'b', 'c'])) for _ in range(1200)})
+        edges = [edge for edge in edges if edge[0] != edge[1]]
+        large = DependencyGraph(edges)
+        for start in random.sample(sorted(large.index), 10):
+            for direction in ('outgoing', 'incoming', 'both'):
+                assert large.bfs(start, direction=direction)[0] == reference_hops(edges, start, direction)
+
+        starts = list(large.index)
+        started = time.perf_counter()
+        for start in starts:
+            large.bfs(start, depth=2)
+        per_walk = (time.perf_counter() - started) / len(starts)
+        print(f"✅ Matches reference BFS on {len(edges)} edges; 2-hop walk {per_walk * 1e6:.0f}µs, "
+              f"{large.memory_bytes() / 1024:.0f} KB")
+
+        components = strongly_connected_components(graph)
+        assert sorted(sorted(graph.component_ids[n] for n in members) for members in components) == [[10, 20, 30], [40], [50]]
+        index = ReachabilityIndex(graph)
+        assert sorted(index.reached(40)) == [10, 20, 30, 50]
+        assert sorted(index.reached(10, 'outgoing')) == [20, 30, 40]
+        assert index.count(40) == 4 and index.count(50, 'outgoing') == 1 and index.count(999) == 0
+        assert index.reaches(30, 40) and not index.reaches(40, 10)
+        assert sorted(index.cycle_members(20)) == [10, 30] and index.cycle_members(50) == []
+        print("✅ Reachability index condenses the 10 -> 20 -> 30 cycle")
+
+        assert find_dependency_cycles(graph) == [{
+            'component_ids': [10, 20, 30],
+            'edge_count': 3,
+            'dependency_types': ['class_inheritance', 'dml_operation', 'soql_query']
+        }]
+        assert find_dependency_cycles(DependencyGraph([(1, 2, 'a'), (2, 3, 'a')])) == []
+        print("✅ Cycle report lists only groups of two or more components")
+
+        large_index = ReachabilityIndex(large)
+        for start in random.sample(sorted(large.index), 25):
+            for direction in ('outgoing', 'incoming'):
+                expected = set(reference_hops(edges, start, direction)) - {start}
+                assert set(large_index.reached(start, direction)) == expected
+                assert large_index.count(start, direction) == len(expected)
+        started = time.perf_counter()
+        for start in starts:
+            large_index.count(start)
+        per_count = (time.perf_counter() - started) / len(starts)
+        cycle_nodes = {node for cycle in find_dependency_cycles(large) for node in cycle['component_ids']}
+        # A component is in a cycle exactly when one of its dependencies leads back to it
+        assert cycle_nodes == {node for node in large.index
+                               if any(large.reachable(other, node) for other, _ in large.neighbors(node))}
+        print(f"✅ Reachability matches reference closures; {len(large_index.components)} SCCs, "
+              f"count {per_count * 1e6:.1f}µs")
+
+        loads = []
+        cache = DependencyGraphCache(lambda job_id: loads.append(job_id) or EDGES, {'max_cached_jobs': 2})
+        cache.get(1)
+        cache.get(2)
+        cache.get(1)
+        cache.get(3)
+        assert loads == [1, 2, 3], loads
+        cache.get(1)
+        cache.get(2)
+        assert loads == [1, 2, 3, 2], "Job 2 should have been evicted as least recently used"
+        cache.invalidate(1)
+        cache.get(1)
+        stats = cache.get_stats()
+        assert stats['cached_jobs'] == 2 and stats['evictions'] == 2 and stats['invalidations'] == 1, stats
+        assert stats['memory_bytes'] > 0
+        before = cache.get(1).memory_bytes()
+        assert cache.get_reachability_index(1).count(40) == 4
+        assert cache.get(1).memory_bytes() > before
+        assert DependencyGraphCache(lambda job_id: EDGES, {'max_reachability_components': 2}).get_reachability_index(1) is None
+        print(f"✅ LRU cache evicts and invalidates ({stats['hits']} hits, {stats['misses']} misses)")
+
+        loads = []
+        versions = {1: 'v1', 2: None}
+        cache = DependencyGraphCache(lambda job_id: loads.append(job_id) or EDGES, version=versions.get)
+        cache.get(1)
+        cache.get(1)
+        versions[1] = 'v2'
+        cache.get(1)
+        cache.get(2)
+        cache.get(2)
+        assert loads == [1, 1, 2, 2], "A changed version reloads, a running job (None) is never kept"
+
+        invalidating = DependencyGraphCache(lambda job_id: invalidating.invalidate(job_id) or EDGES)
+        assert len(invalidating.get(1)) == 5
+        stats = invalidating.get_stats()
+        assert stats['cached_jobs'] == 0 and stats['uncached_loads'] == 1, stats
+        built = DependencyGraph(EDGES)
+        cache.put(1, built)
+        cache.put(2, DependencyGraph(EDGES))
+        assert cache.get(1) is built and loads == [1, 1, 2, 2], "A graph put at the current version is served"
+        assert cache.get_stats()['cached_jobs'] == 1, "A running job's graph is not kept when put"
+        print("✅ Graphs are kept per job version, loads that raced an invalidation are dropped")
+
+    except AssertionError as e:
+        print(f"❌ Assertion failed: {str(e)}")
+        raise
+    except Exception as e:
+        print(f"❌ Error: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        raise
+
+if __name__ == "__main__":
+    test_dependency_graph()
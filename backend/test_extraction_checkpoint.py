@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Test script to verify extraction checkpoints and the resume plan built from them
+"""
+
+import sys
+import os
+import io
+import tempfile
+import threading
+import zipfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from extraction_checkpoint import (
+    ExtractionCheckpoint, add_id_ranges, save_retrieve_zip, open_saved_retrieve, remove_saved_zips
+)
+from retrieve_stream import RetrieveResponse
+
+class RecordingCheckpointStore:
+    """Keeps the newest saved checkpoint, standing in for ids_audit_extraction_job.aej_checkpoint"""
+
+    def __init__(self):
+        self.stored = None
+        self.saves = 0
+        self.lock = threading.Lock()
+
+    def save(self, data):
+        with self.lock:
+            self.saves += 1
+            if self.stored is None or self.stored['version'] < data['version']:
+                self.stored = data
+
+def test_extraction_checkpoint():
+    """Test checkpoint saves, the resume plan and saved retrieve zips"""
+    try:
+        print("🔍 Testing Extraction Checkpoints")
+        print("=" * 50)
+
+        store = RecordingCheckpointStore()
+        checkpoint = ExtractionCheckpoint.start('job-1', [['ApexClass'], ['CustomObject'], ['Flow'], ['Layout'], ['Profile']],
+                                                save=store.save)
+        assert checkpoint.get('stage') == 'retrieving' and checkpoint.get('carried_max_id') is None
+        checkpoint.update_chunk(0, status='ingested')
+        checkpoint.update_chunk(1, status='downloaded', zip_path='/missing/retrieve_1.zip', async_id='09S1')
+        checkpoint.update_chunk(2, status='submitted', async_id='09S2')
+        checkpoint.update_chunk(3, status='failed', error='INVALID_TYPE')
+        assert store.saves == 4 and store.stored['version'] == 4
+        assert store.stored['chunks'][2] == dict(checkpoint.chunk(2)), "Every change is saved"
+        print("✅ Each change is saved with a new version")
+
+        stored = ExtractionCheckpoint(store.stored)
+        plan = stored.resume_plan()
+        assert plan == {'ingest': [], 'poll': [1, 2], 'submit': [4], 'ingested': [0], 'failed': [3]}, plan
+        plan = stored.resume_plan(zip_exists=lambda path: True)
+        assert plan['ingest'] == [1] and plan['poll'] == [2], plan
+        stored.update_chunk(1, async_id=None)
+        assert stored.resume_plan()['submit'] == [1, 4], "A lost zip without an async id is retrieved again"
+        print("✅ Resume plan ingests saved zips, polls async ids and submits the rest")
+
+        threads = [threading.Thread(target=checkpoint.update_chunk, args=(4,), kwargs={'files_done': i})
+                   for i in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert store.stored['version'] == 24 and store.stored == checkpoint.snapshot()
+        print("✅ Concurrent saves keep the newest version")
+
+        assert add_id_ranges([], [7, 3, 4, 5, 9]) == [[3, 5], [7, 7], [9, 9]]
+        assert add_id_ranges([[3, 5], [9, 9]], [6, 7, 8, 20]) == [[3, 9], [20, 20]]
+        checkpoint.record_batch(4, 2, [101, 102])
+        checkpoint.record_batch(4, 4, [105, 103, 104])
+        assert checkpoint.chunk(4)['files_done'] == 4 and checkpoint.chunk(4)['id_ranges'] == [[101, 105]]
+        assert store.stored['chunks'][4]['id_ranges'] == [[101, 105]], "Batch ids are saved with the checkpoint"
+        print("✅ Committed batches record their component id ranges")
+
+        other = threading.Thread(target=checkpoint.update_chunk, args=(3,), kwargs={'status': 'ingested'})
+        with checkpoint.committing(4):
+            checkpoint.record_batch(4, 6, [106])
+            other.start()
+            other.join(0.2)
+            assert other.is_alive() and store.stored['chunks'][4]['files_done'] == 6
+            assert store.stored['chunks'][3]['status'] != 'ingested', "Other saves wait for the batch to commit"
+        other.join()
+        assert store.stored['chunks'][3]['status'] == 'ingested' and store.stored == checkpoint.snapshot()
+
+        try:
+            with checkpoint.committing(4):
+                checkpoint.record_batch(4, 8, [107])
+                raise RuntimeError('rolled back')
+        except RuntimeError:
+            pass
+        assert checkpoint.chunk(4)['files_done'] == 6 and checkpoint.chunk(4)['id_ranges'] == [[101, 106]]
+        checkpoint.update(stage='analyzing')
+        assert store.stored['chunks'][4]['files_done'] == 6, "A rolled back batch is not saved by later changes"
+        print("✅ Saves wait for an ingest batch to commit and drop it if it rolls back")
+
+        with tempfile.TemporaryDirectory() as zip_dir:
+            payload = io.BytesIO()
+            with zipfile.ZipFile(payload, 'w') as zip_file:
+                zip_file.writestr('classes/Account.cls', 'public class Account {}')
+            payload.seek(0)
+            response = RetrieveResponse('<done>true</done>', payload, len(payload.getvalue()))
+            zip_path = save_retrieve_zip('job-1', 0, response, zip_dir)
+            assert response.zip_file.tell() == 0, "The response can still be ingested after saving"
+
+            saved = open_saved_retrieve(zip_path)
+            with saved, zipfile.ZipFile(saved.zip_file) as zip_file:
+                assert saved.text == '<done>true</done>' and saved.zip_size == len(payload.getvalue())
+                assert zip_file.read('classes/Account.cls') == b'public class Account {}'
+            remove_saved_zips('job-1', zip_dir)
+            assert open_saved_retrieve(zip_path) is None and not os.listdir(zip_dir)
+        print("✅ Saved retrieve zips read back until removed")
+
+    except AssertionError as e:
+        print(f"❌ Assertion failed: {str(e)}")
+        raise
+    except Exception as e:
+        print(f"❌ Error: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        raise
+
+if __name__ == "__main__":
+    test_extraction_checkpoint()
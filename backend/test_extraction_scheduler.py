@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the extraction scheduler's worker limit, ordering and deduplication
+"""
+
+import sys
+import os
+import threading
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from extraction_scheduler import ExtractionScheduler, QueueFullError
+from extraction_worker import ExtractionWorker
+
+class RecordingQueueBackend:
+    """Backend that keeps queue rows in a dict, standing in for ids_audit_extraction_queue"""
+
+    def __init__(self):
+        self.rows = {}
+        self.lock = threading.Lock()
+
+    def enqueue(self, entry):
+        if entry['request'] is None:
+            return None
+        for row in self.rows.values():
+            if entry['dedup_key'] is not None and row['dedup_key'] == entry['dedup_key']:
+                return row['job_id']
+        keys = ('job_id', 'org_id', 'integration_id', 'priority', 'dedup_key', 'request', 'enqueued_at')
+        self.rows[entry['job_id']] = {k: entry[k] for k in keys}
+        return None
+
+    def reprioritize(self, job_id, priority):
+        self.rows[job_id]['priority'] = priority
+
+    def start(self, job_id, worker_id, config):
+        with self.lock:
+            if job_id not in self.rows or self.rows[job_id].get('worker_id'):
+                return False
+            self.rows[job_id].update(worker_id=worker_id, beat_at=time.monotonic(),
+                                     attempts=self.rows[job_id].get('attempts', 0) + 1)
+            return True
+
+    def claim(self, worker_id, config):
+        with self.lock:
+            for row in self.load():
+                stale = time.monotonic() - row.get('beat_at', 0) >= config['stale_after_seconds']
+                if not row.get('worker_id') or stale:
+                    row.update(worker_id=worker_id, beat_at=time.monotonic(), attempts=row.get('attempts', 0) + 1)
+                    return dict(row, interrupted=row['attempts'] > 1)
+        return None
+
+    def release(self, job_id, worker_id):
+        if self.rows.get(job_id, {}).get('worker_id') == worker_id:
+            self.rows[job_id]['worker_id'] = None
+
+    def heartbeat(self, worker_id, progress):
+        owned = [job_id for job_id in progress if self.rows.get(job_id, {}).get('worker_id') == worker_id]
+        for job_id in owned:
+            self.rows[job_id]['beat_at'] = time.monotonic()
+        return owned
+
+    def expire(self, config):
+        return []
+
+    def finish(self, job_id, worker_id=None):
+        if worker_id is None or self.rows.get(job_id, {}).get('worker_id') == worker_id:
+            self.rows.pop(job_id, None)
+
+    def get_stats(self):
+        return {'queued': sum(1 for row in self.rows.values() if not row.get('worker_id'))}
+
+    def load(self):
+        return sorted(self.rows.values(), key=lambda row: (row['priority'], row['enqueued_at']))
+
+def test_extraction_scheduler():
+    """Test the worker limit, priority and fair ordering, coalescing, claiming and queue workers"""
+    try:
+        print("🔍 Testing Extraction Scheduler")
+        print("=" * 50)
+
+        gate = threading.Event()
+        order = []
+        done = threading.Semaphore(0)
+
+        def extract(name):
+            gate.wait(5)
+            order.append(name)
+            done.release()
+
+        scheduler = ExtractionScheduler(config={'max_workers': 1, 'max_queued_jobs': 6})
+        scheduler.submit('blocker', extract, ('blocker',), org_id=1)
+        time.sleep(0.05)
+        for name, org_id, priority in [('a1', 1, 1), ('a2', 1, 1), ('a3', 1, 1), ('b1', 2, 1), ('c1', 3, 0)]:
+            scheduler.submit(name, extract, (name,), org_id=org_id, priority=priority)
+        stats = scheduler.get_stats()
+        assert stats['running'] == 1 and stats['queued'] == 5 and stats['queued_by_org'] == {1: 3, 2: 1, 3: 1}, stats
+        print("✅ Only max_workers extractions run, the rest wait")
+
+        assert scheduler.submit('a1-again', extract, ('a1-again',), org_id=1, dedup_key=None)[1] is False
+        try:
+            scheduler.submit('overflow', extract, ('overflow',), org_id=4)
+            raise AssertionError("The seventh waiting job should be refused")
+        except QueueFullError:
+            pass
+        print("✅ A full queue refuses new jobs")
+
+        gate.set()
+        for _ in range(7):
+            assert done.acquire(timeout=5)
+        assert order == ['blocker', 'c1', 'b1', 'a1', 'a2', 'a3', 'a1-again'], order
+        print("✅ Better priority first, then organisations take turns")
+
+        gate.clear()
+        ran = []
+        prepared = []
+        scheduler = ExtractionScheduler(config={'max_workers': 1})
+        first, coalesced = scheduler.submit('x', lambda: (gate.wait(5), ran.append('x')), org_id=1,
+                                            dedup_key='integration:7', prepare=prepared.append)
+        assert (first, coalesced) == ('x', False)
+        assert scheduler.submit('y', lambda: ran.append('y'), org_id=1, dedup_key='integration:7',
+                                prepare=prepared.append) == ('x', True)
+        gate.set()
+        time.sleep(0.1)
+        assert ran == ['x'] and prepared == ['x'], (ran, prepared)
+        assert scheduler.submit('z', lambda: ran.append('z'), org_id=1, dedup_key='integration:7')[0] == 'z'
+        time.sleep(0.1)
+        stats = scheduler.get_stats()
+        assert stats['coalesced'] == 1 and stats['completed'] == 2 and stats['queued'] == 0, stats
+        print("✅ A second extraction of an integration joins the first")
+
+        backend = RecordingQueueBackend()
+        gate.clear()
+        lost = []
+        stopped = ExtractionScheduler(backend, {'max_workers': 1, 'heartbeat_seconds': 0.02}, on_lost=lost.append)
+        stopped.submit('run', gate.wait, (5,), org_id=1, dedup_key='integration:1', request={'kind': 'dashboard'})
+        stopped.submit('wait', gate.wait, (5,), org_id=1, dedup_key='integration:2', request={'kind': 'dashboard'})
+        stopped.submit('login', gate.wait, (5,), org_id=1)
+        time.sleep(0.05)
+        assert set(backend.rows) == {'run', 'wait'}, "Jobs without a request are not persisted"
+        assert ExtractionScheduler(backend).submit('dup', ran.append, org_id=1, dedup_key='integration:2',
+                                                   request={'kind': 'dashboard'}) == ('wait', True)
+
+        restored = []
+        restarted = ExtractionScheduler(backend, {'max_workers': 1, 'poll_seconds': 0.01})
+        restarted.claim_persisted(lambda entry: (restored.append, ((entry['job_id'], entry['interrupted']),)))
+        time.sleep(0.1)
+        assert restored == [('wait', False)] and set(backend.rows) == {'run'}, restored
+        print("✅ Another process claims queued jobs but leaves heartbeated ones alone")
+
+        taken = ExtractionScheduler(backend, {'max_workers': 1, 'poll_seconds': 0.01, 'stale_after_seconds': 0})
+        taken.claim_persisted(lambda entry: (restored.append, ((entry['job_id'], entry['interrupted']),)))
+        time.sleep(0.1)
+        assert restored == [('wait', False), ('run', True)] and lost == ['run'], (restored, lost)
+        gate.set()
+        time.sleep(0.1)
+        assert backend.rows == {}
+        stats = stopped.get_stats()
+        assert stats['claimed_elsewhere'] == 1 and stats['lost'] == 1 and stats['shared'] == {'queued': 0}, stats
+        print("✅ A job whose worker stops heartbeating is taken over, and the old worker is told to stop")
+
+        runs = []
+        backend = RecordingQueueBackend()
+        queue = ExtractionScheduler(backend, {'run_locally': False})
+        for i in range(8):
+            queue.submit(f'job{i}', runs.append, org_id=1, dedup_key=f'integration:{i}', request={'kind': 'dashboard'})
+        assert runs == [] and len(backend.rows) == 8 and queue.get_stats()['handed_to_workers'] == 8
+        workers = [ExtractionWorker(backend, lambda entry: (runs.append, (entry['job_id'],)),
+                                    {'max_workers': 2, 'poll_seconds': 0.01}) for _ in range(2)]
+        workers[1].scheduler.worker_id += '-second'
+        for worker in workers:
+            worker.start()
+        time.sleep(0.2)
+        for worker in workers:
+            worker.stop()
+        assert sorted(runs) == [f'job{i}' for i in range(8)] and backend.rows == {}, runs
+        print("✅ Extraction workers claim each queued job exactly once")
+
+    except AssertionError as e:
+        print(f"❌ Assertion failed: {str(e)}")
+        raise
+    except Exception as e:
+        print(f"❌ Error: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        raise
+
+if __name__ == "__main__":
+    test_extraction_scheduler()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Test script to verify incremental extraction planning from listMetadata file properties
+"""
+
+import sys
+import os
+from datetime import datetime
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from incremental_extraction import parse_file_properties, plan_incremental_extraction, parse_salesforce_datetime
+
+LIST_RESPONSE = '''<?xml version="1.0" encoding="UTF-8"?>
+<soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/">
+<soapenv:Body><listMetadataResponse><result>
+    <fileName>unpackaged/classes/InvoiceService.cls</fileName><fullName>InvoiceService</fullName>
+    <lastModifiedDate>2024-01-01T00:00:00.000Z</lastModifiedDate><type>ApexClass</type>
+</result></listMetadataResponse></soapenv:Body></soapenv:Envelope>'''
+
+FOLDER_TYPES = {'classes': 'ApexClass', 'objects': 'CustomObject'}
+
+def file_type_for(file_name):
+    return FOLDER_TYPES.get(file_name.split('/')[0], 'Other')
+
+def file_property(metadata_type, full_name, file_name, last_modified):
+    return {
+        'type': metadata_type,
+        'full_name': full_name,
+        'file_name': file_name,
+        'last_modified': parse_salesforce_datetime(last_modified)
+    }
+
+def previous_component(amc_id, amt_name, amc_label, last_modified):
+    return {'amc_id': amc_id, 'amt_name': amt_name, 'amc_label': amc_label, 'amc_last_modified': last_modified}
+
+def test_incremental_extraction():
+    """Test file property parsing and the retrieve / carry forward plan"""
+    try:
+        print("🔍 Testing Incremental Extraction Planning")
+        print("=" * 50)
+
+        assert parse_salesforce_datetime('2024-05-01T10:15:30.000Z') == datetime(2024, 5, 1, 10, 15, 30)
+        assert parse_salesforce_datetime('2024-05-01T10:15:30Z') == datetime(2024, 5, 1, 10, 15, 30)
+        assert parse_salesforce_datetime('') is None
+
+        expected = [{
+            'type': 'ApexClass',
+            'full_name': 'InvoiceService',
+            'file_name': 'classes/InvoiceService.cls',
+            'last_modified': datetime(2024, 1, 1)
+        }]
+        # listMetadata returns <result> blocks, checkRetrieveStatus returns <fileProperties> blocks
+        assert parse_file_properties(LIST_RESPONSE, tag='result') == expected
+        retrieve_text = LIST_RESPONSE.replace('<result>', '<result><fileProperties>').replace('</result>', '</fileProperties></result>')
+        assert parse_file_properties(retrieve_text) == expected
+        print("✅ File properties parsed with package prefix stripped")
+
+        previous_time = datetime(2024, 3, 1)
+        previous = [
+            previous_component(1, 'ApexClass', 'Unchanged.cls', previous_time),
+            previous_component(2, 'ApexClass', 'Changed.cls', previous_time),
+            previous_component(3, 'ApexClass', 'Removed.cls', previous_time),
+            previous_component(4, 'CustomObject', 'Invoice__c.object', previous_time),
+            previous_component(5, 'CustomObject', 'Account.object', previous_time),
+            previous_component(6, 'Other', 'Unlisted.page', previous_time)
+        ]
+        listed = [
+            file_property('ApexClass', 'Unchanged', 'classes/Unchanged.cls', '2024-02-01T00:00:00.000Z'),
+            file_property('ApexClass', 'Changed', 'classes/Changed.cls', '2024-04-01T00:00:00.000Z'),
+            file_property('ApexClass', 'Added', 'classes/Added.cls', '2024-04-01T00:00:00.000Z'),
+            file_property('CustomObject', 'Invoice__c', 'objects/Invoice__c.object', '2024-01-01T00:00:00.000Z'),
+            file_property('CustomField', 'Invoice__c.Amount__c', 'objects/Invoice__c.object', '2024-05-01T00:00:00.000Z'),
+            file_property('CustomObject', 'Account', 'objects/Account.object', '2024-01-01T00:00:00.000Z')
+        ]
+
+        plan = plan_incremental_extraction(listed, ['ApexClass', 'CustomObject', 'CustomField'], previous, file_type_for)
+
+        assert plan['members'] == {
+            'ApexClass': ['Changed', 'Added'],
+            'CustomObject': ['Invoice__c'],
+            'CustomField': ['Invoice__c.Amount__c']
+        }, plan['members']
+        print("✅ New and changed members retrieved, a changed field marks its object as changed")
+
+        assert plan['carry_forward'] == [1, 5], plan['carry_forward']
+        print("✅ Unchanged components carried forward")
+
+        assert plan['deleted'] == 1, plan['deleted']
+        print("✅ Removed component counted as deleted, unlisted types left alone")
+
+        unlisted = plan_incremental_extraction(listed, ['CustomObject'], previous, file_type_for)
+        assert 'ApexClass' not in unlisted['members'] and 1 not in unlisted['carry_forward']
+        print("✅ Types that were not listed are neither retrieved per member nor carried forward")
+
+        in_full = plan_incremental_extraction(listed, ['ApexClass', 'CustomObject', 'CustomField'], previous,
+                                              file_type_for, full_types=['CustomObject', 'CustomField'])
+        assert in_full['members'] == {'ApexClass': ['Changed', 'Added']}, in_full['members']
+        assert in_full['carry_forward'] == [1], in_full['carry_forward']
+        print("✅ Types retrieved in full are neither retrieved per member nor carried forward")
+
+    except AssertionError as e:
+        print(f"❌ Assertion failed: {str(e)}")
+        raise
+    except Exception as e:
+        print(f"❌ Error: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        raise
+
+if __name__ == "__main__":
+    test_incremental_extraction()
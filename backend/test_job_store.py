@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the extraction job store
+"""
+
+import sys
+import os
+import time
+import threading
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from job_store import JobStore
+
+class RecordingBackend:
+    """Backend that keeps saved jobs in a dict, standing in for ids_audit_job_state"""
+
+    def __init__(self):
+        self.rows = {}
+        self.saves = []
+
+    def save(self, job, new_lines):
+        row = self.rows.setdefault(job.job_id, {'progress': []})
+        row.update({k: v for k, v in dict(job).items() if k != 'progress'})
+        row['progress'] = (row['progress'] + new_lines)[-job.store.config['max_progress_entries']:]
+        self.saves.append((job.job_id, list(new_lines)))
+
+    def load(self, job_id, max_entries):
+        row = self.rows.get(job_id)
+        return dict(row, progress=list(row['progress'])) if row else None
+
+    def cleanup(self, config):
+        return 0
+
+def new_job(job_id):
+    return {'id': job_id, 'status': 'starting', 'progress': ['Starting...'], 'data': None, 'error': None}
+
+def test_job_store():
+    """Test bounded progress, final statuses, write-behind and TTL eviction"""
+    try:
+        print("🔍 Testing Job Store")
+        print("=" * 50)
+
+        store = JobStore(config={'max_progress_entries': 3})
+        store['a'] = new_job('a')
+        job = store['a']
+        for i in range(5):
+            job['progress'].append(f'step {i}')
+        assert job['progress'] == ['step 2', 'step 3', 'step 4'], job['progress']
+        assert 'a' in store and 'b' not in store and store.get('b') is None
+        print("✅ Progress log keeps the newest entries")
+
+        assert job.update(status='error', error='Retrieve failed')
+        assert not job.update(status='success', data={'totalFiles': 1})
+        job['status'] = 'processing'
+        assert job['status'] == 'error' and job['error'] == 'Retrieve failed' and job['data'] is None
+        print("✅ Success and error are final")
+
+        backend = RecordingBackend()
+        shared = JobStore(backend, {'max_progress_entries': 3, 'flush_interval_seconds': 60})
+        job = shared.create('c', new_job('c'))
+        assert backend.rows['c']['status'] == 'starting', "Creating a job writes it immediately"
+        job['progress'].append('one')
+        job['progress'].append('two')
+        assert backend.saves == [('c', ['Starting...'])], "Progress lines wait for the flusher"
+        shared.flush()
+        assert backend.saves[-1] == ('c', ['one', 'two']) and len(backend.saves) == 2
+        print("✅ Progress lines are batched into one write")
+
+        other = JobStore(backend)
+        remote = other.get('c')
+        assert remote['progress'] == ['Starting...', 'one', 'two'] and remote.store is None
+        job.update(status='success', data={'totalFiles': 3})
+        shared.flush()
+        assert other['c']['status'] == 'success' and other['c']['data'] == {'totalFiles': 3}
+        print("✅ Another store reads the job from the backend")
+
+        expiring = JobStore(backend, {'finished_job_ttl_seconds': 0, 'flush_interval_seconds': 60})
+        done = expiring.create('d', new_job('d'))
+        running = expiring.create('e', new_job('e'))
+        done.update(status='success')
+        expiring.flush()
+        time.sleep(0.01)
+        assert expiring.get('e') is running
+        assert expiring.get('d') is not done and expiring.get('d')['status'] == 'success'
+        stats = expiring.get_stats()
+        assert stats['evicted'] == 1 and stats['local_jobs'] == 1 and stats['running_jobs'] == 1, stats
+        print("✅ Finished jobs leave memory after their TTL, running jobs stay")
+
+        streaming = JobStore(config={'max_progress_entries': 3, 'stream_keepalive_seconds': 0.05})
+        job = streaming.create('f', new_job('f'))
+        for i in range(4):
+            job['progress'].append(f'step {i}')
+        assert job['progress'].lines_since(2) == (['step 1', 'step 2', 'step 3'], 5), "Lines already trimmed are skipped"
+        follow = streaming.follow('f', seen=4)
+        first = next(follow)
+        assert first['lines'] == ['step 3'] and first['progress_total'] == 5 and first['status'] == 'starting'
+        assert next(follow) is None, "An idle job yields a keepalive"
+        threading.Timer(0.01, lambda: job['progress'].append('done')).start()
+        assert next(follow)['lines'] == ['done']
+        job.update(status='success', data={'totalFiles': 4})
+        last = next(follow)
+        assert last['status'] == 'success' and last['lines'] == [] and last['data'] == {'totalFiles': 4}
+        assert list(follow) == [], "The stream ends once the job finishes"
+        assert list(streaming.follow('missing')) == [{'status': None}]
+        print("✅ Following a job yields new lines, keepalives and the final status")
+
+    except AssertionError as e:
+        print(f"❌ Assertion failed: {str(e)}")
+        raise
+    except Exception as e:
+        print(f"❌ Error: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        raise
+
+if __name__ == "__main__":
+    test_job_store()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Test script to verify metadata file classification and dev name derivation
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from metadata_files import get_file_type_from_path, get_dev_name, strip_metadata_extension, METADATA_FILE_EXTENSIONS
+from dependency_analysis import ComponentNameIndex
+
+def test_metadata_files():
+    """Test extension lookups, folder overrides and dev names"""
+    try:
+        print("🔍 Testing Metadata File Classification")
+        print("=" * 50)
+
+        assert get_file_type_from_path('classes/InvoiceService.cls') == 'ApexClass'
+        assert get_file_type_from_path('unpackaged/workflows/Invoice__c.workflow') == 'WorkflowRule'
+        assert get_file_type_from_path('workflows/Alert.workflowAlert') == 'WorkflowAlert'
+        assert get_file_type_from_path('territory2Models/M/X.territory2') == 'Territory2'
+        assert get_file_type_from_path('Admin.permissionset') == 'PermissionSet'
+        assert get_file_type_from_path('classes/InvoiceService.cls-meta.xml') == 'Unknown'
+        assert get_file_type_from_path('package.xml') == 'Unknown'
+        assert get_file_type_from_path('classes/Invoice.CLS') == 'Unknown', "Extensions are case-sensitive"
+        print(f"✅ {len(METADATA_FILE_EXTENSIONS)} extensions classified by suffix lookup")
+
+        assert get_file_type_from_path('sites/Partners.site') == 'CustomSite'
+        assert get_file_type_from_path('siteDotComSites/Partners.site') == 'CustomSite'
+        assert get_file_type_from_path('applications/Sales.app') == 'CustomApplication'
+        assert get_file_type_from_path('aura/InvoiceCard/InvoiceCard.app') == 'CustomApplication'
+        assert get_file_type_from_path('lwc/invoiceCard/invoiceCard.js') == 'Unknown'
+        assert get_file_type_from_path('lwc\\invoiceCard\\invoiceCard.js-meta.xml') == 'Unknown'
+        print("✅ Folders do not change a file's type, matching the seeded metadata types")
+
+        assert get_dev_name('classes/InvoiceService.cls') == 'InvoiceService'
+        assert get_dev_name('pages/InvoicePage.page') == 'InvoicePage'
+        assert get_dev_name('permissionsets/Admin.permissionset') == 'Admin'
+        assert get_dev_name('objects/Invoice__c.object') == 'Invoice__c'
+        assert get_dev_name('documents/logo.png') == 'logo.png'
+        assert strip_metadata_extension('.cls') == '.cls'
+        print("✅ Dev names drop every known extension")
+
+        index = ComponentNameIndex()
+        index.add('InvoicePage.page', 1, 'ApexPage')
+        index.add('Admin.permissionset', 2, 'PermissionSet')
+        assert index.resolve('InvoicePage') == 1 and index.resolve('admin') == 2
+        print("✅ Name index resolves pages and permission sets by dev name")
+
+    except AssertionError as e:
+        print(f"❌ Assertion failed: {str(e)}")
+        raise
+    except Exception as e:
+        print(f"❌ Error: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        raise
+
+if __name__ == "__main__":
+    test_metadata_files()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the metadata type registry lookups and invalidation
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from metadata_registry import MetadataTypeRegistry
+
+TYPE_ROWS = {
+    409: [
+        {'amt_id': 1, 'amt_name': 'ApexClass', 'amt_file_extension': '.cls'},
+        {'amt_id': 2, 'amt_name': 'ApexTrigger', 'amt_file_extension': '.trigger'},
+        {'amt_id': 9, 'amt_name': 'ValidationRule', 'amt_file_extension': '.validationRule'}
+    ],
+    410: [
+        {'amt_id': 20, 'amt_name': 'ApexClass', 'amt_file_extension': '.cls'}
+    ]
+}
+
+def test_metadata_registry():
+    """Test name, id and extension lookups, caching and invalidation"""
+    try:
+        print("🔍 Testing Metadata Type Registry")
+        print("=" * 50)
+
+        loads = []
+        rows = {org_id: list(org_rows) for org_id, org_rows in TYPE_ROWS.items()}
+        registry = MetadataTypeRegistry(lambda org_id: loads.append(org_id) or rows.get(org_id))
+
+        types = registry.get(409)
+        assert types.id_for('ApexTrigger') == 2 and types.id_for('Flow') is None
+        assert types.name_for(9) == 'ValidationRule' and types.name_for(99) is None
+        assert types.ids == {'ApexClass': 1, 'ApexTrigger': 2, 'ValidationRule': 9}
+        print("✅ Name and id lookups")
+
+        try:
+            types.ids['Flow'] = 30
+            raise AssertionError("The id table of a shared snapshot should be read-only")
+        except TypeError:
+            pass
+        assert types.id_for('Flow') is None
+        print("✅ Lookup tables are read-only")
+
+        assert registry.get(409) is types and registry.get(410).id_for('ApexClass') == 20
+        assert loads == [409, 410], loads
+        assert len(registry.get(999)) == 0
+        print("✅ Types load once per organisation")
+
+        rows[409].append({'amt_id': 30, 'amt_name': 'Flow', 'amt_file_extension': '.flow'})
+        assert registry.get(409).id_for('Flow') is None
+        registry.invalidate(409)
+        assert registry.get(409).id_for('Flow') == 30
+        assert types.id_for('Flow') is None, "Existing snapshots must not change"
+        registry.invalidate()
+        registry.get(410)
+        assert loads == [409, 410, 999, 409, 410], loads
+        print("✅ Invalidation reloads one or every organisation")
+
+        expiring = MetadataTypeRegistry(lambda org_id: loads.append(org_id) or [], {'max_age_seconds': 0})
+        expiring.get(1)
+        expiring.get(1)
+        assert loads[-2:] == [1, 1]
+        stats = registry.get_stats()
+        assert stats['invalidations'] == 4 and stats['cached_orgs'] == {410: 1}, stats
+        print(f"✅ Snapshots expire after max_age_seconds ({stats['hits']} hits, {stats['loads']} loads)")
+
+    except AssertionError as e:
+        print(f"❌ Assertion failed: {str(e)}")
+        raise
+    except Exception as e:
+        print(f"❌ Error: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        raise
+
+if __name__ == "__main__":
+    test_metadata_registry()
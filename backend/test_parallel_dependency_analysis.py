@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Test script to verify parallel dependency analysis matches the serial path
+"""
+
+import sys
+import os
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import dependency_analysis
+from dependency_analysis import analyze_components, analyze_component_shard, split_into_shards, ComponentNameIndex
+
+OBJECT_XML = '''<?xml version="1.0" encoding="UTF-8"?>
+<CustomObject xmlns="http://soap.sforce.com/2006/04/metadata">
+    <fields><fullName>Parent__c</fullName><referenceTo>{target}</referenceTo><type>Lookup</type></fields>
+</CustomObject>'''
+
+FLOW_XML = '''<?xml version="1.0" encoding="UTF-8"?>
+<Flow xmlns="http://soap.sforce.com/2006/04/metadata">
+    <recordLookups><object>{obj}</object></recordLookups>
+    <actionCalls><apexClass>{cls}</apexClass></actionCalls>
+</Flow>'''
+
+def build_component_table(class_count):
+    """Build a synthetic component table covering every analyzer"""
+    table = []
+
+    def add(name, metadata_type, content):
+        component_id = len(table) + 1
+        table.append({'component_id': component_id, 'name': name, 'metadata_type': metadata_type, 'content': content})
+
+    for i in range(20):
+        add(f'Object{i}__c', 'CustomObject', OBJECT_XML.format(target=f'Object{(i + 1) % 20}__c'))
+    for i in range(class_count):
+        add(f'Service{i}', 'ApexClass',
+            f'public class Service{i} extends Service{(i + 1) % class_count} {{ '
+            f'void run() {{ [SELECT Id FROM Object{i % 20}__c]; insert Object{(i + 3) % 20}__c; }} }}')
+    for i in range(10):
+        add(f'Trigger{i}', 'ApexTrigger', f'trigger Trigger{i} on Object{i}__c (before insert) {{}}')
+        add(f'Flow{i}', 'Flow', FLOW_XML.format(obj=f'Object{i}__c', cls=f'Service{i}'))
+    add('Broken_Flow', 'Flow', '<Flow>')
+    add('StaticPage', 'ApexPage', '<apex:page/>')
+    return table
+
+def test_parallel_dependency_analysis():
+    """Compare serial and sharded process pool analysis"""
+    try:
+        print("🔍 Testing Parallel Dependency Analysis")
+        print("=" * 50)
+
+        shards = split_into_shards(list(range(10)), 4)
+        assert [len(s) for s in shards] == [3, 3, 2, 2], shards
+        assert sum(shards, []) == list(range(10))
+        print("✅ Shards are contiguous and order-preserving")
+
+        table = build_component_table(2000)
+
+        started = time.monotonic()
+        name_index = ComponentNameIndex.from_component_table(table)
+        serial = analyze_components(table, name_index, workers=1)
+        serial_seconds = time.monotonic() - started
+        print(f"Serial: {len(serial)} components analyzed in {serial_seconds:.2f}s")
+
+        assert serial == analyze_component_shard(
+            [c for c in table if c['metadata_type'] in dependency_analysis.IN_MEMORY_DEPENDENCY_ANALYZERS],
+            name_index
+        )
+
+        dependency_analysis.ANALYSIS_POOL_CONFIG['min_parallel_components'] = 1
+        started = time.monotonic()
+        parallel = analyze_components(table, name_index, workers=4, progress=print)
+        parallel_seconds = time.monotonic() - started
+        print(f"Parallel: {len(parallel)} components analyzed in {parallel_seconds:.2f}s")
+
+        assert parallel == serial, "Parallel analysis differs from serial analysis"
+        print(f"✅ Parallel output identical to serial ({sum(len(d) for _, d in serial)} dependencies)")
+
+    except AssertionError as e:
+        print(f"❌ Assertion failed: {str(e)}")
+        raise
+    except Exception as e:
+        print(f"❌ Error: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        raise
+
+if __name__ == "__main__":
+    test_parallel_dependency_analysis()
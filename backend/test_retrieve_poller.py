@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Test script to verify the adaptive checkRetrieveStatus poller
+"""
+
+import sys
+import os
+import threading
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from retrieve_poller import RetrievePoller
+from retrieve_stream import parse_retrieve_text
+
+class FakeSalesforce:
+    """Answers status checks for several retrieves that finish after a number of checks"""
+
+    def __init__(self, checks_until_done):
+        self.checks_until_done = checks_until_done
+        self.calls = {async_id: [] for async_id in checks_until_done}
+        self.lock = threading.Lock()
+
+    def check_status(self, metadata_url, session_id, async_id, include_zip=True, timeout=180):
+        with self.lock:
+            self.calls[async_id].append((time.monotonic(), include_zip))
+            checks = sum(1 for _, zip_requested in self.calls[async_id] if not zip_requested)
+        remaining = self.checks_until_done[async_id]
+        if remaining is None:
+            return 200, parse_retrieve_text('<soapenv:Fault><faultstring>INVALID_SESSION_ID</faultstring></soapenv:Fault>')
+        if checks < remaining:
+            return 200, parse_retrieve_text('<result><done>false</done><state>InProgress</state></result>')
+        body = '<result><done>true</done><success>true</success>'
+        if include_zip:
+            body += '<zipFile>UEsFBgAAAAAAAAAAAAAAAAAAAAAAAA==</zipFile>'
+        return 200, parse_retrieve_text(body + '</result>')
+
+def test_retrieve_poller():
+    """Drive several retrieves through one poller with a short schedule"""
+    try:
+        print("🔍 Testing Retrieve Poller")
+        print("=" * 50)
+
+        salesforce = FakeSalesforce({'fast': 1, 'slow': 5, 'broken': None})
+        poller = RetrievePoller(
+            config={'initial_interval': 0.05, 'backoff_factor': 2, 'max_interval': 0.3, 'jitter': 0.1, 'timeout': 10},
+            check_status=salesforce.check_status
+        )
+
+        results = {}
+        finished = threading.Event()
+
+        def record(async_id, outcome):
+            results[async_id] = outcome
+            if len(results) == 3:
+                finished.set()
+
+        for async_id in ['fast', 'slow', 'broken']:
+            poller.submit(
+                'https://example.invalid', 'session', async_id,
+                on_complete=lambda response, a=async_id: record(a, ('complete', response.zip_size)),
+                on_error=lambda message, a=async_id: record(a, ('error', message))
+            )
+
+        assert finished.wait(10), f"Retrieves did not finish: {results}"
+        print(f"Results: {results}")
+
+        assert results['fast'] == ('complete', 22)
+        assert results['slow'] == ('complete', 22)
+        assert results['broken'] == ('error', 'INVALID_SESSION_ID')
+        print("✅ Completed and failed retrieves reach the right callback")
+
+        fast_calls = salesforce.calls['fast']
+        assert [zip_requested for _, zip_requested in fast_calls] == [False, True], fast_calls
+        print("✅ Polling uses includeZip=false; the zip is fetched once on completion")
+
+        slow_checks = [t for t, zip_requested in salesforce.calls['slow'] if not zip_requested]
+        gaps = [later - earlier for earlier, later in zip(slow_checks, slow_checks[1:])]
+        assert all(later >= earlier * 1.3 or later >= 0.25 for earlier, later in zip(gaps, gaps[1:])), gaps
+        assert max(gaps) < 0.3 * 1.1 + 0.1, gaps
+        print(f"✅ Check intervals back off up to the cap: {[round(g, 2) for g in gaps]}")
+
+        stats = poller.get_stats()
+        assert stats['completed'] == 2 and stats['failed'] == 1 and stats['in_flight'] == 0, stats
+        print(f"✅ Stats: {stats}")
+
+        poller.shutdown()
+
+    except AssertionError as e:
+        print(f"❌ Assertion failed: {str(e)}")
+        raise
+
+if __name__ == "__main__":
+    test_retrieve_poller()
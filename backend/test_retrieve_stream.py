@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Test script to verify streaming parsing of checkRetrieveStatus responses
+"""
+
+import sys
+import os
+import io
+import base64
+import random
+import zipfile
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from retrieve_stream import parse_retrieve_stream, parse_retrieve_text
+
+def build_zip():
+    """Build a small retrieve zip with incompressible content"""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as zip_file:
+        zip_file.writestr('classes/InvoiceService.cls', 'public class InvoiceService {}')
+        zip_file.writestr('objects/Invoice__c.object', os.urandom(200000))
+    return buffer.getvalue()
+
+def build_envelope(zip_bytes, wrap=76):
+    """Build a checkRetrieveStatus reply with a line-wrapped base64 payload"""
+    b64 = base64.b64encode(zip_bytes).decode()
+    wrapped = '\n'.join(b64[i:i + wrap] for i in range(0, len(b64), wrap))
+    return ('<?xml version="1.0"?><soapenv:Envelope><soapenv:Body><checkRetrieveStatusResponse><result>'
+            '<done>true</done><id>09S1</id><status>Succeeded</status><success>true</success>'
+            f'<zipFile>\n{wrapped}\n</zipFile></result></checkRetrieveStatusResponse></soapenv:Body></soapenv:Envelope>').encode()
+
+def random_chunks(data, rng):
+    """Split data at random points, including 1-byte chunks that split tags"""
+    position = 0
+    while position < len(data):
+        size = rng.choice([1, 3, 7, 64, 1000, 65536])
+        yield data[position:position + size]
+        position += size
+
+def test_retrieve_stream():
+    """Parse the same reply with many chunkings and compare against the plain decode"""
+    try:
+        print("🔍 Testing Streaming Retrieve Response Parsing")
+        print("=" * 50)
+
+        zip_bytes = build_zip()
+        envelope = build_envelope(zip_bytes)
+        rng = random.Random(7)
+
+        for attempt in range(20):
+            with parse_retrieve_stream(random_chunks(envelope, rng), spool_max_size=50000) as response:
+                assert response.zip_size == len(zip_bytes), (response.zip_size, len(zip_bytes))
+                assert response.zip_file.read() == zip_bytes, f"Zip payload differs on attempt {attempt}"
+                assert response.search(r'<done>(.*?)</done>') == 'true'
+                assert response.search(r'<success>(.*?)</success>') == 'true'
+                assert '<zipFile></zipFile>' in response.text.replace('\n', '')
+                assert len(response.text) < 1000, "The envelope text should not hold the payload"
+        print("✅ Payload decodes identically across 20 random chunkings")
+
+        with parse_retrieve_stream([envelope]) as response:
+            with zipfile.ZipFile(response.zip_file) as zip_file:
+                assert zip_file.read('classes/InvoiceService.cls') == b'public class InvoiceService {}'
+        print("✅ Zip opens directly from the spooled file")
+
+        pending = parse_retrieve_text('<result><done>false</done><state>InProgress</state></result>')
+        assert pending.zip_file is None
+        assert pending.search(r'<state>(.*?)</state>') == 'InProgress'
+        print("✅ Replies without a zip parse as envelope only")
+
+        try:
+            parse_retrieve_stream([b'<result><zipFile>UEsDBA=='])
+            raise AssertionError("A truncated payload should raise")
+        except ValueError:
+            print("✅ Truncated payload is rejected")
+
+    except AssertionError as e:
+        print(f"❌ Assertion failed: {str(e)}")
+        raise
+
+if __name__ == "__main__":
+    test_retrieve_stream()
@@ -608,52 +608,73 @@ const App = () => {
     setNotification(prev => ({ ...prev, isVisible: false }));
   };
 
-  // Poll for job status updates
+  // Follow job status updates over server-sent events
   useEffect(() => {
-    let intervalId;
+    let source;
     
     if (extractionState.status === 'loading' && extractionState.jobId) {
-      intervalId = setInterval(async () => {
-        try {
-          const response = await fetch(`${API_BASE_URL}/job-status/${extractionState.jobId}`);
-          const result = await response.json();
-          
-          if (result.success) {
-            setExtractionState(prev => ({
-              ...prev,
-              status: result.status === 'starting' ? 'loading' : result.status,
-              progress: result.progress || [],
-              extractedData: result.data,
-              error: result.error,
-              duration: result.duration,
-              message: result.status === 'success' ? 'Metadata extraction completed successfully!' :
-                      result.status === 'error' ? result.error :
-                      'Processing...'
-            }));
-            
-            // Navigate to dashboard when extraction is successful
-            if (result.status === 'success') {
-              clearInterval(intervalId);
-              navigateToDashboard();
-            } else if (result.status === 'error') {
-              clearInterval(intervalId);
-            }
-          }
-        } catch (error) {
-          console.error('Error polling job status:', error);
+      source = new EventSource(`${API_BASE_URL}/job-status/${extractionState.jobId}/stream`);
+      
+      source.addEventListener('progress', (event) => {
+        const { lines } = JSON.parse(event.data);
+        setExtractionState(prev => ({
+          ...prev,
+          progress: [...(prev.progress || []), ...lines]
+        }));
+      });
+      
+      source.addEventListener('status', (event) => {
+        const result = JSON.parse(event.data);
+        setExtractionState(prev => ({
+          ...prev,
+          extractedData: result.data,
+          message: result.status === 'queued' ? 'Waiting for an extraction worker...' : 'Processing...'
+        }));
+      });
+      
+      source.addEventListener('complete', (event) => {
+        const result = JSON.parse(event.data);
+        source.close();
+        setExtractionState(prev => ({
+          ...prev,
+          status: result.status,
+          extractedData: result.data,
+          error: result.error,
+          duration: result.duration,
+          message: result.status === 'success' ? 'Metadata extraction completed successfully!' : result.error
+        }));
+        
+        // Navigate to dashboard when extraction is successful
+        if (result.status === 'success') {
+          navigateToDashboard();
+        }
+      });
+      
+      source.addEventListener('missing', () => {
+        source.close();
+        setExtractionState(prev => ({
+          ...prev,
+          status: 'error',
+          message: 'Error checking job status'
+        }));
+      });
+      
+      // EventSource reconnects by itself after network errors; only give up once it stops trying
+      source.onerror = () => {
+        if (source.readyState === EventSource.CLOSED) {
+          console.error('Job status stream closed');
           setExtractionState(prev => ({
             ...prev,
             status: 'error',
             message: 'Error checking job status'
           }));
-          clearInterval(intervalId);
         }
-      }, 2000);
+      };
     }
     
     return () => {
-      if (intervalId) {
-        clearInterval(intervalId);
+      if (source) {
+        source.close();
       }
     };
   }, [extractionState.status, extractionState.jobId]);
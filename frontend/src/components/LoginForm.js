@@ -76,8 +76,12 @@ const LoginForm = ({ onExtract, onLoginTest, onNavigateToDashboard }) => {
       if (data.success) {
         const jobId = data.job_id;
         
-        // Poll for job completion with progress updates
-        pollJobStatus(jobId, integrationId);
+        // Follow job completion with progress updates
+        if (typeof EventSource !== 'undefined') {
+          followJobStatus(jobId, integrationId);
+        } else {
+          pollJobStatus(jobId, integrationId);
+        }
       } else {
         setError(data.error || 'Failed to start extraction');
         setExtracting(prev => ({ ...prev, [integrationId]: false }));
@@ -91,6 +95,50 @@ const LoginForm = ({ onExtract, onLoginTest, onNavigateToDashboard }) => {
     }
   };
 
+  const followJobStatus = (jobId, integrationId) => {
+    const source = new EventSource(`http://localhost:5000/api/dashboard/job-status/${jobId}/stream`);
+    
+    const finish = () => {
+      source.close();
+      setExtracting(prev => ({ ...prev, [integrationId]: false }));
+      setShowLoadingScreen(false);
+    };
+    
+    // Only lines the loading screen has not shown yet arrive with each event
+    source.addEventListener('progress', (event) => {
+      const { lines } = JSON.parse(event.data);
+      setExtractionState(prev => ({
+        ...prev,
+        progress: [...prev.progress, ...lines],
+        message: lines[lines.length - 1] || prev.message
+      }));
+    });
+    
+    source.addEventListener('complete', (event) => {
+      const data = JSON.parse(event.data);
+      finish();
+      if (data.status === 'success') {
+        // Job completed, navigate to dashboard
+        onNavigateToDashboard(data.dashboard_data);
+      } else {
+        setError(data.error || 'Extraction failed');
+      }
+    });
+    
+    source.addEventListener('missing', () => {
+      finish();
+      setError('Failed to check job status');
+    });
+    
+    // EventSource reconnects by itself after network errors; only give up once it stops trying
+    source.onerror = () => {
+      if (source.readyState === EventSource.CLOSED) {
+        finish();
+        setError('Failed to check job status');
+      }
+    };
+  };
+
   const pollJobStatus = async (jobId, integrationId) => {
     const checkStatus = async () => {
       try {
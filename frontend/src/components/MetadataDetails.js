@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import MetadataObjectView from './MetadataObjectView';
 
 const API_BASE_URL = 'http://localhost:5000/api';
@@ -19,8 +19,11 @@ const MetadataDetails = ({
   const [activeType, setActiveType] = useState(initialSelectedType || { type: 'All Types', count: totalFiles });
   const [metadataFiles, setMetadataFiles] = useState([]);
   const [loadingFiles, setLoadingFiles] = useState(false);
+  const [nextPage, setNextPage] = useState(null);  // { url, cursor, requestId } of the next page, if any
+  const [loadingMore, setLoadingMore] = useState(false);
   const [selectedObject, setSelectedObject] = useState(null);
   const [searchTerm, setSearchTerm] = useState('');
+  const loadRequestRef = useRef(0);
 
   // Use actual metadata types from backend, prepend "All Types"
   const metadataTypes = [
@@ -35,47 +38,66 @@ const MetadataDetails = ({
     }
   }, [activeType, jobId]);
 
+  // Component listings are paginated - show the first page, then load the next one when the list is
+  // scrolled to its end or "Load more" is clicked. A newer load (type change or search) discards older ones.
+  const fetchComponentPage = async (url, cursor = null, pageOf = null) => {
+    const requestId = cursor ? pageOf : ++loadRequestRef.current;
+    const separator = url.includes('?') ? '&' : '?';
+    const response = await fetch(cursor ? `${url}${separator}cursor=${encodeURIComponent(cursor)}` : url);
+    if (!response.ok) {
+      throw new Error(`HTTP error: ${response.status}`);
+    }
+    const result = await response.json();
+    if (!result.success) {
+      throw new Error(result.error);
+    }
+    if (requestId !== loadRequestRef.current) {
+      return;
+    }
+
+    const components = result.components || [];
+    setMetadataFiles(previous => cursor ? previous.concat(components) : components);
+    setNextPage(result.has_more ? { url, cursor: result.next_cursor, requestId } : null);
+  };
+
+  const loadMoreFiles = async () => {
+    if (!nextPage || loadingMore) {
+      return;
+    }
+    setLoadingMore(true);
+    try {
+      await fetchComponentPage(nextPage.url, nextPage.cursor, nextPage.requestId);
+    } catch (error) {
+      console.error('Error fetching more metadata components:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
+  const handleListScroll = (e) => {
+    const { scrollTop, scrollHeight, clientHeight } = e.currentTarget;
+    if (scrollHeight - scrollTop - clientHeight < 200) {
+      loadMoreFiles();
+    }
+  };
+
   const loadMetadataFiles = async () => {
     setLoadingFiles(true);
+    setNextPage(null);
     
     try {
       if (activeType.type === 'All Types') {
         // Fetch all metadata components for the job
-        const response = await fetch(`${API_BASE_URL}/metadata-components/${jobId}`);
-        
-        if (response.ok) {
-          const result = await response.json();
-          if (result.success) {
-            setMetadataFiles(result.components || []);
-          } else {
-            console.error('API returned error:', result.error);
-            setMetadataFiles([]);
-          }
-        } else {
-          console.error('HTTP error:', response.status);
-          setMetadataFiles([]);
-        }
+        await fetchComponentPage(`${API_BASE_URL}/metadata-components/${jobId}`);
       } else {
         // Fetch metadata components for specific type
         const typeToFetch = encodeURIComponent(activeType.type);
-        const response = await fetch(`${API_BASE_URL}/metadata-components/${jobId}/type/${typeToFetch}`);
-        
-        if (response.ok) {
-          const result = await response.json();
-          if (result.success) {
-            setMetadataFiles(result.components || []);
-          } else {
-            console.error('API returned error:', result.error);
-            setMetadataFiles([]);
-          }
-        } else {
-          console.error('HTTP error:', response.status);
-          setMetadataFiles([]);
-        }
+        await fetchComponentPage(`${API_BASE_URL}/metadata-components/${jobId}/type/${typeToFetch}`);
       }
     } catch (error) {
       console.error('Error fetching metadata components:', error);
       setMetadataFiles([]);
+      setNextPage(null);
     } finally {
       setLoadingFiles(false);
     }
@@ -92,7 +114,7 @@ const MetadataDetails = ({
     
     try {
       if (activeType.type === 'All Types') {
-        // For "All Types", we'll filter client-side since we already have all components
+        // For "All Types", we'll filter client-side among the components loaded so far
         setLoadingFiles(false);
         return;
       }
@@ -105,23 +127,11 @@ const MetadataDetails = ({
       
       // Use the search endpoint for specific types
       const typeToFetch = encodeURIComponent(activeType.type);
-      const response = await fetch(`${API_BASE_URL}/metadata-components/${jobId}/type/${typeToFetch}/search?search_term=${encodeURIComponent(searchTerm)}`);
-      
-      if (response.ok) {
-        const result = await response.json();
-        if (result.success) {
-          setMetadataFiles(result.components || []);
-        } else {
-          console.error('Search API returned error:', result.error);
-          setMetadataFiles([]);
-        }
-      } else {
-        console.error('Search HTTP error:', response.status);
-        setMetadataFiles([]);
-      }
+      await fetchComponentPage(`${API_BASE_URL}/metadata-components/${jobId}/type/${typeToFetch}/search?search_term=${encodeURIComponent(searchTerm)}`);
     } catch (error) {
       console.error('Error searching metadata components:', error);
       setMetadataFiles([]);
+      setNextPage(null);
     } finally {
       setLoadingFiles(false);
     }
@@ -181,7 +191,7 @@ const MetadataDetails = ({
     }
   };
 
-  // For "All Types", filter client-side since we have all components
+  // For "All Types", filter client-side among the loaded pages
   // For specific types, the filtering is done server-side
   const filteredObjects = activeType.type === 'All Types' 
     ? metadataFiles.filter(obj =>
@@ -253,7 +263,7 @@ const MetadataDetails = ({
             </div>
           </div>
           
-          <div className="objects-content">
+          <div className="objects-content" onScroll={handleListScroll}>
             {loadingFiles ? (
               <div className="loading-state">
                 <div className="loading-spinner small"></div>
@@ -271,6 +281,7 @@ const MetadataDetails = ({
                   <span>
                     <strong style={{ color: 'white' }}>{filteredObjects.length}</strong> objects
                     {searchTerm && ` matching "${searchTerm}"`}
+                    {nextPage && ' loaded so far'}
                   </span>
                 </div>
 
@@ -312,7 +323,7 @@ const MetadataDetails = ({
                       </div>
                     </div>
                   ))
-                ) : (
+                ) : nextPage ? null : (
                   <div className="empty-state">
                     <div className="empty-icon">📄</div>
                     <h3>No {activeType.type} found</h3>
@@ -324,6 +335,17 @@ const MetadataDetails = ({
                     </p>
                   </div>
                 )}
+
+                {nextPage && (
+                  <button
+                    className="secondary-button"
+                    style={{ width: '100%', marginTop: '10px' }}
+                    onClick={loadMoreFiles}
+                    disabled={loadingMore}
+                  >
+                    {loadingMore ? 'Loading...' : 'Load more'}
+                  </button>
+                )}
               </div>
             )}
           </div>